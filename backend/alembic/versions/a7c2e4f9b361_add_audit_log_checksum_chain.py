@@ -0,0 +1,23 @@
+"""add_audit_log_checksum_chain
+
+Revision ID: a7c2e4f9b361
+Revises: f6b1d4e8a239
+Create Date: 2026-10-18 16:27:44.918205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2e4f9b361'
+down_revision = 'f6b1d4e8a239'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('audit_logs', sa.Column('previous_checksum', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('audit_logs', 'previous_checksum')
@@ -0,0 +1,23 @@
+"""add_chat_message_token_count
+
+Revision ID: b7c4d2e9f013
+Revises: new_rag_rbac
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7c4d2e9f013'
+down_revision = 'new_rag_rbac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_messages', sa.Column('token_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('chat_messages', 'token_count')
@@ -0,0 +1,29 @@
+"""add_chat_session_summary
+
+Revision ID: c3e8a1f5b724
+Revises: b7c4d2e9f013
+Create Date: 2026-10-18 11:02:17.530961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f5b724'
+down_revision = 'b7c4d2e9f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chat_sessions', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column('chat_sessions', sa.Column('summarized_message_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.add_column('chat_sessions', sa.Column('summary_updated_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_chat_messages_session_created', 'chat_messages', ['session_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_messages_session_created', table_name='chat_messages')
+    op.drop_column('chat_sessions', 'summary_updated_at')
+    op.drop_column('chat_sessions', 'summarized_message_count')
+    op.drop_column('chat_sessions', 'summary')
@@ -0,0 +1,25 @@
+"""add_tool_result_cache_fields
+
+Revision ID: d4f7b2c9e815
+Revises: c3e8a1f5b724
+Create Date: 2026-10-18 14:26:41.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7b2c9e815'
+down_revision = 'c3e8a1f5b724'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tools', sa.Column('cacheable', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.add_column('tools', sa.Column('cache_ttl_seconds', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tools', 'cache_ttl_seconds')
+    op.drop_column('tools', 'cacheable')
@@ -0,0 +1,28 @@
+"""add_tool_execution_count
+
+Revision ID: e5a9c3d1f027
+Revises: d4f7b2c9e815
+Create Date: 2026-10-18 15:02:17.530841
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3d1f027'
+down_revision = 'd4f7b2c9e815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tools', sa.Column('execution_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # Existing averages were computed over every recorded use
+    op.execute(
+        "UPDATE tools SET execution_count = COALESCE(usage_count, 0) "
+        "WHERE average_execution_time IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tools', 'execution_count')
@@ -0,0 +1,39 @@
+"""add_tool_mcp_server_columns
+
+Revision ID: f6b1d4e8a239
+Revises: e5a9c3d1f027
+Create Date: 2026-10-18 15:41:09.284317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'f6b1d4e8a239'
+down_revision = 'e5a9c3d1f027'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tools', sa.Column('mcp_server_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('tools', sa.Column('mcp_tool_name', sa.String(length=255), nullable=True))
+    op.create_foreign_key(
+        'fk_tools_mcp_server_id', 'tools', 'mcp_servers',
+        ['mcp_server_id'], ['id'], ondelete='CASCADE'
+    )
+    # Tools synced before these columns existed kept the ids in their metadata
+    op.execute(
+        "UPDATE tools SET mcp_server_id = (tool_metadata->>'mcp_server_id')::uuid, "
+        "mcp_tool_name = tool_metadata->>'mcp_tool_name' "
+        "WHERE tool_metadata->>'mcp_server_id' IS NOT NULL AND tool_metadata->>'mcp_tool_name' IS NOT NULL"
+    )
+    op.create_unique_constraint('uq_tools_mcp_server_tool', 'tools', ['mcp_server_id', 'mcp_tool_name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_tools_mcp_server_tool', 'tools', type_='unique')
+    op.drop_constraint('fk_tools_mcp_server_id', 'tools', type_='foreignkey')
+    op.drop_column('tools', 'mcp_tool_name')
+    op.drop_column('tools', 'mcp_server_id')
@@ -8,10 +8,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import make_asgi_app
 
 from shared.config.settings import get_settings
-from shared.logging.structured_logging import setup_structured_logging, get_logger
+from shared.logging.structured_logging import setup_structured_logging, stop_log_queue, get_logger
 from shared.api import api_router
 from shared.middleware.compliance import ComplianceMiddleware
-from shared.middleware.audit import AuditMiddleware
 from shared.middleware.security import SecurityConfig, create_security_middleware_stack
 from shared.services.monitoring import monitoring_service
 
@@ -49,6 +48,22 @@ async def lifespan(app: FastAPI):
     await global_state_manager.start_global_monitoring()
     logger.info("Agent lifecycle monitoring started")
     
+    # Pre-warm custom tool sandbox workers
+    from shared.services.sandbox_pool import sandbox_pool
+    await sandbox_pool.start(prewarm=settings.sandbox.prewarm_workers)
+    
+    # Start write-behind tool usage statistics
+    from shared.services.tool_usage_stats import tool_usage_recorder
+    await tool_usage_recorder.start()
+    
+    # Start the batched audit log writer
+    from shared.services.audit_writer import audit_writer
+    await audit_writer.start()
+    
+    # Start principal cache invalidation and API key usage flushing
+    from shared.services.principal_cache import principal_cache
+    await principal_cache.start()
+    
     yield
     
     # Shutdown
@@ -62,6 +77,46 @@ async def lifespan(app: FastAPI):
     await lifecycle_manager.stop_monitoring()
     await global_state_manager.stop_global_monitoring()
     logger.info("Agent lifecycle monitoring stopped")
+    
+    # Stop custom tool sandbox workers
+    await sandbox_pool.close()
+    logger.info("Sandbox workers stopped")
+    
+    # Flush pending tool usage statistics
+    await tool_usage_recorder.aclose()
+    logger.info("Tool usage statistics flushed")
+    
+    # Flush queued audit events
+    await audit_writer.aclose()
+    logger.info("Audit log writer flushed")
+    
+    # Flush API key usage and stop principal cache invalidation
+    await principal_cache.aclose()
+    
+    # Stop password hashing threads
+    from shared.services.password_hasher import password_hasher
+    password_hasher.close()
+    
+    # Stop MCP server health checks
+    from shared.services.mcp_health_scheduler import mcp_health_scheduler
+    await mcp_health_scheduler.aclose()
+    
+    # Close persistent MCP sessions
+    from shared.services.mcp_session_pool import mcp_session_pool
+    await mcp_session_pool.aclose()
+    logger.info("MCP sessions closed")
+    
+    # Close cached LLM provider instances before the transports they use
+    from shared.services.llm_providers.provider_factory import aclose_all_factories
+    await aclose_all_factories()
+    
+    # Close pooled outbound HTTP connections
+    from shared.services.http_transport import http_transport_registry
+    await http_transport_registry.aclose()
+    logger.info("HTTP transport pools closed")
+    
+    # Write out queued log records
+    stop_log_queue()
 
 
 # Create FastAPI application
@@ -83,10 +138,10 @@ security_config.rate_limit_per_minute = 600
 security_config.rate_limit_per_hour = 10000
 security_config.burst_limit = 100
 
-# Apply security middleware stack
+# Apply security and audit middleware as one pure ASGI pipeline layer
 app = create_security_middleware_stack(app, security_config)
 
-# Add CORS middleware
+# Add CORS middleware (outermost, so rejected requests still carry CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.api.cors_origins,
@@ -95,9 +150,6 @@ app.add_middleware(
     allow_headers=settings.api.cors_headers,
 )
 
-# Add audit middleware
-app.add_middleware(AuditMiddleware)
-
 # Add compliance middleware
 # app.add_middleware(ComplianceMiddleware)
 
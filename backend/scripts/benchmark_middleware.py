@@ -0,0 +1,97 @@
+"""
+Benchmark the per-request overhead of the HTTP middleware stack.
+
+Runs the same security and audit stages (as configured in main.py) once as
+one pure ASGI pipeline and once with every stage wrapped in Starlette's
+BaseHTTPMiddleware, which is how they were stacked before. Requests are
+driven directly through ASGI, so the numbers are middleware overhead only.
+
+Usage:
+    python scripts/benchmark_middleware.py [--requests 5000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add parent directory to path so we can import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+
+from shared.middleware.audit import AuditMiddleware
+from shared.middleware.pipeline import MiddlewarePipeline
+from shared.middleware.security import RateLimitMiddleware, RequestLoggingMiddleware
+from shared.services.audit_writer import audit_writer
+
+
+async def endpoint(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def make_stages():
+    return [
+        RequestLoggingMiddleware(),
+        AuditMiddleware(),
+        RateLimitMiddleware(requests_per_minute=10 ** 9, requests_per_hour=10 ** 9, burst_limit=10 ** 9)
+    ]
+
+
+def build_pipeline():
+    return MiddlewarePipeline(endpoint, make_stages())
+
+
+def build_base_http_stack():
+    app = endpoint
+    for stage in reversed(make_stages()):
+        app = BaseHTTPMiddleware(app, dispatch=stage.dispatch)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Send ``requests`` GET requests through ``app``; returns microseconds per request."""
+    scope = {
+        "type": "http", "method": "GET", "path": "/api/v1/agents", "raw_path": b"/api/v1/agents",
+        "query_string": b"", "headers": [(b"user-agent", b"bench")], "client": ("203.0.113.5", 1234),
+        "server": ("bench", 80), "scheme": "http", "http_version": "1.1", "root_path": ""
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm up
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int):
+    # Measure the middleware, not the database
+    async def discard(entries):
+        pass
+    audit_writer._write = discard
+
+    base_http = await drive(build_base_http_stack(), requests)
+    pipeline = await drive(build_pipeline(), requests)
+    await audit_writer.aclose()
+
+    print(f"{requests} requests, {len(make_stages())} middleware stages")
+    print(f"  BaseHTTPMiddleware stack: {base_http:8.1f} us/request")
+    print(f"  Pure ASGI pipeline:       {pipeline:8.1f} us/request")
+    print(f"  Overhead reduction:       {(1 - pipeline / base_http) * 100:8.1f} %")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main(args.requests))
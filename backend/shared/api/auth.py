@@ -29,6 +29,8 @@ from ..schemas.auth import (
     RoleCreate, RoleUpdate, PermissionResponse
 )
 from ..services.api_key import APIKeyService
+from ..services.password_hasher import PasswordHasherBusyError
+from ..services.principal_cache import principal_cache
 from ..models.api_key import APIKey
 from typing import Union
 from fastapi import Header
@@ -44,6 +46,16 @@ settings = get_settings()
 SECRET_KEY = settings.security.secret_key if hasattr(settings, 'security') else "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 
+
+def password_hasher_busy() -> HTTPException:
+    """Response for requests rejected because password hashing is saturated."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many authentication attempts, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(
     user_data: UserRegister,
@@ -78,6 +90,8 @@ async def register_user(
         
         return UserResponse.from_orm(user)
         
+    except PasswordHasherBusyError:
+        raise password_hasher_busy()
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -104,7 +118,11 @@ async def login_user(
     auth_service = AuthService(db)
     
     # Authenticate user
-    user = await auth_service.authenticate_user(user_data.email, user_data.password)
+    try:
+        user = await auth_service.authenticate_user(user_data.email, user_data.password)
+    except PasswordHasherBusyError:
+        logger.warning(f"Login rejected, password verification saturated: {user_data.email}")
+        raise password_hasher_busy()
     
     if not user:
         logger.warning(f"Login failed for email: {user_data.email}")
@@ -185,9 +203,8 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Get user from database
-    auth_service = AuthService(db)
-    user = await auth_service.get_user_by_id(UUID(user_id))
+    # Get user (cached briefly per process)
+    user = await principal_cache.get_user(db, UUID(user_id))
     
     if user is None:
         raise HTTPException(
@@ -309,6 +326,7 @@ async def update_user_profile(
     
     await db.commit()
     await db.refresh(current_user)
+    await principal_cache.invalidate_user(current_user.id)
     
     return UserResponse.from_orm(current_user)
 
@@ -326,11 +344,14 @@ async def change_password(
     """
     auth_service = AuthService(db)
     
-    success = await auth_service.change_password(
-        user_id=current_user.id,
-        old_password=password_data.old_password,
-        new_password=password_data.new_password
-    )
+    try:
+        success = await auth_service.change_password(
+            user_id=current_user.id,
+            old_password=password_data.old_password,
+            new_password=password_data.new_password
+        )
+    except PasswordHasherBusyError:
+        raise password_hasher_busy()
     
     if not success:
         raise HTTPException(
@@ -354,10 +375,13 @@ async def reset_password(
     """
     auth_service = AuthService(db)
     
-    success = await auth_service.reset_password(
-        email=password_data.email,
-        new_password=password_data.new_password
-    )
+    try:
+        success = await auth_service.reset_password(
+            email=password_data.email,
+            new_password=password_data.new_password
+        )
+    except PasswordHasherBusyError:
+        raise password_hasher_busy()
     
     if not success:
         raise HTTPException(
@@ -565,6 +589,7 @@ async def update_user_admin(
     
     await db.commit()
     await db.refresh(user)
+    await principal_cache.invalidate_user(user_id)
     
     # Update roles if provided
     if user_data.role_ids is not None:
@@ -644,6 +669,7 @@ async def delete_user(
     user.is_active = False
     user.status = "inactive"
     await db.commit()
+    await principal_cache.invalidate_user(user_id)
     
     return {"message": "User deactivated successfully"}
 
@@ -838,6 +864,8 @@ async def update_role(
     
     await db.commit()
     await db.refresh(role)
+    # Cached principals hold the role snapshot of every user that has it
+    await principal_cache.invalidate_all()
     
     return RoleResponse.from_orm(role)
 
@@ -880,6 +908,7 @@ async def delete_role(
     # Soft delete by setting is_deleted = True
     role.is_deleted = True
     await db.commit()
+    await principal_cache.invalidate_all()
     
     return {"message": "Role deleted successfully"}
 
@@ -5,7 +5,7 @@ Tool Registry API endpoints for the AI Agent Framework.
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.security import HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,6 +15,7 @@ from ..models.tool import (
     ToolDiscoveryResponse, ToolType, ToolStatus
 )
 from ..services.tool_registry import ToolRegistryService
+from ..services.tool_output_store import tool_output_store
 from ..services.auth import get_current_user
 from ..models.user import User
 from ..logging.config import get_logger
@@ -159,6 +160,22 @@ async def execute_tool(
         logger.error(f"Failed to execute tool: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/outputs/{blob_id}")
+async def get_tool_output(
+    blob_id: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(get_current_user)
+):
+    """Read a large tool output stored as a blob."""
+    # Only the user the output was produced for may read it; others get the same 404
+    if not current_user.is_system_admin and tool_output_store.owner_of(blob_id) != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Tool output not found or expired")
+    content = await tool_output_store.read(blob_id, offset=offset, limit=limit)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Tool output not found or expired")
+    return Response(content=content, media_type=tool_output_store.content_type_of(blob_id))
+
 @router.get("/templates/", response_model=List[Dict[str, Any]])
 async def get_tool_templates(
     current_user: User = Depends(get_current_user),
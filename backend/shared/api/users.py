@@ -12,6 +12,7 @@ from shared.models.rbac import Role, UserRole
 from shared.schemas.user import UserResponse, UserCreateRequest, UserUpdateRequest, UserRoleAssignRequest, RoleResponse
 from shared.decorators.permissions import require_super_admin
 from shared.services.auth import AuthService
+from shared.services.principal_cache import principal_cache
 
 router = APIRouter(prefix="/users", tags=["User Management"])
 
@@ -204,6 +205,7 @@ async def update_user(
             
     await db.commit()
     await db.refresh(user)
+    await principal_cache.invalidate_user(user_id)
     
     # Creating response manually to ensure roles are loaded
     stmt = select(User).options(
@@ -251,6 +253,7 @@ async def delete_user(
         
     await db.delete(user)
     await db.commit()
+    await principal_cache.invalidate_user(user_id)
 
 @router.post("/{user_id}/roles/{role_id}")
 @require_super_admin
@@ -270,6 +273,7 @@ async def assign_user_role(
     user_role = UserRole(user_id=user_id, role_id=role_id, assigned_by=current_user.id)
     db.add(user_role)
     await db.commit()
+    await principal_cache.invalidate_user(user_id)
     
     return {"message": "Role assigned successfully"}
 
@@ -289,6 +293,7 @@ async def revoke_user_role(
         raise HTTPException(status_code=404, detail="Role assignment not found")
         
     await db.commit()
+    await principal_cache.invalidate_user(user_id)
     return {"message": "Role revoked successfully"}
 
 @router.get("/{user_id}/roles", response_model=List[RoleResponse])
@@ -20,6 +20,8 @@ from shared.api.auth import get_current_user
 from shared.models.user import User
 from shared.services.chain_orchestrator import ChainOrchestratorService, ChainExecutionError
 from shared.api.v1.endpoints.chains import get_chain_orchestrator_service
+from shared.services.context_budget import count_tokens
+from shared.services.chat_summary import ChatSummaryService, summarize_session_background
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +99,7 @@ async def get_session(
 async def send_message(
     session_id: UUID,
     message: ChatMessageCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_db),
     orchestrator: ChainOrchestratorService = Depends(get_chain_orchestrator_service)
@@ -115,6 +118,7 @@ async def send_message(
         session_id=session_id,
         role=MessageRole.USER,
         content=message.content,
+        token_count=count_tokens(message.content),
         message_metadata=message.message_metadata
     )
     session.add(user_msg)
@@ -131,15 +135,18 @@ async def send_message(
     # but usually we want to include it in history or as current input. 
     # Here we treat current message as 'input' variable and past messages as 'chat_history'.)
     
-    history_result = await session.execute(
-        select(ChatMessage)
-        .where(ChatMessage.session_id == session_id, ChatMessage.id != user_msg.id)
-        .order_by(ChatMessage.created_at)
-    )
-    history = history_result.scalars().all()
+    # Only the unsummarized tail is read; older turns are covered by the rolling summary.
+    summary_service = ChatSummaryService(session)
+    history, total_messages = await summary_service.load_history(chat_session, exclude_message_id=user_msg.id)
+    
+    # Backfill cached token counts for messages stored before counting existed;
+    # they are persisted with the assistant message commit below.
+    for msg in history:
+        if msg.token_count is None:
+            msg.token_count = count_tokens(msg.content)
     
     formatted_history = [
-        {"role": msg.role, "content": msg.content} for msg in history
+        {"role": msg.role, "content": msg.content, "token_count": msg.token_count} for msg in history
     ]
     
     # We also include the current message in the history for the LLM if the chain handles it that way.
@@ -149,6 +156,11 @@ async def send_message(
         "input": message.content,
         "chat_history": formatted_history
     }
+    if chat_session.summary:
+        chain_input["conversation_summary"] = chat_session.summary
+    
+    if summary_service.needs_summary(chat_session, total_messages + 1):
+        background_tasks.add_task(summarize_session_background, session_id)
     
     # Extract model override from session metadata
     model_override = None
@@ -171,8 +183,8 @@ async def send_message(
         await session.refresh(execution)
         
         output_data = execution.output_data or {}
-        logger.info(f"DEBUG: output_data type: {type(output_data)}")
-        logger.info(f"DEBUG: output_data full: {output_data}")
+        logger.debug("output_data type: %s", type(output_data))
+        logger.debug("output_data full: %s", output_data)
 
         # Heuristic to find the response text
         response_text = None
@@ -240,6 +252,7 @@ async def send_message(
             session_id=session_id,
             role=MessageRole.ASSISTANT,
             content=response_text,
+            token_count=count_tokens(response_text),
             execution_id=execution.id
         )
         session.add(assistant_msg)
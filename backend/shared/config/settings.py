@@ -1,7 +1,7 @@
 """Application configuration management using Pydantic Settings."""
 
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -58,7 +58,52 @@ class SecuritySettings(BaseSettings):
     keycloak_client_secret: Optional[str] = Field(
         default=None, description="Keycloak client secret"
     )
-    
+
+    # Rate limiting
+    rate_limit_backend: str = Field(
+        default="memory",
+        description="Rate limiter backend: 'memory' (per process) or 'redis' (shared across workers)"
+    )
+    rate_limit_redis_url: Optional[str] = Field(
+        default=None,
+        description="Redis URL for the rate limiter (defaults to REDIS_URL)"
+    )
+    rate_limit_max_keys: int = Field(
+        default=100000,
+        description="Maximum number of clients tracked by the in-process rate limiter"
+    )
+
+    # Principal cache
+    principal_cache_ttl_seconds: float = Field(
+        default=30.0,
+        description="Seconds an authenticated user or API key is cached per process (0 disables caching)"
+    )
+    principal_cache_max_entries: int = Field(
+        default=10000,
+        description="Maximum number of cached users and API keys each"
+    )
+    principal_invalidation_channel: str = Field(
+        default="auth:principal-invalidation",
+        description="Redis channel for principal cache invalidations (empty for local only)"
+    )
+    api_key_usage_flush_interval_seconds: float = Field(
+        default=30.0,
+        description="Seconds between batched writes of API key last_used_at"
+    )
+
+    # Password hashing
+    password_hash_workers: int = Field(
+        default=4,
+        description="Threads (and concurrent operations) for password hashing and verification"
+    )
+    password_hash_max_waiting: int = Field(
+        default=32,
+        description="Password operations allowed to wait for a thread before new ones are rejected"
+    )
+    argon2_time_cost: int = Field(default=3, description="Argon2 time cost (iterations)")
+    argon2_memory_cost_kib: int = Field(default=65536, description="Argon2 memory cost in KiB")
+    argon2_parallelism: int = Field(default=4, description="Argon2 parallelism (lanes)")
+
     model_config = SettingsConfigDict(env_prefix="SECURITY_")
 
 
@@ -67,6 +112,28 @@ class LoggingSettings(BaseSettings):
     
     level: str = Field(default="INFO", description="Log level")
     format: str = Field(default="json", description="Log format (json or console)")
+
+    # Queued logging
+    queue_enabled: bool = Field(
+        default=True,
+        description="Format and write log records on a background thread instead of the event loop"
+    )
+    queue_max_size: int = Field(
+        default=10000,
+        description="Maximum log records waiting to be written; further records are dropped and counted"
+    )
+    max_message_chars: int = Field(
+        default=4000,
+        description="Log messages longer than this are truncated (0 disables truncation)"
+    )
+    max_field_chars: int = Field(
+        default=1000,
+        description="String fields passed as extra longer than this are truncated (0 disables truncation)"
+    )
+    sample_rates: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Share of records below WARNING kept per logger name prefix, e.g. {\"shared.services\": 0.1}"
+    )
     
     model_config = SettingsConfigDict(env_prefix="LOG_")
 
@@ -117,6 +184,14 @@ class MemorySettings(BaseSettings):
         default="./data/chroma",
         description="Path to vector database storage"
     )
+    embedding_batch_size: int = Field(
+        default=32,
+        description="Maximum texts per micro-batched embedding call (1 disables batching)"
+    )
+    embedding_batch_wait_ms: float = Field(
+        default=5.0,
+        description="Maximum time an embedding request waits to be batched"
+    )
     
     model_config = SettingsConfigDict(env_prefix="MEMORY_")
 
@@ -129,10 +204,187 @@ class LLMSettings(BaseSettings):
         default=60,
         description="Maximum number of LLM calls per minute"
     )
-    
+
+    # Context budgeting
+    context_max_tokens: int = Field(
+        default=16000,
+        description="Upper bound on prompt plus completion tokens, regardless of model window"
+    )
+    context_rag_share: float = Field(
+        default=0.25,
+        description="Share of the available prompt budget reserved for RAG context"
+    )
+    context_memory_share: float = Field(
+        default=0.10,
+        description="Share of the available prompt budget reserved for memory snippets"
+    )
+
+    # Request coalescing
+    coalesce_requests: bool = Field(
+        default=True,
+        description="Share one upstream call between concurrent identical requests"
+    )
+    coalesce_max_temperature: float = Field(
+        default=0.0,
+        description="Highest temperature at which requests are coalesced without explicit opt-in"
+    )
+
+    # Provider instance cache
+    provider_cache_size: int = Field(
+        default=32,
+        description="Maximum number of cached provider instances (least recently used are evicted)"
+    )
+    provider_idle_ttl_seconds: int = Field(
+        default=900,
+        description="Cached provider instances unused for this long are evicted"
+    )
+    provider_health_check_interval: int = Field(
+        default=60,
+        description="Minimum seconds between health checks of a cached provider"
+    )
+
     model_config = SettingsConfigDict(env_prefix="LLM_")
 
 
+class HTTPClientSettings(BaseSettings):
+    """Outbound HTTP client pool settings."""
+    
+    max_connections: int = Field(default=100, description="Maximum connections per upstream pool")
+    max_keepalive_connections: int = Field(default=20, description="Maximum idle keep-alive connections per pool")
+    keepalive_expiry: float = Field(default=30.0, description="Seconds an idle connection is kept alive")
+    timeout: float = Field(default=60.0, description="Default request timeout in seconds")
+    connect_timeout: float = Field(default=10.0, description="Connection timeout in seconds")
+    http2: bool = Field(default=True, description="Negotiate HTTP/2 when the h2 package is installed")
+    
+    model_config = SettingsConfigDict(env_prefix="HTTP_CLIENT_")
+
+
+class SandboxSettings(BaseSettings):
+    """Custom tool sandbox worker pool settings."""
+    
+    pool_size: int = Field(default=4, description="Maximum number of sandbox worker processes")
+    prewarm_workers: int = Field(default=2, description="Workers started ahead of the first call at startup")
+    max_calls_per_worker: int = Field(
+        default=1,
+        description="Calls served before a worker is recycled; 1 gives every call a fresh process, "
+                    "higher values (0 for no limit) share workers across tools and users"
+    )
+    memory_limit_mb: int = Field(default=512, description="Address space limit per worker in MB (0 disables)")
+    cpu_seconds_per_call: int = Field(default=30, description="CPU time allowed per tool call (0 disables)")
+    warm_modules: str = Field(
+        default="json,requests,bs4,httpx",
+        description="Comma-separated modules imported when a worker starts"
+    )
+    startup_timeout: float = Field(default=15.0, description="Seconds to wait for a worker to become ready")
+    
+    model_config = SettingsConfigDict(env_prefix="SANDBOX_")
+
+
+class ToolSettings(BaseSettings):
+    """Tool registry and execution settings."""
+    
+    catalog_ttl_seconds: float = Field(
+        default=300.0,
+        description="Seconds before the in-process tool catalog is reloaded (0 keeps it until invalidated)"
+    )
+    max_parallel_calls: int = Field(default=4, description="Default cap on concurrent tool calls per agent")
+    max_calls_per_batch: int = Field(default=8, description="Maximum independent tool calls executed from one decision")
+    call_timeout_seconds: float = Field(default=60.0, description="Timeout for tool calls without their own timeout")
+    result_cache_enabled: bool = Field(default=True, description="Serve repeated calls to cacheable tools from cache")
+    result_cache_default_ttl_seconds: int = Field(default=300, description="TTL for cacheable tools without their own TTL")
+    result_cache_max_memory_mb: int = Field(default=50, description="In-process memory budget for cached tool results")
+    result_cache_l2: bool = Field(default=True, description="Share cached tool results across workers through Redis")
+    schema_engine: str = Field(
+        default="auto",
+        description="Input validation engine: auto (fastjsonschema when installed) or jsonschema"
+    )
+    schema_cache_size: int = Field(default=512, description="Maximum compiled input-schema validators kept in memory")
+    usage_flush_interval_seconds: float = Field(default=10.0, description="Seconds between usage statistics flushes")
+    usage_flush_max_pending: int = Field(default=500, description="Flush early once this many tools have pending usage")
+    output_spill_threshold_bytes: int = Field(default=256 * 1024, description="Tool outputs larger than this are stored as blobs")
+    output_store_dir: str = Field(default="./data/tool_outputs", description="Directory of the tool output blob store")
+    output_preview_chars: int = Field(default=2000, description="Characters of a spilled output kept inline as a preview")
+    output_retention_hours: float = Field(default=24.0, description="Hours before stored tool output blobs are purged")
+    context_max_chars: int = Field(default=16000, description="Character budget for all tool results in an agent prompt")
+    
+    model_config = SettingsConfigDict(env_prefix="TOOLS_")
+
+
+class MCPSettings(BaseSettings):
+    """MCP client connection settings."""
+    
+    max_in_flight_per_server: int = Field(default=16, description="Concurrent requests multiplexed on one server session")
+    connect_timeout: float = Field(default=10.0, description="Seconds to wait for a session to connect and initialize")
+    request_timeout: float = Field(default=60.0, description="Default per-request timeout in seconds")
+    idle_timeout_seconds: float = Field(default=300.0, description="Idle sessions are closed after this many seconds (0 keeps them)")
+    reconnect_initial_backoff: float = Field(default=0.5, description="First reconnect delay in seconds")
+    reconnect_max_backoff: float = Field(default=30.0, description="Maximum reconnect delay in seconds")
+    health_check_interval: float = Field(default=60.0, description="Seconds between health checks of a connected server")
+    health_tick_seconds: float = Field(default=5.0, description="How often the health scheduler looks for due servers")
+    health_max_concurrency: int = Field(default=8, description="Maximum concurrent health checks and reconnects")
+    health_jitter: float = Field(default=0.1, description="Relative jitter applied to check intervals and backoff")
+    health_reconnect_initial_backoff: float = Field(default=5.0, description="First reconnect delay for an unhealthy server")
+    health_reconnect_max_backoff: float = Field(default=300.0, description="Maximum reconnect delay for an unhealthy server")
+    
+    model_config = SettingsConfigDict(env_prefix="MCP_")
+
+
+class ChatSettings(BaseSettings):
+    """Chat session configuration settings."""
+    
+    summary_trigger_messages: int = Field(
+        default=20,
+        description="Unsummarized messages (beyond the recent window) that trigger a summary update"
+    )
+    summary_recent_messages: int = Field(
+        default=10,
+        description="Most recent messages always sent verbatim alongside the summary"
+    )
+    summary_provider: str = Field(default="ollama", description="LLM provider used for summaries")
+    summary_model: str = Field(default="llama3.2:latest", description="LLM model used for summaries")
+    summary_max_tokens: int = Field(default=500, description="Maximum tokens for a summary")
+    
+    model_config = SettingsConfigDict(env_prefix="CHAT_")
+
+
+class AuditSettings(BaseSettings):
+    """Audit log writer settings."""
+    
+    queue_max_size: int = Field(default=10000, description="Maximum audit events waiting to be written")
+    batch_size: int = Field(default=500, description="Maximum audit events inserted per statement")
+    flush_interval_seconds: float = Field(default=1.0, description="Maximum time an audit event waits for a batch")
+    overflow_policy: str = Field(
+        default="sample",
+        description="When the queue fills: 'block' (wait for space), 'sample' (thin low-severity events) or 'drop'"
+    )
+    enqueue_timeout_seconds: float = Field(
+        default=0.1,
+        description="Maximum time a request waits for queue space before its event is dropped"
+    )
+    sample_high_water: float = Field(
+        default=0.8,
+        description="Queue fill ratio above which low-severity events are sampled"
+    )
+    sample_rate: float = Field(default=0.1, description="Share of low-severity events kept while sampling")
+    
+    model_config = SettingsConfigDict(env_prefix="AUDIT_")
+
+
+class GuardrailsSettings(BaseSettings):
+    """Content guardrails settings."""
+    
+    stream_window_chars: int = Field(
+        default=256,
+        description="Characters of streamed output held back so patterns spanning chunks are caught"
+    )
+    policy_cache_ttl_seconds: float = Field(
+        default=60.0,
+        description="How long compiled guardrail policies are cached before they are reloaded"
+    )
+    
+    model_config = SettingsConfigDict(env_prefix="GUARDRAILS_")
+
+
 class Settings(BaseSettings):
     """Main application settings."""
     
@@ -152,6 +404,13 @@ class Settings(BaseSettings):
     api: APISettings = Field(default_factory=APISettings)
     memory: MemorySettings = Field(default_factory=MemorySettings)
     llm: LLMSettings = Field(default_factory=LLMSettings)
+    chat: ChatSettings = Field(default_factory=ChatSettings)
+    audit: AuditSettings = Field(default_factory=AuditSettings)
+    guardrails: GuardrailsSettings = Field(default_factory=GuardrailsSettings)
+    http: HTTPClientSettings = Field(default_factory=HTTPClientSettings)
+    sandbox: SandboxSettings = Field(default_factory=SandboxSettings)
+    tools: ToolSettings = Field(default_factory=ToolSettings)
+    mcp: MCPSettings = Field(default_factory=MCPSettings)
 
     # Zeebe settings
     zeebe_gateway_host: str = Field(default="zeebe", description="Zeebe gateway host")
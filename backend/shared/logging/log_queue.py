@@ -0,0 +1,156 @@
+"""
+Queued Log Handling
+
+Log records used to be JSON-formatted and written to the console and the
+rotating log files by whichever coroutine logged them, so log I/O showed up
+as event-loop latency. With the log queue:
+
+- Each configured logger gets a ``QueueLogHandler`` instead of its
+  handlers. It only captures the record: the message is merged with its
+  arguments and truncated, long ``extra`` strings are truncated, and the
+  record is put on a bounded queue.
+- A single ``QueueListener`` thread formats records and writes them through
+  the handlers their logger was configured with.
+- When the queue is full, records are dropped and counted rather than
+  blocking the caller.
+"""
+
+import copy
+import logging
+import logging.handlers
+import queue
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Attributes every LogRecord has; anything else was passed as ``extra``
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def truncate(value: str, limit: int) -> str:
+    """Shorten ``value`` to ``limit`` characters (0 means no limit)"""
+    if limit and len(value) > limit:
+        return f"{value[:limit]}... [truncated {len(value) - limit} chars]"
+    return value
+
+
+@dataclass
+class LogQueueStats:
+    """Counters of the log queue"""
+    enqueued: int = 0
+    dropped: int = 0
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """Puts the records of one logger on the shared log queue"""
+
+    def __init__(self, log_queue: "LogQueue", route: str):
+        super().__init__(log_queue.queue)
+        self.log_queue = log_queue
+        self.route = route
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message is merged now since its arguments may change once the call returns;
+        # formatting and the exception traceback are left to the listener thread
+        record = copy.copy(record)
+        record.msg = truncate(record.getMessage(), self.log_queue.max_message_chars)
+        record.args = None
+
+        max_field_chars = self.log_queue.max_field_chars
+        if max_field_chars:
+            for key, value in list(record.__dict__.items()):
+                if isinstance(value, str) and len(value) > max_field_chars and key not in RECORD_ATTRIBUTES:
+                    record.__dict__[key] = truncate(value, max_field_chars)
+
+        record.log_route = self.route
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+            self.log_queue.stats.enqueued += 1
+        except queue.Full:
+            self.log_queue.stats.dropped += 1
+
+
+class _RouteHandler(logging.Handler):
+    """Hands records to the handlers of the logger they were queued from"""
+
+    def __init__(self, routes: Dict[str, List[logging.Handler]]):
+        super().__init__()
+        self.routes = routes
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Popped so formatters do not emit it as an extra field
+        for handler in self.routes.get(record.__dict__.pop("log_route", None), ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+
+class _LogQueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room instead of failing when the queue is full at shutdown
+        self.queue.put(self._sentinel)
+
+
+class LogQueue:
+    """Bounded queue of log records written by a background thread"""
+
+    def __init__(self, max_size: int = 10000, max_message_chars: int = 4000, max_field_chars: int = 1000):
+        self.queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self.max_message_chars = max_message_chars
+        self.max_field_chars = max_field_chars
+        self.routes: Dict[str, List[logging.Handler]] = {}
+        self.stats = LogQueueStats()
+        self._listener: Optional[_LogQueueListener] = None
+        self._attached: List[Tuple[logging.Logger, QueueLogHandler]] = []
+
+    def attach(self, logger: logging.Logger, filters: Iterable[logging.Filter] = ()) -> None:
+        """Move a logger's handlers behind the queue
+
+        ``filters`` run on the calling thread before the record is queued,
+        e.g. to capture context variables.
+        """
+        handlers = list(logger.handlers)
+        if not handlers:
+            return
+        self.routes[logger.name] = handlers
+        queue_handler = QueueLogHandler(self, logger.name)
+        for log_filter in filters:
+            queue_handler.addFilter(log_filter)
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+        self._attached.append((logger, queue_handler))
+
+    def start(self) -> None:
+        """Start the listener thread"""
+        if self._listener is None:
+            self._listener = _LogQueueListener(self.queue, _RouteHandler(self.routes))
+            self._listener.start()
+
+    def stop(self) -> None:
+        """Write out the queued records, stop the listener thread and detach
+
+        Loggers get their own handlers back, with the queue handler's filters,
+        so records logged afterwards are written directly instead of being
+        queued with nothing left to read them.
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        # Restored after the queue is drained, since the filters must not run on queued records again
+        for logger, queue_handler in self._attached:
+            for handler in self.routes.get(logger.name, []):
+                for log_filter in queue_handler.filters:
+                    handler.addFilter(log_filter)
+                logger.addHandler(handler)
+            logger.removeHandler(queue_handler)
+        self._attached = []
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "enqueued": self.stats.enqueued,
+            "dropped": self.stats.dropped
+        }
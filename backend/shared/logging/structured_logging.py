@@ -7,13 +7,16 @@ This module provides structured logging capabilities with:
 - Multiple output formats (JSON, text, syslog)
 - Log aggregation and filtering
 - Performance monitoring integration
+- Queued writing on a background thread, with sampling and truncation
 """
 
+import atexit
 import logging
 import logging.config
 import json
 import sys
 import os
+import random
 import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -22,6 +25,15 @@ import traceback
 
 from pythonjsonlogger import jsonlogger
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from ..config.settings import get_settings
+from .log_queue import LogQueue
+
 
 # Context variables for request correlation
 correlation_id_var: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
@@ -91,6 +103,45 @@ class CustomJSONFormatter(jsonlogger.JsonFormatter):
         for key, value in message_dict.items():
             if key not in log_record:
                 log_record[key] = value
+    
+    def jsonify_log_record(self, log_record):
+        if ORJSON_AVAILABLE:
+            try:
+                return orjson.dumps(log_record, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+            except TypeError:
+                # e.g. integers beyond 64 bits; the standard encoder copes
+                pass
+        return super().jsonify_log_record(log_record)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of records below WARNING from high-volume loggers"""
+    
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        # Longest logger name prefix wins
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self._logger_rates: Dict[str, float] = {}
+        self.sampled_out = 0
+    
+    def _rate(self, name: str) -> float:
+        rate = self._logger_rates.get(name)
+        if rate is None:
+            rate = next(
+                (rate for prefix, rate in self.rates if name == prefix or name.startswith(prefix + '.')),
+                1.0
+            )
+            self._logger_rates[name] = rate
+        return rate
+    
+    def filter(self, record):
+        if not self.rates or record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
 
 
 class PerformanceFilter(logging.Filter):
@@ -135,11 +186,18 @@ class AuditFilter(logging.Filter):
         return any(keyword in message for keyword in audit_keywords)
 
 
+# Queue feeding the configured handlers, when queued logging is enabled
+_log_queue: Optional[LogQueue] = None
+_sampling_filter: Optional[SamplingFilter] = None
+
+
 def setup_structured_logging(
     log_level: str = "INFO",
     log_format: str = "json",
     enable_file_logging: bool = True,
-    log_file_path: str = "/app/logs/app.log"
+    log_file_path: str = "/app/logs/app.log",
+    queue_enabled: Optional[bool] = None,
+    sample_rates: Optional[Dict[str, float]] = None
 ):
     """
     Setup structured logging configuration
@@ -149,7 +207,25 @@ def setup_structured_logging(
         log_format: Log format (json, text)
         enable_file_logging: Whether to enable file logging
         log_file_path: Path to log file
+        queue_enabled: Write records on a background thread (defaults to LOG_QUEUE_ENABLED)
+        sample_rates: Share of records below WARNING kept per logger name prefix
+            (defaults to LOG_SAMPLE_RATES)
     """
+    global _log_queue, _sampling_filter
+    
+    settings = get_settings().logging
+    if queue_enabled is None:
+        queue_enabled = settings.queue_enabled
+    if sample_rates is None:
+        sample_rates = settings.sample_rates
+    
+    # Write out records queued under a previous configuration
+    stop_log_queue()
+    _sampling_filter = SamplingFilter(sample_rates)
+    
+    # Correlation and sampling must run where the record is logged: with the
+    # queue they move onto the queue handlers, ahead of the listener thread
+    producer_filters = [] if queue_enabled else ['correlation', 'sampling']
     
     # Create logs directory if it doesn't exist
     if enable_file_logging:
@@ -178,7 +254,7 @@ def setup_structured_logging(
             'level': log_level,
             'formatter': log_format,  # This should reference a formatter name
             'stream': sys.stdout,
-            'filters': ['correlation']
+            'filters': producer_filters
         }
     }
     
@@ -192,7 +268,7 @@ def setup_structured_logging(
                 'filename': log_file_path,
                 'maxBytes': 10485760,  # 10MB
                 'backupCount': 5,
-                'filters': ['correlation']
+                'filters': producer_filters
             },
             'file_performance': {
                 'class': 'logging.handlers.RotatingFileHandler',
@@ -201,7 +277,7 @@ def setup_structured_logging(
                 'filename': log_file_path.replace('.log', '_performance.log'),
                 'maxBytes': 10485760,  # 10MB
                 'backupCount': 5,
-                'filters': ['correlation', 'performance']
+                'filters': producer_filters + ['performance']
             },
             'file_security': {
                 'class': 'logging.handlers.RotatingFileHandler',
@@ -210,7 +286,7 @@ def setup_structured_logging(
                 'filename': log_file_path.replace('.log', '_security.log'),
                 'maxBytes': 10485760,  # 10MB
                 'backupCount': 10,  # Keep more security logs
-                'filters': ['correlation', 'security']
+                'filters': producer_filters + ['security']
             },
             'file_audit': {
                 'class': 'logging.handlers.RotatingFileHandler',
@@ -219,7 +295,7 @@ def setup_structured_logging(
                 'filename': log_file_path.replace('.log', '_audit.log'),
                 'maxBytes': 10485760,  # 10MB
                 'backupCount': 20,  # Keep many audit logs
-                'filters': ['correlation', 'audit']
+                'filters': producer_filters + ['audit']
             }
         })
     
@@ -228,6 +304,9 @@ def setup_structured_logging(
         'correlation': {
             '()': CorrelationFilter
         },
+        'sampling': {
+            '()': lambda: _sampling_filter
+        },
         'performance': {
             '()': PerformanceFilter
         },
@@ -283,6 +362,40 @@ def setup_structured_logging(
     }
     
     logging.config.dictConfig(logging_config)
+    
+    if queue_enabled:
+        _log_queue = LogQueue(
+            max_size=settings.queue_max_size,
+            max_message_chars=settings.max_message_chars,
+            max_field_chars=settings.max_field_chars
+        )
+        queue_filters = [CorrelationFilter(), _sampling_filter]
+        for name in loggers:
+            _log_queue.attach(logging.getLogger(name or None), queue_filters)
+        _log_queue.start()
+
+
+def stop_log_queue():
+    """Write out queued log records and stop the background writer
+    
+    Loggers get their handlers back, so anything logged afterwards (e.g.
+    server shutdown messages) is written directly.
+    """
+    global _log_queue
+    if _log_queue is not None:
+        _log_queue.stop()
+        _log_queue = None
+
+
+atexit.register(stop_log_queue)
+
+
+def get_logging_statistics() -> Dict[str, Any]:
+    """Queue and sampling counters of the logging pipeline"""
+    stats = _log_queue.get_statistics() if _log_queue is not None else {"queued": 0, "enqueued": 0, "dropped": 0}
+    stats["queue_enabled"] = _log_queue is not None
+    stats["sampled_out"] = _sampling_filter.sampled_out if _sampling_filter is not None else 0
+    return stats
 
 
 class StructuredLogger:
@@ -1,23 +1,21 @@
 """Audit middleware for automatic logging of all system operations."""
 
-import asyncio
 import json
-import time
-import uuid
-from datetime import datetime
-from typing import Dict, Any, Optional, List
-from urllib.parse import urlparse
+import logging
+from typing import Dict, Any, Optional
 
 from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 
 from ..models.audit import AuditEventType, AuditSeverity, AuditOutcome
 from ..services.audit import AuditService
-from ..database import get_database_session
+from ..services.audit_writer import audit_writer
+from .pipeline import PipelineStage, RequestContext
 
+logger = logging.getLogger(__name__)
 
-class AuditMiddleware(BaseHTTPMiddleware):
+
+class AuditMiddleware(PipelineStage):
     """
     Middleware for comprehensive audit logging of all HTTP requests and responses.
     
@@ -25,7 +23,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
     providing complete audit trails for compliance and security monitoring.
     """
     
-    def __init__(self, app: ASGIApp):
+    def __init__(self, app: Optional[ASGIApp] = None):
         super().__init__(app)
         self.sensitive_headers = {
             'authorization', 'cookie', 'x-api-key', 'x-auth-token',
@@ -41,114 +39,112 @@ class AuditMiddleware(BaseHTTPMiddleware):
             '/redoc', '/static'
         }
     
-    async def dispatch(self, request: Request, call_next) -> Response:
-        """Process request and response with comprehensive audit logging."""
+    def _is_excluded(self, path: str) -> bool:
+        return any(path.startswith(excluded) for excluded in self.excluded_paths)
+    
+    def wants_body(self, request: Request, context: RequestContext) -> bool:
+        """JSON bodies of modifying requests are recorded (sanitized)."""
+        return (
+            request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+            and 'application/json' in request.headers.get('content-type', '')
+            and not self._is_excluded(context.path)
+        )
+    
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
+        """Capture request information for the audit record."""
         
         # Skip audit logging for excluded paths
-        if any(request.url.path.startswith(path) for path in self.excluded_paths):
-            return await call_next(request)
-        
-        # Generate correlation ID for request tracing
-        correlation_id = str(uuid.uuid4())
-        request.state.correlation_id = correlation_id
+        if self._is_excluded(context.path):
+            return None
         
-        # Capture request start time
-        start_time = time.time()
+        context.state['audit'] = (request, self._extract_request_info(request, context))
+        return None
+    
+    async def on_complete(self, context: RequestContext) -> None:
+        """Queue the audit record once the response has been sent."""
         
-        # Extract request information
-        request_info = await self._extract_request_info(request)
+        captured = context.state.get('audit')
+        if captured is None:
+            return
+        request, request_info = captured
         
-        # Process the request
-        response = None
         error_info = None
-        
-        try:
-            response = await call_next(request)
-            outcome = AuditOutcome.SUCCESS if response.status_code < 400 else AuditOutcome.FAILURE
-            
-        except Exception as e:
-            outcome = AuditOutcome.FAILURE
+        if context.error is not None:
             error_info = {
-                'error_type': type(e).__name__,
-                'error_message': str(e)
+                'error_type': type(context.error).__name__,
+                'error_message': str(context.error)
             }
-            # Re-raise the exception after logging
-            raise
+        status_code = context.status_code if error_info is None else None
+        outcome = AuditOutcome.SUCCESS if status_code is not None and status_code < 400 else AuditOutcome.FAILURE
         
-        finally:
-            # Calculate request duration
-            duration = time.time() - start_time
-            
-            # Extract response information
-            response_info = self._extract_response_info(response) if response else {}
-            
-            # Log the audit event asynchronously
-            asyncio.create_task(
-                self._log_audit_event(
+        # Queue the audit event for the batched writer
+        try:
+            await audit_writer.submit(
+                self._build_audit_entry(
                     request=request,
-                    response=response,
-                    correlation_id=correlation_id,
-                    duration=duration,
+                    status_code=status_code,
+                    correlation_id=context.correlation_id,
+                    duration=context.duration,
                     request_info=request_info,
-                    response_info=response_info,
+                    response_info=self._extract_response_info(status_code, context.response_headers),
                     outcome=outcome,
                     error_info=error_info
                 )
             )
-        
-        return response
+        except Exception as e:
+            # Don't break the main request flow
+            logger.error(f"Failed to queue audit event: {e}")
     
-    async def _extract_request_info(self, request: Request) -> Dict[str, Any]:
+    def _extract_request_info(self, request: Request, context: RequestContext) -> Dict[str, Any]:
         """Extract comprehensive request information for audit logging."""
         
         # Basic request information
         request_info = {
             'method': request.method,
             'url': str(request.url),
-            'path': request.url.path,
+            'path': context.path,
             'query_params': dict(request.query_params),
             'headers': self._sanitize_headers(dict(request.headers)),
-            'client_ip': self._get_client_ip(request),
+            'client_ip': context.client_ip,
             'user_agent': request.headers.get('user-agent'),
             'content_type': request.headers.get('content-type'),
             'content_length': request.headers.get('content-length')
         }
         
-        # Extract request body for POST/PUT/PATCH requests
+        # Record the request body for POST/PUT/PATCH/DELETE requests; JSON
+        # bodies are buffered once by the pipeline, others are not read
         if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            try:
-                # Read body (this consumes the stream, so we need to be careful)
-                body = await request.body()
-                if body:
-                    content_type = request.headers.get('content-type', '')
-                    if 'application/json' in content_type:
-                        try:
-                            request_data = json.loads(body.decode('utf-8'))
-                            request_info['body'] = self._sanitize_data(request_data)
-                        except (json.JSONDecodeError, UnicodeDecodeError):
-                            request_info['body'] = '<binary_or_invalid_json>'
-                    elif 'application/x-www-form-urlencoded' in content_type:
-                        request_info['body'] = '<form_data>'
-                    elif 'multipart/form-data' in content_type:
-                        request_info['body'] = '<multipart_data>'
-                    else:
-                        request_info['body'] = f'<{content_type}>'
-            except Exception:
-                request_info['body'] = '<error_reading_body>'
+            content_type = request.headers.get('content-type', '')
+            body = context.request_body
+            if 'application/json' in content_type:
+                if body is None:
+                    request_info['body'] = '<unbuffered_json>'
+                elif body:
+                    try:
+                        request_data = json.loads(body.decode('utf-8'))
+                        request_info['body'] = self._sanitize_data(request_data)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        request_info['body'] = '<binary_or_invalid_json>'
+            elif 'application/x-www-form-urlencoded' in content_type:
+                request_info['body'] = '<form_data>'
+            elif 'multipart/form-data' in content_type:
+                request_info['body'] = '<multipart_data>'
+            elif content_type:
+                request_info['body'] = f'<{content_type}>'
         
         return request_info
     
-    def _extract_response_info(self, response: Optional[Response]) -> Dict[str, Any]:
+    def _extract_response_info(self, status_code: Optional[int], headers) -> Dict[str, Any]:
         """Extract response information for audit logging."""
         
-        if not response:
+        if status_code is None or headers is None:
             return {}
         
         response_info = {
-            'status_code': response.status_code,
-            'headers': self._sanitize_headers(dict(response.headers)),
-            'content_type': response.headers.get('content-type'),
-            'content_length': response.headers.get('content-length')
+            'status_code': status_code,
+            'headers': self._sanitize_headers(dict(headers)),
+            'content_type': headers.get('content-type'),
+            'content_length': headers.get('content-length')
         }
         
         # Note: We don't capture response body to avoid performance issues
@@ -200,26 +196,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
         # Show first 2 and last 2 characters
         return value[:2] + '*' * (len(value) - 4) + value[-2:]
     
-    def _get_client_ip(self, request: Request) -> Optional[str]:
-        """Extract client IP address from request headers."""
-        
-        # Check for forwarded headers (common in load balancer setups)
-        forwarded_for = request.headers.get('x-forwarded-for')
-        if forwarded_for:
-            # Take the first IP in the chain
-            return forwarded_for.split(',')[0].strip()
-        
-        real_ip = request.headers.get('x-real-ip')
-        if real_ip:
-            return real_ip
-        
-        # Fall back to direct client IP
-        if hasattr(request, 'client') and request.client:
-            return request.client.host
-        
-        return None
-    
-    def _determine_event_type(self, request: Request, response: Optional[Response]) -> AuditEventType:
+    def _determine_event_type(self, request: Request, status_code: Optional[int]) -> AuditEventType:
         """Determine the appropriate audit event type based on the request."""
         
         path = request.url.path.lower()
@@ -228,7 +205,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
         # Authentication endpoints
         if '/auth/' in path:
             if 'login' in path:
-                if response and response.status_code >= 400:
+                if status_code is not None and status_code >= 400:
                     return AuditEventType.USER_LOGIN_FAILED
                 return AuditEventType.USER_LOGIN
             elif 'logout' in path:
@@ -245,7 +222,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
             elif method == 'DELETE':
                 return AuditEventType.AGENT_DELETED
             elif 'execute' in path:
-                if response and response.status_code >= 400:
+                if status_code is not None and status_code >= 400:
                     return AuditEventType.AGENT_EXECUTION_FAILED
                 return AuditEventType.AGENT_EXECUTED
         
@@ -258,7 +235,7 @@ class AuditMiddleware(BaseHTTPMiddleware):
             elif method == 'DELETE':
                 return AuditEventType.WORKFLOW_DELETED
             elif 'execute' in path:
-                if response and response.status_code >= 400:
+                if status_code is not None and status_code >= 400:
                     return AuditEventType.WORKFLOW_EXECUTION_FAILED
                 return AuditEventType.WORKFLOW_EXECUTED
         
@@ -300,11 +277,11 @@ class AuditMiddleware(BaseHTTPMiddleware):
                 return AuditEventType.ROLE_DELETED
         
         # Access denied (4xx responses)
-        elif response and response.status_code in [401, 403]:
+        elif status_code is not None and status_code in [401, 403]:
             return AuditEventType.ACCESS_DENIED
         
         # Security violations (other 4xx responses)
-        elif response and 400 <= response.status_code < 500:
+        elif status_code is not None and 400 <= status_code < 500:
             return AuditEventType.SECURITY_VIOLATION
         
         # Default to data access for GET requests
@@ -315,19 +292,19 @@ class AuditMiddleware(BaseHTTPMiddleware):
         else:
             return AuditEventType.CONFIGURATION_CHANGED
     
-    def _determine_severity(self, request: Request, response: Optional[Response], error_info: Optional[Dict]) -> AuditSeverity:
+    def _determine_severity(self, request: Request, status_code: Optional[int], error_info: Optional[Dict]) -> AuditSeverity:
         """Determine the severity level of the audit event."""
         
         # Critical severity for security violations and system errors
-        if error_info or (response and response.status_code >= 500):
+        if error_info or (status_code is not None and status_code >= 500):
             return AuditSeverity.CRITICAL
         
         # High severity for authentication failures and access denials
-        if response and response.status_code in [401, 403]:
+        if status_code is not None and status_code in [401, 403]:
             return AuditSeverity.HIGH
         
         # Medium severity for client errors and data modifications
-        if response and 400 <= response.status_code < 500:
+        if status_code is not None and 400 <= status_code < 500:
             return AuditSeverity.MEDIUM
         
         # Medium severity for data modifications
@@ -356,72 +333,57 @@ class AuditMiddleware(BaseHTTPMiddleware):
         
         return None, None, None
     
-    async def _log_audit_event(
+    def _build_audit_entry(
         self,
         request: Request,
-        response: Optional[Response],
+        status_code: Optional[int],
         correlation_id: str,
         duration: float,
         request_info: Dict[str, Any],
         response_info: Dict[str, Any],
         outcome: AuditOutcome,
         error_info: Optional[Dict[str, Any]]
-    ):
-        """Log the audit event asynchronously."""
+    ) -> Dict[str, Any]:
+        """Build the audit log entry for a request."""
+        
+        # Determine event details
+        event_type = self._determine_event_type(request, status_code)
+        severity = self._determine_severity(request, status_code, error_info)
+        resource_type, resource_id, resource_name = self._extract_resource_info(request)
+        
+        # Create audit message
+        message = f"{request.method} {request.url.path} - {status_code or 'ERROR'} ({duration:.3f}s)"
+        
+        # Prepare audit details
+        details = {
+            'request': request_info,
+            'response': response_info,
+            'duration_seconds': round(duration, 3),
+            'correlation_id': correlation_id
+        }
         
-        try:
-            # Get database session
-            async with get_database_session() as session:
-                # Extract user information from request state
-                user_id = getattr(request.state, 'user_id', None)
-                
-                # Create audit service
-                audit_service = AuditService(session, user_id=user_id)
-                
-                # Determine event details
-                event_type = self._determine_event_type(request, response)
-                severity = self._determine_severity(request, response, error_info)
-                resource_type, resource_id, resource_name = self._extract_resource_info(request)
-                
-                # Create audit message
-                status_code = response.status_code if response else 'ERROR'
-                message = f"{request.method} {request.url.path} - {status_code} ({duration:.3f}s)"
-                
-                # Prepare audit details
-                details = {
-                    'request': request_info,
-                    'response': response_info,
-                    'duration_seconds': round(duration, 3),
-                    'correlation_id': correlation_id
-                }
-                
-                if error_info:
-                    details['error'] = error_info
-                
-                # Log the audit event
-                await audit_service.log_event(
-                    event_type=event_type,
-                    action=f"{request.method.lower()}_{request.url.path.replace('/', '_').strip('_')}",
-                    message=message,
-                    outcome=outcome,
-                    severity=severity,
-                    resource_type=resource_type,
-                    resource_id=resource_id,
-                    resource_name=resource_name,
-                    details=details,
-                    request_data=request_info.get('body'),
-                    response_data=response_info,
-                    error_code=str(response.status_code) if response and response.status_code >= 400 else None,
-                    error_message=error_info.get('error_message') if error_info else None,
-                    source_ip=request_info.get('client_ip'),
-                    user_agent=request_info.get('user_agent'),
-                    source_service='api_gateway',
-                    session_id=getattr(request.state, 'session_id', None),
-                    correlation_id=correlation_id,
-                    compliance_tags=['api_access', 'http_request']
-                )
-                
-        except Exception as e:
-            # Log audit logging failures to system logs
-            print(f"Failed to log audit event: {e}")
-            # Don't raise the exception to avoid breaking the main request flow
\ No newline at end of file
+        if error_info:
+            details['error'] = error_info
+        
+        return AuditService.build_entry(
+            event_type=event_type,
+            action=f"{request.method.lower()}_{request.url.path.replace('/', '_').strip('_')}",
+            message=message,
+            outcome=outcome,
+            severity=severity,
+            resource_type=resource_type,
+            resource_id=resource_id,
+            resource_name=resource_name,
+            details=details,
+            request_data=request_info.get('body'),
+            response_data=response_info,
+            error_code=str(status_code) if status_code is not None and status_code >= 400 else None,
+            error_message=error_info.get('error_message') if error_info else None,
+            source_ip=request_info.get('client_ip'),
+            user_agent=request_info.get('user_agent'),
+            source_service='api_gateway',
+            session_id=getattr(request.state, 'session_id', None),
+            correlation_id=correlation_id,
+            user_id=getattr(request.state, 'user_id', None),
+            compliance_tags=['api_access', 'http_request']
+        )
@@ -1,37 +1,51 @@
 # Guardrails Middleware
-from fastapi import Request, Response, HTTPException, status
+from fastapi import Request, Response, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Callable, Dict, Any, Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import Message, Send
+from typing import Any, Optional
 import logging
 import json
 import time
-import asyncio
+from datetime import datetime
 
+from ..config.settings import get_settings
 from ..database.connection import get_database_session
-from ..services.guardrails import GuardrailsService, ValidationContext, ContentCategory
-from .tenant import get_tenant_context
+from ..services.guardrails import (
+    ContentCategory, ContentFilter, GuardrailsEngine, GuardrailsService, RiskLevel,
+    StreamingContentScanner, ValidationContext, Violation, ViolationType
+)
+from .pipeline import PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
+# Response content types whose bodies are scanned
+SCANNED_CONTENT_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+# Content types that can be redacted and cut off in the stream (including
+# event streams); other scanned bodies are only reported, since rewriting
+# raw JSON bytes would leave an invalid document
+REWRITTEN_CONTENT_TYPES = ('text/',)
 
-class GuardrailsMiddleware(BaseHTTPMiddleware):
+
+class GuardrailsMiddleware(PipelineStage):
     """
     Middleware to automatically apply guardrails to API requests and responses
-    
+
     This middleware:
     1. Validates input content in request bodies
-    2. Validates output content in response bodies
-    3. Enforces tenant-specific policies
-    4. Logs violations and blocks harmful content
+    2. Scans output content chunk by chunk as it streams, redacting or
+       cutting off violations in text streams without buffering the body
+       (JSON bodies are only reported, or rejected before they are sent)
+    3. Logs violations and blocks harmful content
     """
-    
-    def __init__(self, app, enabled: bool = True, strict_mode: bool = False):
+
+    def __init__(self, app=None, enabled: bool = True, strict_mode: bool = False):
         super().__init__(app)
         self.enabled = enabled
         self.strict_mode = strict_mode  # If True, blocks all violations; if False, allows with warnings
-        
+        self.stream_window = get_settings().guardrails.stream_window_chars
+        self.content_filter = ContentFilter()
+
         # Endpoints that should be checked for input validation
         self.input_validation_paths = {
             '/api/v1/agents/execute',
@@ -39,14 +53,14 @@ class GuardrailsMiddleware(BaseHTTPMiddleware):
             '/api/v1/workflows/execute',
             '/api/v1/memory/store',
         }
-        
+
         # Endpoints that should be checked for output validation
         self.output_validation_paths = {
             '/api/v1/agents/execute',
             '/api/v1/agents/chat',
             '/api/v1/workflows/execute',
         }
-        
+
         # Endpoints to skip entirely
         self.skip_paths = {
             '/api/v1/auth/',
@@ -56,199 +70,208 @@ class GuardrailsMiddleware(BaseHTTPMiddleware):
             '/openapi.json',
             '/favicon.ico'
         }
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Process request through guardrails"""
-        if not self.enabled:
-            return await call_next(request)
-        
-        # Skip certain paths
-        if any(request.url.path.startswith(skip_path) for skip_path in self.skip_paths):
-            return await call_next(request)
-        
-        start_time = time.time()
-        
+
+    def _applies(self, context: RequestContext) -> bool:
+        return self.enabled and not any(context.path.startswith(skip_path) for skip_path in self.skip_paths)
+
+    def wants_body(self, request: Request, context: RequestContext) -> bool:
+        return self._applies(context) and context.path in self.input_validation_paths
+
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
+        """Validate input content before the request is processed"""
+        if not self._applies(context):
+            return None
+        context.state["guardrails_user_id"] = getattr(request.state, 'user_id', None)
+        if context.path not in self.input_validation_paths:
+            return None
+
+        context.state["guardrails_started_at"] = time.perf_counter()
         try:
-            # Get tenant context
-            tenant_context = get_tenant_context(request)
-            tenant_id = tenant_context.get('tenant_id')
-            
-            if not tenant_id:
-                # No tenant context, skip guardrails
-                return await call_next(request)
-            
-            # Get database session
             async with get_database_session() as session:
                 guardrails_service = GuardrailsService(session)
-                
-                # Validate input if applicable
-                if request.url.path in self.input_validation_paths:
-                    input_validation_result = await self._validate_input(
-                        request, guardrails_service, tenant_id
-                    )
-                    
-                    if not input_validation_result.is_valid and self.strict_mode:
-                        return self._create_violation_response(input_validation_result, "input")
-                
-                # Process the request
-                response = await call_next(request)
-                
-                # Validate output if applicable
-                if request.url.path in self.output_validation_paths:
-                    response = await self._validate_output(
-                        request, response, guardrails_service, tenant_id
-                    )
-                
-                # Add guardrails headers
-                processing_time = (time.time() - start_time) * 1000
-                response.headers["X-Guardrails-Processed"] = "true"
-                response.headers["X-Guardrails-Time-Ms"] = str(round(processing_time, 2))
-                
-                return response
-                
+                input_validation_result = await self._validate_input(
+                    request, context.request_body, guardrails_service
+                )
         except Exception as e:
             logger.error(f"Error in guardrails middleware: {e}")
             # Continue processing even if guardrails fail
-            response = await call_next(request)
-            response.headers["X-Guardrails-Error"] = "true"
-            return response
-    
+            context.state["guardrails_error"] = True
+            return None
+
+        if input_validation_result is not None and not input_validation_result.is_valid and self.strict_mode:
+            return self._create_violation_response(input_validation_result, "input")
+        return None
+
+    def on_response_start(self, context: RequestContext, headers: MutableHeaders) -> None:
+        if not self._applies(context):
+            return
+        if context.state.get("guardrails_error"):
+            headers["X-Guardrails-Error"] = "true"
+        started_at = context.state.get("guardrails_started_at")
+        if started_at is not None:
+            headers["X-Guardrails-Processed"] = "true"
+            headers["X-Guardrails-Time-Ms"] = str(round((time.perf_counter() - started_at) * 1000, 2))
+
+    def wrap_send(self, context: RequestContext, send: Send) -> Send:
+        """Scan the response body as it is sent"""
+        if not self._applies(context) or context.path not in self.output_validation_paths:
+            return send
+        context.state.setdefault("guardrails_started_at", time.perf_counter())
+        scanner: Optional[StreamingContentScanner] = None
+        start_message: Optional[Message] = None
+        finished = False
+
+        async def scanning_send(message: Message) -> None:
+            nonlocal scanner, start_message, finished
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                content_type = headers.get("content-type", "")
+                if content_type.startswith(SCANNED_CONTENT_TYPES):
+                    scanner = StreamingContentScanner(
+                        self.content_filter, self.stream_window, self.strict_mode,
+                        rewrite=content_type.startswith(REWRITTEN_CONTENT_TYPES)
+                    )
+                    context.state["guardrails_scanner"] = scanner
+                    # Redaction changes the length
+                    if scanner.rewrite and "content-length" in headers:
+                        del headers["content-length"]
+                    headers["X-Guardrails-Output-Validated"] = "true"
+                    # Sent with the first body chunk, so a complete body can still be rejected
+                    start_message = message
+                    return
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body" or scanner is None:
+                await send(message)
+                return
+            if finished:
+                return
+
+            more_body = message.get("more_body", False)
+            body = scanner.feed(message.get("body", b""), final=not more_body)
+
+            if self.strict_mode and start_message is not None and scanner.found_blocking:
+                # Nothing sent yet: reject the whole response
+                finished = True
+                scanner.blocked = True
+                logger.warning(f"Output blocked by guardrails on {context.path}: {scanner.violations}")
+                violation_response = self._create_stream_violation_response(scanner)
+                await send({
+                    "type": "http.response.start",
+                    "status": violation_response.status_code,
+                    "headers": violation_response.raw_headers
+                })
+                await send({"type": "http.response.body", "body": violation_response.body})
+                return
+
+            if scanner.blocked:
+                finished = True
+                logger.warning(f"Output stream cut off by guardrails on {context.path}: {scanner.violations}")
+                await send({
+                    "type": "http.response.body",
+                    "body": body + self._cutoff_marker(context),
+                    "more_body": False
+                })
+                return
+
+            if start_message is not None:
+                await send(start_message)
+                start_message = None
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+            if not more_body:
+                finished = True
+
+        return scanning_send
+
+    async def on_complete(self, context: RequestContext) -> None:
+        """Report output violations found while streaming"""
+        scanner: Optional[StreamingContentScanner] = context.state.get("guardrails_scanner")
+        if scanner is None or not scanner.violations:
+            return
+
+        logger.warning(
+            f"Output validation found {len(scanner.violations)} violation(s) on {context.path}"
+            f" ({'blocked' if scanner.blocked else f'{scanner.redactions} redacted'})"
+        )
+        validation_context = ValidationContext(
+            user_id=context.state.get("guardrails_user_id"),
+            agent_id=None,
+            session_id=None,
+            content_category=ContentCategory.GENERAL,
+            source='output',
+            timestamp=datetime.utcnow(),
+            metadata={'path': context.path, 'correlation_id': context.correlation_id}
+        )
+        violation = Violation(
+            id=f"violation_{int(time.time())}_{scanner.content_hash[:8]}",
+            user_id=validation_context.user_id,
+            agent_id=None,
+            violation_type=scanner.violation_types[0] if scanner.violation_types else ViolationType.POLICY_VIOLATION,
+            risk_level=RiskLevel.HIGH if scanner.blocked else RiskLevel.MEDIUM,
+            content_hash=scanner.content_hash,
+            original_content="",
+            sanitized_content=None,
+            context=validation_context,
+            timestamp=validation_context.timestamp,
+            resolved=False,
+            resolution_notes=None
+        )
+        try:
+            async with get_database_session() as session:
+                await GuardrailsEngine(session).report_violation(violation)
+        except Exception as e:
+            logger.error(f"Error reporting output violation: {e}")
+
     async def _validate_input(
         self,
         request: Request,
-        guardrails_service: GuardrailsService,
-        tenant_id: str
+        body: Optional[bytes],
+        guardrails_service: GuardrailsService
     ) -> Optional[Any]:
         """Validate request input content"""
         try:
-            # Read request body
-            body = await request.body()
             if not body:
                 return None
-            
+
             # Parse JSON content
             try:
                 content_data = json.loads(body.decode())
             except (json.JSONDecodeError, UnicodeDecodeError):
                 # Not JSON or not decodable, skip validation
                 return None
-            
+
             # Extract text content to validate
             text_content = self._extract_text_content(content_data)
             if not text_content:
                 return None
-            
+
             # Get user context
             user_id = getattr(request.state, 'user_id', None)
-            agent_id = content_data.get('agent_id')
-            session_id = content_data.get('session_id')
-            
+            agent_id = content_data.get('agent_id') if isinstance(content_data, dict) else None
+            session_id = content_data.get('session_id') if isinstance(content_data, dict) else None
+
             # Validate content
             result = await guardrails_service.validate_agent_input(
-                tenant_id=tenant_id,
                 agent_id=agent_id,
                 user_id=user_id,
                 content=text_content,
                 session_id=session_id
             )
-            
+
             if not result.is_valid:
                 logger.warning(
-                    f"Input validation failed for tenant {tenant_id}: "
+                    f"Input validation failed on {request.url.path}: "
                     f"{len(result.violations)} violations detected"
                 )
-            
+
             return result
-            
+
         except Exception as e:
             logger.error(f"Error validating input: {e}")
             return None
-    
-    async def _validate_output(
-        self,
-        request: Request,
-        response: Response,
-        guardrails_service: GuardrailsService,
-        tenant_id: str
-    ) -> Response:
-        """Validate response output content"""
-        try:
-            # Only validate JSON responses
-            if not response.headers.get("content-type", "").startswith("application/json"):
-                return response
-            
-            # Read response body
-            response_body = b""
-            async for chunk in response.body_iterator:
-                response_body += chunk
-            
-            if not response_body:
-                return response
-            
-            # Parse JSON content
-            try:
-                content_data = json.loads(response_body.decode())
-            except (json.JSONDecodeError, UnicodeDecodeError):
-                # Not JSON or not decodable, return original response
-                return Response(
-                    content=response_body,
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
-                )
-            
-            # Extract text content to validate
-            text_content = self._extract_text_content(content_data)
-            if not text_content:
-                return Response(
-                    content=response_body,
-                    status_code=response.status_code,
-                    headers=dict(response.headers)
-                )
-            
-            # Get user context
-            user_id = getattr(request.state, 'user_id', None)
-            agent_id = content_data.get('agent_id')
-            session_id = content_data.get('session_id')
-            
-            # Validate content
-            result = await guardrails_service.validate_agent_output(
-                tenant_id=tenant_id,
-                agent_id=agent_id,
-                user_id=user_id,
-                content=text_content,
-                session_id=session_id
-            )
-            
-            if not result.is_valid:
-                logger.warning(
-                    f"Output validation failed for tenant {tenant_id}: "
-                    f"{len(result.violations)} violations detected"
-                )
-                
-                if self.strict_mode:
-                    return self._create_violation_response(result, "output")
-                else:
-                    # Sanitize content if available
-                    if result.sanitized_content:
-                        content_data = self._replace_text_content(content_data, result.sanitized_content)
-                        response_body = json.dumps(content_data).encode()
-            
-            # Create new response with validated content
-            headers = dict(response.headers)
-            headers["X-Guardrails-Output-Validated"] = "true"
-            headers["X-Guardrails-Risk-Score"] = str(result.risk_score)
-            
-            return Response(
-                content=response_body,
-                status_code=response.status_code,
-                headers=headers
-            )
-            
-        except Exception as e:
-            logger.error(f"Error validating output: {e}")
-            # Return original response on error
-            return response
-    
+
     def _extract_text_content(self, data: Any) -> Optional[str]:
         """Extract text content from request/response data"""
         if isinstance(data, str):
@@ -259,7 +282,7 @@ class GuardrailsMiddleware(BaseHTTPMiddleware):
             for field in text_fields:
                 if field in data and isinstance(data[field], str):
                     return data[field]
-            
+
             # Recursively search nested objects
             for value in data.values():
                 text_content = self._extract_text_content(value)
@@ -271,32 +294,29 @@ class GuardrailsMiddleware(BaseHTTPMiddleware):
                 text_content = self._extract_text_content(item)
                 if text_content:
                     return text_content
-        
+
         return None
-    
-    def _replace_text_content(self, data: Any, sanitized_content: str) -> Any:
-        """Replace text content with sanitized version"""
-        if isinstance(data, str):
-            return sanitized_content
-        elif isinstance(data, dict):
-            result = data.copy()
-            # Look for common text fields
-            text_fields = ['content', 'message', 'text', 'prompt', 'response', 'output']
-            for field in text_fields:
-                if field in result and isinstance(result[field], str):
-                    result[field] = sanitized_content
-                    return result
-            
-            # Recursively replace in nested objects
-            for key, value in result.items():
-                result[key] = self._replace_text_content(value, sanitized_content)
-            return result
-        elif isinstance(data, list):
-            # Replace in list items
-            return [self._replace_text_content(item, sanitized_content) for item in data]
-        
-        return data
-    
+
+    def _cutoff_marker(self, context: RequestContext) -> bytes:
+        """Terminates a stream that was cut off mid-way"""
+        content_type = context.response_headers.get("content-type", "") if context.response_headers else ""
+        if content_type.startswith("text/event-stream"):
+            return b'\n\nevent: guardrails\ndata: {"error": "Content blocked by guardrails"}\n\n'
+        return b"\n[Content blocked by guardrails]"
+
+    def _create_stream_violation_response(self, scanner: StreamingContentScanner) -> JSONResponse:
+        """Create response for output rejected before any of it was sent"""
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": "Content validation failed",
+                "detail": "The output content violates content policies",
+                "violations": scanner.violations,
+                "violation_types": [t.value for t in scanner.violation_types]
+            },
+            headers={"X-Guardrails-Blocked": "true"}
+        )
+
     def _create_violation_response(self, result: Any, source: str) -> JSONResponse:
         """Create response for guardrail violations"""
         return JSONResponse(
@@ -318,7 +338,7 @@ class GuardrailsMiddleware(BaseHTTPMiddleware):
 
 class GuardrailsConfig:
     """Configuration for guardrails middleware"""
-    
+
     def __init__(
         self,
         enabled: bool = True,
@@ -338,20 +358,20 @@ def create_guardrails_middleware(config: Optional[GuardrailsConfig] = None):
     """Factory function to create guardrails middleware with configuration"""
     if config is None:
         config = GuardrailsConfig()
-    
+
     class ConfiguredGuardrailsMiddleware(GuardrailsMiddleware):
-        def __init__(self, app):
+        def __init__(self, app=None):
             super().__init__(
                 app,
                 enabled=config.enabled,
                 strict_mode=config.strict_mode
             )
-            
+
             if config.input_validation_paths:
                 self.input_validation_paths.update(config.input_validation_paths)
             if config.output_validation_paths:
                 self.output_validation_paths.update(config.output_validation_paths)
             if config.skip_paths:
                 self.skip_paths.update(config.skip_paths)
-    
-    return ConfiguredGuardrailsMiddleware
\ No newline at end of file
+
+    return ConfiguredGuardrailsMiddleware
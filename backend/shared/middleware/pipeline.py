@@ -0,0 +1,218 @@
+"""Pure ASGI middleware pipeline.
+
+Starlette's ``BaseHTTPMiddleware`` runs every layer's downstream app in a
+separate task and relays the response through a memory stream, which costs
+time per layer and per request and defeats streaming responses. Middleware
+in this package is instead written as pipeline stages with three hooks:
+
+* ``on_request(request, context)`` runs before the application and may
+  return a response to short-circuit it;
+* ``on_response_start(context, headers)`` may adjust the response headers
+  when the response starts, without touching the body;
+* ``on_complete(context)`` runs after the response has been sent (or the
+  application failed).
+
+Stages that need to inspect or rewrite the response body as it streams
+can also wrap the ASGI ``send`` of the application with ``wrap_send``.
+
+``MiddlewarePipeline`` runs a list of stages as one ASGI layer that shares a
+``RequestContext`` (client IP parsed once, correlation id, timing) between
+them. Each stage is also a standalone ASGI middleware, and keeps a
+``dispatch(request, call_next)`` method for code that works with request
+objects.
+"""
+
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Larger request bodies are streamed to the application without buffering
+MAX_BUFFERED_BODY_BYTES = 1024 * 1024
+
+
+def client_ip_from_request(request: Any) -> str:
+    """Client IP address, honouring proxy headers."""
+    forwarded_for = request.headers.get("X-Forwarded-For") or request.headers.get("x-forwarded-for")
+    if forwarded_for:
+        return forwarded_for.split(",")[0].strip()
+
+    real_ip = request.headers.get("X-Real-IP") or request.headers.get("x-real-ip")
+    if real_ip:
+        return real_ip
+
+    return request.client.host if request.client else "unknown"
+
+
+@dataclass
+class RequestContext:
+    """Per-request data shared by all pipeline stages."""
+    method: str
+    path: str
+    client_ip: str
+    correlation_id: str
+    started_at: float = field(default_factory=time.perf_counter)
+    status_code: Optional[int] = None
+    response_headers: Optional[MutableHeaders] = None
+    error: Optional[BaseException] = None
+    request_body: Optional[bytes] = None
+    # Stage-specific data, keyed by stage
+    state: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_request(cls, request: Any) -> "RequestContext":
+        return cls(
+            method=request.method,
+            path=request.url.path,
+            client_ip=client_ip_from_request(request),
+            correlation_id=str(uuid.uuid4())
+        )
+
+    @property
+    def duration(self) -> float:
+        """Seconds since the request entered the pipeline."""
+        return time.perf_counter() - self.started_at
+
+
+class PipelineStage:
+    """Base class for middleware running as a stage of the pipeline."""
+
+    def __init__(self, app: Optional[ASGIApp] = None):
+        self.app = app
+
+    def wants_body(self, request: Request, context: RequestContext) -> bool:
+        """Whether the stage needs ``context.request_body`` (buffered once for all stages)."""
+        return False
+
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
+        return None
+
+    def on_response_start(self, context: RequestContext, headers: MutableHeaders) -> None:
+        pass
+
+    def wrap_send(self, context: RequestContext, send: Send) -> Send:
+        """Wrap the application's ``send``, e.g. to process the body chunk by chunk.
+
+        Not applied to responses returned by ``on_request`` or through ``dispatch``.
+        """
+        return send
+
+    async def on_complete(self, context: RequestContext) -> None:
+        pass
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await run_pipeline(self.app, [self], scope, receive, send)
+
+    async def dispatch(self, request: Any, call_next: Callable[[Any], Awaitable[Response]]) -> Response:
+        """Run this stage around ``call_next`` for an already built request."""
+        context = RequestContext.from_request(request)
+        request.state.correlation_id = context.correlation_id
+        if self.wants_body(request, context):
+            # Request objects cache their body, so call_next can still read it
+            context.request_body = await request.body()
+        response = await self.on_request(request, context)
+        if response is not None:
+            return response
+        try:
+            response = await call_next(request)
+        except Exception as e:
+            context.error = e
+            await self.on_complete(context)
+            raise
+        context.status_code = response.status_code
+        context.response_headers = response.headers
+        self.on_response_start(context, response.headers)
+        await self.on_complete(context)
+        return response
+
+
+async def _complete(stages: Sequence[PipelineStage], context: RequestContext) -> None:
+    for stage in reversed(stages):
+        try:
+            await stage.on_complete(context)
+        except Exception as e:
+            # One failing stage must not prevent the others from finishing
+            logger.error(f"Middleware stage {type(stage).__name__} failed after response: {e}")
+
+
+async def run_pipeline(
+    app: ASGIApp,
+    stages: Sequence[PipelineStage],
+    scope: Scope,
+    receive: Receive,
+    send: Send
+) -> None:
+    """Run ``stages`` around ``app`` for one ASGI connection."""
+    if scope["type"] != "http" or not stages:
+        await app(scope, receive, send)
+        return
+
+    request = Request(scope, receive)
+    context = RequestContext.from_request(request)
+    request.state.correlation_id = context.correlation_id
+    request.state.request_context = context
+
+    if any(stage.wants_body(request, context) for stage in stages):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) <= MAX_BUFFERED_BODY_BYTES:
+            body = await request.body()
+            context.request_body = body
+            body_sent = False
+
+            async def replay_receive() -> Message:
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            receive = replay_receive
+
+    # Stages whose on_request ran without short-circuiting see the response
+    active: List[PipelineStage] = []
+
+    async def send_with_hooks(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            context.status_code = message["status"]
+            headers = MutableHeaders(scope=message)
+            context.response_headers = headers
+            for stage in reversed(active):
+                stage.on_response_start(context, headers)
+        await send(message)
+
+    try:
+        for stage in stages:
+            response = await stage.on_request(request, context)
+            if response is not None:
+                await response(scope, receive, send_with_hooks)
+                break
+            active.append(stage)
+        else:
+            app_send = send_with_hooks
+            for stage in active:
+                app_send = stage.wrap_send(context, app_send)
+            await app(scope, receive, app_send)
+    except Exception as e:
+        context.error = e
+        await _complete(active, context)
+        raise
+    await _complete(active, context)
+
+
+class MiddlewarePipeline:
+    """Runs several pipeline stages as a single ASGI middleware."""
+
+    def __init__(self, app: ASGIApp, stages: Sequence[PipelineStage]):
+        self.app = app
+        self.stages = list(stages)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await run_pipeline(self.app, self.stages, scope, receive, send)
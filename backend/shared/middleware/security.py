@@ -9,26 +9,34 @@ This module provides essential security middleware including:
 - Request/response logging for security monitoring
 - Authentication and authorization dependencies
 
+The middleware are pure ASGI pipeline stages (see ``pipeline.py``) and are
+combined into a single layer by ``create_security_middleware_stack``.
+
 This is a simplified implementation that can be extended with Kong Gateway later.
 """
 
+import hashlib
 import logging
 import time
 import re
 from typing import Dict, List, Optional, Set, Callable
-from collections import defaultdict, deque
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from ipaddress import ip_address, ip_network
 
 from fastapi import Request, Response, HTTPException, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.responses import JSONResponse
+from jose import JWTError, jwt
 
 # Import auth functions from services
 from ..services.auth import get_current_user as _get_current_user, get_current_user_with_tenant as _get_current_user_with_tenant
+from ..services.auth import SECRET_KEY as AUTH_SECRET_KEY, ALGORITHM as AUTH_ALGORITHM
+from ..services.rate_limiter import RateLimitRule, create_rate_limiter
 from ..models.user import User
+from .pipeline import MiddlewarePipeline, PipelineStage, RequestContext
 
 logger = logging.getLogger(__name__)
 
@@ -83,116 +91,98 @@ def require_permissions(permissions: List[str]) -> Callable:
     return permission_dependency
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware with sliding window algorithm."""
+class RateLimitMiddleware(PipelineStage):
+    """Rate limiting middleware with a sliding window counter per client.
+
+    Clients are identified by the subject of a valid bearer token, otherwise
+    by IP address; requests carrying an API key are also limited per key.
+    """
     
     def __init__(
         self,
-        app,
+        app=None,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
-        burst_limit: int = 10
+        burst_limit: int = 10,
+        limiter=None
     ):
         super().__init__(app)
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
         self.burst_limit = burst_limit
-        
-        # In-memory storage (in production, use Redis)
-        self.request_counts: Dict[str, deque] = defaultdict(deque)
-        self.burst_counts: Dict[str, int] = defaultdict(int)
-        self.burst_reset_times: Dict[str, float] = defaultdict(float)
+        self.limiter = limiter or create_rate_limiter([
+            RateLimitRule("burst", 10, burst_limit),
+            RateLimitRule("minute", 60, requests_per_minute),
+            RateLimitRule("hour", 3600, requests_per_hour)
+        ])
+        # Verified bearer token -> (subject, expiry); bounded so tokens are decoded once
+        self._token_subjects: "OrderedDict[str, tuple]" = OrderedDict()
+        self._token_cache_size = 1024
     
-    async def dispatch(self, request: Request, call_next):
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
         """Apply rate limiting to requests."""
-        client_ip = self._get_client_ip(request)
-        current_time = time.time()
+        decision = await self.limiter.hit(self._get_client_keys(request, context))
         
-        # Check burst limit (10 requests per 10 seconds)
-        if self._check_burst_limit(client_ip, current_time):
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "detail": "Rate limit exceeded - too many requests in short time",
-                    "retry_after": 10
-                }
+        if not decision.allowed:
+            detail = (
+                "Rate limit exceeded - too many requests in short time"
+                if decision.rule == "burst" else "Rate limit exceeded"
             )
-        
-        # Check minute and hour limits
-        if self._check_rate_limits(client_ip, current_time):
             return JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "detail": "Rate limit exceeded",
-                    "retry_after": 60
-                }
+                content={"detail": detail, "retry_after": decision.retry_after},
+                headers={"Retry-After": str(decision.retry_after)}
             )
         
-        # Record the request
-        self._record_request(client_ip, current_time)
-        
-        # Process request
-        response = await call_next(request)
-        
-        # Add rate limit headers
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(
-            max(0, self.requests_per_minute - len(self.request_counts[client_ip]))
-        )
-        
-        return response
-    
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP address from request."""
-        # Check for forwarded headers (from load balancers/proxies)
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        # Fallback to direct client IP
-        return request.client.host if request.client else "unknown"
+        context.state["rate_limit"] = decision
+        return None
     
-    def _check_burst_limit(self, client_ip: str, current_time: float) -> bool:
-        """Check if client has exceeded burst limit."""
-        # Reset burst count every 10 seconds
-        if current_time - self.burst_reset_times[client_ip] > 10:
-            self.burst_counts[client_ip] = 0
-            self.burst_reset_times[client_ip] = current_time
-        
-        self.burst_counts[client_ip] += 1
-        return self.burst_counts[client_ip] > self.burst_limit
+    def on_response_start(self, context: RequestContext, headers: MutableHeaders) -> None:
+        """Add rate limit headers."""
+        decision = context.state["rate_limit"]
+        headers["X-RateLimit-Limit"] = str(decision.limit)
+        headers["X-RateLimit-Remaining"] = str(max(0, decision.remaining))
     
-    def _check_rate_limits(self, client_ip: str, current_time: float) -> bool:
-        """Check if client has exceeded rate limits."""
-        requests = self.request_counts[client_ip]
-        
-        # Remove old requests (older than 1 hour)
-        while requests and current_time - requests[0] > 3600:
-            requests.popleft()
-        
-        # Check hour limit
-        if len(requests) >= self.requests_per_hour:
-            return True
+    def _get_client_keys(self, request: Request, context: RequestContext) -> List[str]:
+        """Rate limit keys for a request: user or IP, plus API key if present."""
+        subject = self._get_token_subject(request.headers.get("Authorization"))
+        keys = [f"user:{subject}" if subject else f"ip:{context.client_ip}"]
         
-        # Check minute limit
-        minute_requests = sum(1 for req_time in requests if current_time - req_time <= 60)
-        return minute_requests >= self.requests_per_minute
+        api_key = request.headers.get("X-API-Key")
+        if api_key:
+            keys.append(f"api_key:{hashlib.sha256(api_key.encode()).hexdigest()[:32]}")
+        return keys
     
-    def _record_request(self, client_ip: str, current_time: float):
-        """Record a request for rate limiting."""
-        self.request_counts[client_ip].append(current_time)
+    def _get_token_subject(self, authorization: Optional[str]) -> Optional[str]:
+        """Subject of a valid bearer token, or None."""
+        if not authorization or not authorization.startswith("Bearer "):
+            return None
+        token = authorization[7:]
+        cached = self._token_subjects.get(token)
+        if cached is not None and cached[1] > time.time():
+            self._token_subjects.move_to_end(token)
+            return cached[0]
+        
+        # Unverified tokens must not give attackers fresh buckets
+        try:
+            payload = jwt.decode(token, AUTH_SECRET_KEY, algorithms=[AUTH_ALGORITHM])
+        except JWTError:
+            return None
+        subject = payload.get("sub")
+        if not subject:
+            return None
+        self._token_subjects[token] = (str(subject), float(payload.get("exp") or time.time() + 300))
+        if len(self._token_subjects) > self._token_cache_size:
+            self._token_subjects.popitem(last=False)
+        return str(subject)
 
 
-class IPFilterMiddleware(BaseHTTPMiddleware):
+class IPFilterMiddleware(PipelineStage):
     """IP filtering middleware for basic access control."""
     
     def __init__(
         self,
-        app,
+        app=None,
         allowed_ips: Optional[List[str]] = None,
         blocked_ips: Optional[List[str]] = None,
         allowed_networks: Optional[List[str]] = None
@@ -202,9 +192,9 @@ class IPFilterMiddleware(BaseHTTPMiddleware):
         self.blocked_ips = set(blocked_ips or [])
         self.allowed_networks = [ip_network(net) for net in (allowed_networks or [])]
     
-    async def dispatch(self, request: Request, call_next):
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
         """Filter requests based on IP address."""
-        client_ip = self._get_client_ip(request)
+        client_ip = context.client_ip
         
         try:
             ip_addr = ip_address(client_ip)
@@ -233,25 +223,13 @@ class IPFilterMiddleware(BaseHTTPMiddleware):
                     content={"detail": "Access denied"}
                 )
         
-        return await call_next(request)
-    
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP address from request."""
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-        
-        return request.client.host if request.client else "unknown"
+        return None
 
 
-class InputValidationMiddleware(BaseHTTPMiddleware):
+class InputValidationMiddleware(PipelineStage):
     """Input validation and sanitization middleware."""
     
-    def __init__(self, app):
+    def __init__(self, app=None):
         super().__init__(app)
         
         # Patterns for detecting malicious input
@@ -291,7 +269,7 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
             r"%0d",     # URL encoded CR
         ]
     
-    async def dispatch(self, request: Request, call_next):
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
         """Validate and sanitize request input."""
         # Check URL path
         if self._contains_malicious_patterns(request.url.path):
@@ -319,7 +297,7 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
                     content={"detail": "Invalid request headers"}
                 )
         
-        return await call_next(request)
+        return None
     
     def _contains_malicious_patterns(self, text: str) -> bool:
         """Check if text contains malicious patterns."""
@@ -353,10 +331,10 @@ class InputValidationMiddleware(BaseHTTPMiddleware):
         return False
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+class SecurityHeadersMiddleware(PipelineStage):
     """Security headers middleware for enhanced protection."""
     
-    def __init__(self, app):
+    def __init__(self, app=None):
         super().__init__(app)
         
         self.security_headers = {
@@ -380,106 +358,82 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             )
         }
     
-    async def dispatch(self, request: Request, call_next):
+    def on_response_start(self, context: RequestContext, headers: MutableHeaders) -> None:
         """Add security headers to response."""
-        response = await call_next(request)
-        
-        # Add security headers
         for header_name, header_value in self.security_headers.items():
-            response.headers[header_name] = header_value
+            headers[header_name] = header_value
         
         # Add server identification header
-        response.headers["Server"] = "AI-Agent-Framework"
-        
-        return response
+        headers["Server"] = "AI-Agent-Framework"
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
+class RequestLoggingMiddleware(PipelineStage):
     """Request logging middleware for security monitoring."""
     
-    def __init__(self, app):
+    def __init__(self, app=None):
         super().__init__(app)
     
-    async def dispatch(self, request: Request, call_next):
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
         """Log requests for security monitoring."""
-        start_time = time.time()
-        client_ip = self._get_client_ip(request)
-        
-        # Log request
         logger.info(
-            f"Request: {request.method} {request.url.path}",
+            f"Request: {request.method} {context.path}",
             extra={
-                "client_ip": client_ip,
+                "client_ip": context.client_ip,
                 "method": request.method,
-                "path": request.url.path,
+                "path": context.path,
                 "query_params": dict(request.query_params),
                 "user_agent": request.headers.get("User-Agent"),
+                "correlation_id": context.correlation_id,
                 "timestamp": datetime.utcnow().isoformat()
             }
         )
-        
-        # Process request
-        try:
-            response = await call_next(request)
-            
-            # Log response
-            duration = time.time() - start_time
-            logger.info(
-                f"Response: {response.status_code} in {duration:.3f}s",
-                extra={
-                    "client_ip": client_ip,
-                    "status_code": response.status_code,
-                    "duration_ms": round(duration * 1000, 2),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-            )
-            
-            return response
-            
-        except Exception as e:
-            # Log error
-            duration = time.time() - start_time
+        return None
+    
+    async def on_complete(self, context: RequestContext) -> None:
+        """Log the response, or the error that prevented one."""
+        duration = context.duration
+        if context.error is not None:
             logger.error(
-                f"Request failed: {str(e)} in {duration:.3f}s",
+                f"Request failed: {str(context.error)} in {duration:.3f}s",
                 extra={
-                    "client_ip": client_ip,
-                    "error": str(e),
+                    "client_ip": context.client_ip,
+                    "error": str(context.error),
                     "duration_ms": round(duration * 1000, 2),
+                    "correlation_id": context.correlation_id,
                     "timestamp": datetime.utcnow().isoformat()
                 }
             )
-            raise
-    
-    def _get_client_ip(self, request: Request) -> str:
-        """Extract client IP address from request."""
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
+            return
         
-        return request.client.host if request.client else "unknown"
+        logger.info(
+            f"Response: {context.status_code} in {duration:.3f}s",
+            extra={
+                "client_ip": context.client_ip,
+                "status_code": context.status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "correlation_id": context.correlation_id,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        )
 
 
-class APIKeyMiddleware(BaseHTTPMiddleware):
+class APIKeyMiddleware(PipelineStage):
     """API key authentication middleware."""
     
-    def __init__(self, app, api_keys: Optional[Set[str]] = None):
+    def __init__(self, app=None, api_keys: Optional[Set[str]] = None):
         super().__init__(app)
         self.api_keys = api_keys or set()
         self.protected_paths = {"/api/v1/admin/", "/api/v1/agents/", "/api/v1/workflows/"}
     
-    async def dispatch(self, request: Request, call_next):
+    async def on_request(self, request: Request, context: RequestContext) -> Optional[Response]:
         """Validate API keys for protected endpoints."""
         # Check if path requires API key
-        if not any(request.url.path.startswith(path) for path in self.protected_paths):
-            return await call_next(request)
+        if not any(context.path.startswith(path) for path in self.protected_paths):
+            return None
         
         # Skip API key check for auth endpoints
-        if request.url.path.startswith("/api/v1/auth/"):
-            return await call_next(request)
+        if context.path.startswith("/api/v1/auth/"):
+            return None
         
         # Check for API key in header
         api_key = request.headers.get("X-API-Key")
@@ -487,7 +441,7 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
             # Check for Bearer token (JWT auth takes precedence)
             auth_header = request.headers.get("Authorization")
             if auth_header and auth_header.startswith("Bearer "):
-                return await call_next(request)
+                return None
             
             return JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -502,7 +456,7 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
                 content={"detail": "Invalid API key"}
             )
         
-        return await call_next(request)
+        return None
 
 
 # Configuration class for security settings
@@ -529,44 +483,54 @@ class SecurityConfig:
         self.enable_input_validation = True
         self.enable_security_headers = True
         self.enable_request_logging = True
+        self.enable_audit_logging = True
         self.enable_api_key_auth = False
 
 
 def create_security_middleware_stack(app, config: SecurityConfig):
-    """Create and configure the security middleware stack."""
+    """Add the configured security middleware to ``app`` as a single pipeline layer."""
+    from .audit import AuditMiddleware
+    
+    # Stages run in this order on the way in and in reverse on the way out
+    stages: List[PipelineStage] = []
     
-    # Add security headers (outermost layer)
+    # Add security headers (to every response, including rejections)
     if config.enable_security_headers:
-        app.add_middleware(SecurityHeadersMiddleware)
+        stages.append(SecurityHeadersMiddleware())
     
     # Add request logging
     if config.enable_request_logging:
-        app.add_middleware(RequestLoggingMiddleware)
+        stages.append(RequestLoggingMiddleware())
     
-    # Add rate limiting
-    if config.enable_rate_limiting:
-        app.add_middleware(
-            RateLimitMiddleware,
-            requests_per_minute=config.rate_limit_per_minute,
-            requests_per_hour=config.rate_limit_per_hour,
-            burst_limit=config.burst_limit
-        )
+    # Add audit logging (records rejected requests too)
+    if config.enable_audit_logging:
+        stages.append(AuditMiddleware())
     
     # Add IP filtering
     if config.enable_ip_filtering:
-        app.add_middleware(
-            IPFilterMiddleware,
+        stages.append(IPFilterMiddleware(
             allowed_ips=config.allowed_ips,
             blocked_ips=config.blocked_ips,
             allowed_networks=config.allowed_networks
-        )
+        ))
+    
+    # Add rate limiting
+    if config.enable_rate_limiting:
+        stages.append(RateLimitMiddleware(
+            requests_per_minute=config.rate_limit_per_minute,
+            requests_per_hour=config.rate_limit_per_hour,
+            burst_limit=config.burst_limit
+        ))
     
     # Add input validation
     if config.enable_input_validation:
-        app.add_middleware(InputValidationMiddleware)
+        stages.append(InputValidationMiddleware())
     
     # Add API key authentication
     if config.enable_api_key_auth:
-        app.add_middleware(APIKeyMiddleware, api_keys=config.api_keys)
+        stages.append(APIKeyMiddleware(api_keys=config.api_keys))
+    
+    if stages:
+        app.add_middleware(MiddlewarePipeline, stages=stages)
     
-    return app
\ No newline at end of file
+    return app
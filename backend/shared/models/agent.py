@@ -56,6 +56,7 @@ class AgentConfig(BaseModel):
     use_standard_response_format: bool = False
     success_criteria: Optional[str] = None
     failure_criteria: Optional[str] = None
+    max_parallel_tools: Optional[int] = None  # Cap on concurrent tool calls (defaults to TOOLS_MAX_PARALLEL_CALLS)
 
 class Agent(SystemEntity):
     __tablename__ = "agents"
@@ -1,5 +1,7 @@
+import hashlib
+import json
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from enum import Enum
 
@@ -180,9 +182,43 @@ class AuditLog(BaseEntity):
     compliance_tags: Mapped[List[str]] = mapped_column(JSONB, nullable=True, server_default=text("'[]'::jsonb"))
     retention_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     checksum: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    previous_checksum: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
 
     def calculate_checksum(self) -> str:
-        return "checksum"
+        return audit_checksum(
+            self.previous_checksum,
+            {field: getattr(self, field) for field in AUDIT_CHECKSUM_FIELDS}
+        )
 
     def verify_integrity(self) -> bool:
-        return True
+        return self.checksum == self.calculate_checksum()
+
+
+# Columns covered by an audit record's checksum
+AUDIT_CHECKSUM_FIELDS = (
+    "event_type", "event_id", "correlation_id", "timestamp", "user_id", "username",
+    "session_id", "source_ip", "resource_type", "resource_id", "action", "outcome",
+    "severity", "message", "details", "request_data", "response_data",
+    "error_code", "error_message"
+)
+
+
+def _checksum_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Naive timestamps are stored as UTC
+        value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def audit_checksum(previous_checksum: Optional[str], row: Dict[str, Any]) -> str:
+    """SHA-256 over a record's content, chained to the previous record's checksum."""
+    content = json.dumps(
+        {field: _checksum_value(row.get(field)) for field in AUDIT_CHECKSUM_FIELDS},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(f"{previous_checksum or ''}|{content}".encode("utf-8")).hexdigest()
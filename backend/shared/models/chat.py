@@ -23,14 +23,24 @@ class ChatSession(SystemEntity):
     is_archived: Mapped[bool] = mapped_column(default=False)
     session_metadata: Mapped[Dict[str, Any]] = mapped_column("metadata", JSONB, nullable=True, server_default=text("'{}'::jsonb"))
     
+    # Rolling summary of the oldest messages, updated incrementally
+    summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    summarized_message_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    summary_updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    
     messages = relationship("ChatMessage", back_populates="session", cascade="all, delete-orphan", order_by="ChatMessage.created_at")
 
 class ChatMessage(SystemEntity):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
+    )
     
     session_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
     role: Mapped[str] = mapped_column(String(50), nullable=False) # user, assistant
     content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Cached token count of content (default tokenizer), filled lazily
+    token_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     
     # Link to execution that produced this message (for assistant messages)
     execution_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("chain_executions.id"), nullable=True)
@@ -3,7 +3,7 @@ from typing import Optional, List, Dict, Any
 from uuid import UUID
 
 from pydantic import BaseModel, Field, field_validator
-from sqlalchemy import String, Text, ForeignKey, text, Integer, Float, DateTime
+from sqlalchemy import String, Text, ForeignKey, text, Integer, Float, DateTime, Boolean, UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB, UUID as PG_UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -47,19 +47,27 @@ class Tool(BaseEntity):
     usage_count: Mapped[int] = mapped_column(Integer, default=0)
     last_used_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
     average_execution_time: Mapped[Optional[int]] = mapped_column(Integer, nullable=True) # ms
+    execution_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text("0")) # timed executions behind the average
     timeout_seconds: Mapped[int] = mapped_column(Integer, default=30)
     
+    # Result caching (opt-in for tools whose output depends only on their inputs)
+    cacheable: Mapped[bool] = mapped_column(Boolean, default=False, server_default=text("false"))
+    cache_ttl_seconds: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    
     # Validation
     last_validated_at: Mapped[Optional[DateTime]] = mapped_column(DateTime(timezone=True), nullable=True)
     validation_errors: Mapped[List[str]] = mapped_column(JSONB, default=text("'[]'::jsonb"))
     
     # Relations
-    # For now assuming MCP server relation is optional or stubbed if MCP model missing
-    # mcp_server_id: Mapped[Optional[UUID]] = mapped_column(PG_UUID(as_uuid=True), ForeignKey("mcp_servers.id"), nullable=True)
-    # mcp_server = relationship("MCPServer", back_populates="tools", lazy="selectin") 
-
-    # Since I don't have MCPServer model yet, I will comment out mcp_server usage in service if needed.
+    # MCP tools are keyed by their server and the server's own tool name (the discovery upsert target)
+    mcp_server_id: Mapped[Optional[UUID]] = mapped_column(
+        PG_UUID(as_uuid=True), ForeignKey("mcp_servers.id", ondelete="CASCADE"), nullable=True
+    )
+    mcp_tool_name: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     
+    __table_args__ = (
+        UniqueConstraint("mcp_server_id", "mcp_tool_name", name="uq_tools_mcp_server_tool"),
+    )
 
 
 # Pydantic Models for Request/Response
@@ -75,6 +83,8 @@ class ToolRequest(BaseModel):
     tags: Optional[List[str]] = []
     capabilities: Optional[List[str]] = []
     timeout_seconds: Optional[int] = 30
+    cacheable: Optional[bool] = False
+    cache_ttl_seconds: Optional[int] = None
 
 class ToolResponse(BaseModel):
     id: UUID
@@ -93,6 +103,10 @@ class ToolResponse(BaseModel):
     average_execution_time: Optional[int]
     last_validated_at: Optional[Any] # datetime
     validation_errors: List[str]
+    cacheable: bool = False
+    cache_ttl_seconds: Optional[int] = None
+    mcp_server_id: Optional[UUID] = None
+    mcp_tool_name: Optional[str] = None
     created_at: Any
     updated_at: Any
 
@@ -119,6 +133,8 @@ class ToolExecutionResponse(BaseModel):
     execution_time: Optional[int] = None
     started_at: Optional[str] = None
     completed_at: Optional[str] = None
+    cache_hit: Optional[bool] = None
+    validation_errors: Optional[List[Dict[str, Any]]] = None
 
 class MCPServerStatus(str, Enum):
     CONNECTED = "connected"
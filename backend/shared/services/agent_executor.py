@@ -50,6 +50,7 @@ except ImportError:
         async def validate_output(self, *args, **kwargs): return type('R',(),{'is_valid':True,'violations':[]})
 
 from .base import BaseService
+from .context_budget import ContextBudgeter
 
 logger = logging.getLogger(__name__)
 
@@ -380,17 +381,17 @@ class AgentExecutorService(BaseService):
             logger.error(f"[EXEC-BG] Background execution failed for {context.execution_id}: {e}", exc_info=True)
 
     async def _execute_agent_logic(self, context: AgentExecutionContext) -> AgentExecutionResult:
-        logger.info(f"[EXEC-LOGIC] Starting execution logic for {context.execution_id}")
+        logger.info("[EXEC-LOGIC] Starting execution logic for %s", context.execution_id)
         start_time = time.time()
         try:
-            logger.debug(f"[EXEC-LOGIC] Fetching agent {context.agent_id}")
+            logger.debug("[EXEC-LOGIC] Fetching agent %s", context.agent_id)
             agent = await self._get_agent(context.agent_id)
             if not agent:
                 raise ValueError(f"Agent {context.agent_id} not found")
-            logger.debug(f"[EXEC-LOGIC] Agent {context.agent_id} found: {agent.name}")
+            logger.debug("[EXEC-LOGIC] Agent %s found: %s", context.agent_id, agent.name)
 
             # RAG Context Retrieval
-            rag_context_str = ""
+            rag_entries = []
             if context.user_id:
                 try:
                     # Import here to avoid circular dependencies
@@ -424,25 +425,23 @@ class AgentExecutorService(BaseService):
                         )
                         
                         if results:
-                            rag_entries = []
                             for item in results:
                                 source_name = item.get('metadata', {}).get('source_name', 'Unknown Source')
                                 content = item.get('content', '')
                                 rag_entries.append(f"Source: {source_name}\nContent: {content}")
                             
-                            rag_context_str = "\n\n".join(rag_entries)
-                            logger.info(f"[EXEC-LOGIC] Retrieved {len(results)} RAG items for execution {context.execution_id}")
+                            logger.info("[EXEC-LOGIC] Retrieved %s RAG items for execution %s", len(results), context.execution_id)
                 except Exception as e:
-                    logger.error(f"[EXEC-LOGIC] Error retrieving RAG context: {e}")
+                    logger.error("[EXEC-LOGIC] Error retrieving RAG context: %s", e)
 
             # Guardrails, Memory... (Simplified logic for brevity but preserving key flows)
             memory_context = []
             memory_enabled = context.config.get("memory_enabled", True)
-            logger.debug(f"[EXEC-LOGIC] Memory enabled: {memory_enabled}")
+            logger.debug("[EXEC-LOGIC] Memory enabled: %s", memory_enabled)
             
             if memory_enabled:
                 if self.memory_service is not None:
-                    logger.debug(f"[EXEC-LOGIC] Performing semantic search for execution {context.execution_id}")
+                    logger.debug("[EXEC-LOGIC] Performing semantic search for execution %s", context.execution_id)
                     try:
                         memory_results = await self.memory_service.semantic_search(
                             agent_id=context.agent_id,
@@ -450,14 +449,14 @@ class AgentExecutorService(BaseService):
                             limit=5
                         )
                         memory_context = [res.content for res in memory_results]
-                        logger.debug(f"[EXEC-LOGIC] Retrieved {len(memory_context)} memory items")
+                        logger.debug("[EXEC-LOGIC] Retrieved %s memory items", len(memory_context))
                     except Exception as e:
-                        logger.error(f"[EXEC-LOGIC] Memory search failed: {e}")
+                        logger.error("[EXEC-LOGIC] Memory search failed: %s", e)
                         # Continue without memory if it fails
                 else:
-                    logger.warning(f"[EXEC-LOGIC] Memory enabled but memory_service is None for execution {context.execution_id}")
+                    logger.warning("[EXEC-LOGIC] Memory enabled but memory_service is None for execution %s", context.execution_id)
 
-            logger.debug(f"[EXEC-LOGIC] Preparing messages for execution {context.execution_id}")
+            logger.debug("[EXEC-LOGIC] Preparing messages for execution %s", context.execution_id)
             
             # Create agent config from agent.config dict, effectively handling overrides from context.config
             from ..models.agent import AgentConfig, LLMProvider
@@ -487,8 +486,9 @@ class AgentExecutorService(BaseService):
                 model_service = LLMModelService(self.session)
                 llm_models = await model_service.list_llm_models()
                 
-                logger.info(f"[EXEC-LOGIC] Looking for model with provider='{raw_provider}' and name='{agent_config.model}'")
-                logger.info(f"[EXEC-LOGIC] Available models: {[(m.provider, m.name, m.id) for m in llm_models]}")
+                logger.info("[EXEC-LOGIC] Looking for model with provider='%s' and name='%s'", raw_provider, agent_config.model)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("[EXEC-LOGIC] Available models: %s", [(m.provider, m.name, m.id) for m in llm_models])
                 
                 # Normalize provider name for matching (handle display names like "Google Gemini" -> "google")
                 def normalize_provider(provider_str: str) -> str:
@@ -521,11 +521,11 @@ class AgentExecutorService(BaseService):
                                    and agent_config.model.strip().lower() in m.name.strip().lower()), None)
                 
                 if target_model:
-                    logger.info(f"[EXEC-LOGIC] Found matching model: {target_model.name} (provider: {target_model.provider}, id: {target_model.id})")
+                    logger.info("[EXEC-LOGIC] Found matching model: %s (provider: %s, id: %s)", target_model.name, target_model.provider, target_model.id)
                     custom_creds = {}
                     if target_model.api_key:
                         custom_creds["api_key"] = target_model.api_key
-                        logger.info(f"[EXEC-LOGIC] Using API key from model {target_model.id}")
+                        logger.info("[EXEC-LOGIC] Using API key from model %s", target_model.id)
                     if target_model.api_base:
                         # Handle Ollama connection - prioritize internal networking if available
                         base_url = target_model.api_base
@@ -536,7 +536,7 @@ class AgentExecutorService(BaseService):
                             # If we are in Docker and the DB says localhost, switch to the internal service
                             if base_url and ("localhost" in base_url or "127.0.0.1" in base_url) and env_ollama_url:
                                 base_url = env_ollama_url
-                                logger.info(f"[EXEC-LOGIC] Switched Ollama URL from localhost to {base_url}")
+                                logger.info("[EXEC-LOGIC] Switched Ollama URL from localhost to %s", base_url)
                         
                         custom_creds["base_url"] = base_url
                     
@@ -549,7 +549,7 @@ class AgentExecutorService(BaseService):
                         custom_creds = {"api_key": target_model.api_key}
                     elif raw_provider.lower() == "google" and target_model.api_key:
                         custom_creds = {"api_key": target_model.api_key}
-                        logger.info(f"[EXEC-LOGIC] Set Google API key from model")
+                        logger.info("[EXEC-LOGIC] Set Google API key from model")
                         if target_model.api_base:
                             custom_creds["base_url"] = target_model.api_base
                     elif raw_provider.lower() == "azure-openai" and target_model.api_key:
@@ -600,45 +600,12 @@ class AgentExecutorService(BaseService):
 
             logger.info(f"[EXEC-LOGIC] Phase 2: Final Response Generation for {context.execution_id}")
             
-            system_prompt = agent.system_prompt or "You are a helpful assistant."
-            
-            # Inject RAG Context
-            if rag_context_str:
-                system_prompt += f"\n\n### RELEVANT KNOWLEDGE BASE CONTEXT ###\nUse the following information to answer the user's request if relevant.\n\n{rag_context_str}\n"
-
-            if memory_context:
-                system_prompt += f"\nContext from memory: {', '.join(memory_context)}"
-            
-            # Inject Success/Failure Criteria
-            success_criteria = agent.config.get("success_criteria")
-            failure_criteria = agent.config.get("failure_criteria")
-            
-            if success_criteria or failure_criteria:
-                 system_prompt += "\n\n### EVALUATION CRITERIA\n"
-                 if success_criteria:
-                     system_prompt += f"SUCCESS CRITERIA:\n{success_criteria}\n\n"
-                     system_prompt += "If the success criteria are met, set the 'status' field in your JSON response to 'success'.\n"
-                 if failure_criteria:
-                     system_prompt += f"FAILURE CRITERIA:\n{failure_criteria}\n\n"
-                     system_prompt += "If the failure criteria are met, set the 'status' field in your JSON response to 'failure'.\n"
-
-            # Inject Standard Agent Communication Protocol if enabled
-            if agent.config.get("use_standard_protocol") or agent.config.get("use_standard_response_format") or success_criteria or failure_criteria:
-                system_prompt += f"\n\n{SACP_INSTRUCTION}"
-            
-            # Add tool results to context if available
-            if tool_executions:
-                from ..services.tool_executor import ToolExecutorService
-                # Reuse the existing tool_executor if possible or just call formatting
-                tool_executor_fmt = ToolExecutorService(self.session)
-                tool_context = tool_executor_fmt.format_tool_results_for_context(tool_executions)
-                system_prompt += tool_context
-            
             # Extract user message - if it's a dict with 'message', use that
             # Also handle chat_history if present
             user_input = context.input_data
             user_content = ""
             chat_history = []
+            conversation_summary = ""
             
             if isinstance(user_input, dict):
                 # Extract Message
@@ -651,17 +618,84 @@ class AgentExecutorService(BaseService):
                 
                 # Extract History
                 if "chat_history" in user_input and isinstance(user_input["chat_history"], list):
-                    chat_history = user_input["chat_history"]
+                    chat_history = [
+                        hist_msg for hist_msg in user_input["chat_history"]
+                        if isinstance(hist_msg, dict) and "role" in hist_msg and "content" in hist_msg
+                    ]
                     logger.debug(f"[EXEC-LOGIC] Found {len(chat_history)} history messages in input")
+                
+                # Extract rolling summary of earlier turns
+                if isinstance(user_input.get("conversation_summary"), str):
+                    conversation_summary = user_input["conversation_summary"]
             else:
                 user_content = str(user_input)
 
+            # Fixed system prompt sections (always included in full)
+            criteria_prompt = ""
+            success_criteria = agent.config.get("success_criteria")
+            failure_criteria = agent.config.get("failure_criteria")
+            
+            # Inject Success/Failure Criteria
+            if success_criteria or failure_criteria:
+                 criteria_prompt += "\n\n### EVALUATION CRITERIA\n"
+                 if success_criteria:
+                     criteria_prompt += f"SUCCESS CRITERIA:\n{success_criteria}\n\n"
+                     criteria_prompt += "If the success criteria are met, set the 'status' field in your JSON response to 'success'.\n"
+                 if failure_criteria:
+                     criteria_prompt += f"FAILURE CRITERIA:\n{failure_criteria}\n\n"
+                     criteria_prompt += "If the failure criteria are met, set the 'status' field in your JSON response to 'failure'.\n"
+
+            # Inject Standard Agent Communication Protocol if enabled
+            if agent.config.get("use_standard_protocol") or agent.config.get("use_standard_response_format") or success_criteria or failure_criteria:
+                criteria_prompt += f"\n\n{SACP_INSTRUCTION}"
+            
+            # Add tool results to context if available
+            tool_context = ""
+            if tool_executions:
+                from ..services.tool_executor import ToolExecutorService
+                # Reuse the existing tool_executor if possible or just call formatting
+                tool_executor_fmt = ToolExecutorService(self.session)
+                tool_context = tool_executor_fmt.format_tool_results_for_context(tool_executions)
+
+            base_prompt = agent.system_prompt or "You are a helpful assistant."
+            if conversation_summary:
+                base_prompt += f"\n\n### CONVERSATION SUMMARY ###\nSummary of earlier messages in this conversation:\n{conversation_summary}\n"
+
+            # Fit RAG, memory and history into the model's context window
+            budgeter = ContextBudgeter(
+                model=agent_config.model,
+                provider=raw_provider,
+                max_tokens=agent_config.max_tokens
+            )
+            budgeted = budgeter.fit(
+                system_prompt=base_prompt + criteria_prompt + tool_context,
+                user_message=user_content,
+                history=chat_history,
+                rag_entries=rag_entries,
+                memory_entries=memory_context
+            )
+            logger.debug(f"[EXEC-LOGIC] Context token usage for {context.execution_id}: {budgeted.tokens_used}")
+
+            system_prompt = base_prompt
+            
+            # Inject RAG Context
+            if budgeted.rag_entries:
+                rag_context_str = "\n\n".join(budgeted.rag_entries)
+                system_prompt += f"\n\n### RELEVANT KNOWLEDGE BASE CONTEXT ###\nUse the following information to answer the user's request if relevant.\n\n{rag_context_str}\n"
+
+            if budgeted.memory_entries:
+                system_prompt += f"\nContext from memory: {', '.join(budgeted.memory_entries)}"
+
+            if budgeted.omitted_history:
+                system_prompt += f"\n\n[{budgeted.omitted_history} earlier message(s) in this conversation were omitted to fit the context window.]"
+
+            system_prompt += criteria_prompt + tool_context
+
             messages = [{"role": "system", "content": system_prompt}]
             
             # Add History
-            for hist_msg in chat_history:
-                if isinstance(hist_msg, dict) and "role" in hist_msg and "content" in hist_msg:
-                    messages.append({"role": hist_msg["role"], "content": hist_msg["content"]})
+            for hist_msg in budgeted.history:
+                messages.append({"role": hist_msg["role"], "content": hist_msg["content"]})
             
             # Add Current Message
             messages.append({"role": "user", "content": user_content})
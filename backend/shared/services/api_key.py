@@ -15,6 +15,7 @@ from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.api_key import APIKey
+from .principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 
@@ -94,15 +95,7 @@ class APIKeyService:
         """
         key_hash = self.hash_api_key(api_key)
         
-        query = select(APIKey).where(
-            and_(
-                APIKey.key_hash == key_hash,
-                APIKey.is_active == True
-            )
-        )
-        
-        result = await self.session.execute(query)
-        api_key_record = result.scalar_one_or_none()
+        api_key_record = await principal_cache.get_api_key(self.session, key_hash)
         
         if not api_key_record:
             return None
@@ -112,9 +105,8 @@ class APIKeyService:
             logger.warning(f"Expired API key used: {api_key_record.key_prefix}...")
             return None
         
-        # Update last used timestamp
-        api_key_record.last_used_at = datetime.utcnow()
-        await self.session.commit()
+        # Update last used timestamp with the next batched flush
+        principal_cache.record_api_key_use(api_key_record.id)
         
         return api_key_record
     
@@ -163,6 +155,7 @@ class APIKeyService:
         api_key.updated_at = datetime.utcnow()
         
         await self.session.commit()
+        await principal_cache.invalidate_api_key(api_key.key_hash)
         
         logger.info(f"Revoked API key: {api_key.name} ({api_key.key_prefix}...)")
         return True
@@ -213,6 +206,7 @@ class APIKeyService:
         
         await self.session.commit()
         await self.session.refresh(api_key)
+        await principal_cache.invalidate_api_key(api_key.key_hash)
         
         logger.info(f"Updated API key: {api_key.name} ({api_key.key_prefix}...)")
         return api_key
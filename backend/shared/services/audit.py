@@ -22,6 +22,15 @@ from ..models.user import User
 from .base import BaseService
 
 
+# Length limits of the audit log's string columns; request-derived values
+# (client IP, URL path) are clamped so one oversized value cannot fail a batch insert
+AUDIT_COLUMN_LENGTHS = {
+    column.name: column.type.length
+    for column in AuditLog.__table__.columns
+    if getattr(column.type, "length", None)
+}
+
+
 class AuditService(BaseService):
     """Comprehensive audit logging and compliance service."""
     
@@ -81,46 +90,40 @@ class AuditService(BaseService):
             Created audit log entry
         """
         try:
-            # Generate unique event ID
-            event_id = str(uuid.uuid4())
+            entry = self.build_entry(
+                event_type=event_type,
+                action=action,
+                message=message,
+                outcome=outcome,
+                severity=severity,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                resource_name=resource_name,
+                details=details,
+                request_data=request_data,
+                response_data=response_data,
+                error_code=error_code,
+                error_message=error_message,
+                compliance_tags=compliance_tags,
+                source_ip=source_ip,
+                user_agent=user_agent,
+                source_service=source_service,
+                session_id=session_id,
+                correlation_id=correlation_id or self.correlation_id,
+                user_id=self.user_id
+            )
             
             # Get user information if available
-            username = None
             if self.user_id:
                 user_result = await self.session.execute(
                     select(User.username).where(User.id == self.user_id)
                 )
                 user_row = user_result.first()
                 if user_row:
-                    username = user_row.username
+                    entry['username'] = user_row.username
             
             # Create audit log entry
-            audit_log = AuditLog(
-                event_type=event_type.value if hasattr(event_type, 'value') else str(event_type),
-                event_id=event_id,
-                correlation_id=correlation_id or self.correlation_id,
-                timestamp=datetime.utcnow(),
-                user_id=self.user_id,
-                username=username,
-                session_id=session_id,
-                source_ip=source_ip,
-                user_agent=user_agent,
-                source_service=source_service,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                resource_name=resource_name,
-                action=action,
-                outcome=outcome.value if hasattr(outcome, 'value') else str(outcome),
-                severity=severity.value if hasattr(severity, 'value') else str(severity),
-                message=message,
-                details=details or {},
-                request_data=request_data or {},
-                response_data=response_data or {},
-                error_code=error_code,
-                error_message=error_message,
-                compliance_tags=compliance_tags or [],
-                retention_date=self._calculate_retention_date(event_type, severity)
-            )
+            audit_log = AuditLog(**entry)
             
             # Calculate and set checksum for integrity
             audit_log.checksum = audit_log.calculate_checksum()
@@ -138,6 +141,67 @@ class AuditService(BaseService):
             print(f"Failed to log audit event: {e}")
             raise
     
+    @classmethod
+    def build_entry(
+        cls,
+        event_type: AuditEventType,
+        action: str,
+        message: str,
+        outcome: AuditOutcome = AuditOutcome.SUCCESS,
+        severity: AuditSeverity = AuditSeverity.LOW,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[Union[str, UUID]] = None,
+        resource_name: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        request_data: Optional[Dict[str, Any]] = None,
+        response_data: Optional[Dict[str, Any]] = None,
+        error_code: Optional[str] = None,
+        error_message: Optional[str] = None,
+        compliance_tags: Optional[List[str]] = None,
+        source_ip: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        source_service: Optional[str] = None,
+        session_id: Optional[str] = None,
+        correlation_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the column values of an audit log entry (without username and checksum).
+        
+        Used by ``log_event`` and by the batched audit writer.
+        """
+        entry = {
+            'event_type': event_type.value if hasattr(event_type, 'value') else str(event_type),
+            'event_id': str(uuid.uuid4()),
+            'correlation_id': correlation_id or str(uuid.uuid4()),
+            'timestamp': datetime.utcnow(),
+            'user_id': user_id,
+            'username': None,
+            'session_id': session_id,
+            'source_ip': source_ip,
+            'user_agent': user_agent,
+            'source_service': source_service,
+            'resource_type': resource_type,
+            'resource_id': str(resource_id) if resource_id is not None else None,
+            'resource_name': resource_name,
+            'action': action,
+            'outcome': outcome.value if hasattr(outcome, 'value') else str(outcome),
+            'severity': severity.value if hasattr(severity, 'value') else str(severity),
+            'message': message,
+            'details': details or {},
+            'request_data': request_data or {},
+            'response_data': response_data or {},
+            'error_code': error_code,
+            'error_message': error_message,
+            'compliance_tags': compliance_tags or [],
+            'retention_date': cls._calculate_retention_date(event_type, severity)
+        }
+        for name, length in AUDIT_COLUMN_LENGTHS.items():
+            value = entry.get(name)
+            if isinstance(value, str) and len(value) > length:
+                entry[name] = value[:length]
+        return entry
+    
     async def get_audit_logs(
         self,
         request: AuditLogRequest
@@ -634,14 +698,24 @@ class AuditService(BaseService):
             'verified_records': 0,
             'corrupted_records': 0,
             'missing_checksums': 0,
+            'unlinked_records': 0,
             'corrupted_entries': []
         }
         
+        # Each record written by the audit writer names its predecessor's checksum;
+        # a predecessor missing from the range means the range starts mid-chain
+        # or records were deleted
+        known_checksums = {log.checksum for log in audit_logs if log.checksum}
+        
         for log in audit_logs:
-            if not log.checksum:
+            # Rows written before checksums were implemented hold a placeholder
+            if not log.checksum or log.checksum == 'checksum':
                 verification_results['missing_checksums'] += 1
                 continue
             
+            if log.previous_checksum and log.previous_checksum not in known_checksums:
+                verification_results['unlinked_records'] += 1
+            
             if log.verify_integrity():
                 verification_results['verified_records'] += 1
             else:
@@ -649,7 +723,7 @@ class AuditService(BaseService):
                 verification_results['corrupted_entries'].append({
                     'event_id': log.event_id,
                     'timestamp': log.timestamp.isoformat(),
-                    'event_type': log.event_type.value,
+                    'event_type': log.event_type,
                     'expected_checksum': log.checksum,
                     'calculated_checksum': log.calculate_checksum()
                 })
@@ -668,8 +742,8 @@ class AuditService(BaseService):
         
         return verification_results
     
+    @staticmethod
     def _calculate_retention_date(
-        self,
         event_type: AuditEventType,
         severity: AuditSeverity
     ) -> Optional[datetime]:
@@ -0,0 +1,261 @@
+"""Batched audit log writer.
+
+HTTP audit events are put on a bounded in-memory queue and written by one
+background task in multi-row ``INSERT`` batches (on size or time), instead
+of one task, session and commit per request. When the queue fills up the
+configured overflow policy applies backpressure, samples low-severity
+events or drops events. The writer computes each record's checksum, chained
+to the previous record's, so integrity can still be verified; pending
+events are flushed on shutdown. A batch the database rejects is bisected so
+only the offending rows are dropped.
+"""
+
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from ..config.settings import get_settings
+from ..database import get_database_session
+from ..models.audit import AuditLog, AuditSeverity, audit_checksum
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "sample", "drop")
+
+# Failures that say nothing about the rows themselves; the batch is retried whole
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, ConnectionError, OSError, asyncio.TimeoutError)
+
+
+@dataclass
+class AuditWriterStats:
+    """Counters of the audit writer."""
+    enqueued: int = 0
+    written: int = 0
+    batches: int = 0
+    dropped: int = 0
+    sampled_out: int = 0
+    failed_batches: int = 0
+
+
+class AuditWriter:
+    """Queues audit entries and bulk-inserts them from a background task."""
+
+    def __init__(
+        self,
+        queue_max_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        overflow_policy: Optional[str] = None,
+        enqueue_timeout: Optional[float] = None
+    ):
+        audit_settings = get_settings().audit
+        self.queue_max_size = queue_max_size or audit_settings.queue_max_size
+        self.batch_size = batch_size or audit_settings.batch_size
+        self.flush_interval = flush_interval if flush_interval is not None else audit_settings.flush_interval_seconds
+        self.overflow_policy = overflow_policy or audit_settings.overflow_policy
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy: {self.overflow_policy}")
+        self.enqueue_timeout = enqueue_timeout if enqueue_timeout is not None else audit_settings.enqueue_timeout_seconds
+        self.sample_high_water = audit_settings.sample_high_water
+        self.sample_rate = audit_settings.sample_rate
+        self.stats = AuditWriterStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._retry: List[Dict[str, Any]] = []
+        self._last_checksum: Optional[str] = None
+        self._chain_loaded = False
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_max_size)
+        return self._queue
+
+    async def submit(self, entry: Dict[str, Any]) -> bool:
+        """Queue an entry built by ``AuditService.build_entry``.
+
+        Returns False if the entry was dropped or sampled out.
+        """
+        queue = self.queue
+        if self.overflow_policy == "sample" and entry.get("severity") == AuditSeverity.LOW.value:
+            if queue.qsize() >= self.queue_max_size * self.sample_high_water and random.random() >= self.sample_rate:
+                self.stats.sampled_out += 1
+                return False
+            if queue.full():
+                self.stats.dropped += 1
+                return False
+
+        try:
+            queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            if self.overflow_policy == "drop":
+                self.stats.dropped += 1
+                return False
+            # Backpressure: hold the request briefly rather than lose the event
+            try:
+                await asyncio.wait_for(queue.put(entry), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.stats.dropped += 1
+                logger.warning("Audit queue full, dropping event")
+                return False
+
+        self.stats.enqueued += 1
+        self._ensure_running()
+        return True
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def start(self) -> None:
+        """Start the background writer."""
+        self._ensure_running()
+
+    async def _collect(self) -> tuple:
+        """Wait for one entry, then gather more until the batch is full or the interval passes.
+
+        Returns the batch and whether the stop marker was reached.
+        """
+        queue = self.queue
+        batch: List[Dict[str, Any]] = []
+        entry = await queue.get()
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while entry is not None:
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            if not queue.empty():
+                entry = queue.get_nowait()
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return batch, False
+            try:
+                entry = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return batch, False
+        return batch, True
+
+    async def _run(self) -> None:
+        while True:
+            batch, stop = await self._collect()
+            if batch:
+                await self._flush_batch(batch)
+            if stop:
+                return
+
+    async def _flush_batch(self, batch: List[Dict[str, Any]]) -> None:
+        retried, self._retry = self._retry, []
+        entries = retried + batch
+        if not entries:
+            return
+        try:
+            await self._write(entries)
+            self.stats.written += len(entries)
+            self.stats.batches += 1
+        except TRANSIENT_ERRORS as e:
+            self.stats.failed_batches += 1
+            # New entries get one more attempt with the next batch; entries
+            # that already failed once are dropped
+            self._retry = batch
+            self.stats.dropped += len(retried)
+            logger.error(f"Failed to write {len(entries)} audit event(s), {len(retried)} dropped: {e}")
+        except Exception as e:
+            self.stats.failed_batches += 1
+            # The database rejected some row; bisect so only the rejected rows are lost
+            middle = len(entries) // 2
+            rejected = await self._write_isolating(entries[:middle]) + await self._write_isolating(entries[middle:])
+            self.stats.dropped += len(rejected)
+            logger.error(f"Dropped {len(rejected)} of {len(entries)} audit event(s) rejected by the database: {e}")
+
+    async def _write_isolating(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write ``entries``, splitting them on failure; returns the rows that could not be written."""
+        if not entries:
+            return []
+        try:
+            await self._write(entries)
+            self.stats.written += len(entries)
+            return []
+        except Exception as e:
+            if len(entries) == 1:
+                logger.warning(f"Audit event {entries[0].get('event_id')} rejected: {e}")
+                return entries
+        middle = len(entries) // 2
+        return await self._write_isolating(entries[:middle]) + await self._write_isolating(entries[middle:])
+
+    def _chain(self, entries: List[Dict[str, Any]], previous: Optional[str]) -> Optional[str]:
+        """Set ``previous_checksum`` and ``checksum`` on each entry in order."""
+        for entry in entries:
+            entry["previous_checksum"] = previous
+            entry["checksum"] = previous = audit_checksum(previous, entry)
+        return previous
+
+    async def _write(self, entries: List[Dict[str, Any]]) -> None:
+        async with get_database_session() as session:
+            if not self._chain_loaded:
+                result = await session.execute(
+                    select(AuditLog.checksum)
+                    .where(AuditLog.checksum.is_not(None))
+                    .order_by(AuditLog.timestamp.desc())
+                    .limit(1)
+                )
+                self._last_checksum = result.scalar_one_or_none()
+                self._chain_loaded = True
+
+            user_ids = {entry["user_id"] for entry in entries if entry.get("user_id") and not entry.get("username")}
+            if user_ids:
+                result = await session.execute(select(User.id, User.username).where(User.id.in_(user_ids)))
+                usernames = {str(row.id): row.username for row in result}
+                for entry in entries:
+                    if entry.get("user_id") and not entry.get("username"):
+                        entry["username"] = usernames.get(str(entry["user_id"]))
+
+            # The chain only advances once the batch is committed
+            last_checksum = self._chain(entries, self._last_checksum)
+            await session.execute(insert(AuditLog), entries)
+            await session.commit()
+            self._last_checksum = last_checksum
+
+    async def flush(self) -> int:
+        """Write everything queued so far; returns the number of entries written."""
+        written = self.stats.written
+        queue = self.queue
+        while not queue.empty() or self._retry:
+            batch = []
+            while not queue.empty() and len(batch) < self.batch_size:
+                entry = queue.get_nowait()
+                if entry is not None:
+                    batch.append(entry)
+            await self._flush_batch(batch)
+        return self.stats.written - written
+
+    async def aclose(self) -> None:
+        """Stop the writer and flush pending entries (application shutdown)."""
+        if self._task and not self._task.done():
+            # The stop marker lets the writer finish the batch it is working on
+            await self.queue.put(None)
+            await self._task
+        await self.flush()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get writer statistics."""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self.stats.enqueued,
+            "written": self.stats.written,
+            "batches": self.stats.batches,
+            "dropped": self.stats.dropped,
+            "sampled_out": self.stats.sampled_out,
+            "failed_batches": self.stats.failed_batches,
+            "overflow_policy": self.overflow_policy
+        }
+
+
+# Global audit writer
+audit_writer = AuditWriter()
@@ -17,7 +17,6 @@ from uuid import UUID, uuid4
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -28,13 +27,12 @@ from ..models.rbac import Role, UserRole
 from ..models.tenant import Tenant, TenantUser
 from ..config.settings import get_settings
 from ..database.connection import get_async_db
+from .password_hasher import password_hasher
+from .principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Password hashing context - using argon2 to avoid bcrypt version issues
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 # JWT settings
 SECRET_KEY = settings.security.secret_key if hasattr(settings, 'security') else "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
@@ -50,13 +48,13 @@ class AuthService:
     
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hash a password using argon2."""
-        return pwd_context.hash(password)
+        """Hash a password using argon2 (blocking; async code uses the password hasher pool)."""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+        """Verify a password against its hash (blocking; async code uses the password hasher pool)."""
+        return password_hasher.verify(plain_password, hashed_password)
     
     @staticmethod
     def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -130,12 +128,13 @@ class AuthService:
         # Mapping to User model fields from Step 727
         first_name = full_name.split(" ")[0] if full_name else ""
         last_name = " ".join(full_name.split(" ")[1:]) if full_name and " " in full_name else ""
+        password_hash = await password_hasher.run(self.hash_password, password)
         
         user = User(
             id=uuid4(),
             email=email,
             username=email, # Using email as username for now
-            password_hash=self.hash_password(password),
+            password_hash=password_hash,
             first_name=first_name,
             last_name=last_name,
             is_active=True,
@@ -162,10 +161,15 @@ class AuthService:
             return None
         
         # Verify using password_hash field
-        if not self.verify_password(password, user.password_hash):
+        if not await password_hasher.run(self.verify_password, password, user.password_hash):
             logger.warning(f"Authentication failed: Invalid password - {email}")
             return None
         
+        # Upgrade hashes made with older argon2 parameters
+        if password_hasher.needs_update(user.password_hash):
+            user.password_hash = await password_hasher.run(self.hash_password, password)
+            logger.info(f"Rehashed password with current parameters: {email}")
+        
         # Update last login
         user.last_login = datetime.utcnow() # User model has last_login (not last_login_at)
         await self.session.commit()
@@ -247,11 +251,11 @@ class AuthService:
         if not user:
             return False
         
-        if not self.verify_password(old_password, user.password_hash):
+        if not await password_hasher.run(self.verify_password, old_password, user.password_hash):
             logger.warning(f"Password change failed: Invalid old password - {user.email}")
             return False
         
-        user.password_hash = self.hash_password(new_password)
+        user.password_hash = await password_hasher.run(self.hash_password, new_password)
         # update timestamp if needed? BaseEntity does it automatically?
         await self.session.commit()
         
@@ -265,7 +269,7 @@ class AuthService:
         if not user:
             return False
         
-        user.password_hash = self.hash_password(new_password)
+        user.password_hash = await password_hasher.run(self.hash_password, new_password)
         await self.session.commit()
         
         logger.info(f"Password reset for user: {email}")
@@ -329,7 +333,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = await auth_service.get_user_by_id(UUID(user_id))
+    user = await principal_cache.get_user(session, UUID(user_id))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -88,7 +88,9 @@ def execute(inputs: dict, context=None) -> dict:
     },
     "category": "web",
     "tags": ["search", "internet", "web", "duckduckgo"],
-    "timeout_seconds": 30
+    "timeout_seconds": 30,
+    "cacheable": True,
+    "cache_ttl_seconds": 600
 }
 
 
@@ -279,7 +281,9 @@ def execute(inputs: dict, context=None) -> dict:
     },
     "category": "knowledge",
     "tags": ["wikipedia", "knowledge", "research"],
-    "timeout_seconds": 30
+    "timeout_seconds": 30,
+    "cacheable": True,
+    "cache_ttl_seconds": 3600
 }
 
 
@@ -401,7 +405,9 @@ def execute(inputs: dict, context=None) -> dict:
     },
     "category": "utility",
     "tags": ["json", "parser", "data"],
-    "timeout_seconds": 10
+    "timeout_seconds": 10,
+    "cacheable": True,
+    "cache_ttl_seconds": 86400
 }
 
 
@@ -473,7 +479,9 @@ def execute(inputs: dict, context=None) -> dict:
     },
     "category": "math",
     "tags": ["math", "calculation", "calculator"],
-    "timeout_seconds": 10
+    "timeout_seconds": 10,
+    "cacheable": True,
+    "cache_ttl_seconds": 86400
 }
 
 
@@ -62,6 +62,7 @@ class AppCache:
         self._l1_cache: Dict[str, Any] = {}
         self._l1_access_times: Dict[str, datetime] = {}
         self._l1_access_counts: Dict[str, int] = {}
+        self._l1_expires_at: Dict[str, datetime] = {}
         
         # Cache statistics
         self.stats = CacheStats()
@@ -95,6 +96,8 @@ class AppCache:
         try:
             # L1 Cache check (in-memory)
             if use_l1 and self.config.enable_l1:
+                if cache_key in self._l1_cache and self._l1_expired(cache_key):
+                    self._remove_l1(cache_key)
                 if cache_key in self._l1_cache:
                     self._update_l1_access(cache_key)
                     self.stats.hits += 1
@@ -109,9 +112,10 @@ class AppCache:
                     # Deserialize value
                     deserialized_value = self._deserialize(value)
                     
-                    # Promote to L1 cache
+                    # Promote to L1 cache for the key's remaining lifetime
                     if use_l1 and self.config.enable_l1:
-                        await self._set_l1(cache_key, deserialized_value)
+                        remaining_ttl = await self.redis.ttl(cache_key)
+                        await self._set_l1(cache_key, deserialized_value, remaining_ttl if remaining_ttl > 0 else None)
                     
                     self.stats.hits += 1
                     self._update_response_time(start_time)
@@ -172,9 +176,7 @@ class AppCache:
         try:
             # Delete from L1 cache
             if use_l1 and cache_key in self._l1_cache:
-                del self._l1_cache[cache_key]
-                self._l1_access_times.pop(cache_key, None)
-                self._l1_access_counts.pop(cache_key, None)
+                self._remove_l1(cache_key)
             
             # Delete from L2 cache
             if use_l2:
@@ -196,9 +198,7 @@ class AppCache:
             l1_deleted = 0
             keys_to_delete = [k for k in self._l1_cache.keys() if k.startswith(f"{self.key_prefix}:{namespace}:")]
             for key in keys_to_delete:
-                del self._l1_cache[key]
-                self._l1_access_times.pop(key, None)
-                self._l1_access_counts.pop(key, None)
+                self._remove_l1(key)
                 l1_deleted += 1
             
             # Invalidate L2 cache
@@ -208,7 +208,7 @@ class AppCache:
                 l2_deleted += 1
             
             total_deleted = l1_deleted + l2_deleted
-            logger.info(f"Invalidated {total_deleted} keys in namespace {namespace} for tenant {self.tenant_id}")
+            logger.info(f"Invalidated {total_deleted} keys in namespace {namespace}")
             return total_deleted
             
         except Exception as e:
@@ -225,6 +225,7 @@ class AppCache:
             self._l1_cache.clear()
             self._l1_access_times.clear()
             self._l1_access_counts.clear()
+            self._l1_expires_at.clear()
             
             # Clear L2 cache
             l2_count = 0
@@ -259,6 +260,20 @@ class AppCache:
         self._l1_cache[cache_key] = value
         self._l1_access_times[cache_key] = datetime.utcnow()
         self._l1_access_counts[cache_key] = 1
+        ttl = ttl or self.config.default_ttl_seconds
+        self._l1_expires_at[cache_key] = datetime.utcnow() + timedelta(seconds=ttl)
+    
+    def _l1_expired(self, cache_key: str) -> bool:
+        """Check whether an L1 entry has outlived its TTL"""
+        expires_at = self._l1_expires_at.get(cache_key)
+        return expires_at is not None and expires_at <= datetime.utcnow()
+    
+    def _remove_l1(self, cache_key: str):
+        """Remove an entry and its bookkeeping from the L1 cache"""
+        self._l1_cache.pop(cache_key, None)
+        self._l1_access_times.pop(cache_key, None)
+        self._l1_access_counts.pop(cache_key, None)
+        self._l1_expires_at.pop(cache_key, None)
     
     def _update_l1_access(self, cache_key: str):
         """Update L1 cache access statistics"""
@@ -288,9 +303,7 @@ class AppCache:
         evict_count = max(1, len(sorted_keys) // 4)
         
         for key, _ in sorted_keys[:evict_count]:
-            self._l1_cache.pop(key, None)
-            self._l1_access_times.pop(key, None)
-            self._l1_access_counts.pop(key, None)
+            self._remove_l1(key)
             self.stats.evictions += 1
     
     async def _evict_lfu(self):
@@ -303,9 +316,7 @@ class AppCache:
         evict_count = max(1, len(sorted_keys) // 4)
         
         for key, _ in sorted_keys[:evict_count]:
-            self._l1_cache.pop(key, None)
-            self._l1_access_times.pop(key, None)
-            self._l1_access_counts.pop(key, None)
+            self._remove_l1(key)
             self.stats.evictions += 1
     
     def _calculate_l1_memory_usage(self) -> float:
@@ -21,6 +21,7 @@ from shared.models.agent import Agent
 from shared.schemas.chain import ChainValidationResult
 from shared.services.base import BaseService
 from shared.services.agent_executor import AgentExecutorService
+from shared.services.tool_output_store import tool_output_store
 
 logger = logging.getLogger(__name__)
 
@@ -619,10 +620,14 @@ class ChainOrchestratorService(BaseService):
                     # context['node_outputs'] stores just the output for easy chaining
                     context['node_outputs'][node_id] = node_output
                     
-                    # execution.node_results stores full trace (input + output)
+                    # execution.node_results stores full trace (input + output);
+                    # oversized outputs are stored as blobs and referenced from the JSONB
+                    stored_output = await tool_output_store.spill_if_large(
+                        node_output, owner=str(execution.triggered_by) if execution.triggered_by else None
+                    )
                     execution.node_results[node_id] = {
                         "input": node_input,
-                        "output": node_output,
+                        "output": stored_output,
                         "timestamp": datetime.now(timezone.utc).isoformat()
                     }
                     execution.completed_nodes.append(node_id)
@@ -634,7 +639,7 @@ class ChainOrchestratorService(BaseService):
                     # Log Success
                     await self._log_execution_event(
                         task_session, execution.id, node_id, "node_completed",
-                        f"Node {node.label} completed", "INFO", output_data=node_output
+                        f"Node {node.label} completed", "INFO", output_data=stored_output
                     )
                     
                     await task_session.commit()
@@ -1051,7 +1056,7 @@ class ChainOrchestratorService(BaseService):
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Execute an agent node."""
-        logger.info(f"DEBUG: _execute_agent_node Input: {input_data.keys()}")
+        logger.debug("_execute_agent_node input keys: %s", list(input_data.keys()))
         
         if not self.agent_executor:
             self.agent_executor = AgentExecutorService(session)
@@ -1069,7 +1074,7 @@ class ChainOrchestratorService(BaseService):
             raise ChainExecutionError(f"Agent {node.agent_id} not found")
         
         # Execute agent
-        logger.info(f"Executing agent {agent.name} (node {node.node_id})")
+        logger.info("Executing agent %s (node %s)", agent.name, node.node_id)
         
         # Prepare agent logic with support for Structured Output
         output_schema = node.config.get('output_schema')
@@ -1101,10 +1106,10 @@ class ChainOrchestratorService(BaseService):
                         # Fallback: add to system_instruction if possible, or just log warning that we couldn't inject
                         processed_input['_system_instruction_injection'] = instruction
             except Exception as e:
-                logger.warning(f"Failed to inject output schema instruction: {e}")
+                logger.warning("Failed to inject output schema instruction: %s", e)
         
-        logger.info(f"[CHAIN] Executing agent node {node.node_id} (agent: {agent.name})")
-        logger.debug(f"[CHAIN] Agent node input_data: {input_data}")
+        logger.info("[CHAIN] Executing agent node %s (agent: %s)", node.node_id, agent.name)
+        logger.debug("[CHAIN] Agent node input_data: %s", input_data)
         
         # Check for model override in variables
         model_override = context.get('variables', {}).get('_model_override')
@@ -1114,7 +1119,7 @@ class ChainOrchestratorService(BaseService):
         if model_override:
             # Merge override into config (override wins). Ensure we don't mutate the original node.config
             execution_config = {**execution_config, **model_override}
-            logger.info(f"[CHAIN] Applying model override to agent execution: {model_override}")
+            logger.info("[CHAIN] Applying model override to agent execution: %s", model_override)
 
         execution_result = await local_agent_executor.execute_agent(
             agent_id=str(agent.id),
@@ -1123,8 +1128,8 @@ class ChainOrchestratorService(BaseService):
             user_id=context.get('user_id')
         )
         
-        logger.info(f"[CHAIN] Agent execution completed. Status: {execution_result.status}")
-        logger.debug(f"[CHAIN] Execution result output_data: {execution_result.output_data}")
+        logger.info("[CHAIN] Agent execution completed. Status: %s", execution_result.status)
+        logger.debug("[CHAIN] Execution result output_data: %s", execution_result.output_data)
         
         # Check if execution failed
         if execution_result.status == "FAILED" or execution_result.status == "failed":
@@ -1133,13 +1138,13 @@ class ChainOrchestratorService(BaseService):
                 "error_message": execution_result.error_message or "Agent execution failed",
                 "status": "failed"
             }
-            logger.warning(f"[CHAIN] Agent node {node.node_id} failed: {execution_result.error_message}")
-            logger.info(f"[CHAIN] Agent node {node.node_id} returning error output: {error_output}")
+            logger.warning("[CHAIN] Agent node %s failed: %s", node.node_id, execution_result.error_message)
+            logger.debug("[CHAIN] Agent node %s returning error output: %s", node.node_id, error_output)
             return error_output
         
         # Return agent output
         result_data = execution_result.output_data or {}
-        logger.debug(f"[CHAIN] Result data after extraction: {result_data}")
+        logger.debug("[CHAIN] Result data after extraction: %s", result_data)
         
         # Check if SACP is enabled and parse JSON
         if agent.config.get("use_standard_protocol") or agent.config.get("use_standard_response_format"):
@@ -1167,7 +1172,7 @@ class ChainOrchestratorService(BaseService):
                 parsed = json.loads(json_str)
                 return parsed
             except Exception as e:
-                logger.warning(f"Failed to parse SACP JSON response from agent {agent.name}: {e}")
+                logger.warning("Failed to parse SACP JSON response from agent %s: %s", agent.name, e)
                 # Fallback: Wrap in default structure per spec
                 return {
                     "thought": "System Note: LLM failed to provide structured JSON output.",
@@ -1176,7 +1181,7 @@ class ChainOrchestratorService(BaseService):
                     "message": "The LLM returned an invalid response format."
                 }
         
-        logger.info(f"[CHAIN] Agent node {node.node_id} returning output: {result_data}")
+        logger.debug("[CHAIN] Agent node %s returning output: %s", node.node_id, result_data)
         return result_data
     
     async def _execute_aggregator_node(
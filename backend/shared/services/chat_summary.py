@@ -0,0 +1,170 @@
+"""Rolling conversation summaries for chat sessions.
+
+Older messages of a chat session are folded into a summary stored on the
+``ChatSession`` row. History assembly then only reads the unsummarized tail
+of the conversation, which bounds both the database read and the prompt
+length of long-running sessions.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config.settings import get_settings
+from ..database.connection import AsyncSessionLocal
+from ..models.agent import AgentConfig
+from ..models.chat import ChatSession, ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant.
+Update the existing summary with the new messages below. Keep facts, decisions, user preferences,
+open questions and any names, numbers or identifiers that may be needed later. Be concise and write
+in plain prose. Return only the updated summary."""
+
+# Sessions with a summary update currently running in this process
+_summaries_in_progress: Set[uuid.UUID] = set()
+
+
+class ChatSummaryService:
+    """Service for assembling chat history from a rolling summary plus recent messages."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.settings = get_settings().chat
+
+    async def count_messages(
+        self,
+        session_id: uuid.UUID,
+        exclude_message_id: Optional[uuid.UUID] = None
+    ) -> int:
+        """Count messages stored for a chat session."""
+        query = select(func.count()).select_from(ChatMessage).where(ChatMessage.session_id == session_id)
+        if exclude_message_id is not None:
+            query = query.where(ChatMessage.id != exclude_message_id)
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
+    async def load_history(
+        self,
+        chat_session: ChatSession,
+        exclude_message_id: Optional[uuid.UUID] = None
+    ) -> Tuple[List[ChatMessage], int]:
+        """Load the unsummarized tail of a conversation.
+
+        Every message after the summarized ones is returned, so nothing is
+        lost while a summary update lags behind or fails; once summaries keep
+        up the tail stays within the recent and trigger windows.
+
+        Args:
+            chat_session: Chat session to load history for
+            exclude_message_id: Message to leave out (usually the one being answered)
+
+        Returns:
+            Tuple of (messages in chronological order, total message count)
+        """
+        total = await self.count_messages(chat_session.id, exclude_message_id)
+        summarized = chat_session.summarized_message_count or 0
+        if total <= summarized:
+            return [], total
+
+        query = select(ChatMessage).where(ChatMessage.session_id == chat_session.id)
+        if exclude_message_id is not None:
+            query = query.where(ChatMessage.id != exclude_message_id)
+        query = query.order_by(ChatMessage.created_at).offset(summarized)
+
+        result = await self.session.execute(query)
+        return list(result.scalars().all()), total
+
+    def needs_summary(self, chat_session: ChatSession, total_messages: int) -> bool:
+        """Check whether enough messages have accumulated to fold into the summary."""
+        foldable = total_messages - (chat_session.summarized_message_count or 0) - self.settings.summary_recent_messages
+        return foldable >= self.settings.summary_trigger_messages
+
+    async def update_summary(self, session_id: uuid.UUID, llm_service=None) -> bool:
+        """Fold messages that fell out of the recent window into the session summary.
+
+        The existing summary is extended with only the newly folded messages, so
+        each update costs one LLM call over a bounded number of messages.
+
+        Returns:
+            True if the summary was updated
+        """
+        result = await self.session.execute(select(ChatSession).where(ChatSession.id == session_id))
+        chat_session = result.scalar_one_or_none()
+        if not chat_session:
+            return False
+
+        total = await self.count_messages(session_id)
+        if not self.needs_summary(chat_session, total):
+            return False
+
+        summarized = chat_session.summarized_message_count or 0
+        fold_count = total - summarized - self.settings.summary_recent_messages
+
+        result = await self.session.execute(
+            select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at)
+            .offset(summarized)
+            .limit(fold_count)
+        )
+        to_fold = result.scalars().all()
+        if not to_fold:
+            return False
+
+        transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in to_fold)
+        user_prompt = (
+            f"Existing summary:\n{chat_session.summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+
+        if llm_service is None:
+            from .llm_service import LLMService
+            llm_service = LLMService()
+
+        summary_config = AgentConfig(
+            name="chat-summarizer",
+            model=self.settings.summary_model,
+            temperature=0.2,
+            max_tokens=self.settings.summary_max_tokens,
+            llm_provider=self.settings.summary_provider
+        )
+        response = await llm_service.generate_response(
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            summary_config
+        )
+
+        chat_session.summary = response.content.strip()
+        chat_session.summarized_message_count = summarized + len(to_fold)
+        chat_session.summary_updated_at = datetime.now(timezone.utc)
+        await self.session.commit()
+
+        logger.info(
+            f"Updated summary for chat session {session_id}: folded {len(to_fold)} messages "
+            f"({chat_session.summarized_message_count} total)"
+        )
+        return True
+
+
+async def summarize_session_background(session_id: uuid.UUID) -> None:
+    """Background task that updates a session summary with its own DB session."""
+    if session_id in _summaries_in_progress:
+        return
+
+    _summaries_in_progress.add(session_id)
+    try:
+        async with AsyncSessionLocal() as session:
+            await ChatSummaryService(session).update_summary(session_id)
+    except Exception as e:
+        logger.error(f"Failed to update summary for chat session {session_id}: {e}", exc_info=True)
+    finally:
+        _summaries_in_progress.discard(session_id)
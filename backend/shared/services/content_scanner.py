@@ -0,0 +1,302 @@
+"""Single-pass content scanning for guardrails.
+
+Guardrails run on the input and output of every agent call. Running each
+harmful, PII and prompt-injection regex separately and then checking every
+keyword list with its own substring test walked the text dozens of times,
+and the patterns were recompiled whenever a ``ContentFilter`` was built.
+
+``ContentScanner`` compiles everything once per process:
+
+* all literals -- the keyword lists, plus regexes that are only a word-bounded
+  alternation of literals such as ``\\b(kill|bomb)\\b`` -- into one
+  Aho–Corasick automaton, using ``pyahocorasick`` when installed and a
+  trie-shaped regex otherwise;
+* the remaining regexes into one alternation with a named group per pattern.
+
+``scan`` returns the matches of all categories at once; the module-level
+``content_scanner`` is shared by every ``ContentFilter`` and
+``MLContentAnalyzer``.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# Regex categories
+HARMFUL = "harmful"
+PII = "pii"
+PROMPT_INJECTION = "prompt_injection"
+
+# Keyword categories
+TOXIC = "toxic"
+NEGATIVE = "negative"
+POSITIVE = "positive"
+TOXICITY_INDICATOR = "toxicity_indicator"
+GENDER_BIAS = "gender_bias"
+RACIAL_BIAS = "racial_bias"
+RELIGIOUS_BIAS = "religious_bias"
+
+DEFAULT_PATTERNS: Dict[str, List[str]] = {
+    HARMFUL: [
+        # Violence and threats
+        r'\b(kill|murder|assassinate|bomb|terrorist|violence)\b',
+        r'\b(suicide|self-harm|hurt yourself)\b',
+        r'\b(weapon|gun|knife|explosive)\b',
+
+        # Hate speech
+        r'\b(hate|racist|nazi|supremacist)\b',
+        r'\b(discriminat|prejudice|bigot)\b',
+
+        # Illegal activities
+        r'\b(drug dealing|money laundering|fraud|scam)\b',
+        r'\b(hack|crack|exploit|malware)\b',
+
+        # Adult content
+        r'\b(explicit|pornographic|sexual|adult content)\b',
+    ],
+    PII: [
+        # Social Security Numbers
+        r'\b\d{3}-\d{2}-\d{4}\b',
+        r'\b\d{9}\b',
+
+        # Credit Card Numbers
+        r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
+
+        # Email addresses
+        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+
+        # Phone numbers
+        r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+        r'\(\d{3}\)\s?\d{3}[-.]?\d{4}',
+
+        # IP addresses
+        r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b',
+    ],
+    PROMPT_INJECTION: [
+        # Direct instruction attempts
+        r'\b(ignore|forget|disregard)\s+(previous|above|all)\s+(instructions?|prompts?|rules?)\b',
+        r'\b(act as|pretend to be|roleplay as)\b',
+        r'\b(system prompt|system message|initial prompt)\b',
+
+        # Jailbreak attempts
+        r'\b(jailbreak|bypass|override)\b',
+        r'\b(developer mode|admin mode|god mode)\b',
+        r'\b(unrestricted|unlimited|no limits)\b',
+
+        # Prompt leakage attempts
+        r'\b(show me your|what is your|reveal your)\s+(prompt|instructions|system message)\b',
+        r'\b(copy|repeat|echo)\s+(your|the)\s+(prompt|instructions)\b',
+    ],
+}
+
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    # This would typically be loaded from a comprehensive database
+    TOXIC: [
+        'hate', 'toxic', 'offensive', 'abusive', 'harassment',
+        'discrimination', 'bullying', 'threatening', 'violent'
+    ],
+    NEGATIVE: ['bad', 'terrible', 'awful', 'hate', 'angry', 'sad'],
+    POSITIVE: ['good', 'great', 'excellent', 'love', 'happy', 'amazing'],
+    TOXICITY_INDICATOR: [
+        'hate', 'kill', 'die', 'stupid', 'idiot', 'moron',
+        'shut up', 'go away', 'nobody cares', 'worthless'
+    ],
+    GENDER_BIAS: ['men are', 'women are', 'boys are', 'girls are'],
+    RACIAL_BIAS: ['all blacks', 'all whites', 'all asians'],
+    RELIGIOUS_BIAS: ['all muslims', 'all christians', 'all jews'],
+}
+
+
+@dataclass(frozen=True)
+class ScanMatch:
+    """A pattern or keyword match"""
+    category: str
+    start: int
+    end: int
+    text: str
+
+
+class ScanResult:
+    """Matches of all categories found in one scan"""
+
+    def __init__(self, matches: List[ScanMatch], keywords: Dict[str, Set[str]]):
+        self.matches = matches
+        self._keywords = keywords
+
+    def by_category(self, category: str) -> List[ScanMatch]:
+        """Matches of a category, in text order"""
+        return [match for match in self.matches if match.category == category]
+
+    def keywords(self, category: str) -> Set[str]:
+        """Distinct keywords of a category found in the text"""
+        return self._keywords.get(category, set())
+
+
+# A regex that only matches whole words from a list of literals
+LITERAL_ALTERNATION = re.compile(r"\\b\(([\w '-]+(?:\|[\w '-]+)*)\)\\b")
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+def _trie_regex(literals: Iterable[str]) -> str:
+    """Regex matching the longest of ``literals``, shaped like their trie."""
+    trie: Dict[str, Any] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional tails prefer the longest literal
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Case-insensitive multi-literal matcher.
+
+    ``keywords`` match anywhere in the text, ``words`` only as whole words.
+    Overlapping matches are all reported.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]], words: Optional[Dict[str, Iterable[str]]] = None):
+        # literal -> categories it belongs to
+        self.categories: Dict[str, Set[str]] = {}
+        self.word_categories: Dict[str, Set[str]] = {}
+        for target, source in ((self.categories, keywords), (self.word_categories, words or {})):
+            for category, literals in source.items():
+                for literal in literals:
+                    target.setdefault(literal.lower(), set()).add(category)
+        literals = set(self.categories) | set(self.word_categories)
+
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and literals:
+            self._automaton = ahocorasick.Automaton()
+            for literal in literals:
+                self._automaton.add_word(literal, literal)
+            self._automaton.make_automaton()
+
+        # Fallback: at each position the lookahead finds the longest literal,
+        # shorter literals starting there are its prefixes
+        self._pattern = re.compile("(?=(" + _trie_regex(literals) + "))", re.IGNORECASE) if literals else None
+        self._prefixes: Dict[str, List[str]] = {
+            literal: [other for other in literals if other != literal and literal.startswith(other)]
+            for literal in literals
+        }
+
+    def _literals(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        if self._automaton is not None:
+            lowered = text.lower()
+            # Offsets only carry over if lowercasing kept the length
+            if len(lowered) == len(text):
+                for end, literal in self._automaton.iter(lowered):
+                    yield end - len(literal) + 1, end + 1, literal
+                return
+        if self._pattern is None:
+            return
+        for match in self._pattern.finditer(text):
+            literal = match.group(1).lower()
+            if literal not in self._prefixes:
+                continue
+            start = match.start(1)
+            yield start, match.end(1), literal
+            for prefix in self._prefixes[literal]:
+                yield start, start + len(prefix), prefix
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str, str]]:
+        """Yield ``(start, end, literal, category)`` for every match."""
+        for start, end, literal in self._literals(text):
+            for category in self.categories.get(literal, ()):
+                yield start, end, literal, category
+            if literal in self.word_categories:
+                if (start > 0 and _is_word_char(text[start - 1])) or (end < len(text) and _is_word_char(text[end])):
+                    continue
+                for category in self.word_categories[literal]:
+                    yield start, end, literal, category
+
+
+class ContentScanner:
+    """Compiled guardrail patterns and keywords, scanned in a single pass."""
+
+    def __init__(
+        self,
+        patterns: Optional[Dict[str, List[str]]] = None,
+        keywords: Optional[Dict[str, Iterable[str]]] = None
+    ):
+        patterns = DEFAULT_PATTERNS if patterns is None else patterns
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+
+        # Individually compiled patterns per category, for callers that need them
+        self.patterns: Dict[str, List[re.Pattern]] = {
+            category: [re.compile(source, re.IGNORECASE) for source in sources]
+            for category, sources in patterns.items()
+        }
+
+        words: Dict[str, List[str]] = {}
+        self._group_categories: Dict[str, str] = {}
+        bounded, unbounded = [], []
+        for category, sources in patterns.items():
+            for index, source in enumerate(sources):
+                literal_alternation = LITERAL_ALTERNATION.fullmatch(source)
+                if literal_alternation:
+                    words.setdefault(category, []).extend(literal_alternation.group(1).split('|'))
+                    continue
+                group = f"{category}_{index}"
+                self._group_categories[group] = category
+                # A shared leading word boundary rejects most positions at once
+                if source.startswith(r'\b'):
+                    bounded.append(f"(?P<{group}>{source[2:]})")
+                else:
+                    unbounded.append(f"(?P<{group}>{source})")
+        alternatives = ([r"\b(?:" + "|".join(bounded) + ")"] if bounded else []) + unbounded
+        self._combined = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+        self.keyword_matcher = KeywordMatcher(keywords, words)
+
+    def keywords(self, category: str) -> Set[str]:
+        """The configured keywords of a category"""
+        return {keyword for keyword, categories in self.keyword_matcher.categories.items() if category in categories}
+
+    def scan(self, text: str) -> ScanResult:
+        """Find matches of every category in ``text``.
+
+        Regex matches do not overlap each other; where two regexes match at
+        the same position the first configured one wins. Literal matches
+        may overlap anything.
+        """
+        matches: List[ScanMatch] = []
+        if self._combined is not None:
+            for match in self._combined.finditer(text):
+                matches.append(ScanMatch(
+                    self._group_categories[match.lastgroup], match.start(), match.end(), match.group(0)
+                ))
+
+        found: Dict[str, Set[str]] = {}
+        for start, end, literal, category in self.keyword_matcher.finditer(text):
+            matches.append(ScanMatch(category, start, end, text[start:end]))
+            found.setdefault(category, set()).add(literal)
+
+        matches.sort(key=lambda match: (match.start, match.end))
+        return ScanResult(matches, found)
+
+
+# Global scanner, compiled once per process
+content_scanner = ContentScanner()
@@ -0,0 +1,269 @@
+"""Token-aware context budgeting for agent prompts.
+
+Splits a model's context window between the system prompt, chat history,
+RAG context and memory snippets so that prompt size stays bounded as chat
+sessions grow.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+# Context windows by model name prefix (longest prefix wins)
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 128000,
+    "claude": 200000,
+    "gemini": 1000000,
+    "llama3": 8192,
+    "llama2": 4096,
+    "mistral": 8192,
+    "qwen": 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Average characters per token used when no exact tokenizer is available
+CHARS_PER_TOKEN: Dict[str, float] = {
+    "anthropic": 3.5,
+    "google": 4.0,
+    "ollama": 4.0,
+}
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Per-message framing overhead (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Providers whose models are tokenized with tiktoken encodings
+TIKTOKEN_PROVIDERS = {"openai", "azure-openai"}
+
+# Tokenizer used for model-agnostic counts (e.g. cached on stored chat messages)
+DEFAULT_COUNTER_MODEL = "gpt-4"
+
+
+class TokenCounter:
+    """Counts tokens for a specific model.
+
+    Uses tiktoken for OpenAI-family models and a characters-per-token
+    approximation for everything else.
+    """
+
+    def __init__(self, model: str, provider: Optional[str] = None):
+        self.model = model or ""
+        self.provider = (provider or "").lower()
+        self._encoding = self._load_encoding()
+        self._chars_per_token = CHARS_PER_TOKEN.get(self.provider, DEFAULT_CHARS_PER_TOKEN)
+
+    @property
+    def is_exact(self) -> bool:
+        """Whether counts come from the model's real tokenizer."""
+        return self._encoding is not None
+
+    def _load_encoding(self):
+        if not TIKTOKEN_AVAILABLE:
+            return None
+        if self.provider and self.provider not in TIKTOKEN_PROVIDERS:
+            return None
+        # Loading an encoding may download its BPE file, so any failure falls back
+        try:
+            try:
+                return tiktoken.encoding_for_model(self.model)
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Falling back to approximate token counts for {self.model}: {e}")
+            return None
+
+    def count(self, text: str) -> int:
+        """Count tokens in a piece of text."""
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return max(1, int(len(text) / self._chars_per_token + 0.5))
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """Count tokens for a chat message, reusing a cached ``token_count`` if present."""
+        cached = message.get("token_count")
+        if isinstance(cached, int) and cached >= 0:
+            return cached + MESSAGE_OVERHEAD_TOKENS
+        return self.count(str(message.get("content", ""))) + MESSAGE_OVERHEAD_TOKENS
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Truncate text so that it fits within ``max_tokens``."""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            return self._encoding.decode(tokens[:max_tokens])
+        max_chars = int(max_tokens * self._chars_per_token)
+        return text if len(text) <= max_chars else text[:max_chars]
+
+
+@lru_cache(maxsize=64)
+def get_token_counter(model: str, provider: Optional[str] = None) -> TokenCounter:
+    """Get a shared token counter for a model/provider pair."""
+    return TokenCounter(model, provider)
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with the default tokenizer."""
+    return get_token_counter(DEFAULT_COUNTER_MODEL, "openai").count(text)
+
+
+def get_context_window(model: str) -> int:
+    """Look up the context window for a model name."""
+    name = (model or "").lower()
+    best_prefix = ""
+    for prefix in MODEL_CONTEXT_WINDOWS:
+        if name.startswith(prefix) and len(prefix) > len(best_prefix):
+            best_prefix = prefix
+    return MODEL_CONTEXT_WINDOWS.get(best_prefix, DEFAULT_CONTEXT_WINDOW)
+
+
+@dataclass
+class ContextBudget:
+    """Token allocation for each part of a prompt."""
+    total: int
+    system: int
+    history: int
+    rag: int
+    memory: int
+
+
+@dataclass
+class BudgetedContext:
+    """Result of fitting prompt components into a budget."""
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    rag_entries: List[str] = field(default_factory=list)
+    memory_entries: List[str] = field(default_factory=list)
+    omitted_history: int = 0
+    tokens_used: Dict[str, int] = field(default_factory=dict)
+
+
+class ContextBudgeter:
+    """Allocates a token budget across system prompt, history, RAG and memory."""
+
+    def __init__(
+        self,
+        model: str,
+        provider: Optional[str] = None,
+        max_tokens: int = 1000,
+        context_window: Optional[int] = None
+    ):
+        """Initialize the budgeter.
+
+        Args:
+            model: Model name, used for tokenizer and context window lookup
+            provider: LLM provider name
+            max_tokens: Tokens reserved for the completion
+            context_window: Optional explicit context window override
+        """
+        llm_settings = get_settings().llm
+        self.counter = get_token_counter(model, provider)
+        window = context_window or get_context_window(model)
+        self.context_window = min(window, llm_settings.context_max_tokens)
+        self.max_tokens = max_tokens
+        self.rag_share = llm_settings.context_rag_share
+        self.memory_share = llm_settings.context_memory_share
+
+    def plan(self, system_prompt: str, user_message: str = "") -> ContextBudget:
+        """Compute the token allocation for the variable parts of a prompt."""
+        system_tokens = self.counter.count(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        user_tokens = self.counter.count(user_message) + MESSAGE_OVERHEAD_TOKENS
+        available = max(0, self.context_window - self.max_tokens - system_tokens - user_tokens)
+
+        rag = int(available * self.rag_share)
+        memory = int(available * self.memory_share)
+        return ContextBudget(
+            total=self.context_window,
+            system=system_tokens,
+            history=available - rag - memory,
+            rag=rag,
+            memory=memory
+        )
+
+    def fit(
+        self,
+        system_prompt: str,
+        user_message: str = "",
+        history: Optional[List[Dict[str, Any]]] = None,
+        rag_entries: Optional[List[str]] = None,
+        memory_entries: Optional[List[str]] = None
+    ) -> BudgetedContext:
+        """Fit history, RAG and memory into the budget left by the system prompt.
+
+        RAG and memory entries are kept in relevance order until their share
+        is exhausted; any unused share is handed to history. History keeps the
+        most recent turns and drops the oldest ones first.
+        """
+        budget = self.plan(system_prompt, user_message)
+
+        rag_kept, rag_used = self._fit_entries(rag_entries or [], budget.rag)
+        memory_kept, memory_used = self._fit_entries(memory_entries or [], budget.memory)
+
+        history_budget = budget.history + (budget.rag - rag_used) + (budget.memory - memory_used)
+        history_kept, history_used = self._fit_history(history or [], history_budget)
+        omitted = len(history or []) - len(history_kept)
+
+        if omitted:
+            logger.info(f"Context budget dropped {omitted} oldest history message(s) for model {self.counter.model}")
+
+        return BudgetedContext(
+            history=history_kept,
+            rag_entries=rag_kept,
+            memory_entries=memory_kept,
+            omitted_history=omitted,
+            tokens_used={
+                "system": budget.system,
+                "history": history_used,
+                "rag": rag_used,
+                "memory": memory_used,
+                "available": budget.total - self.max_tokens
+            }
+        )
+
+    def _fit_entries(self, entries: List[str], budget: int) -> Tuple[List[str], int]:
+        kept: List[str] = []
+        used = 0
+        for entry in entries:
+            tokens = self.counter.count(entry)
+            if used + tokens <= budget:
+                kept.append(entry)
+                used += tokens
+                continue
+            # Truncate the first entry rather than dropping all context
+            if not kept and budget > 0:
+                kept.append(self.counter.truncate(entry, budget))
+                used = budget
+            break
+        return kept, used
+
+    def _fit_history(self, history: List[Dict[str, Any]], budget: int) -> Tuple[List[Dict[str, Any]], int]:
+        kept: List[Dict[str, Any]] = []
+        used = 0
+        for message in reversed(history):
+            tokens = self.counter.count_message(message)
+            if used + tokens > budget:
+                break
+            kept.append(message)
+            used += tokens
+        kept.reverse()
+        return kept, used
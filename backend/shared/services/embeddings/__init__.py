@@ -4,10 +4,13 @@ from .base import BaseEmbeddingProvider
 from .openai_provider import OpenAIEmbeddingProvider
 from .local_provider import LocalEmbeddingProvider
 from .ollama_provider import OllamaEmbeddingProvider
+from .batching import BatchingEmbeddingProvider, MicroBatcher
 
 __all__ = [
     "BaseEmbeddingProvider",
     "OpenAIEmbeddingProvider",
     "LocalEmbeddingProvider",
     "OllamaEmbeddingProvider",
+    "BatchingEmbeddingProvider",
+    "MicroBatcher",
 ]
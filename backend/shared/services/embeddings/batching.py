@@ -0,0 +1,148 @@
+"""Dynamic micro-batching for embedding providers.
+
+Concurrent single-text embedding requests (memory searches, RAG queries)
+are collected for a few milliseconds, or until the batch is full, and sent
+to the provider as one batched call.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+from .base import BaseEmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchStats:
+    """Micro-batching statistics"""
+    requests: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects individual requests and dispatches them in batches.
+
+    Each ``submit`` call returns the result for its own item. A batch is
+    dispatched when ``max_batch_size`` items are pending or ``max_wait_ms``
+    has elapsed since the first pending item arrived.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[T]], Awaitable[List[R]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = BatchStats()
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self.stats.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        self.stats.batches += 1
+        self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+        asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        # Skip items whose callers already gave up
+        live = [(item, future) for item, future in batch if not future.done()]
+        if not live:
+            return
+        try:
+            results = await self.batch_fn([item for item, _ in live])
+            if len(results) != len(live):
+                raise RuntimeError(f"Batch function returned {len(results)} results for {len(live)} items")
+        except Exception as e:
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class BatchingEmbeddingProvider(BaseEmbeddingProvider):
+    """Embedding provider wrapper that micro-batches single-text requests."""
+
+    def __init__(
+        self,
+        provider: BaseEmbeddingProvider,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        """Initialize the batching wrapper.
+
+        Args:
+            provider: Underlying provider with a batched ``generate_embeddings``
+            max_batch_size: Maximum texts per dispatched batch
+            max_wait_ms: Maximum time a request waits for companions
+        """
+        super().__init__()
+        self.provider = provider
+        self.batcher: MicroBatcher[str, List[float]] = MicroBatcher(
+            provider.generate_embeddings,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+
+    async def initialize(self) -> None:
+        """Initialize the underlying provider."""
+        await self.provider.initialize()
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding for a single text via the micro-batcher."""
+        return await self.batcher.submit(text)
+
+    async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for texts that are already batched by the caller."""
+        return await self.provider.generate_embeddings(texts)
+
+    @property
+    def embedding_dimension(self) -> int:
+        """Get the dimension of the embeddings."""
+        return self.provider.embedding_dimension
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose provider-specific attributes (model name, base URL, ...)
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
@@ -1,6 +1,7 @@
 """Local embedding provider using Sentence Transformers."""
 
 from typing import List, Optional
+import asyncio
 import logging
 
 try:
@@ -60,7 +61,8 @@ class LocalEmbeddingProvider(BaseEmbeddingProvider):
             await self.initialize()
         
         try:
-            embedding = self._model.encode(text, convert_to_tensor=False)
+            # Run the CPU-bound encode off the event loop
+            embedding = await asyncio.to_thread(self._model.encode, text, convert_to_tensor=False)
             return embedding.tolist()
         except Exception as e:
             self.logger.error(f"Failed to generate local embedding: {e}")
@@ -79,7 +81,7 @@ class LocalEmbeddingProvider(BaseEmbeddingProvider):
             await self.initialize()
         
         try:
-            embeddings = self._model.encode(texts, convert_to_tensor=False)
+            embeddings = await asyncio.to_thread(self._model.encode, texts, convert_to_tensor=False)
             return [emb.tolist() for emb in embeddings]
         except Exception as e:
             self.logger.error(f"Failed to generate local embeddings: {e}")
@@ -1,9 +1,25 @@
 """Ollama embedding provider implementation."""
 
 from typing import List, Optional
-import httpx
 import logging
+import math
 from .base import BaseEmbeddingProvider
+from ..http_transport import http_transport_registry
+
+def _normalize(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length"""
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+def _api_error(response) -> Optional[str]:
+    """The error Ollama reported in a JSON body; None for a bare 404 of a missing endpoint"""
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("error") if isinstance(body, dict) else None
+
 
 class OllamaEmbeddingProvider(BaseEmbeddingProvider):
     """Embedding provider using Ollama's API."""
@@ -18,8 +34,10 @@ class OllamaEmbeddingProvider(BaseEmbeddingProvider):
         super().__init__()
         self.base_url = base_url
         self.model = model
-        self.client = httpx.AsyncClient(base_url=self.base_url, timeout=60.0)
+        self.client = http_transport_registry.get_client(self.base_url)
         self._embedding_dimension = None
+        self._model_checked = False
+        self._batch_supported = True
 
     async def initialize(self) -> None:
         """Initialize and verify connection to Ollama with retries."""
@@ -43,8 +61,11 @@ class OllamaEmbeddingProvider(BaseEmbeddingProvider):
                     self.logger.error(f"Failed to initialize Ollama embedding provider after {max_retries} attempts: {e}")
                     raise
 
-    async def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for a single text."""
+    async def _ensure_model(self) -> None:
+        """Pull the embedding model on first use if it is missing."""
+        if self._model_checked:
+            return
+
         # Initialize OllamaService for management if not already done
         if not hasattr(self, "_ollama_mgmt"):
             from ..ollama_service import OllamaService
@@ -54,7 +75,19 @@ class OllamaEmbeddingProvider(BaseEmbeddingProvider):
         if not await self._ollama_mgmt.model_exists(self.model):
             self.logger.info(f"Embedding model '{self.model}' not found. Pulling lazily...")
             await self._ollama_mgmt.pull_model(self.model)
+        self._model_checked = True
+
+    async def generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding for a single text."""
+        return (await self.generate_embeddings([text]))[0]
+
+    async def _generate_legacy_embedding(self, text: str) -> List[float]:
+        """Embed one text with the ``/api/embeddings`` endpoint of older Ollama versions.
 
+        That endpoint returns unnormalized vectors while ``/api/embed``
+        returns unit vectors; they are normalized so both endpoints give the
+        same vectors (collections use cosine distance, see ``vector_collections``).
+        """
         payload = {
             "model": self.model,
             "prompt": text
@@ -63,16 +96,41 @@ class OllamaEmbeddingProvider(BaseEmbeddingProvider):
         try:
             response = await self.client.post("/api/embeddings", json=payload)
             response.raise_for_status()
-            return response.json()["embedding"]
+            return _normalize(response.json()["embedding"])
         except Exception as e:
             self.logger.error(f"Error generating Ollama embedding: {e}")
             raise
 
     async def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts."""
-        # Ollama currently doesn't support batch embeddings in one call in a standard way
-        # that is consistent across all versions/models. We'll do it sequentially for now.
-        return [await self.generate_embedding(text) for text in texts]
+        """Generate embeddings for multiple texts.
+
+        Uses the batched ``/api/embed`` endpoint and falls back to one request
+        per text on Ollama versions that don't provide it.
+        """
+        if not texts:
+            return []
+
+        await self._ensure_model()
+
+        if not self._batch_supported:
+            return [await self._generate_legacy_embedding(text) for text in texts]
+
+        try:
+            response = await self.client.post("/api/embed", json={"model": self.model, "input": texts})
+            if response.status_code == 404:
+                if _api_error(response):
+                    # The endpoint exists but reported an error such as a missing model;
+                    # check the model again on the next call
+                    self._model_checked = False
+                else:
+                    self.logger.info("Ollama /api/embed not available, falling back to per-text embeddings")
+                    self._batch_supported = False
+                    return [await self._generate_legacy_embedding(text) for text in texts]
+            response.raise_for_status()
+            return response.json()["embeddings"]
+        except Exception as e:
+            self.logger.error(f"Error generating Ollama embeddings: {e}")
+            raise
 
     @property
     def embedding_dimension(self) -> int:
@@ -0,0 +1,137 @@
+"""Compiled and cached guardrail policies.
+
+``GuardrailsEngine.check_policy`` used to load the policy list and walk
+every policy dict for each check. Policies are now compiled once into a
+``PolicySet``: only blocking policies can change the outcome, so the others
+are dropped, and the blocking candidates for an action/resource pair are
+indexed on first use. The compiled set is cached process-wide by
+``guardrail_policy_cache`` until ``invalidate`` is called after a policy
+change, or its TTL expires so other workers pick up changes too.
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+WILDCARD = '*'
+
+# Distinct action/resource pairs whose candidates are kept
+MAX_INDEXED_PAIRS = 1024
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """A policy with its conditions prepared for evaluation"""
+    name: str
+    action: Optional[str]
+    resource: Optional[str]
+    allowed: bool
+    reason: str
+    risk_score: float
+    metadata: Dict[str, Any]
+    conditions: Tuple[Tuple[str, Any], ...]
+
+    @classmethod
+    def from_dict(cls, policy: Dict[str, Any]) -> "CompiledPolicy":
+        return cls(
+            name=policy['name'],
+            action=policy.get('action'),
+            resource=policy.get('resource'),
+            allowed=policy.get('allowed', True),
+            reason=policy.get('reason', 'Action not allowed by policy'),
+            risk_score=policy.get('risk_score', 0.5),
+            metadata=policy.get('metadata', {}),
+            conditions=tuple(policy.get('conditions', {}).items())
+        )
+
+    def targets(self, action: str, resource: str) -> bool:
+        """Whether the policy covers the action and resource"""
+        return (
+            (self.action == WILDCARD or self.action == action)
+            and (self.resource == WILDCARD or self.resource == resource)
+        )
+
+    def matches_context(self, context: Dict[str, Any]) -> bool:
+        """Conditions only constrain context keys that are present"""
+        for key, value in self.conditions:
+            if key in context and context[key] != value:
+                return False
+        return True
+
+
+class PolicySet:
+    """Policies compiled for evaluation"""
+
+    def __init__(self, policies: List[Dict[str, Any]]):
+        self.policies = [CompiledPolicy.from_dict(policy) for policy in policies]
+        # Allowing policies never change the outcome
+        self._blocking = [policy for policy in self.policies if not policy.allowed]
+        self._candidates: Dict[Tuple[str, str], List[CompiledPolicy]] = {}
+
+    def evaluate(self, action: str, resource: str, context: Dict[str, Any]) -> Optional[CompiledPolicy]:
+        """Return the first policy blocking the action, or None"""
+        if not self._blocking:
+            return None
+
+        key = (action, resource)
+        candidates = self._candidates.get(key)
+        if candidates is None:
+            candidates = [policy for policy in self._blocking if policy.targets(action, resource)]
+            if len(self._candidates) < MAX_INDEXED_PAIRS:
+                self._candidates[key] = candidates
+
+        for policy in candidates:
+            if policy.matches_context(context):
+                return policy
+        return None
+
+
+class GuardrailPolicyCache:
+    """Process-wide cache of the compiled policy set."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None else get_settings().guardrails.policy_cache_ttl_seconds
+        )
+        self._policies: Optional[PolicySet] = None
+        self._loaded_at = 0.0
+        # Bumped on invalidation so a load started before it is not cached
+        self._generation = 0
+        self.hits = 0
+        self.loads = 0
+
+    async def get(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> PolicySet:
+        """Return the cached policy set, compiling the loader's policies on a miss"""
+        if self._policies is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            self.hits += 1
+            return self._policies
+
+        generation = self._generation
+        policies = PolicySet(await loader())
+        self.loads += 1
+        if generation == self._generation:
+            self._policies = policies
+            self._loaded_at = time.monotonic()
+        return policies
+
+    def invalidate(self) -> None:
+        """Drop the cached policies; call after guardrail policies change"""
+        self._policies = None
+        self._generation += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "cached": self._policies is not None,
+            "policies": len(self._policies.policies) if self._policies is not None else 0,
+            "hits": self.hits,
+            "loads": self.loads
+        }
+
+
+# Global guardrail policy cache
+guardrail_policy_cache = GuardrailPolicyCache()
@@ -1,21 +1,26 @@
 # Guardrails Engine Implementation
-from typing import Dict, Any, Optional, List, Set, Union
+from typing import Dict, Any, Optional, List, Union
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, or_, func
 from datetime import datetime, timedelta
 from enum import Enum
 import logging
-import json
-import re
-import asyncio
 import uuid
 from dataclasses import dataclass
 import hashlib
 import time
+import codecs
 
 from ..models.tenant import Tenant
 from ..models.audit import AuditLog, AuditEventType, AuditOutcome, AuditSeverity
 from .base import BaseService
+from .audit import AuditService
+from .audit_writer import audit_writer
+from .guardrail_policies import guardrail_policy_cache
+from .content_scanner import (
+    ContentScanner, ScanResult, content_scanner, HARMFUL, PII, PROMPT_INJECTION, TOXIC,
+    NEGATIVE, POSITIVE, TOXICITY_INDICATOR, GENDER_BIAS, RACIAL_BIAS, RELIGIOUS_BIAS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -109,170 +114,198 @@ class Violation:
 class ContentFilter:
     """Content filtering with pattern matching and ML-based detection"""
     
-    def __init__(self):
-        self.harmful_patterns = self._load_harmful_patterns()
-        self.pii_patterns = self._load_pii_patterns()
-        self.prompt_injection_patterns = self._load_prompt_injection_patterns()
-        self.toxic_keywords = self._load_toxic_keywords()
-    
-    def _load_harmful_patterns(self) -> List[re.Pattern]:
-        """Load harmful content patterns"""
-        patterns = [
-            # Violence and threats
-            r'\b(kill|murder|assassinate|bomb|terrorist|violence)\b',
-            r'\b(suicide|self-harm|hurt yourself)\b',
-            r'\b(weapon|gun|knife|explosive)\b',
-            
-            # Hate speech
-            r'\b(hate|racist|nazi|supremacist)\b',
-            r'\b(discriminat|prejudice|bigot)\b',
-            
-            # Illegal activities
-            r'\b(drug dealing|money laundering|fraud|scam)\b',
-            r'\b(hack|crack|exploit|malware)\b',
-            
-            # Adult content
-            r'\b(explicit|pornographic|sexual|adult content)\b',
-        ]
-        
-        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
-    
-    def _load_pii_patterns(self) -> List[re.Pattern]:
-        """Load PII detection patterns"""
-        patterns = [
-            # Social Security Numbers
-            r'\b\d{3}-\d{2}-\d{4}\b',
-            r'\b\d{9}\b',
-            
-            # Credit Card Numbers
-            r'\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b',
-            
-            # Email addresses
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            
-            # Phone numbers
-            r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-            r'\(\d{3}\)\s?\d{3}[-.]?\d{4}',
-            
-            # IP addresses
-            r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b',
-        ]
-        
-        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
-    
-    def _load_prompt_injection_patterns(self) -> List[re.Pattern]:
-        """Load prompt injection detection patterns"""
-        patterns = [
-            # Direct instruction attempts
-            r'\b(ignore|forget|disregard)\s+(previous|above|all)\s+(instructions?|prompts?|rules?)\b',
-            r'\b(act as|pretend to be|roleplay as)\b',
-            r'\b(system prompt|system message|initial prompt)\b',
-            
-            # Jailbreak attempts
-            r'\b(jailbreak|bypass|override)\b',
-            r'\b(developer mode|admin mode|god mode)\b',
-            r'\b(unrestricted|unlimited|no limits)\b',
-            
-            # Prompt leakage attempts
-            r'\b(show me your|what is your|reveal your)\s+(prompt|instructions|system message)\b',
-            r'\b(copy|repeat|echo)\s+(your|the)\s+(prompt|instructions)\b',
-        ]
-        
-        return [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    def __init__(self, scanner: Optional[ContentScanner] = None):
+        # Patterns are compiled once per process and shared
+        self.scanner = scanner or content_scanner
+        self.harmful_patterns = self.scanner.patterns[HARMFUL]
+        self.pii_patterns = self.scanner.patterns[PII]
+        self.prompt_injection_patterns = self.scanner.patterns[PROMPT_INJECTION]
+        self.toxic_keywords = self.scanner.keywords(TOXIC)
     
-    def _load_toxic_keywords(self) -> Set[str]:
-        """Load toxic keywords list"""
-        # This would typically be loaded from a comprehensive database
-        return {
-            'hate', 'toxic', 'offensive', 'abusive', 'harassment',
-            'discrimination', 'bullying', 'threatening', 'violent'
-        }
+    def scan(self, content: str) -> ScanResult:
+        """Scan content for all pattern and keyword categories in one pass"""
+        return self.scanner.scan(content)
+    
+    def harmful_violations(self, result: ScanResult) -> List[str]:
+        return [f"Harmful content detected: {match.text}" for match in result.by_category(HARMFUL)]
+    
+    def pii_violations(self, result: ScanResult) -> List[str]:
+        return [f"PII detected: {match.text}" for match in result.by_category(PII)]
+    
+    def prompt_injection_violations(self, result: ScanResult) -> List[str]:
+        return [f"Prompt injection detected: {match.text}" for match in result.by_category(PROMPT_INJECTION)]
+    
+    def toxic_violations(self, result: ScanResult) -> List[str]:
+        return [f"Toxic content detected: {keyword}" for keyword in sorted(result.keywords(TOXIC))]
     
     async def detect_harmful_content(self, content: str) -> List[str]:
         """Detect harmful content patterns"""
-        violations = []
-        
-        for pattern in self.harmful_patterns:
-            matches = pattern.findall(content)
-            if matches:
-                violations.extend([f"Harmful content detected: {match}" for match in matches])
-        
-        return violations
+        return self.harmful_violations(self.scan(content))
     
     async def detect_pii(self, content: str) -> List[str]:
         """Detect personally identifiable information"""
-        violations = []
-        
-        for pattern in self.pii_patterns:
-            matches = pattern.findall(content)
-            if matches:
-                violations.extend([f"PII detected: {match}" for match in matches])
-        
-        return violations
+        return self.pii_violations(self.scan(content))
     
     async def detect_prompt_injection(self, content: str) -> List[str]:
         """Detect prompt injection attempts"""
-        violations = []
-        
-        for pattern in self.prompt_injection_patterns:
-            matches = pattern.findall(content)
-            if matches:
-                violations.extend([f"Prompt injection detected: {match}" for match in matches])
-        
-        return violations
+        return self.prompt_injection_violations(self.scan(content))
     
     async def detect_toxic_content(self, content: str) -> List[str]:
         """Detect toxic content using keyword matching"""
-        violations = []
-        content_lower = content.lower()
-        
-        for keyword in self.toxic_keywords:
-            if keyword in content_lower:
-                violations.append(f"Toxic content detected: {keyword}")
-        
-        return violations
+        return self.toxic_violations(self.scan(content))
     
-    def sanitize_content(self, content: str, violations: List[str]) -> str:
-        """Sanitize content by removing or masking violations"""
-        sanitized = content
-        
-        # Mask PII
-        for pattern in self.pii_patterns:
-            sanitized = pattern.sub('[REDACTED]', sanitized)
-        
-        # Remove harmful patterns
-        for pattern in self.harmful_patterns:
-            sanitized = pattern.sub('[FILTERED]', sanitized)
+    def sanitize_content(self, content: str, violations: List[str], result: Optional[ScanResult] = None) -> str:
+        """Sanitize content by masking PII and removing harmful patterns"""
+        result = result or self.scan(content)
+        replacements = {PII: '[REDACTED]', HARMFUL: '[FILTERED]'}
+        
+        parts = []
+        position = 0
+        for match in result.matches:
+            replacement = replacements.get(match.category)
+            if replacement is None or match.start < position:
+                continue
+            parts.append(content[position:match.start])
+            parts.append(replacement)
+            position = match.end
+        parts.append(content[position:])
         
-        return sanitized
+        return "".join(parts)
+
+
+@dataclass
+class StreamMatch:
+    """A match found by the streaming scanner"""
+    start: int
+    end: int
+    violation_type: ViolationType
+    message: str
+    replacement: Optional[str]
+
+
+class StreamingContentScanner:
+    """
+    Incremental content scanner for streamed output.
+
+    Chunks are decoded incrementally and the last ``window`` characters are
+    held back, so matches spanning chunk boundaries are seen whole. Text
+    before the window is released with PII redacted and harmful content
+    filtered; in blocking mode the stream is cut off before the first
+    harmful or prompt injection match instead. At most one window of text
+    is buffered, never the full body.
+
+    With ``rewrite`` off the scanner only reports: text is released
+    unchanged, for bodies such as JSON where a replacement or a cut would
+    corrupt the document.
+    """
+
+    BLOCKING_TYPES = {ViolationType.HARMFUL_CONTENT, ViolationType.PROMPT_INJECTION}
+
+    def __init__(self, content_filter: ContentFilter, window: int = 256, block: bool = False, rewrite: bool = True):
+        self.content_filter = content_filter
+        self.window = window
+        self.block = block
+        self.rewrite = rewrite
+        self.violations: List[str] = []
+        self.violation_types: List[ViolationType] = []
+        self.blocked = False
+        self.redactions = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._digest = hashlib.sha256()
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the text scanned so far"""
+        return self._digest.hexdigest()
+
+    @property
+    def found_blocking(self) -> bool:
+        """Whether content that blocking mode would cut off was found"""
+        return any(violation_type in self.BLOCKING_TYPES for violation_type in self.violation_types)
+
+    # Scanner category -> (violation type, message label, replacement)
+    CATEGORIES = {
+        PII: (ViolationType.PII_EXPOSURE, "PII detected", '[REDACTED]'),
+        HARMFUL: (ViolationType.HARMFUL_CONTENT, "Harmful content detected", '[FILTERED]'),
+        PROMPT_INJECTION: (ViolationType.PROMPT_INJECTION, "Prompt injection detected", None),
+        TOXIC: (ViolationType.TOXIC_CONTENT, "Toxic content detected", None),
+    }
+
+    def _find_matches(self, text: str) -> List[StreamMatch]:
+        matches = []
+        for match in self.content_filter.scan(text).matches:
+            if match.category not in self.CATEGORIES:
+                continue
+            violation_type, label, replacement = self.CATEGORIES[match.category]
+            matches.append(StreamMatch(
+                match.start, match.end, violation_type, f"{label}: {match.text}", replacement
+            ))
+        return matches
+
+    def feed(self, chunk: bytes, final: bool = False) -> bytes:
+        """Scan a chunk; returns the bytes that can be released."""
+        if self.blocked:
+            return b""
+        text = self._pending + self._decoder.decode(chunk, final=final)
+        matches = self._find_matches(text)
+
+        # Release everything except the window, without splitting a match
+        cut = len(text) if final else max(0, len(text) - self.window)
+        moved = True
+        while moved:
+            moved = False
+            for match in matches:
+                if match.start < cut < match.end:
+                    cut = match.start
+                    moved = True
+
+        released: List[str] = []
+        position = 0
+        for match in matches:
+            if match.end > cut:
+                break
+            self.violations.append(match.message)
+            if match.violation_type not in self.violation_types:
+                self.violation_types.append(match.violation_type)
+            if not self.rewrite:
+                continue
+            if self.block and match.violation_type in self.BLOCKING_TYPES:
+                released.append(text[position:match.start])
+                self._digest.update(text[:match.end].encode())
+                self.blocked = True
+                self._pending = ""
+                return "".join(released).encode()
+            if match.replacement and match.start >= position:
+                released.append(text[position:match.start])
+                released.append(match.replacement)
+                position = match.end
+                self.redactions += 1
+        released.append(text[position:cut])
+
+        self._digest.update(text[:cut].encode())
+        self._pending = text[cut:]
+        return "".join(released).encode()
 
 
 class MLContentAnalyzer:
     """ML-based content analysis (placeholder for future ML integration)"""
     
-    def __init__(self):
+    def __init__(self, scanner: Optional[ContentScanner] = None):
         self.model_loaded = False
         # In a real implementation, this would load ML models
-        # For now, we'll use rule-based scoring
+        # For now, we'll use rule-based scoring over the shared keyword scan
+        self.scanner = scanner or content_scanner
     
-    async def analyze_sentiment(self, content: str) -> Dict[str, float]:
-        """Analyze content sentiment"""
+    def sentiment(self, result: ScanResult, word_count: int) -> Dict[str, float]:
+        """Sentiment from the negative and positive words found by a scan"""
         # Placeholder implementation
         # In production, this would use a trained sentiment analysis model
-        
-        negative_words = ['bad', 'terrible', 'awful', 'hate', 'angry', 'sad']
-        positive_words = ['good', 'great', 'excellent', 'love', 'happy', 'amazing']
-        
-        content_lower = content.lower()
-        negative_score = sum(1 for word in negative_words if word in content_lower)
-        positive_score = sum(1 for word in positive_words if word in content_lower)
-        
-        total_words = len(content.split())
-        if total_words == 0:
+        if word_count == 0:
             return {'positive': 0.5, 'negative': 0.5, 'neutral': 0.0}
         
-        negative_ratio = negative_score / total_words
-        positive_ratio = positive_score / total_words
+        negative_ratio = len(result.keywords(NEGATIVE)) / word_count
+        positive_ratio = len(result.keywords(POSITIVE)) / word_count
         neutral_ratio = max(0, 1 - negative_ratio - positive_ratio)
         
         return {
@@ -281,57 +314,47 @@ class MLContentAnalyzer:
             'neutral': neutral_ratio
         }
     
-    async def calculate_toxicity_score(self, content: str) -> float:
-        """Calculate toxicity score (0.0 to 1.0)"""
+    def toxicity_score(self, result: ScanResult, word_count: int) -> float:
+        """Toxicity score (0.0 to 1.0) from the toxic indicators found by a scan"""
         # Placeholder implementation
         # In production, this would use a trained toxicity detection model
-        
-        toxic_indicators = [
-            'hate', 'kill', 'die', 'stupid', 'idiot', 'moron',
-            'shut up', 'go away', 'nobody cares', 'worthless'
-        ]
-        
-        content_lower = content.lower()
-        toxic_count = sum(1 for indicator in toxic_indicators if indicator in content_lower)
-        
-        # Simple scoring based on toxic word density
-        words = content.split()
-        if len(words) == 0:
+        if word_count == 0:
             return 0.0
         
-        toxicity_score = min(1.0, (toxic_count / len(words)) * 10)
-        return toxicity_score
+        # Simple scoring based on toxic word density
+        return min(1.0, (len(result.keywords(TOXICITY_INDICATOR)) / word_count) * 10)
     
-    async def detect_bias(self, content: str) -> Dict[str, float]:
-        """Detect potential bias in content"""
+    def bias(self, result: ScanResult) -> Dict[str, float]:
+        """Bias scores from the bias phrases found by a scan"""
         # Placeholder implementation
         # In production, this would use trained bias detection models
-        
-        bias_categories = {
-            'gender': 0.0,
-            'racial': 0.0,
-            'religious': 0.0,
+        return {
+            'gender': 0.7 if result.keywords(GENDER_BIAS) else 0.0,
+            'racial': 0.8 if result.keywords(RACIAL_BIAS) else 0.0,
+            'religious': 0.8 if result.keywords(RELIGIOUS_BIAS) else 0.0,
             'age': 0.0,
             'political': 0.0
         }
-        
-        # Simple keyword-based bias detection
-        gender_bias_words = ['men are', 'women are', 'boys are', 'girls are']
-        racial_bias_words = ['all blacks', 'all whites', 'all asians']
-        religious_bias_words = ['all muslims', 'all christians', 'all jews']
-        
-        content_lower = content.lower()
-        
-        if any(word in content_lower for word in gender_bias_words):
-            bias_categories['gender'] = 0.7
-        
-        if any(word in content_lower for word in racial_bias_words):
-            bias_categories['racial'] = 0.8
-        
-        if any(word in content_lower for word in religious_bias_words):
-            bias_categories['religious'] = 0.8
-        
-        return bias_categories
+    
+    async def analyze_sentiment(self, content: str) -> Dict[str, float]:
+        """Analyze content sentiment"""
+        return self.sentiment(self.scanner.scan(content), len(content.split()))
+    
+    async def calculate_toxicity_score(self, content: str) -> float:
+        """Calculate toxicity score (0.0 to 1.0)"""
+        return self.toxicity_score(self.scanner.scan(content), len(content.split()))
+    
+    async def detect_bias(self, content: str) -> Dict[str, float]:
+        """Detect potential bias in content"""
+        return self.bias(self.scanner.scan(content))
+
+
+def _audit_user_id(user_id: Optional[str]) -> Optional[str]:
+    """User id for the audit log's UUID column; other identifiers stay in the details"""
+    try:
+        return str(uuid.UUID(str(user_id))) if user_id else None
+    except ValueError:
+        return None
 
 
 class GuardrailsEngine:
@@ -342,7 +365,6 @@ class GuardrailsEngine:
         self.content_filter = ContentFilter()
         self.ml_analyzer = MLContentAnalyzer()
         self.violations_cache = {}
-        self.policy_cache = {}
     
     async def validate_input(
         self,
@@ -353,26 +375,17 @@ class GuardrailsEngine:
         start_time = time.time()
         
         try:
-            # Run all validation checks concurrently
-            tasks = [
-                self.content_filter.detect_harmful_content(content),
-                self.content_filter.detect_pii(content),
-                self.content_filter.detect_prompt_injection(content),
-                self.content_filter.detect_toxic_content(content),
-                self.ml_analyzer.analyze_sentiment(content),
-                self.ml_analyzer.calculate_toxicity_score(content),
-                self.ml_analyzer.detect_bias(content)
-            ]
-            
-            results = await asyncio.gather(*tasks)
+            # One pass over the content finds every pattern and keyword category
+            scan = self.content_filter.scan(content)
+            word_count = len(content.split())
             
-            harmful_violations = results[0]
-            pii_violations = results[1]
-            injection_violations = results[2]
-            toxic_violations = results[3]
-            sentiment = results[4]
-            toxicity_score = results[5]
-            bias_scores = results[6]
+            harmful_violations = self.content_filter.harmful_violations(scan)
+            pii_violations = self.content_filter.pii_violations(scan)
+            injection_violations = self.content_filter.prompt_injection_violations(scan)
+            toxic_violations = self.content_filter.toxic_violations(scan)
+            sentiment = self.ml_analyzer.sentiment(scan, word_count)
+            toxicity_score = self.ml_analyzer.toxicity_score(scan, word_count)
+            bias_scores = self.ml_analyzer.bias(scan)
             
             # Combine all violations
             all_violations = (
@@ -410,7 +423,7 @@ class GuardrailsEngine:
             # Sanitize content if needed
             sanitized_content = None
             if not is_valid:
-                sanitized_content = self.content_filter.sanitize_content(content, all_violations)
+                sanitized_content = self.content_filter.sanitize_content(content, all_violations, scan)
             
             processing_time = (time.time() - start_time) * 1000
             
@@ -429,7 +442,7 @@ class GuardrailsEngine:
                     'toxicity_score': toxicity_score,
                     'bias_scores': bias_scores,
                     'content_length': len(content),
-                    'word_count': len(content.split())
+                    'word_count': word_count
                 }
             )
             
@@ -481,20 +494,18 @@ class GuardrailsEngine:
     ) -> PolicyResult:
         """Check if action is allowed by policies"""
         try:
-            # Get policies
-            policies = await self._get_policies()
+            # Compiled policies are cached across engines
+            policies = await guardrail_policy_cache.get(self._get_policies)
             
-            # Check each applicable policy
-            for policy in policies:
-                if self._policy_applies(policy, action, resource, context):
-                    if not policy.get('allowed', True):
-                        return PolicyResult(
-                            allowed=False,
-                            policy_name=policy['name'],
-                            reason=policy.get('reason', 'Action not allowed by policy'),
-                            risk_score=policy.get('risk_score', 0.5),
-                            metadata=policy.get('metadata', {})
-                        )
+            policy = policies.evaluate(action, resource, context)
+            if policy is not None:
+                return PolicyResult(
+                    allowed=False,
+                    policy_name=policy.name,
+                    reason=policy.reason,
+                    risk_score=policy.risk_score,
+                    metadata=policy.metadata
+                )
             
             # Default allow if no blocking policies
             return PolicyResult(
@@ -516,15 +527,19 @@ class GuardrailsEngine:
             )
     
     async def report_violation(self, violation: Violation) -> None:
-        """Report and log a guardrail violation"""
+        """Report and log a guardrail violation
+        
+        The audit record is queued for the batched audit writer, so reporting
+        does not wait for a database commit.
+        """
         try:
-            # Create audit log entry
-            audit_entry = AuditLog(
+            context = violation.context
+            entry = AuditService.build_entry(
                 event_type=AuditEventType.GUARDRAIL_TRIGGERED,
-                event_id=str(uuid.uuid4()),
-                correlation_id=violation.id, # Use violation id as correlation if not available
-                user_id=violation.user_id,
                 action="guardrail_violation",
+                message=f"Guardrail violation: {violation.violation_type.value}",
+                outcome=AuditOutcome.FAILURE,
+                severity=AuditSeverity.HIGH if violation.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL] else AuditSeverity.MEDIUM,
                 resource_type="content",
                 resource_id=violation.id,
                 details={
@@ -532,15 +547,23 @@ class GuardrailsEngine:
                     'risk_level': violation.risk_level.value,
                     'content_hash': violation.content_hash,
                     'agent_id': violation.agent_id,
-                    'context': violation.context.__dict__
+                    'user_id': violation.user_id,
+                    'context': {
+                        'user_id': context.user_id,
+                        'agent_id': context.agent_id,
+                        'session_id': context.session_id,
+                        'content_category': context.content_category.value,
+                        'source': context.source,
+                        'timestamp': context.timestamp.isoformat(),
+                        'metadata': context.metadata
+                    }
                 },
-                outcome=AuditOutcome.FAILURE,
-                severity=AuditSeverity.HIGH if violation.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL] else AuditSeverity.MEDIUM,
-                timestamp=violation.timestamp
+                correlation_id=violation.id,  # Use violation id as correlation if not available
+                user_id=_audit_user_id(violation.user_id)
             )
+            entry['timestamp'] = violation.timestamp
             
-            self.session.add(audit_entry)
-            await self.session.commit()
+            await audit_writer.submit(entry)
             
             # Send notification if risk level is high or critical
             if violation.risk_level in [RiskLevel.HIGH, RiskLevel.CRITICAL]:
@@ -645,33 +668,6 @@ class GuardrailsEngine:
             }
         ]
     
-    def _policy_applies(
-        self,
-        policy: Dict[str, Any],
-        action: str,
-        resource: str,
-        context: Dict[str, Any]
-    ) -> bool:
-        """Check if policy applies to the given action and resource"""
-        # Check action match
-        if policy.get('action') != '*' and policy.get('action') != action:
-            return False
-        
-        # Check resource match
-        if policy.get('resource') != '*' and policy.get('resource') != resource:
-            return False
-        
-        # Check conditions
-        conditions = policy.get('conditions', {})
-        for condition_key, condition_value in conditions.items():
-            if condition_key not in context:
-                continue
-            
-            if context[condition_key] != condition_value:
-                return False
-        
-        return True
-    
     async def _send_violation_notification(self, violation: Violation) -> None:
         """Send notification for high-risk violations"""
         # This would integrate with notification system
@@ -0,0 +1,97 @@
+"""Shared HTTP transport registry.
+
+Keeps one pooled ``httpx.AsyncClient`` per upstream so that LLM providers,
+embedding providers and management services talking to the same host share
+keep-alive connections instead of each opening (and leaking) their own.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_base_url(base_url: str) -> str:
+    """Normalize a base URL so equivalent spellings share one client."""
+    parts = urlsplit(base_url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    default_port = 443 if scheme == "https" else 80
+    port = f":{parts.port}" if parts.port and parts.port != default_port else ""
+    path = parts.path.rstrip("/")
+    return f"{scheme}://{host}{port}{path}"
+
+
+class HTTPTransportRegistry:
+    """Registry of shared, pooled HTTP clients keyed by upstream base URL."""
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._lock = asyncio.Lock()
+
+    def _build_client(self, base_url: Optional[str]) -> httpx.AsyncClient:
+        http_settings = get_settings().http
+        limits = httpx.Limits(
+            max_connections=http_settings.max_connections,
+            max_keepalive_connections=http_settings.max_keepalive_connections,
+            keepalive_expiry=http_settings.keepalive_expiry
+        )
+        kwargs = {
+            "limits": limits,
+            "timeout": httpx.Timeout(http_settings.timeout, connect=http_settings.connect_timeout),
+            "http2": http_settings.http2 and HTTP2_AVAILABLE,
+        }
+        if base_url:
+            kwargs["base_url"] = base_url
+        return httpx.AsyncClient(**kwargs)
+
+    def get_client(self, base_url: Optional[str] = None) -> httpx.AsyncClient:
+        """Get the shared client for an upstream.
+
+        Args:
+            base_url: Upstream base URL; relative request paths resolve against it.
+                Clients without a base URL (e.g. handed to vendor SDKs that build
+                absolute URLs themselves) share a single default pool.
+
+        Returns:
+            Pooled HTTP client; callers must not close it
+        """
+        key = normalize_base_url(base_url) if base_url else ""
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._build_client(key or None)
+            self._clients[key] = client
+            logger.debug(f"Created pooled HTTP client for {key or 'default'}")
+        return client
+
+    async def aclose(self) -> None:
+        """Close every pooled client (application shutdown)."""
+        async with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing pooled HTTP client: {e}")
+        if clients:
+            logger.info(f"Closed {len(clients)} pooled HTTP client(s)")
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get registry statistics."""
+        return {"clients": len(self._clients)}
+
+
+# Global registry instance
+http_transport_registry = HTTPTransportRegistry()
@@ -17,6 +17,7 @@ from .base import (
     LLMRateLimitError,
     LLMProviderType
 )
+from ..http_transport import http_transport_registry
 
 
 class AnthropicConfig(LLMProviderConfig):
@@ -64,7 +65,8 @@ class AnthropicProvider(BaseLLMProvider):
             # Initialize Anthropic client
             self._client = AsyncAnthropic(
                 api_key=self.api_key,
-                timeout=self.config.timeout
+                timeout=self.config.timeout,
+                http_client=http_transport_registry.get_client("https://api.anthropic.com")
             )
             
             self.logger.info("Anthropic provider initialized successfully")
@@ -17,6 +17,7 @@ from .base import (
     LLMRateLimitError,
     LLMProviderType
 )
+from ..http_transport import http_transport_registry
 
 
 class AzureOpenAIConfig(LLMProviderConfig):
@@ -66,7 +67,8 @@ class AzureOpenAIProvider(BaseLLMProvider):
                 api_key=self.api_key,
                 azure_endpoint=self.endpoint,
                 api_version=self.api_version,
-                timeout=self.config.timeout
+                timeout=self.config.timeout,
+                http_client=http_transport_registry.get_client(self.endpoint)
             )
             
             self.logger.info(f"Azure OpenAI provider initialized successfully at {self.endpoint}")
@@ -173,7 +173,17 @@ class BaseLLMProvider(ABC):
         if not self._is_initialized:
             await self.initialize()
             self._is_initialized = True
-    
+
+    async def aclose(self) -> None:
+        """Release the provider when it leaves the factory cache.
+
+        HTTP connections belong to the shared transport registry and stay
+        pooled. The client is kept rather than dropped: requests already
+        running on an evicted provider may still be using it, and it is
+        released with the instance once nothing references it.
+        """
+        pass
+
     def get_provider_info(self) -> Dict[str, Any]:
         """Get provider information."""
         return {
@@ -17,6 +17,7 @@ from .base import (
     LLMConnectionError,
     LLMProviderType
 )
+from ..http_transport import http_transport_registry
 
 
 class OllamaConfig(LLMProviderConfig):
@@ -42,12 +43,9 @@ class OllamaProvider(BaseLLMProvider):
         self.config: OllamaConfig = config
         self.base_url = credentials.get("base_url", config.base_url)
         
-        # Initialize HTTP client
-        self._client = httpx.AsyncClient(
-            base_url=self.base_url,
-            timeout=httpx.Timeout(config.timeout),
-            headers={"Content-Type": "application/json"}
-        )
+        # Shared pooled client for this host; generation calls pass their own timeout
+        self._client = http_transport_registry.get_client(self.base_url)
+        self._timeout = httpx.Timeout(config.timeout)
     
     async def initialize(self) -> None:
         """Initialize Ollama provider."""
@@ -154,7 +152,7 @@ class OllamaProvider(BaseLLMProvider):
             
             for attempt in range(max_retries):
                 try:
-                    response = await self._client.post("/api/chat", json=payload)
+                    response = await self._client.post("/api/chat", json=payload, timeout=self._timeout)
                     response.raise_for_status()
                     break
                 except httpx.HTTPStatusError as e:
@@ -268,7 +266,7 @@ class OllamaProvider(BaseLLMProvider):
             
             for attempt in range(max_retries):
                 try:
-                    async with self._client.stream("POST", "/api/chat", json=payload) as response:
+                    async with self._client.stream("POST", "/api/chat", json=payload, timeout=self._timeout) as response:
                         response.raise_for_status()
                         
                         async for line in response.aiter_lines():
@@ -336,6 +334,10 @@ class OllamaProvider(BaseLLMProvider):
         # Simple estimation: ~4 characters per token
         return max(1, len(text) // 4)
     
+    async def aclose(self) -> None:
+        """Release the provider; the pooled client stays with the transport registry."""
+        self._is_initialized = False
+    
     async def __aenter__(self):
         """Async context manager entry."""
         await self.ensure_initialized()
@@ -343,5 +345,4 @@ class OllamaProvider(BaseLLMProvider):
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
-        if self._client:
-            await self._client.aclose()
\ No newline at end of file
+        await self.aclose()
\ No newline at end of file
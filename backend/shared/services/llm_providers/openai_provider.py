@@ -17,6 +17,7 @@ from .base import (
     LLMRateLimitError,
     LLMProviderType
 )
+from ..http_transport import http_transport_registry
 
 
 class OpenAIConfig(LLMProviderConfig):
@@ -66,7 +67,8 @@ class OpenAIProvider(BaseLLMProvider):
             self._client = AsyncOpenAI(
                 api_key=self.api_key,
                 organization=self.organization,
-                timeout=self.config.timeout
+                timeout=self.config.timeout,
+                http_client=http_transport_registry.get_client("https://api.openai.com")
             )
             
             # Test connection by listing models
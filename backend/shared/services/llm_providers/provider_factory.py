@@ -1,7 +1,11 @@
 """LLM Provider Factory for creating and managing provider instances."""
 
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Dict, Any, Optional, List
 import logging
+import time
+import weakref
 
 from .base import BaseLLMProvider, LLMProviderType, LLMProviderConfig, LLMError
 from .ollama_provider import OllamaProvider, OllamaConfig
@@ -11,9 +15,21 @@ from .azure_openai_provider import AzureOpenAIProvider, AzureOpenAIConfig
 from .google_provider import GoogleProvider, GoogleConfig
 from .credential_manager import CredentialManager
 from .mock_provider import MockProvider, MockConfig
+from ...config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Live factories, so cached providers can be closed at application shutdown
+_factories: "weakref.WeakSet[LLMProviderFactory]" = weakref.WeakSet()
+
+
+@dataclass
+class _CachedProvider:
+    """Cached provider instance with usage bookkeeping."""
+    provider: BaseLLMProvider
+    last_used: float
+    last_checked: float
+
 
 class LLMProviderFactory:
     """Factory for creating and managing LLM provider instances."""
@@ -25,8 +41,14 @@ class LLMProviderFactory:
             credential_manager: Optional credential manager instance
         """
         self.credential_manager = credential_manager or CredentialManager()
-        self._provider_cache: Dict[str, BaseLLMProvider] = {}
+        self._provider_cache: "OrderedDict[str, _CachedProvider]" = OrderedDict()
         self.logger = logging.getLogger(__name__)
+        _factories.add(self)
+        
+        llm_settings = get_settings().llm
+        self.max_cached_providers = llm_settings.provider_cache_size
+        self.provider_idle_ttl = llm_settings.provider_idle_ttl_seconds
+        self.health_check_interval = llm_settings.provider_health_check_interval
         
         # Provider class mapping
         self._provider_classes = {
@@ -71,14 +93,9 @@ class LLMProviderFactory:
                     cache_key = f"{cache_key}:custom:{cred_hash}"
             
             # Check cache first
-            if cache_key in self._provider_cache:
-                provider = self._provider_cache[cache_key]
-                # Validate cached provider is still healthy
-                if await self._validate_cached_provider(provider):
-                    return provider
-                else:
-                    # Remove invalid provider from cache
-                    del self._provider_cache[cache_key]
+            provider = await self._get_cached_provider(cache_key)
+            if provider:
+                return provider
             
             # Get provider class and config class
             if provider_type not in self._provider_classes:
@@ -127,7 +144,7 @@ class LLMProviderFactory:
             )
             
             # Cache provider instance
-            self._provider_cache[cache_key] = provider
+            await self._cache_provider(cache_key, provider)
             
             self.logger.info(f"Created and cached provider {provider_type.value}")
             return provider
@@ -156,17 +173,7 @@ class LLMProviderFactory:
             Cached provider instance or None if not found
         """
         cache_key = self._generate_cache_key(provider_type)
-        
-        if cache_key in self._provider_cache:
-            provider = self._provider_cache[cache_key]
-            # Validate cached provider is still healthy
-            if await self._validate_cached_provider(provider):
-                return provider
-            else:
-                # Remove invalid provider from cache
-                del self._provider_cache[cache_key]
-        
-        return None
+        return await self._get_cached_provider(cache_key)
     
     async def get_or_create_provider(
         self, 
@@ -292,6 +299,78 @@ class LLMProviderFactory:
         
         self.logger.info(f"Cleared provider cache for {provider_type.value if provider_type else 'all providers'}")
     
+    async def aclose_all(self) -> None:
+        """Close and forget every cached provider (application shutdown)."""
+        entries = list(self._provider_cache.values())
+        self._provider_cache.clear()
+        for entry in entries:
+            await self._close_provider(entry.provider)
+    
+    def get_cache_statistics(self) -> Dict[str, Any]:
+        """Get provider cache statistics."""
+        return {
+            "cached_providers": len(self._provider_cache),
+            "max_cached_providers": self.max_cached_providers,
+            "idle_ttl_seconds": self.provider_idle_ttl
+        }
+    
+    async def _get_cached_provider(self, cache_key: str) -> Optional[BaseLLMProvider]:
+        """Return a cached provider, evicting it if idle too long or unhealthy.
+        
+        Health checks run at most once per ``health_check_interval`` per
+        instance rather than on every cache hit.
+        """
+        await self._evict_idle()
+        entry = self._provider_cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        now = time.monotonic()
+        if now - entry.last_checked >= self.health_check_interval:
+            if not await self._validate_cached_provider(entry.provider):
+                # Remove invalid provider from cache
+                self._provider_cache.pop(cache_key, None)
+                await self._close_provider(entry.provider)
+                return None
+            entry.last_checked = now
+        
+        entry.last_used = now
+        self._provider_cache.move_to_end(cache_key)
+        return entry.provider
+    
+    async def _cache_provider(self, cache_key: str, provider: BaseLLMProvider) -> None:
+        """Cache a provider instance, evicting least recently used ones beyond capacity."""
+        now = time.monotonic()
+        previous = self._provider_cache.pop(cache_key, None)
+        if previous and previous.provider is not provider:
+            await self._close_provider(previous.provider)
+        self._provider_cache[cache_key] = _CachedProvider(provider, last_used=now, last_checked=now)
+        
+        while len(self._provider_cache) > max(1, self.max_cached_providers):
+            evicted_key, evicted = self._provider_cache.popitem(last=False)
+            self.logger.debug(f"Evicting least recently used provider {evicted_key}")
+            await self._close_provider(evicted.provider)
+    
+    async def _evict_idle(self) -> None:
+        """Close providers that have not been used within the idle TTL."""
+        if self.provider_idle_ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.provider_idle_ttl
+        # Entries are ordered by recency, so idle ones are at the front
+        while self._provider_cache:
+            key, entry = next(iter(self._provider_cache.items()))
+            if entry.last_used > cutoff:
+                break
+            del self._provider_cache[key]
+            self.logger.debug(f"Evicting idle provider {key}")
+            await self._close_provider(entry.provider)
+    
+    async def _close_provider(self, provider: BaseLLMProvider) -> None:
+        try:
+            await provider.aclose()
+        except Exception as e:
+            self.logger.warning(f"Error closing provider {provider.provider_type.value}: {e}")
+    
     def _generate_cache_key(
         self, 
         provider_type: LLMProviderType
@@ -343,4 +422,10 @@ class LLMProviderFactory:
             health = await provider.health_check()
             return health.get("status") == "healthy"
         except Exception:
-            return False
\ No newline at end of file
+            return False
+
+
+async def aclose_all_factories() -> None:
+    """Close the cached providers of every live factory (application shutdown)."""
+    for factory in list(_factories):
+        await factory.aclose_all()
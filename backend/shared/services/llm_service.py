@@ -1,6 +1,8 @@
 """LLM Service for managing LLM provider integrations."""
 
 import asyncio
+import hashlib
+import json
 import time
 from typing import Dict, List, Optional, Any, AsyncGenerator
 from datetime import datetime
@@ -19,6 +21,7 @@ from .llm_providers import (
     LLMRateLimitError
 )
 from ..models.agent import LLMProvider, AgentConfig
+from .single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +65,10 @@ class GlobalRateLimiter:
             logger.debug(f"Rate limit slot acquired. Active calls in window: {len(cls._timestamps)}")
 
 
+# Process-wide coalescing of identical in-flight LLM requests
+llm_single_flight = SingleFlight()
+
+
 class LLMService:
     """Service for managing LLM provider integrations and requests."""
     
@@ -208,15 +215,20 @@ class LLMService:
         messages: List[Dict[str, str]],
         agent_config: AgentConfig,
         stream: bool = False,
-        credentials: Optional[Dict[str, Any]] = None
+        credentials: Optional[Dict[str, Any]] = None,
+        coalesce: Optional[bool] = None
     ) -> LLMResponse:
         """Generate response using configured LLM provider.
         
+        Concurrent identical requests that are eligible for coalescing share
+        a single upstream call.
+        
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             agent_config: Agent configuration containing LLM settings
             stream: Whether to stream the response
             credentials: Optional custom credentials to use
+            coalesce: Force coalescing on or off (default: decided by settings)
             
         Returns:
             LLM response object
@@ -224,6 +236,30 @@ class LLMService:
         Raises:
             LLMError: If response generation fails
         """
+        if not self._should_coalesce(agent_config, coalesce):
+            return await self._generate_response(messages, agent_config, stream, credentials)
+        
+        key = self._request_key(messages, agent_config, credentials)
+        response, shared = await llm_single_flight.do(
+            key,
+            lambda: self._generate_response(messages, agent_config, stream, credentials)
+        )
+        if not shared:
+            return response
+        
+        # Give joiners their own copy so callers can mutate metadata safely
+        response = response.model_copy(deep=True)
+        response.metadata["coalesced"] = True
+        return response
+    
+    async def _generate_response(
+        self,
+        messages: List[Dict[str, str]],
+        agent_config: AgentConfig,
+        stream: bool = False,
+        credentials: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        """Generate a response with a dedicated upstream call."""
         # Enforce rate limit
         await GlobalRateLimiter.acquire()
         
@@ -314,14 +350,19 @@ class LLMService:
         self,
         messages: List[Dict[str, str]],
         agent_config: AgentConfig,
-        credentials: Optional[Dict[str, Any]] = None
+        credentials: Optional[Dict[str, Any]] = None,
+        coalesce: Optional[bool] = None
     ) -> AsyncGenerator[str, None]:
         """Stream response using configured LLM provider.
         
+        Concurrent identical streams that are eligible for coalescing share
+        one upstream stream, fanned out to every subscriber.
+        
         Args:
             messages: List of message dictionaries with 'role' and 'content'
             agent_config: Agent configuration containing LLM settings
             credentials: Optional custom credentials to use
+            coalesce: Force coalescing on or off (default: decided by settings)
             
         Yields:
             Response content chunks
@@ -329,6 +370,25 @@ class LLMService:
         Raises:
             LLMError: If streaming fails
         """
+        if not self._should_coalesce(agent_config, coalesce):
+            async for chunk in self._stream_response(messages, agent_config, credentials):
+                yield chunk
+            return
+        
+        key = "stream:" + self._request_key(messages, agent_config, credentials)
+        async for chunk in llm_single_flight.stream(
+            key,
+            lambda: self._stream_response(messages, agent_config, credentials)
+        ):
+            yield chunk
+    
+    async def _stream_response(
+        self,
+        messages: List[Dict[str, str]],
+        agent_config: AgentConfig,
+        credentials: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream a response with a dedicated upstream call."""
         # Enforce rate limit
         await GlobalRateLimiter.acquire()
         
@@ -445,6 +505,61 @@ class LLMService:
         """
         return await self.provider_factory.list_available_providers()
     
+    def get_coalescing_statistics(self) -> Dict[str, Any]:
+        """Get request coalescing statistics for monitoring.
+        
+        Returns:
+            Coalescing statistics dictionary
+        """
+        stats = llm_single_flight.stats
+        return {
+            "upstream_calls": stats.upstream_calls,
+            "shared_calls": stats.shared_calls,
+            "in_flight": stats.in_flight
+        }
+    
+    def _should_coalesce(self, agent_config: AgentConfig, coalesce: Optional[bool]) -> bool:
+        """Decide whether a request may share an upstream call.
+        
+        Explicit opt-in/out wins; otherwise only near-deterministic requests
+        are coalesced, since sampled responses are expected to differ.
+        """
+        if coalesce is not None:
+            return coalesce
+        llm_settings = settings.llm
+        return (
+            llm_settings.coalesce_requests
+            and agent_config.temperature <= llm_settings.coalesce_max_temperature
+        )
+    
+    def _request_key(
+        self,
+        messages: List[Dict[str, str]],
+        agent_config: AgentConfig,
+        credentials: Optional[Dict[str, Any]]
+    ) -> str:
+        """Build the canonical hash identifying an LLM request."""
+        provider = agent_config.llm_provider
+        if hasattr(provider, 'value'):
+            provider = provider.value
+        
+        canonical = {
+            "provider": provider,
+            "model": agent_config.model,
+            "temperature": agent_config.temperature,
+            "max_tokens": agent_config.max_tokens,
+            "top_p": agent_config.top_p,
+            "top_k": agent_config.top_k,
+            "stop": agent_config.stop_sequences,
+            "messages": [[m.get("role"), m.get("content")] for m in messages],
+            # Requests made with different credentials never share a call
+            "credentials": hashlib.sha256(
+                json.dumps(credentials or {}, sort_keys=True, default=str).encode()
+            ).hexdigest()
+        }
+        payload = json.dumps(canonical, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
     def get_request_statistics(self) -> Dict[str, Any]:
         """Get request statistics for monitoring.
         
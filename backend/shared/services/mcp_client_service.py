@@ -3,12 +3,13 @@ from typing import Dict, Any, List, Optional
 import httpx
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
-from mcp.client.sse import sse_client
 
 import os
 import json
 import logging
 
+from .mcp_session_pool import mcp_session_pool
+
 logger = logging.getLogger(__name__)
 
 class MCPClientService:
@@ -47,10 +48,8 @@ class MCPClientService:
             
             # For HTTP / SSE
             elif transport in ["sse", "http", "streamable-http"]:
-                async with sse_client(url) as (read_stream, write_stream):
-                    async with ClientSession(read_stream, write_stream) as session:
-                        await session.initialize()
-                        result = await self._discover_capabilities(session)
+                # Discovery also warms the pooled session used for later calls
+                result = await mcp_session_pool.request(url, self._discover_capabilities, retry=True)
             
             # WebSocket transport would go here if using raw WS or bridge
             
@@ -85,33 +84,28 @@ class MCPClientService:
 
     async def read_resource(self, url: str, transport: str, uri: str) -> Any:
         try:
-            async with sse_client(url) as (read_stream, write_stream):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    result = await session.read_resource(uri)
-                    return result
+            return await mcp_session_pool.request(
+                url, lambda session: session.read_resource(uri), retry=True
+            )
         except Exception as e:
             logger.error(f"Failed to read resource {uri} from {url}: {e}")
             raise e
 
     async def get_prompt(self, url: str, transport: str, name: str, args: Dict) -> Any:
         try:
-            async with sse_client(url) as (read_stream, write_stream):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    result = await session.get_prompt(name, arguments=args)
-                    return result
+            return await mcp_session_pool.request(
+                url, lambda session: session.get_prompt(name, arguments=args), retry=True
+            )
         except Exception as e:
             logger.error(f"Failed to get prompt {name} from {url}: {e}")
             raise e
     
     async def call_tool(self, url: str, transport: str, name: str, args: Dict) -> Any:
         try:
-            async with sse_client(url) as (read_stream, write_stream):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    result = await session.call_tool(name, arguments=args)
-                    return result
+            # Not retried: tool calls are not assumed to be idempotent
+            return await mcp_session_pool.request(
+                url, lambda session: session.call_tool(name, arguments=args)
+            )
         except Exception as e:
              logger.error(f"Failed to call tool {name} on {url}: {e}")
              raise e
@@ -6,7 +6,6 @@ external MCP servers and managing tool integrations.
 """
 
 import asyncio
-import json
 import logging
 import time
 from datetime import datetime, timedelta
@@ -14,7 +13,8 @@ from typing import Dict, List, Optional, Any, Tuple
 from uuid import UUID, uuid4
 
 import websockets
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, or_, update, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -24,6 +24,11 @@ from ..models.tool import MCPServerRequest, MCPServerResponse
 from ..models.audit import AuditLog, AuditEventType
 from ..logging.config import get_logger
 from ..services.mcp_client_service import MCPClientService
+from ..services.mcp_session_pool import JSONRPCWebSocket, MCPRequestError, mcp_session_pool
+from ..services.mcp_health_scheduler import mcp_health_scheduler
+from ..services.tool_output_store import tool_output_store
+from ..services.tool_catalog import tool_catalog
+from ..config.settings import get_settings
 
 logger = get_logger(__name__)
 
@@ -48,7 +53,6 @@ class MCPGatewayService:
     
     def __init__(self):
         self._connections = {}  # Active MCP server connections
-        self._health_check_tasks = {}  # Background health check tasks
         self._discovery_cache = {}  # Tool discovery cache
         self._session_pool = {}  # HTTP session pool
         self.mcp_client = MCPClientService()
@@ -316,9 +320,11 @@ class MCPGatewayService:
             
             # Disconnect from server
             await self._disconnect_from_server(server_id)
+            await mcp_session_pool.close_server(server.base_url)
             
             await session.delete(server)
             await session.commit()
+            tool_catalog.invalidate()
             
             # Log audit event
             await self._log_audit_event(
@@ -474,7 +480,16 @@ class MCPGatewayService:
                      # Fallback if structure is different or raw dict
                      result_content.append(str(tool_result))
                      
-                result = "\n".join(result_content)
+                # Stream oversized content straight to the blob store instead of joining it
+                content_size = sum(len(part) for part in result_content) + max(0, len(result_content) - 1)
+                if content_size > tool_output_store.spill_threshold_bytes:
+                    result = await tool_output_store.put_stream(
+                        (part if i == 0 else "\n" + part for i, part in enumerate(result_content)),
+                        content_type="text/plain",
+                        owner=str(user_id) if user_id else None
+                    )
+                else:
+                    result = "\n".join(result_content)
                 
                 execution_time = int((time.time() - start_time) * 1000)
                 
@@ -587,8 +602,8 @@ class MCPGatewayService:
                     
                     await session.commit()
                 
-                # Start health check task
-                self._start_health_check_task(server)
+                # Schedule periodic health checks
+                mcp_health_scheduler.register(server, self._probe_server, self._reconnect_server)
                 
                 logger.info(
                     "Connected to MCP server successfully",
@@ -674,37 +689,28 @@ class MCPGatewayService:
                 timeout=server.timeout_seconds
             )
             
-            # Store connection
-            self._connections[server.id] = websocket
-            
-            # Send initial handshake
-            handshake_message = {
-                "jsonrpc": "2.0",
-                "method": "initialize",
-                "params": {
-                    "protocolVersion": "1.0",
-                    "clientInfo": {
-                        "name": "AI Agent Framework",
-                        "version": "1.0.0"
-                    }
-                },
-                "id": str(uuid4())
-            }
-            
-            await websocket.send(json.dumps(handshake_message))
-            
-            # Wait for response
-            response = await asyncio.wait_for(
-                websocket.recv(),
-                timeout=server.timeout_seconds
+            # Store connection; requests are multiplexed over it by JSON-RPC id
+            connection = JSONRPCWebSocket(
+                websocket,
+                max_in_flight=get_settings().mcp.max_in_flight_per_server
             )
+            self._connections[server.id] = connection
             
-            response_data = json.loads(response)
-            
-            if "error" in response_data:
-                raise MCPProtocolError(f"Handshake failed: {response_data['error']}")
-            
-            server_info = response_data.get("result", {})
+            # Send initial handshake
+            try:
+                server_info = await connection.request(
+                    "initialize",
+                    {
+                        "protocolVersion": "1.0",
+                        "clientInfo": {
+                            "name": "AI Agent Framework",
+                            "version": "1.0.0"
+                        }
+                    },
+                    timeout=server.timeout_seconds
+                )
+            except MCPRequestError as e:
+                raise MCPProtocolError(f"Handshake failed: {e.error}")
             
             return {
                 "success": True,
@@ -720,10 +726,24 @@ class MCPGatewayService:
     async def _disconnect_from_server(self, server_id: UUID):
         """Disconnect from an MCP server."""
         
-        # Stop health check task
-        if server_id in self._health_check_tasks:
-            self._health_check_tasks[server_id].cancel()
-            del self._health_check_tasks[server_id]
+        # Stop health checks
+        mcp_health_scheduler.unregister(server_id)
+        
+        await self._close_server_connections(server_id)
+        
+        # Update server status
+        async with get_database_session() as session:
+            result = await session.execute(
+                select(MCPServer).where(MCPServer.id == server_id)
+            )
+            server = result.scalar_one_or_none()
+            
+            if server:
+                server.status = MCPServerStatus.DISCONNECTED
+                await session.commit()
+    
+    async def _close_server_connections(self, server_id: UUID):
+        """Close the WebSocket connection and HTTP session of a server."""
         
         # Close WebSocket connection
         if server_id in self._connections:
@@ -740,17 +760,6 @@ class MCPGatewayService:
             except:
                 pass
             del self._session_pool[server_id]
-        
-        # Update server status
-        async with get_database_session() as session:
-            result = await session.execute(
-                select(MCPServer).where(MCPServer.id == server_id)
-            )
-            server = result.scalar_one_or_none()
-            
-            if server:
-                server.status = MCPServerStatus.DISCONNECTED
-                await session.commit()
     
     def _prepare_auth_headers(self, server: MCPServer) -> Dict[str, str]:
         """Prepare authentication headers for MCP server."""
@@ -770,53 +779,32 @@ class MCPGatewayService:
         
         return headers
     
-    def _start_health_check_task(self, server: MCPServer):
-        """Start background health check task for a server."""
+    async def _probe_server(self, server: MCPServer):
+        """Health probe run by the health scheduler; raises when unhealthy."""
         
-        async def health_check_loop():
-            while True:
-                try:
-                    await asyncio.sleep(server.health_check_interval)
-                    await self._perform_health_check(server)
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    logger.error(
-                        "Health check failed",
-                        server_id=str(server.id),
-                        error=str(e)
-                    )
-        
-        task = asyncio.create_task(health_check_loop())
-        self._health_check_tasks[server.id] = task
+        if server.protocol in ['http', 'https']:
+            await self._http_health_check(server)
+        elif server.protocol in ['ws', 'wss']:
+            await self._websocket_health_check(server)
     
-    async def _perform_health_check(self, server: MCPServer):
-        """Perform health check on an MCP server."""
+    async def _reconnect_server(self, server: MCPServer) -> bool:
+        """Reconnect an unhealthy server for the health scheduler.
         
-        try:
-            if server.protocol in ['http', 'https']:
-                await self._http_health_check(server)
-            elif server.protocol in ['ws', 'wss']:
-                await self._websocket_health_check(server)
-            
-            # Update health check timestamp
-            async with get_database_session() as session:
-                await session.merge(server)
-                server.last_health_check_at = datetime.utcnow()
-                await session.commit()
-                
-        except Exception as e:
-            # Update error status
-            async with get_database_session() as session:
-                await session.merge(server)
-                server.status = MCPServerStatus.ERROR
-                server.last_error = str(e)
-                server.last_error_at = datetime.utcnow()
-                server.error_count += 1
-                await session.commit()
-            
-            # Attempt reconnection
-            asyncio.create_task(self._connect_to_server(server))
+        The scheduler serializes attempts per server, applies backoff and
+        records the outcome, so no status is written here.
+        """
+        
+        await self._close_server_connections(server.id)
+        if server.protocol in ['http', 'https']:
+            result = await self._connect_http_server(server)
+        elif server.protocol in ['ws', 'wss']:
+            result = await self._connect_websocket_server(server)
+        else:
+            raise MCPProtocolError(f"Unsupported protocol: {server.protocol}")
+        
+        if not result["success"]:
+            raise MCPConnectionError(result.get("error", "Reconnect failed"))
+        return True
     
     async def _http_health_check(self, server: MCPServer):
         """Perform HTTP health check."""
@@ -842,27 +830,13 @@ class MCPGatewayService:
         if server.id not in self._connections:
             return
         
-        websocket = self._connections[server.id]
-        
-        # Send ping message
-        ping_message = {
-            "jsonrpc": "2.0",
-            "method": "ping",
-            "id": str(uuid4())
-        }
-        
-        await websocket.send(json.dumps(ping_message))
-        
-        # Wait for pong response
-        response = await asyncio.wait_for(
-            websocket.recv(),
-            timeout=server.timeout_seconds
-        )
-        
-        response_data = json.loads(response)
+        connection = self._connections[server.id]
         
-        if "error" in response_data:
-            raise MCPProtocolError(f"Health check failed: {response_data['error']}")
+        # Send ping and wait for the matching response
+        try:
+            await connection.request("ping", timeout=server.timeout_seconds)
+        except MCPRequestError as e:
+            raise MCPProtocolError(f"Health check failed: {e.error}")
     
     async def _discover_server_tools(self, server: MCPServer) -> Dict[str, Any]:
         """Discover available tools on an MCP server."""
@@ -914,29 +888,12 @@ class MCPGatewayService:
         if server.id not in self._connections:
             raise MCPConnectionError("No active WebSocket connection")
         
-        websocket = self._connections[server.id]
-        
-        # Send tools discovery message
-        discovery_message = {
-            "jsonrpc": "2.0",
-            "method": "tools/list",
-            "id": str(uuid4())
-        }
-        
-        await websocket.send(json.dumps(discovery_message))
-        
-        # Wait for response
-        response = await asyncio.wait_for(
-            websocket.recv(),
-            timeout=server.timeout_seconds
-        )
-        
-        response_data = json.loads(response)
+        connection = self._connections[server.id]
         
-        if "error" in response_data:
-            raise MCPProtocolError(f"Tool discovery failed: {response_data['error']}")
-        
-        result = response_data.get("result", {})
+        try:
+            result = await connection.request("tools/list", timeout=server.timeout_seconds)
+        except MCPRequestError as e:
+            raise MCPProtocolError(f"Tool discovery failed: {e.error}")
         
         return {
             "tools": result.get("tools", []),
@@ -944,48 +901,107 @@ class MCPGatewayService:
             "server_info": result.get("server_info", {})
         }
     
+    @staticmethod
+    def _build_tool_sync_statements(server: MCPServer, discovered_tools: List[Dict[str, Any]]) -> Tuple[Any, Any]:
+        """Build the upsert for discovered tools and the soft-delete for vanished ones.
+        
+        Rows are upserted on ``(mcp_server_id, mcp_tool_name)``; existing rows
+        are only rewritten when their description or schemas changed, or when
+        a previously removed tool reappears.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for tool_info in discovered_tools:
+            tool_name = tool_info.get("name")
+            if not tool_name:
+                continue
+            # Last definition wins; ON CONFLICT cannot touch one row twice
+            rows[tool_name] = {
+                "id": uuid4(),
+                "name": f"{server.name}_{tool_name}",
+                "description": tool_info.get("description") or "",
+                "tool_type": ToolType.MCP_SERVER.value,
+                "status": ToolStatus.ACTIVE.value,
+                "mcp_server_id": server.id,
+                "mcp_tool_name": tool_name,
+                "input_schema": tool_info.get("input_schema") or {},
+                "output_schema": tool_info.get("output_schema") or {},
+                "capabilities": tool_info.get("capabilities") or [],
+                "category": tool_info.get("category") or "mcp",
+                "tool_config_metadata": {"mcp_server_id": str(server.id), "mcp_tool_name": tool_name}
+            }
+        
+        upsert = None
+        if rows:
+            insert_stmt = pg_insert(Tool).values(list(rows.values()))
+            excluded = insert_stmt.excluded
+            # Only rows whose definition changed (or that were soft-deleted) are rewritten
+            upsert = insert_stmt.on_conflict_do_update(
+                constraint="uq_tools_mcp_server_tool",
+                set_={
+                    "description": excluded.description,
+                    "input_schema": excluded.input_schema,
+                    "output_schema": excluded.output_schema,
+                    "status": ToolStatus.ACTIVE.value,
+                    "is_deleted": False,
+                    "updated_at": func.now()
+                },
+                where=or_(
+                    Tool.description.is_distinct_from(excluded.description),
+                    Tool.input_schema.is_distinct_from(excluded.input_schema),
+                    Tool.output_schema.is_distinct_from(excluded.output_schema),
+                    Tool.is_deleted.is_(True)
+                )
+            ).returning(Tool.id, literal_column("xmax = 0").label("inserted"))
+        
+        # Tools the server no longer exposes are soft-deleted, not removed
+        deactivate = update(Tool).where(
+            Tool.mcp_server_id == server.id,
+            Tool.is_deleted.is_not(True)
+        )
+        if rows:
+            deactivate = deactivate.where(Tool.mcp_tool_name.not_in(list(rows)))
+        deactivate = deactivate.values(
+            is_deleted=True,
+            status=ToolStatus.INACTIVE.value,
+            updated_at=func.now()
+        )
+        
+        return upsert, deactivate
+    
     async def _sync_discovered_tools(
         self,
         session: AsyncSession,
         server: MCPServer,
         discovered_tools: List[Dict[str, Any]]
-    ):
-        """Sync discovered tools to the database."""
+    ) -> Dict[str, int]:
+        """Sync discovered tools to the database with one set-based upsert."""
         
-        for tool_info in discovered_tools:
-            # Check if tool already exists
-            existing_tool = await session.execute(
-                select(Tool).where(
-                    and_(
-                        Tool.mcp_server_id == server.id,
-                        Tool.mcp_tool_name == tool_info["name"]
-                    )
-                )
-            )
-            
-            if not existing_tool.scalar_one_or_none():
-                # Create new tool entry
-                tool = Tool(
-                    id=uuid4(),
-                    name=f"{server.name}_{tool_info['name']}",
-                    display_name=tool_info.get("display_name", tool_info["name"]),
-                    description=tool_info.get("description", ""),
-                    tool_type=ToolType.MCP_SERVER,
-                    status=ToolStatus.ACTIVE,
-                    mcp_server_id=server.id,
-                    mcp_tool_name=tool_info["name"],
-                    input_schema=tool_info.get("input_schema", {}),
-                    output_schema=tool_info.get("output_schema", {}),
-                    parameters=tool_info.get("parameters", {}),
-                    capabilities=tool_info.get("capabilities", []),
-                    category=tool_info.get("category", "mcp"),
-                    created_by=None,  # System-created
-                    updated_by=None
-                )
-                
-                session.add(tool)
+        # A newly created server must exist before tools can reference it
+        await session.flush()
+        
+        upsert, deactivate = self._build_tool_sync_statements(server, discovered_tools)
+        created = updated = 0
+        if upsert is not None:
+            for row in (await session.execute(upsert)).all():
+                if row.inserted:
+                    created += 1
+                else:
+                    updated += 1
+        removed = (await session.execute(deactivate)).rowcount or 0
         
         await session.commit()
+        if created or updated or removed:
+            tool_catalog.invalidate()
+        
+        logger.info(
+            "MCP tools synced",
+            server_id=str(server.id),
+            discovered=len(discovered_tools),
+            created=created,
+            updated=updated,
+            removed=removed
+        )
+        return {"created": created, "updated": updated, "removed": removed}
     
     async def _call_server_tool(
         self,
@@ -1047,31 +1063,18 @@ class MCPGatewayService:
         if server.id not in self._connections:
             raise MCPConnectionError("No active WebSocket connection")
         
-        websocket = self._connections[server.id]
-        
-        # Send tool call message
-        call_message = {
-            "jsonrpc": "2.0",
-            "method": "tools/call",
-            "params": {
-                "name": tool_name,
-                "arguments": inputs,
-                "context": context or {}
-            },
-            "id": str(uuid4())
-        }
-        
-        await websocket.send(json.dumps(call_message))
-        
-        # Wait for response
-        response = await asyncio.wait_for(
-            websocket.recv(),
-            timeout=server.timeout_seconds
-        )
-        
-        response_data = json.loads(response)
+        connection = self._connections[server.id]
         
-        if "error" in response_data:
-            raise MCPProtocolError(f"Tool call failed: {response_data['error']}")
-        
-        return response_data.get("result", {})
\ No newline at end of file
+        # Concurrent calls share the connection; responses are matched by id
+        try:
+            return await connection.request(
+                "tools/call",
+                {
+                    "name": tool_name,
+                    "arguments": inputs,
+                    "context": context or {}
+                },
+                timeout=server.timeout_seconds
+            )
+        except MCPRequestError as e:
+            raise MCPProtocolError(f"Tool call failed: {e.error}")
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""Centralized MCP server health checks.
+
+A single scheduler task replaces one sleeping task per server. Each tick it
+probes the servers that are due (spread out with jitter, bounded by a
+concurrency limit), retries unhealthy servers with exponential backoff,
+and records every outcome of the tick in one batched ``UPDATE`` of the
+``mcp_servers`` table. A server is never probed or reconnected by more than
+one coroutine at a time, so failures cannot pile up reconnection attempts.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from ..config.settings import get_settings
+from ..database import get_database_session
+
+logger = logging.getLogger(__name__)
+
+HealthProbe = Callable[[Any], Awaitable[None]]
+Reconnect = Callable[[Any], Awaitable[bool]]
+
+
+@dataclass
+class ServerHealthState:
+    """Scheduling state of one registered server."""
+    server: Any
+    probe: HealthProbe
+    reconnect: Reconnect
+    interval: float
+    next_due: float
+    failures: int = 0
+    busy: bool = False
+
+    @property
+    def healthy(self) -> bool:
+        return self.failures == 0
+
+
+@dataclass
+class HealthOutcome:
+    """Result of probing or reconnecting one server."""
+    server_id: str
+    healthy: bool
+    error: Optional[str]
+    checked_at: datetime
+
+
+class MCPHealthScheduler:
+    """Runs health checks and reconnects for all MCP servers."""
+
+    def __init__(
+        self,
+        tick_seconds: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        jitter: Optional[float] = None,
+        reconnect_initial_backoff: Optional[float] = None,
+        reconnect_max_backoff: Optional[float] = None
+    ):
+        mcp_settings = get_settings().mcp
+        self.tick_seconds = tick_seconds if tick_seconds is not None else mcp_settings.health_tick_seconds
+        self.max_concurrency = max_concurrency or mcp_settings.health_max_concurrency
+        self.jitter = jitter if jitter is not None else mcp_settings.health_jitter
+        self.reconnect_initial_backoff = reconnect_initial_backoff or mcp_settings.health_reconnect_initial_backoff
+        self.reconnect_max_backoff = reconnect_max_backoff or mcp_settings.health_reconnect_max_backoff
+        self.default_interval = mcp_settings.health_check_interval
+        self._servers: Dict[str, ServerHealthState] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.writes = 0
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def register(self, server: Any, probe: HealthProbe, reconnect: Reconnect) -> None:
+        """Schedule health checks for a (connected) server.
+
+        Re-registering a server resets its failure count and keeps a single
+        schedule entry.
+        """
+        key = str(server.id)
+        interval = getattr(server, "health_check_interval", None) or self.default_interval
+        state = self._servers.get(key)
+        if state is None:
+            # Spread first checks over one interval so servers do not probe in lockstep
+            state = ServerHealthState(
+                server=server, probe=probe, reconnect=reconnect, interval=interval,
+                next_due=time.monotonic() + random.uniform(0, interval)
+            )
+            self._servers[key] = state
+        else:
+            state.server, state.probe, state.reconnect, state.interval = server, probe, reconnect, interval
+            state.failures = 0
+            state.next_due = time.monotonic() + self._jittered(interval)
+        self._ensure_running()
+
+    def unregister(self, server_id: Any) -> None:
+        """Stop checking a server."""
+        self._servers.pop(str(server_id), None)
+
+    def is_registered(self, server_id: Any) -> bool:
+        return str(server_id) in self._servers
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while self._servers:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"MCP health tick failed: {e}")
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(self.reconnect_max_backoff, self.reconnect_initial_backoff * (2 ** max(0, failures - 1)))
+        return self._jittered(delay)
+
+    async def _check(self, state: ServerHealthState, semaphore: asyncio.Semaphore) -> Optional[HealthOutcome]:
+        async with semaphore:
+            server_id = str(state.server.id)
+            try:
+                if state.healthy:
+                    await state.probe(state.server)
+                    healthy, error = True, None
+                else:
+                    healthy = bool(await state.reconnect(state.server))
+                    error = None if healthy else "reconnect failed"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                healthy, error = False, str(e)
+            finally:
+                state.busy = False
+
+            if self._servers.get(server_id) is not state:
+                return None  # Unregistered while the check was running
+            if healthy:
+                if state.failures:
+                    logger.info(f"MCP server {server_id} recovered after {state.failures} failure(s)")
+                state.failures = 0
+                state.next_due = time.monotonic() + self._jittered(state.interval)
+            else:
+                state.failures += 1
+                state.next_due = time.monotonic() + self._backoff(state.failures)
+                logger.warning(f"MCP server {server_id} unhealthy ({state.failures} consecutive): {error}")
+            return HealthOutcome(server_id, healthy, error, datetime.now(timezone.utc))
+
+    async def tick(self) -> List[HealthOutcome]:
+        """Check every due server once and persist the outcomes."""
+        self.ticks += 1
+        now = time.monotonic()
+        due = [state for state in self._servers.values() if not state.busy and state.next_due <= now]
+        if not due:
+            return []
+        for state in due:
+            state.busy = True
+
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        results = await asyncio.gather(*[self._check(state, semaphore) for state in due])
+        outcomes = [outcome for outcome in results if outcome is not None]
+        if outcomes:
+            try:
+                await self._write(outcomes)
+                self.writes += 1
+            except Exception as e:
+                logger.error(f"Failed to record MCP health for {len(outcomes)} server(s): {e}")
+        return outcomes
+
+    @staticmethod
+    def _build_update(outcomes: List[HealthOutcome]) -> tuple:
+        rows: List[str] = []
+        params: Dict[str, Any] = {}
+        for n, outcome in enumerate(outcomes):
+            rows.append(
+                f"(CAST(:id_{n} AS uuid), CAST(:healthy_{n} AS boolean), "
+                f"CAST(:error_{n} AS text), CAST(:checked_{n} AS timestamptz))"
+            )
+            params.update({
+                f"id_{n}": outcome.server_id,
+                f"healthy_{n}": outcome.healthy,
+                f"error_{n}": outcome.error,
+                f"checked_{n}": outcome.checked_at
+            })
+        statement = f"""
+            UPDATE mcp_servers AS s SET
+                last_health_check_at = v.checked_at,
+                status = CASE WHEN v.healthy THEN 'connected' ELSE 'error' END,
+                last_error = CASE WHEN v.healthy THEN s.last_error ELSE v.error END,
+                error_count = CASE WHEN v.healthy THEN 0 ELSE COALESCE(s.error_count, 0) + 1 END
+            FROM (VALUES {", ".join(rows)}) AS v(id, healthy, error, checked_at)
+            WHERE s.id = v.id
+        """
+        return text(statement), params
+
+    async def _write(self, outcomes: List[HealthOutcome]) -> None:
+        statement, params = self._build_update(outcomes)
+        async with get_database_session() as session:
+            await session.execute(statement, params)
+            await session.commit()
+
+    async def aclose(self) -> None:
+        """Stop the scheduler (application shutdown)."""
+        self._servers.clear()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            "servers": len(self._servers),
+            "unhealthy": sum(1 for state in self._servers.values() if not state.healthy),
+            "ticks": self.ticks,
+            "writes": self.writes
+        }
+
+
+# Global MCP health scheduler
+mcp_health_scheduler = MCPHealthScheduler()
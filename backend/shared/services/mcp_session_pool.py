@@ -0,0 +1,354 @@
+"""Persistent, multiplexed MCP client sessions.
+
+Opening an MCP connection costs a transport connect plus the ``initialize``
+handshake. The pool keeps one long-lived session per server and lets many
+concurrent requests share it: the MCP ``ClientSession`` (and
+``JSONRPCWebSocket`` for raw WebSocket servers) match responses to requests
+by JSON-RPC id, so calls no longer have to be serialized on a connection.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from uuid import uuid4
+
+import anyio
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors that mean the underlying connection is unusable
+TRANSPORT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    httpx.TransportError,
+    ConnectionError
+)
+
+
+class MCPSessionError(Exception):
+    """Raised when an MCP session cannot be established or is lost."""
+    pass
+
+
+class MCPRequestError(Exception):
+    """Raised when an MCP server answers a request with a JSON-RPC error."""
+
+    def __init__(self, error: Any):
+        super().__init__(f"MCP request failed: {error}")
+        self.error = error
+
+
+class PersistentMCPSession:
+    """A long-lived MCP session to one server, reconnected with backoff.
+
+    The transport and ``ClientSession`` context managers are entered and
+    exited by a single runner task (anyio requires this); callers only wait
+    for the session to become ready and then issue requests concurrently,
+    bounded by ``max_in_flight``.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        max_in_flight: int = 16,
+        connect_timeout: float = 10.0,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0
+    ):
+        self.url = url
+        self.headers = headers or {}
+        self.connect_timeout = connect_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.last_used = time.monotonic()
+        self.in_flight = 0
+
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+        self._session: Optional[ClientSession] = None
+        self._ready = asyncio.Event()
+        self._reconnect = asyncio.Event()
+        self._closed = False
+        self._last_error: Optional[BaseException] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._session is not None
+
+    def _ensure_runner(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        backoff = self.initial_backoff
+        while not self._closed:
+            self._reconnect.clear()
+            try:
+                async with sse_client(self.url, headers=self.headers, timeout=self.connect_timeout) as (read_stream, write_stream):
+                    async with ClientSession(read_stream, write_stream) as session:
+                        await asyncio.wait_for(session.initialize(), timeout=self.connect_timeout)
+                        self._session = session
+                        self._last_error = None
+                        self._ready.set()
+                        backoff = self.initial_backoff
+                        logger.info(f"MCP session established to {self.url}")
+                        await self._reconnect.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = e
+                logger.warning(f"MCP session to {self.url} failed: {e}")
+            finally:
+                self._session = None
+                self._ready.clear()
+
+            if self._closed:
+                break
+            # Exponential backoff with jitter before reconnecting
+            await asyncio.sleep(backoff * (0.5 + random.random() / 2))
+            backoff = min(self.max_backoff, backoff * 2)
+
+    async def _get_session(self) -> ClientSession:
+        if self._closed:
+            raise MCPSessionError(f"MCP session to {self.url} is closed")
+        self._ensure_runner()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            detail = f": {self._last_error}" if self._last_error else ""
+            raise MCPSessionError(f"Could not connect to MCP server {self.url}{detail}")
+        session = self._session
+        if session is None:
+            raise MCPSessionError(f"MCP session to {self.url} was lost")
+        return session
+
+    async def request(
+        self,
+        operation: Callable[[ClientSession], Awaitable[T]],
+        timeout: Optional[float] = None,
+        retry: bool = False
+    ) -> T:
+        """Run ``operation`` on the shared session.
+
+        Args:
+            operation: Coroutine function receiving the live ``ClientSession``
+            timeout: Optional per-request timeout in seconds
+            retry: Retry once on a fresh connection if the session breaks;
+                only safe for idempotent requests (listing, reading)
+        """
+        self.last_used = time.monotonic()
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                for attempt in range(2 if retry else 1):
+                    session = await self._get_session()
+                    try:
+                        return await asyncio.wait_for(operation(session), timeout=timeout)
+                    except TRANSPORT_ERRORS as e:
+                        self.mark_broken(session)
+                        if attempt or not retry:
+                            raise MCPSessionError(f"MCP session to {self.url} failed: {e}") from e
+                    except asyncio.TimeoutError:
+                        # A stream that died silently only shows up as timeouts, so
+                        # reconnect unless the server still answers a ping
+                        if await self._is_alive(session):
+                            raise
+                        self.mark_broken(session)
+                        if attempt or not retry:
+                            raise
+            finally:
+                self.in_flight -= 1
+                self.last_used = time.monotonic()
+
+    async def _is_alive(self, session: ClientSession) -> bool:
+        """Whether ``session`` answers a ping within the connect timeout."""
+        try:
+            await asyncio.wait_for(session.send_ping(), timeout=self.connect_timeout)
+            return True
+        except Exception:
+            return False
+
+    def mark_broken(self, session: Optional[ClientSession] = None) -> None:
+        """Force a reconnect if ``session`` is still the live session."""
+        if session is None or session is self._session:
+            self._ready.clear()
+            self._reconnect.set()
+
+    async def aclose(self) -> None:
+        """Close the session and stop reconnecting."""
+        self._closed = True
+        self._reconnect.set()
+        if self._runner and not self._runner.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._runner), timeout=5.0)
+            except Exception:
+                self._runner.cancel()
+
+
+class JSONRPCWebSocket:
+    """JSON-RPC 2.0 client over a raw WebSocket with request-id multiplexing.
+
+    A reader task dispatches each response to the future registered under
+    its id, so any number of requests can be outstanding on one connection.
+    """
+
+    def __init__(self, websocket: Any, max_in_flight: int = 16):
+        self.websocket = websocket
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._semaphore = asyncio.Semaphore(max(1, max_in_flight))
+        self._reader = asyncio.ensure_future(self._read_loop())
+        self._closed_error: Optional[BaseException] = None
+
+    @property
+    def open(self) -> bool:
+        return self._closed_error is None and not self._reader.done()
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """Send a request and wait for the response with the matching id."""
+        if not self.open:
+            raise MCPSessionError(f"WebSocket connection is closed: {self._closed_error}")
+        async with self._semaphore:
+            request_id = str(uuid4())
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            message = {"jsonrpc": "2.0", "method": method, "id": request_id}
+            if params is not None:
+                message["params"] = params
+            try:
+                await self.websocket.send(json.dumps(message))
+                response = await asyncio.wait_for(future, timeout=timeout)
+            finally:
+                self._pending.pop(request_id, None)
+
+        if "error" in response:
+            raise MCPRequestError(response["error"])
+        return response.get("result", {})
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Send a notification (no response expected)."""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self.websocket.send(json.dumps(message))
+
+    async def _read_loop(self) -> None:
+        try:
+            async for raw in self.websocket:
+                try:
+                    message = json.loads(raw)
+                except (TypeError, ValueError):
+                    logger.warning("Ignoring malformed JSON-RPC message")
+                    continue
+                future = self._pending.get(str(message.get("id"))) if "id" in message else None
+                if future is not None and not future.done():
+                    future.set_result(message)
+                elif "method" in message:
+                    logger.debug(f"Ignoring server-initiated message {message['method']}")
+            self._closed_error = MCPSessionError("connection closed by server")
+        except Exception as e:
+            self._closed_error = e
+        finally:
+            error = self._closed_error or MCPSessionError("connection closed")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(MCPSessionError(f"WebSocket connection lost: {error}"))
+
+    async def close(self) -> None:
+        self._closed_error = self._closed_error or MCPSessionError("connection closed by client")
+        try:
+            await self.websocket.close()
+        finally:
+            self._reader.cancel()
+
+
+class MCPSessionPool:
+    """One persistent MCP session per server URL."""
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[str, str], PersistentMCPSession] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def get(self, url: str, headers: Optional[Dict[str, Any]] = None) -> PersistentMCPSession:
+        """Get (or lazily create) the persistent session for a server."""
+        mcp_settings = get_settings().mcp
+        key = (url, json.dumps(headers or {}, sort_keys=True))
+        session = self._sessions.get(key)
+        if session is None:
+            session = PersistentMCPSession(
+                url,
+                headers=headers,
+                max_in_flight=mcp_settings.max_in_flight_per_server,
+                connect_timeout=mcp_settings.connect_timeout,
+                initial_backoff=mcp_settings.reconnect_initial_backoff,
+                max_backoff=mcp_settings.reconnect_max_backoff
+            )
+            self._sessions[key] = session
+            self._ensure_reaper()
+        return session
+
+    async def request(
+        self,
+        url: str,
+        operation: Callable[[ClientSession], Awaitable[T]],
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        retry: bool = False
+    ) -> T:
+        """Run ``operation`` on the pooled session for ``url``."""
+        if timeout is None:
+            timeout = get_settings().mcp.request_timeout
+        return await self.get(url, headers).request(operation, timeout=timeout, retry=retry)
+
+    async def close_server(self, url: str) -> None:
+        """Close every pooled session to ``url``."""
+        for key in [key for key in self._sessions if key[0] == url]:
+            await self._sessions.pop(key).aclose()
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.ensure_future(self._reap_idle())
+
+    async def _reap_idle(self) -> None:
+        # Close sessions that have been idle longer than the configured timeout
+        idle_timeout = get_settings().mcp.idle_timeout_seconds
+        if idle_timeout <= 0:
+            return
+        while self._sessions:
+            await asyncio.sleep(min(60.0, idle_timeout))
+            cutoff = time.monotonic() - idle_timeout
+            for key, session in list(self._sessions.items()):
+                if session.in_flight == 0 and session.last_used < cutoff:
+                    self._sessions.pop(key, None)
+                    logger.debug(f"Closing idle MCP session to {session.url}")
+                    await session.aclose()
+
+    async def aclose(self) -> None:
+        """Close all pooled sessions (application shutdown)."""
+        sessions, self._sessions = list(self._sessions.values()), {}
+        if self._reaper and not self._reaper.done():
+            self._reaper.cancel()
+        await asyncio.gather(*[session.aclose() for session in sessions], return_exceptions=True)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {
+            "sessions": len(self._sessions),
+            "connected": sum(1 for s in self._sessions.values() if s.connected),
+            "in_flight": sum(s.in_flight for s in self._sessions.values())
+        }
+
+
+# Global MCP session pool
+mcp_session_pool = MCPSessionPool()
@@ -30,6 +30,7 @@ from sqlalchemy.orm import selectinload
 from ..models.agent import AgentMemory, Agent
 from .base import BaseService
 from .id_generator import IDGeneratorService
+from .vector_collections import cosine_metadata, migrate_collections
 
 
 class MemoryType(str, Enum):
@@ -84,6 +85,8 @@ class MemoryConfig:
     openai_api_key: Optional[str] = None  # Optional, uses OPENAI_API_KEY env var if not set
     ollama_base_url: str = "http://ollama:11434"
     vector_db_path: str = "./data/chroma"
+    embedding_batch_size: int = 32  # Micro-batch size for concurrent embedding requests (1 disables)
+    embedding_batch_wait_ms: float = 5.0
 
 
 class MemoryManager:
@@ -115,7 +118,9 @@ class MemoryManager:
         """Initialize the memory management system."""
         try:
             # Initialize embedding provider
-            from .embeddings import OpenAIEmbeddingProvider, LocalEmbeddingProvider, OllamaEmbeddingProvider
+            from .embeddings import (
+                OpenAIEmbeddingProvider, LocalEmbeddingProvider, OllamaEmbeddingProvider, BatchingEmbeddingProvider
+            )
             
             if self.config.embedding_provider == "openai":
                 self.logger.info(f"Initializing OpenAI embedding provider: {self.config.embedding_model}")
@@ -135,6 +140,13 @@ class MemoryManager:
                     model_name=self.config.embedding_model
                 )
             
+            if self.config.embedding_batch_size > 1:
+                self._embedding_provider = BatchingEmbeddingProvider(
+                    self._embedding_provider,
+                    max_batch_size=self.config.embedding_batch_size,
+                    max_wait_ms=self.config.embedding_batch_wait_ms
+                )
+            
             await self._embedding_provider.initialize()
             
             # Initialize Chroma vector database
@@ -149,6 +161,12 @@ class MemoryManager:
                 )
             )
             
+            # Collections created with the former L2 distance rank differently
+            # scaled vectors wrongly; move them to cosine before first use
+            migrated = migrate_collections(self._chroma_client)
+            if migrated:
+                self.logger.info(f"Migrated {len(migrated)} vector collection(s) to cosine distance")
+            
             self.logger.info("Memory management system initialized successfully")
             
         except Exception as e:
@@ -171,7 +189,7 @@ class MemoryManager:
                 # Create new collection if it doesn't exist
                 collection = self._chroma_client.create_collection(
                     name=collection_name,
-                    metadata={"tenant_id": tenant_id, "agent_id": agent_id}
+                    metadata=cosine_metadata({"tenant_id": tenant_id, "agent_id": agent_id})
                 )
             
             self._collections[collection_name] = collection
@@ -185,6 +203,13 @@ class MemoryManager:
         
         return await self._embedding_provider.generate_embedding(text)
     
+    async def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for several texts in one provider call."""
+        if not self._embedding_provider:
+            raise RuntimeError("Embedding provider not initialized")
+        
+        return await self._embedding_provider.generate_embeddings(texts)
+    
     def _calculate_importance_score(
         self,
         content: str,
@@ -817,7 +842,9 @@ async def get_memory_manager() -> MemoryManager:
             embedding_model=settings.memory.embedding_model,
             openai_api_key=settings.memory.openai_api_key,
             ollama_base_url=settings.memory.ollama_base_url,
-            vector_db_path=settings.memory.vector_db_path
+            vector_db_path=settings.memory.vector_db_path,
+            embedding_batch_size=settings.memory.embedding_batch_size,
+            embedding_batch_wait_ms=settings.memory.embedding_batch_wait_ms
         )
 
         _memory_manager = MemoryManager(config)
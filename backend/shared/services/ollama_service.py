@@ -1,10 +1,13 @@
 import httpx
 from typing import List, Dict, Any, Optional
 
+from .http_transport import http_transport_registry
+
 class OllamaService:
     def __init__(self, ollama_base_url: str = "http://ollama:11434"):
         self.ollama_base_url = ollama_base_url
-        self.client = httpx.AsyncClient()
+        # Shared pooled client; owned by the transport registry, not closed here
+        self.client = http_transport_registry.get_client(ollama_base_url)
 
     async def list_local_models(self) -> List[Dict[str, Any]]:
         """
@@ -104,15 +107,11 @@ class OllamaService:
 
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        pass
 
     async def __aenter__(self, ):
         return self
 
 async def get_ollama_service() -> OllamaService:
     """Dependency injection for OllamaService."""
-    service = OllamaService()
-    try:
-        yield service
-    finally:
-        await service.client.aclose()
+    yield OllamaService()
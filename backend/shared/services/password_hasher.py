@@ -0,0 +1,111 @@
+"""Password hashing off the event loop.
+
+Argon2 is deliberately expensive: hashing or verifying a password takes
+tens of milliseconds of CPU, which used to run inside async request
+handlers and stall every other request of the worker during login bursts.
+``PasswordHasher`` runs that work in a small bounded thread pool (argon2
+releases the GIL while hashing) behind a concurrency limit: only a fixed
+number of operations wait for a thread, and further ones are rejected with
+``PasswordHasherBusyError``, which also throttles brute-force attempts.
+
+Argon2 parameters are configurable; hashes made with older parameters are
+reported by ``needs_update`` so they can be upgraded on the next login.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusyError(Exception):
+    """Too many password operations are already waiting."""
+    pass
+
+
+class PasswordHasher:
+    """Argon2 hashing and verification in a bounded thread pool."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_waiting: Optional[int] = None,
+        time_cost: Optional[int] = None,
+        memory_cost: Optional[int] = None,
+        parallelism: Optional[int] = None
+    ):
+        security_settings = get_settings().security
+        self.workers = workers or security_settings.password_hash_workers
+        self.max_waiting = max_waiting if max_waiting is not None else security_settings.password_hash_max_waiting
+        self.context = CryptContext(
+            schemes=["argon2"],
+            deprecated="auto",
+            argon2__rounds=time_cost or security_settings.argon2_time_cost,
+            argon2__memory_cost=memory_cost or security_settings.argon2_memory_cost_kib,
+            argon2__parallelism=parallelism or security_settings.argon2_parallelism
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self.rejected = 0
+
+    def hash(self, password: str) -> str:
+        """Hash a password (blocking)."""
+        return self.context.hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash (blocking)."""
+        return self.context.verify(password, hashed_password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        """Whether a hash was made with other parameters than the current ones."""
+        try:
+            return self.context.needs_update(hashed_password)
+        except (UnknownHashError, ValueError, TypeError):
+            return False
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a blocking password operation in the pool.
+
+        Raises:
+            PasswordHasherBusyError: If the wait queue is full
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        if self._semaphore.locked() and self._waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Too many concurrent password operations")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._semaphore.release()
+
+    def close(self) -> None:
+        """Shut down the thread pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "waiting": self._waiting, "rejected": self.rejected}
+
+
+# Global password hasher
+password_hasher = PasswordHasher()
@@ -0,0 +1,203 @@
+"""Compiled per-user permission matrices.
+
+``PermissionService`` used to load the user's roles with their permissions
+for every check and query the resource role tables for resource-level
+checks. A user's effective permissions are instead compiled once into a
+``PermissionMatrix``:
+
+* global permissions as bitsets over interned permission keys, one bitset
+  per minimum role level, so a check is a single AND;
+* resource grants as ``{resource_id: access rank}`` per resource type, also
+  used to filter list queries with one ``IN``.
+
+Matrices are cached per process with a TTL and dropped through the
+principal cache's invalidation channel when role assignments, roles or
+resource grants change.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..config.settings import get_settings
+from ..models.rbac import Role, UserRole
+from ..models.resource_roles import AgentRole, WorkflowRole
+from .principal_cache import principal_cache
+
+logger = logging.getLogger(__name__)
+
+# Minimum role permission level per action; unknown actions need level 3
+ACTION_LEVELS = {
+    'view': 1,      # View User or higher
+    'execute': 2,   # Standard User or higher
+    'create': 3,    # Service User or higher
+    'modify': 3,    # Service User or higher
+    'delete': 3,    # Service User or higher
+    'manage': 3,    # Service User or higher
+    'assign_role': 4,  # Super Admin only
+}
+DEFAULT_ACTION_LEVEL = 3
+MAX_ACTION_LEVEL = max(ACTION_LEVELS.values())
+
+# Resource access types, each including the ones before it
+ACCESS_RANKS = {'view': 1, 'execute': 2, 'modify': 3}
+
+# Access type required per action; unknown actions need modify access
+ACTION_ACCESS = {
+    'view': 'view',
+    'execute': 'execute',
+    'create': 'modify',  # Create requires modify access
+    'modify': 'modify',
+    'delete': 'modify',  # Delete requires modify access
+}
+
+RESOURCE_ROLE_MODELS = {
+    'agent': (AgentRole, AgentRole.agent_id),
+    'workflow': (WorkflowRole, WorkflowRole.workflow_id),
+}
+
+
+class PermissionIndex:
+    """Interns permission keys as bit positions shared by all matrices."""
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+
+    def bit(self, key: str) -> int:
+        bit = self._bits.get(key)
+        if bit is None:
+            bit = self._bits[key] = 1 << len(self._bits)
+        return bit
+
+    def lookup(self, key: str) -> int:
+        """Bit of ``key``, or 0 if no role grants it."""
+        return self._bits.get(key, 0)
+
+
+permission_index = PermissionIndex()
+
+
+def action_level(action: str) -> int:
+    return ACTION_LEVELS.get(action, DEFAULT_ACTION_LEVEL)
+
+
+def required_access_rank(action: str) -> int:
+    return ACCESS_RANKS[ACTION_ACCESS.get(action, 'modify')]
+
+
+@dataclass
+class PermissionMatrix:
+    """Effective permissions of one user."""
+    role_ids: FrozenSet[UUID] = frozenset()
+    # level_bits[n]: permissions granted by roles of level >= n
+    level_bits: List[int] = field(default_factory=lambda: [0] * (MAX_ACTION_LEVEL + 1))
+    # resource type -> resource id -> highest access rank granted
+    grants: Dict[str, Dict[UUID, int]] = field(default_factory=dict)
+
+    def allows(self, resource_type: str, action: str) -> bool:
+        """Global permission for ``action`` on ``resource_type``."""
+        bit = permission_index.lookup(f"{resource_type}.{action}")
+        level = min(action_level(action), MAX_ACTION_LEVEL)
+        return bool(bit and self.level_bits[level] & bit)
+
+    def allows_resource(self, resource_type: str, action: str, resource_id: UUID) -> bool:
+        """Global permission plus a sufficient grant on the resource."""
+        if not self.allows(resource_type, action):
+            return False
+        rank = self.grants.get(resource_type, {}).get(resource_id, 0)
+        return rank >= required_access_rank(action)
+
+    def resource_ids(self, resource_type: str) -> List[UUID]:
+        """Resources of ``resource_type`` any of the user's roles is granted."""
+        return list(self.grants.get(resource_type, {}))
+
+
+async def compile_permission_matrix(session: AsyncSession, user_id: UUID) -> PermissionMatrix:
+    """Build a user's matrix with one query for roles and one per resource type."""
+    result = await session.execute(
+        select(UserRole).options(
+            selectinload(UserRole.role).selectinload(Role.permissions)
+        ).where(UserRole.user_id == user_id)
+    )
+    roles = [user_role.role for user_role in result.scalars().all() if user_role.role]
+
+    matrix = PermissionMatrix(role_ids=frozenset(role.id for role in roles))
+    for role in roles:
+        role_bits = 0
+        for permission in role.permissions:
+            # Permissions match by name or by resource and action
+            role_bits |= permission_index.bit(permission.name)
+            role_bits |= permission_index.bit(f"{permission.resource}.{permission.action}")
+        for level in range(min(role.permission_level or 0, MAX_ACTION_LEVEL) + 1):
+            matrix.level_bits[level] |= role_bits
+
+    if matrix.role_ids:
+        for resource_type, (model, id_column) in RESOURCE_ROLE_MODELS.items():
+            result = await session.execute(
+                select(id_column, model.access_type).where(model.role_id.in_(matrix.role_ids))
+            )
+            grants: Dict[UUID, int] = {}
+            for resource_id, access_type in result.all():
+                rank = ACCESS_RANKS.get(access_type, 0)
+                if rank > grants.get(resource_id, 0):
+                    grants[resource_id] = rank
+            matrix.grants[resource_type] = grants
+
+    return matrix
+
+
+class PermissionMatrixCache:
+    """Per-process TTL cache of compiled permission matrices."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        security_settings = get_settings().security
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else security_settings.principal_cache_ttl_seconds
+        self.max_entries = max_entries or security_settings.principal_cache_max_entries
+        self._matrices: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.compilations = 0
+
+    async def get(self, session: AsyncSession, user_id: UUID) -> PermissionMatrix:
+        key = str(user_id)
+        entry = self._matrices.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._matrices.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        generation = self._generation
+        matrix = await compile_permission_matrix(session, user_id)
+        self.compilations += 1
+        if self.ttl_seconds > 0 and generation == self._generation:
+            self._matrices[key] = (time.monotonic() + self.ttl_seconds, matrix)
+            self._matrices.move_to_end(key)
+            while len(self._matrices) > self.max_entries:
+                self._matrices.popitem(last=False)
+        return matrix
+
+    def on_invalidation(self, kind: str, key: str) -> None:
+        """Principal cache listener."""
+        if kind == "api_key":
+            return
+        self._generation += 1
+        if kind == "user":
+            self._matrices.pop(key, None)
+        else:
+            # Role and resource grant changes affect every holder of the role
+            self._matrices.clear()
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {"users": len(self._matrices), "hits": self.hits, "compilations": self.compilations}
+
+
+# Global permission matrix cache
+permission_matrix_cache = PermissionMatrixCache()
+principal_cache.add_listener(permission_matrix_cache.on_invalidation)
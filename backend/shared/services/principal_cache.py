@@ -0,0 +1,307 @@
+"""Cached principal resolution.
+
+Every authenticated request used to load the user with roles (two queries)
+or look up the API key and commit a ``last_used_at`` update before the
+endpoint ran. Resolved principals are now cached per process for a short
+TTL: users keyed by the token subject, API keys by their key hash. Cached
+records are detached snapshots and are merged into the request's session
+without a query, so endpoints can still modify and commit them.
+
+Changes to users, role assignments, roles and API keys invalidate the
+affected entries locally and publish the invalidation on a Redis channel so
+other workers drop them too; the TTL bounds staleness if Redis is
+unavailable. API key ``last_used_at`` timestamps are coalesced in memory and
+written periodically with one batched ``UPDATE ... FROM (VALUES ...)``.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from sqlalchemy import and_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ..config.settings import get_settings
+from ..database import get_database_session
+from ..models.api_key import APIKey
+from ..models.rbac import UserRole
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Seconds between reconnection attempts of the invalidation listener
+RECONNECT_DELAY_SECONDS = 5.0
+
+
+class PrincipalCache:
+    """TTL cache of authenticated users and API keys with cross-worker invalidation."""
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        channel: Optional[str] = None,
+        redis_url: Optional[str] = None
+    ):
+        settings = get_settings()
+        security_settings = settings.security
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else security_settings.principal_cache_ttl_seconds
+        self.max_entries = max_entries or security_settings.principal_cache_max_entries
+        self.flush_interval = (
+            flush_interval if flush_interval is not None
+            else security_settings.api_key_usage_flush_interval_seconds
+        )
+        self.channel = channel if channel is not None else security_settings.principal_invalidation_channel
+        self.redis_url = redis_url or settings.redis.url
+        self._users: "OrderedDict[str, tuple]" = OrderedDict()
+        self._api_keys: "OrderedDict[str, tuple]" = OrderedDict()
+        # Bumped on every invalidation so loads racing one are not cached
+        self._generation = 0
+        self._pending_use: Dict[str, datetime] = {}
+        self._listeners: List[Callable[[str, str], None]] = []
+        self._client: Optional[redis.Redis] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._running = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.flush_failures = 0
+
+    # Cache storage
+
+    def _get(self, entries: OrderedDict, key: str) -> Any:
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return value
+
+    def _put(self, entries: OrderedDict, key: str, value: Any, generation: int) -> None:
+        if self.ttl_seconds <= 0 or generation != self._generation:
+            return
+        entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    # Principal resolution
+
+    async def _load_user(self, user_id: UUID) -> Optional[User]:
+        # A separate session leaves a detached snapshot behind when it closes
+        async with get_database_session() as session:
+            result = await session.execute(
+                select(User)
+                .options(selectinload(User.roles).selectinload(UserRole.role))
+                .where(User.id == user_id)
+            )
+            return result.unique().scalar_one_or_none()
+
+    async def _load_api_key(self, key_hash: str) -> Optional[APIKey]:
+        async with get_database_session() as session:
+            result = await session.execute(
+                select(APIKey).where(and_(APIKey.key_hash == key_hash, APIKey.is_active == True))
+            )
+            return result.scalar_one_or_none()
+
+    async def get_user(self, session: AsyncSession, user_id: UUID) -> Optional[User]:
+        """User with roles loaded, attached to ``session``."""
+        key = str(user_id)
+        user = self._get(self._users, key)
+        if user is None:
+            self.misses += 1
+            generation = self._generation
+            user = await self._load_user(user_id)
+            if user is None:
+                return None
+            self._put(self._users, key, user, generation)
+        else:
+            self.hits += 1
+        # merge() copies the snapshot, so the cached object is never modified
+        return await session.merge(user, load=False)
+
+    async def get_api_key(self, session: AsyncSession, key_hash: str) -> Optional[APIKey]:
+        """Active API key record for ``key_hash``, attached to ``session``."""
+        api_key = self._get(self._api_keys, key_hash)
+        if api_key is None:
+            self.misses += 1
+            generation = self._generation
+            api_key = await self._load_api_key(key_hash)
+            if api_key is None:
+                return None
+            self._put(self._api_keys, key_hash, api_key, generation)
+        else:
+            self.hits += 1
+        return await session.merge(api_key, load=False)
+
+    # Invalidation
+
+    def add_listener(self, listener: Callable[[str, str], None]) -> None:
+        """Call ``listener(kind, key)`` for every invalidation, local or remote.
+
+        Lets caches derived from principals (e.g. compiled permissions) share
+        the invalidation channel.
+        """
+        self._listeners.append(listener)
+
+    def _invalidate_local(self, message: str) -> None:
+        self._generation += 1
+        self.invalidations += 1
+        kind, _, key = message.partition(":")
+        if kind == "user":
+            self._users.pop(key, None)
+        elif kind == "api_key":
+            self._api_keys.pop(key, None)
+        elif kind == "all":
+            self._users.clear()
+            self._api_keys.clear()
+        for listener in self._listeners:
+            try:
+                listener(kind, key)
+            except Exception as e:
+                logger.error(f"Principal invalidation listener failed: {e}")
+
+    async def _publish(self, message: str) -> None:
+        self._invalidate_local(message)
+        if not self.channel:
+            return
+        try:
+            if self._client is None:
+                self._client = redis.from_url(self.redis_url)
+            await self._client.publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Could not publish principal invalidation {message!r}: {e}")
+
+    async def invalidate_user(self, user_id: Any) -> None:
+        """Drop a user after their account or role assignments changed."""
+        await self._publish(f"user:{user_id}")
+
+    async def invalidate_api_key(self, key_hash: str) -> None:
+        """Drop an API key after it was updated or revoked."""
+        await self._publish(f"api_key:{key_hash}")
+
+    async def invalidate_all(self) -> None:
+        """Drop every cached principal, e.g. after a role's permissions changed."""
+        await self._publish("all")
+
+    async def invalidate_permissions(self) -> None:
+        """Tell listeners that resource grants changed; cached principals stay."""
+        await self._publish("permissions")
+
+    async def _listen(self) -> None:
+        while self._running:
+            try:
+                if self._client is None:
+                    self._client = redis.from_url(self.redis_url)
+                async with self._client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        data = message["data"]
+                        self._invalidate_local(data.decode() if isinstance(data, bytes) else str(data))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Principal invalidation listener disconnected: {e}")
+            # Invalidations may have been missed while disconnected
+            self._invalidate_local("all")
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    # Coalesced API key usage
+
+    def record_api_key_use(self, api_key_id: Any) -> None:
+        """Note that an API key was used; written with the next flush."""
+        self._pending_use[str(api_key_id)] = datetime.now(timezone.utc)
+
+    async def _flush_loop(self) -> None:
+        while self._running:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    @staticmethod
+    def _build_update(batch: Dict[str, datetime]) -> tuple:
+        rows: List[str] = []
+        params: Dict[str, Any] = {}
+        for n, (api_key_id, used_at) in enumerate(batch.items()):
+            rows.append(f"(CAST(:id_{n} AS uuid), CAST(:used_{n} AS timestamptz))")
+            params.update({f"id_{n}": api_key_id, f"used_{n}": used_at})
+        statement = f"""
+            UPDATE api_keys AS k SET last_used_at = GREATEST(k.last_used_at, v.used)
+            FROM (VALUES {", ".join(rows)}) AS v(id, used)
+            WHERE k.id = v.id
+        """
+        return text(statement), params
+
+    async def flush(self) -> int:
+        """Write pending ``last_used_at`` updates; returns the number of keys updated."""
+        if not self._pending_use:
+            return 0
+        batch, self._pending_use = self._pending_use, {}
+        statement, params = self._build_update(batch)
+        try:
+            async with get_database_session() as session:
+                await session.execute(statement, params)
+                await session.commit()
+            return len(batch)
+        except Exception as e:
+            self.flush_failures += 1
+            logger.warning(f"Failed to flush API key usage for {len(batch)} key(s), will retry: {e}")
+            # Keep the timestamps for the next flush unless newer ones arrived
+            for api_key_id, used_at in batch.items():
+                self._pending_use.setdefault(api_key_id, used_at)
+            return 0
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        """Start the invalidation listener and the usage flush task."""
+        if self._running:
+            return
+        self._running = True
+        self._flush_task = asyncio.ensure_future(self._flush_loop())
+        if self.channel:
+            self._listener_task = asyncio.ensure_future(self._listen())
+
+    async def aclose(self) -> None:
+        """Stop background tasks and write pending API key usage."""
+        self._running = False
+        for task in (self._listener_task, self._flush_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "users": len(self._users),
+            "api_keys": len(self._api_keys),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "pending_api_key_updates": len(self._pending_use),
+            "flush_failures": self.flush_failures,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+# Global principal cache
+principal_cache = PrincipalCache()
@@ -16,6 +16,10 @@ from shared.models.rag import RAGSource, AgentRAGSource, RAGSourceType, RAGStatu
 from shared.models.agent import Agent
 from shared.services.base import BaseService
 from shared.services.memory_manager import MemoryManager, MemoryConfig
+from shared.services.vector_collections import get_or_create_collection
+
+# Chunks embedded per provider call when ingesting a source
+EMBEDDING_BATCH_SIZE = 64
 
 # We can reuse MemoryManager's embedding and vector logic, 
 # or instantiate a minimal version of it just for embeddings/chroma.
@@ -100,24 +104,25 @@ class RAGService(BaseService):
             if not self.memory_manager._chroma_client:
                 await self.memory_manager.initialize()
                 
-            collection = self.memory_manager._chroma_client.get_or_create_collection(
-                name=f"rag_kb_{source.owner_id}",
-                metadata={"owner_id": str(source.owner_id)}
+            collection = get_or_create_collection(
+                self.memory_manager._chroma_client,
+                f"rag_kb_{source.owner_id}",
+                {"owner_id": str(source.owner_id)}
             )
             
             ids = [f"{source.id}_chunk_{i}" for i in range(len(chunks))]
             metadatas = [{"source_id": str(source.id), "chunk_index": i, "source_name": source.name} for i in range(len(chunks))]
             
-            # Generate embeddings
+            # Generate embeddings in batches
             embeddings = []
-            for chunk in chunks:
-                emb = await self.memory_manager._generate_embedding(chunk)
-                embeddings.append(emb)
+            for start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+                batch = chunks[start:start + EMBEDDING_BATCH_SIZE]
+                embeddings.extend(await self.memory_manager._generate_embeddings(batch))
             
             collection.add(
                 ids=ids,
                 documents=chunks,
-                embeddings=embeddings, # optimized to batch?
+                embeddings=embeddings,
                 metadatas=metadatas
             )
             
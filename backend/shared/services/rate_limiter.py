@@ -0,0 +1,232 @@
+"""Sliding-window-counter rate limiting.
+
+Each rule (e.g. 100 requests per 10 seconds) is tracked per key with two
+counters: the count of the current aligned window and the count of the
+previous one. The request rate is estimated as::
+
+    previous * (time left in current window / window) + current
+
+which needs O(1) time and constant memory per key and rule, unlike a log of
+request timestamps. Keys idle for two of their longest windows (after which
+both counters would be zero) are evicted, and the number of tracked keys is
+capped.
+
+Two backends share the same algorithm: an in-process one and a Redis one
+(a Lua script, so limits are shared atomically across workers). The Redis
+limiter falls back to the in-process limiter while Redis is unavailable.
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import redis.asyncio as redis
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """At most ``limit`` requests per ``window_seconds``."""
+    name: str
+    window_seconds: float
+    limit: int
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of one rate limit check."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int = 0
+    rule: Optional[str] = None
+
+
+class InMemoryRateLimiter:
+    """Process-local sliding-window-counter limiter."""
+
+    def __init__(self, rules: Sequence[RateLimitRule], max_keys: Optional[int] = None):
+        self.rules = list(rules)
+        self.max_keys = max_keys or get_settings().security.rate_limit_max_keys
+        self.idle_ttl = max(rule.window_seconds for rule in self.rules) * 2
+        # key -> [last_seen, (window_index, previous, current) per rule], oldest first
+        self._state: "OrderedDict[str, list]" = OrderedDict()
+        self.evicted = 0
+
+    def _evict(self, now: float) -> None:
+        while self._state:
+            key, state = next(iter(self._state.items()))
+            if now - state[0] < self.idle_ttl and len(self._state) <= self.max_keys:
+                break
+            del self._state[key]
+            self.evicted += 1
+
+    def _windows(self, key: str, now: float) -> list:
+        state = self._state.get(key)
+        if state is None:
+            state = [now] + [[-1, 0, 0] for _ in self.rules]
+            self._state[key] = state
+        else:
+            state[0] = now
+            self._state.move_to_end(key)
+        for rule, window in zip(self.rules, state[1:]):
+            index = int(now // rule.window_seconds)
+            if window[0] != index:
+                # Roll over: the current window becomes the previous one if adjacent
+                window[1] = window[2] if window[0] == index - 1 else 0
+                window[0], window[2] = index, 0
+        return state[1:]
+
+    async def hit(self, keys: Sequence[str], now: Optional[float] = None) -> RateLimitDecision:
+        """Count one request against every key, unless any key is over a limit."""
+        return self.hit_sync(keys, now)
+
+    def hit_sync(self, keys: Sequence[str], now: Optional[float] = None) -> RateLimitDecision:
+        now = time.time() if now is None else now
+        all_windows = [self._windows(key, now) for key in keys]
+        self._evict(now)
+
+        tightest: Optional[RateLimitDecision] = None
+        for windows in all_windows:
+            for rule, (index, previous, current) in zip(self.rules, windows):
+                start = index * rule.window_seconds
+                weight = 1 - (now - start) / rule.window_seconds
+                estimate = previous * weight + current
+                if estimate + 1 > rule.limit:
+                    retry_after = max(1, math.ceil(start + rule.window_seconds - now))
+                    return RateLimitDecision(False, rule.limit, 0, retry_after, rule.name)
+                remaining = int(rule.limit - estimate - 1)
+                if tightest is None or remaining < tightest.remaining:
+                    tightest = RateLimitDecision(True, rule.limit, remaining, rule=rule.name)
+
+        for windows in all_windows:
+            for window in windows:
+                window[2] += 1
+        return tightest or RateLimitDecision(True, 0, 0)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {"backend": "memory", "keys": len(self._state), "evicted": self.evicted}
+
+
+# KEYS: one hash per client key. ARGV: now_ms, ttl_ms, then window_ms/limit per rule.
+# Returns {allowed, limit, remaining, retry_after_ms, rule_index}.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local rule_count = (#ARGV - 2) / 2
+local best_limit, best_remaining, best_rule = 0, -1, 0
+local states = {}
+
+for k = 1, #KEYS do
+    local state = {}
+    for r = 1, rule_count do
+        local window = tonumber(ARGV[1 + r * 2])
+        local limit = tonumber(ARGV[2 + r * 2])
+        local start = now - (now % window)
+        local stored = redis.call('HMGET', KEYS[k], 's' .. r, 'p' .. r, 'c' .. r)
+        local previous, current = tonumber(stored[2]) or 0, tonumber(stored[3]) or 0
+        local stored_start = tonumber(stored[1])
+        if stored_start ~= start then
+            if stored_start == start - window then previous = current else previous = 0 end
+            current = 0
+        end
+        local estimate = previous * (1 - (now - start) / window) + current
+        if estimate + 1 > limit then
+            return {0, limit, 0, start + window - now, r}
+        end
+        local remaining = math.floor(limit - estimate - 1)
+        if best_remaining < 0 or remaining < best_remaining then
+            best_limit, best_remaining, best_rule = limit, remaining, r
+        end
+        state[r] = {start, previous, current}
+    end
+    states[k] = state
+end
+
+for k = 1, #KEYS do
+    for r = 1, rule_count do
+        local s = states[k][r]
+        redis.call('HSET', KEYS[k], 's' .. r, s[1], 'p' .. r, s[2], 'c' .. r, s[3] + 1)
+    end
+    redis.call('PEXPIRE', KEYS[k], ttl)
+end
+return {1, best_limit, best_remaining, 0, best_rule}
+"""
+
+
+class RedisRateLimiter:
+    """Sliding-window-counter limiter shared across workers through Redis."""
+
+    def __init__(
+        self,
+        rules: Sequence[RateLimitRule],
+        redis_url: Optional[str] = None,
+        key_prefix: str = "ratelimit:",
+        fallback: Optional[InMemoryRateLimiter] = None,
+        client: Optional[redis.Redis] = None
+    ):
+        self.rules = list(rules)
+        self.redis_url = redis_url or get_settings().security.rate_limit_redis_url or get_settings().redis.url
+        self.key_prefix = key_prefix
+        self.fallback = fallback or InMemoryRateLimiter(self.rules)
+        self._client = client
+        self._script = None
+        self._args: List[int] = []
+        for rule in self.rules:
+            self._args.extend([int(rule.window_seconds * 1000), rule.limit])
+        self._ttl_ms = int(max(rule.window_seconds for rule in self.rules) * 2000)
+        self._retry_at = 0.0
+        self.fallbacks = 0
+
+    @property
+    def script(self):
+        if self._script is None:
+            if self._client is None:
+                self._client = redis.from_url(self.redis_url)
+            # register_script re-sends the source when Redis reports NOSCRIPT
+            self._script = self._client.register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    async def hit(self, keys: Sequence[str], now: Optional[float] = None) -> RateLimitDecision:
+        """Count one request against every key, unless any key is over a limit."""
+        now = time.time() if now is None else now
+        if now < self._retry_at:
+            self.fallbacks += 1
+            return self.fallback.hit_sync(keys, now)
+        try:
+            allowed, limit, remaining, retry_ms, rule_index = await self.script(
+                keys=[self.key_prefix + key for key in keys],
+                args=[int(now * 1000), self._ttl_ms, *self._args]
+            )
+        except Exception as e:
+            # Limit locally rather than failing requests while Redis is down
+            logger.warning(f"Redis rate limiter unavailable, using in-process limits: {e}")
+            self._retry_at = now + 5
+            self.fallbacks += 1
+            return self.fallback.hit_sync(keys, now)
+
+        rule = self.rules[int(rule_index) - 1].name if rule_index else None
+        return RateLimitDecision(
+            allowed=bool(allowed),
+            limit=int(limit),
+            remaining=int(remaining),
+            retry_after=max(1, math.ceil(int(retry_ms) / 1000)) if not allowed else 0,
+            rule=rule
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {"backend": "redis", "fallbacks": self.fallbacks, "fallback": self.fallback.get_statistics()}
+
+
+def create_rate_limiter(rules: Sequence[RateLimitRule], backend: Optional[str] = None):
+    """Create the limiter for the configured backend (``memory`` or ``redis``)."""
+    backend = backend or get_settings().security.rate_limit_backend
+    if backend == "redis":
+        return RedisRateLimiter(rules)
+    return InMemoryRateLimiter(rules)
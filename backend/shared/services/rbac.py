@@ -21,6 +21,7 @@ from sqlalchemy.orm import selectinload
 
 from ..models.user import User
 from ..models.rbac import Role, Permission, UserRole
+from .principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 
@@ -185,6 +186,7 @@ class RBACService:
         # Add the role to the user
         user.roles.append(role)
         await self.session.commit()
+        await principal_cache.invalidate_user(user_id)
         
         logger.info(f"Assigned role {role_id} to user {user_id}")
         return True
@@ -208,6 +210,7 @@ class RBACService:
         
         user.roles.remove(role_to_remove)
         await self.session.commit()
+        await principal_cache.invalidate_user(user_id)
         
         logger.info(f"Removed role {role_id} from user {user_id}")
         return True
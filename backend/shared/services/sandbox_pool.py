@@ -0,0 +1,404 @@
+"""Pre-warmed sandbox worker pool for custom tool execution.
+
+Custom tools run in worker processes (see ``sandbox_worker.py``) that are
+started ahead of the call instead of on demand. Workers import common
+libraries once at startup and are recycled after a configurable number of
+calls, on timeout, or when they crash; a replacement is started in the
+background.
+
+By default every worker serves a single call, so each call still gets a
+fresh interpreter. Reusing workers across calls
+(``SANDBOX_MAX_CALLS_PER_WORKER`` above 1, or 0 for no limit) also reuses
+compiled tool modules, cached by code hash, but workers are shared by every
+tool and user: a tool that changes interpreter state (module globals,
+``sys.modules``, files in the working directory) can affect later calls of
+other users served by the same worker. Only enable it when all tool code is
+trusted.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+STDERR_TAIL_BYTES = 4096
+
+
+class SandboxError(Exception):
+    """Raised when a sandboxed tool call fails."""
+    pass
+
+
+class SandboxTimeoutError(SandboxError):
+    """Raised when a sandboxed tool call exceeds its timeout."""
+    pass
+
+
+@dataclass
+class SandboxPoolStats:
+    """Sandbox pool statistics"""
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    crashes: int = 0
+    workers_started: int = 0
+    workers_recycled: int = 0
+
+
+@dataclass(frozen=True)
+class SpilledOutput:
+    """A result the worker wrote to a file because it exceeded the spill threshold."""
+    path: str
+    size_bytes: int
+
+
+def code_hash(code: str) -> str:
+    """Hash tool code; workers cache compiled modules under this key."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class SandboxWorker:
+    """A single long-lived sandbox worker process."""
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.calls = 0
+        self.known_hashes: Set[str] = set()
+        self._next_id = 0
+        self._stderr_tail = b""
+        self._stderr_task = asyncio.ensure_future(self._drain_stderr())
+
+    @classmethod
+    async def spawn(cls, memory_limit_mb: int, cpu_seconds: int, warm_modules: List[str], startup_timeout: float) -> "SandboxWorker":
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, WORKER_SCRIPT, str(memory_limit_mb), str(cpu_seconds), *warm_modules,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        worker = cls(process)
+        try:
+            ready = await asyncio.wait_for(worker._read_frame(), timeout=startup_timeout)
+        except BaseException:
+            await worker.kill()
+            raise
+        if not ready or ready.get("status") != "ready":
+            await worker.kill()
+            raise SandboxError(f"Sandbox worker failed to start: {worker.stderr_tail}")
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    @property
+    def stderr_tail(self) -> str:
+        return self._stderr_tail.decode("utf-8", errors="replace").strip()
+
+    async def call(
+        self,
+        digest: str,
+        code: str,
+        inputs: Dict[str, Any],
+        context: Dict[str, Any],
+        spill: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Send one call to the worker and wait for its response frame."""
+        self.calls += 1
+        response = await self._roundtrip(digest, None if digest in self.known_hashes else code, inputs, context, spill)
+        if response.get("error_code") == "unknown_code":
+            # Worker evicted the module from its cache; resend the code
+            response = await self._roundtrip(digest, code, inputs, context, spill)
+        if response.get("error_code") != "unknown_code":
+            self.known_hashes.add(digest)
+        return response
+
+    async def _roundtrip(
+        self,
+        digest: str,
+        code: Optional[str],
+        inputs: Dict[str, Any],
+        context: Dict[str, Any],
+        spill: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        self._next_id += 1
+        request = {"id": self._next_id, "code_hash": digest, "inputs": inputs, "context": context}
+        if code is not None:
+            request["code"] = code
+        if spill:
+            request["spill"] = spill
+        payload = json.dumps(request, default=str).encode("utf-8")
+        self.process.stdin.write(HEADER.pack(len(payload)) + payload)
+        await self.process.stdin.drain()
+
+        response = await self._read_frame()
+        if response is None:
+            raise SandboxError(f"Sandbox worker exited unexpectedly: {self.stderr_tail or 'no output'}")
+        return response
+
+    async def _read_frame(self) -> Optional[Dict[str, Any]]:
+        try:
+            header = await self.process.stdout.readexactly(HEADER.size)
+            (length,) = HEADER.unpack(header)
+            if length > MAX_FRAME_BYTES:
+                raise SandboxError(f"Sandbox response of {length} bytes exceeds limit")
+            payload = await self.process.stdout.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
+        return json.loads(payload.decode("utf-8"))
+
+    async def _drain_stderr(self) -> None:
+        # Keep the pipe from filling up; retain only the tail for diagnostics
+        try:
+            while True:
+                chunk = await self.process.stderr.read(STDERR_TAIL_BYTES)
+                if not chunk:
+                    break
+                self._stderr_tail = (self._stderr_tail + chunk)[-STDERR_TAIL_BYTES:]
+        except Exception:
+            pass
+
+    async def close(self, timeout: float = 2.0) -> None:
+        """Ask the worker to exit by closing stdin, killing it if it lingers."""
+        if self.alive:
+            try:
+                self.process.stdin.close()
+                await asyncio.wait_for(self.process.wait(), timeout=timeout)
+            except Exception:
+                await self.kill()
+        self._stderr_task.cancel()
+
+    async def kill(self) -> None:
+        if self.alive:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await self.process.wait()
+        except Exception:
+            pass
+        self._stderr_task.cancel()
+
+
+class SandboxPool:
+    """Pool of pre-warmed sandbox workers.
+
+    Each worker serves one call at a time. Idle workers wait in a queue;
+    new workers are spawned on demand up to ``size``.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_calls_per_worker: Optional[int] = None,
+        memory_limit_mb: Optional[int] = None,
+        cpu_seconds_per_call: Optional[int] = None,
+        warm_modules: Optional[List[str]] = None,
+        startup_timeout: Optional[float] = None
+    ):
+        sandbox_settings = get_settings().sandbox
+        self.size = max(1, size if size is not None else sandbox_settings.pool_size)
+        self.max_calls_per_worker = max_calls_per_worker if max_calls_per_worker is not None else sandbox_settings.max_calls_per_worker
+        self.memory_limit_mb = memory_limit_mb if memory_limit_mb is not None else sandbox_settings.memory_limit_mb
+        self.cpu_seconds_per_call = cpu_seconds_per_call if cpu_seconds_per_call is not None else sandbox_settings.cpu_seconds_per_call
+        self.warm_modules = warm_modules if warm_modules is not None else [
+            m.strip() for m in sandbox_settings.warm_modules.split(",") if m.strip()
+        ]
+        self.startup_timeout = startup_timeout if startup_timeout is not None else sandbox_settings.startup_timeout
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: Set[SandboxWorker] = set()
+        self._spawning = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._closed = False
+        self.stats = SandboxPoolStats()
+
+    def _ensure_primitives(self) -> None:
+        # Created lazily so the pool can be instantiated at import time
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._lock = asyncio.Lock()
+
+    async def start(self, prewarm: Optional[int] = None) -> None:
+        """Spawn workers ahead of the first call."""
+        self._ensure_primitives()
+        self._closed = False
+        count = min(self.size, prewarm if prewarm is not None else self.size)
+        results = await asyncio.gather(*[self._spawn() for _ in range(count)], return_exceptions=True)
+        for result in results:
+            if isinstance(result, SandboxWorker):
+                self._return_idle(result)
+            else:
+                logger.warning(f"Failed to pre-warm sandbox worker: {result}")
+        if not self._closed:
+            logger.info(f"Sandbox pool started with {self._idle.qsize()} worker(s)")
+
+    async def execute(
+        self,
+        code: str,
+        inputs: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        spill_dir: Optional[str] = None,
+        spill_threshold_bytes: int = 0
+    ) -> Any:
+        """Run a tool's ``execute(inputs, context)`` in a pooled worker.
+
+        When ``spill_dir`` is given, results whose JSON encoding exceeds
+        ``spill_threshold_bytes`` are written there by the worker and returned
+        as a ``SpilledOutput`` instead of being sent back over the pipe.
+
+        Raises:
+            SandboxTimeoutError: If the call exceeds ``timeout`` seconds
+            SandboxError: If the tool raises or the worker crashes
+        """
+        if self._closed:
+            raise SandboxError("Sandbox pool is closed")
+        self._ensure_primitives()
+        digest = code_hash(code)
+        try:
+            worker = await asyncio.wait_for(self._acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise SandboxTimeoutError(f"No sandbox worker became available within {timeout}s")
+        self.stats.calls += 1
+        start = time.monotonic()
+        healthy = False
+        try:
+            response = await asyncio.wait_for(
+                worker.call(
+                    digest, code, inputs, context or {},
+                    {"dir": spill_dir, "threshold": spill_threshold_bytes} if spill_dir else None
+                ),
+                timeout=timeout
+            )
+            healthy = True
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise SandboxTimeoutError(f"Tool execution timed out after {timeout}s")
+        except SandboxError:
+            self.stats.crashes += 1
+            raise
+        finally:
+            await self._release(worker, healthy)
+            logger.debug(f"Sandbox call {digest[:12]} finished in {(time.monotonic() - start) * 1000:.1f}ms")
+
+        if response.get("status") != "success":
+            self.stats.errors += 1
+            raise SandboxError(response.get("error", "Unknown sandbox error"))
+        if "spilled" in response:
+            return SpilledOutput(response["spilled"]["path"], response["spilled"]["size_bytes"])
+        return response.get("result")
+
+    async def _acquire(self) -> SandboxWorker:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                async with self._lock:
+                    can_spawn = len(self._workers) + self._spawning < self.size
+                    if can_spawn:
+                        self._spawning += 1
+                if can_spawn:
+                    try:
+                        return await self._spawn()
+                    finally:
+                        self._spawning -= 1
+                worker = await self._idle.get()
+
+            if worker.alive:
+                return worker
+            self._workers.discard(worker)
+
+    async def _release(self, worker: SandboxWorker, healthy: bool) -> None:
+        recycle = not healthy or not worker.alive or (
+            self.max_calls_per_worker > 0 and worker.calls >= self.max_calls_per_worker
+        )
+        if recycle or self._closed:
+            self._workers.discard(worker)
+            self.stats.workers_recycled += 1
+            if healthy:
+                asyncio.ensure_future(worker.close())
+            else:
+                # Timed out or crashed mid-call; its state is unknown
+                await worker.kill()
+            # Wake a waiter so it can spawn a replacement
+            if not self._closed:
+                asyncio.ensure_future(self._replace())
+            return
+        self._return_idle(worker)
+
+    def _return_idle(self, worker: SandboxWorker) -> None:
+        # Workers that finish starting or serving after close() are stopped, not queued
+        if self._closed or self._idle is None:
+            self._workers.discard(worker)
+            asyncio.ensure_future(worker.close())
+            return
+        self._idle.put_nowait(worker)
+
+    async def _replace(self) -> None:
+        if self._closed:
+            return
+        async with self._lock:
+            if len(self._workers) + self._spawning >= self.size:
+                return
+            self._spawning += 1
+        try:
+            self._return_idle(await self._spawn())
+        except Exception as e:
+            logger.warning(f"Failed to replace sandbox worker: {e}")
+        finally:
+            self._spawning -= 1
+
+    async def _spawn(self) -> SandboxWorker:
+        worker = await SandboxWorker.spawn(
+            self.memory_limit_mb,
+            self.cpu_seconds_per_call,
+            self.warm_modules,
+            self.startup_timeout
+        )
+        self._workers.add(worker)
+        self.stats.workers_started += 1
+        return worker
+
+    async def close(self) -> None:
+        """Stop every worker (application shutdown)."""
+        self._closed = True
+        workers, self._workers = list(self._workers), set()
+        await asyncio.gather(*[worker.close() for worker in workers], return_exceptions=True)
+        self._idle = None
+        self._lock = None
+        if workers:
+            logger.info(f"Sandbox pool stopped {len(workers)} worker(s)")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {
+            "size": self.size,
+            "workers": len(self._workers),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "calls": self.stats.calls,
+            "errors": self.stats.errors,
+            "timeouts": self.stats.timeouts,
+            "crashes": self.stats.crashes,
+            "workers_started": self.stats.workers_started,
+            "workers_recycled": self.stats.workers_recycled
+        }
+
+
+# Global sandbox pool instance
+sandbox_pool = SandboxPool()
@@ -0,0 +1,161 @@
+"""Sandbox worker process for custom tool execution.
+
+Runs as a standalone script (it must not import the ``shared`` package) and
+serves tool calls from the parent over stdin/stdout. Every frame is a 4-byte
+big-endian length followed by a UTF-8 JSON payload.
+
+Usage: python sandbox_worker.py <memory_limit_mb> <cpu_seconds_per_call> [warm_module ...]
+"""
+
+import hashlib
+import importlib
+import json
+import math
+import os
+import struct
+import sys
+import types
+import uuid
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # Non-POSIX platforms
+    resource = None
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+MAX_CACHED_MODULES = 64
+
+
+def _read_frame(stream):
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds limit")
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+def _write_frame(stream, message):
+    payload = json.dumps(message, default=str).encode("utf-8")
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def _spill_result(call_id, result, spill):
+    """Write a large result to the spill directory instead of the pipe."""
+    if not spill or not spill.get("dir"):
+        return None
+    payload = json.dumps(result, default=str).encode("utf-8")
+    if len(payload) <= int(spill.get("threshold") or 0):
+        return None
+    path = os.path.join(spill["dir"], f"{uuid.uuid4().hex}.json")
+    with open(path, "wb") as handle:
+        handle.write(payload)
+    return {"id": call_id, "status": "success", "spilled": {"path": path, "size_bytes": len(payload)}}
+
+
+def _apply_memory_limit(memory_limit_mb):
+    if resource is None or memory_limit_mb <= 0:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+
+def _arm_cpu_limit(cpu_seconds):
+    """Allow the next call ``cpu_seconds`` of CPU on top of what was used so far."""
+    if resource is None or cpu_seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(math.ceil(usage.ru_utime + usage.ru_stime)) + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _load_module(cache, code_hash, code):
+    module = cache.get(code_hash)
+    if module is not None:
+        cache.move_to_end(code_hash)
+        return module
+
+    if code is None:
+        raise LookupError("unknown_code")
+    if hashlib.sha256(code.encode("utf-8")).hexdigest() != code_hash:
+        raise ValueError("Tool code does not match its hash")
+
+    module = types.ModuleType(f"tool_{code_hash[:12]}")
+    exec(compile(code, f"<tool_{code_hash[:12]}>", "exec"), module.__dict__)
+    if not callable(getattr(module, "execute", None)):
+        raise AttributeError("Tool must define an 'execute' function")
+
+    cache[code_hash] = module
+    while len(cache) > MAX_CACHED_MODULES:
+        cache.popitem(last=False)
+    return module
+
+
+def main(argv):
+    memory_limit_mb = int(argv[1]) if len(argv) > 1 else 0
+    cpu_seconds = int(argv[2]) if len(argv) > 2 else 0
+    warm_modules = argv[3:]
+
+    # Keep the backend source tree off the import path of tool code
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != script_dir]
+
+    # Reserve the real stdout for frames; tool prints go to stderr
+    requests_in = sys.stdin.buffer
+    frames_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    for name in warm_modules:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+    _apply_memory_limit(memory_limit_mb)
+    _write_frame(frames_out, {"status": "ready", "pid": os.getpid()})
+
+    modules = OrderedDict()
+    while True:
+        request = _read_frame(requests_in)
+        if request is None:
+            break
+
+        call_id = request.get("id")
+        try:
+            module = _load_module(modules, request["code_hash"], request.get("code"))
+            _arm_cpu_limit(cpu_seconds)
+            result = module.execute(request.get("inputs") or {}, request.get("context") or {})
+            response = _spill_result(call_id, result, request.get("spill")) or {
+                "id": call_id, "status": "success", "result": result
+            }
+        except LookupError as e:
+            response = {"id": call_id, "status": "error", "error": str(e), "error_code": "unknown_code"}
+        except MemoryError:
+            response = {"id": call_id, "status": "error", "error": "Tool exceeded its memory limit"}
+        except Exception as e:
+            response = {"id": call_id, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+        try:
+            _write_frame(frames_out, response)
+        except (TypeError, ValueError) as e:
+            _write_frame(frames_out, {"id": call_id, "status": "error", "error": f"Tool result is not serializable: {e}"})
+
+
+if __name__ == "__main__":
+    main(sys.argv)
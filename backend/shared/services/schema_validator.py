@@ -0,0 +1,148 @@
+"""Compiled JSON-schema validators.
+
+Tool inputs are validated on every execution. Checking and compiling the
+schema each time dominates the cost for small payloads, so validators are
+compiled once per distinct schema (keyed by a fingerprint of its canonical
+JSON) and kept in a bounded LRU cache. ``fastjsonschema`` is used when it is
+installed; ``jsonschema`` remains the reference engine and produces the
+structured error list when validation fails.
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import jsonschema
+
+try:
+    import fastjsonschema
+    FASTJSONSCHEMA_AVAILABLE = True
+except ImportError:
+    fastjsonschema = None
+    FASTJSONSCHEMA_AVAILABLE = False
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SchemaViolation:
+    """A single validation error."""
+    path: str
+    message: str
+    validator: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"path": self.path, "message": self.message, "validator": self.validator}
+
+
+def schema_fingerprint(schema: Dict[str, Any]) -> str:
+    """Stable fingerprint of a schema's canonical JSON form."""
+    canonical = json.dumps(schema or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _format_path(path: Any) -> str:
+    parts = [str(part) for part in path]
+    return ".".join(parts) if parts else "$"
+
+
+class CompiledSchemaValidator:
+    """Validator for one schema, compiled once."""
+
+    def __init__(self, schema: Dict[str, Any], engine: str = "auto"):
+        self.schema = schema
+        self.schema_error: Optional[SchemaViolation] = None
+        self._fast_check: Optional[Callable[[Any], Any]] = None
+        self._validator: Optional[jsonschema.protocols.Validator] = None
+
+        validator_class = jsonschema.validators.validator_for(schema)
+        try:
+            validator_class.check_schema(schema)
+        except jsonschema.SchemaError as e:
+            self.schema_error = SchemaViolation("$schema", f"Invalid schema: {e.message}", "schema")
+            return
+        self._validator = validator_class(schema)
+
+        if engine in ("auto", "fastjsonschema") and FASTJSONSCHEMA_AVAILABLE:
+            try:
+                self._fast_check = fastjsonschema.compile(schema)
+            except Exception as e:
+                # Unsupported keywords or drafts fall back to jsonschema
+                logger.debug(f"fastjsonschema could not compile schema: {e}")
+
+    @property
+    def engine(self) -> str:
+        return "fastjsonschema" if self._fast_check else "jsonschema"
+
+    def errors(self, data: Any) -> List[SchemaViolation]:
+        """Return all violations of ``data`` (empty when valid)."""
+        if self.schema_error:
+            return [self.schema_error]
+        if self._fast_check is not None:
+            try:
+                self._fast_check(data)
+                return []
+            except fastjsonschema.JsonSchemaException:
+                pass  # Collect the complete error list below
+        return [
+            SchemaViolation(_format_path(error.absolute_path), error.message, error.validator)
+            for error in sorted(self._validator.iter_errors(data), key=lambda e: list(map(str, e.absolute_path)))
+        ]
+
+    def is_valid(self, data: Any) -> bool:
+        return not self.errors(data)
+
+
+class SchemaValidatorCache:
+    """Bounded LRU cache of compiled validators keyed by schema fingerprint."""
+
+    def __init__(self, max_size: Optional[int] = None, engine: Optional[str] = None):
+        tool_settings = get_settings().tools
+        self.max_size = max_size or tool_settings.schema_cache_size
+        self.engine = engine or tool_settings.schema_engine
+        self._validators: "OrderedDict[str, CompiledSchemaValidator]" = OrderedDict()
+        self.hits = 0
+        self.compilations = 0
+
+    def get(self, schema: Dict[str, Any], fingerprint: Optional[str] = None) -> CompiledSchemaValidator:
+        """Get the compiled validator for ``schema``, compiling it on first use."""
+        key = fingerprint or schema_fingerprint(schema)
+        validator = self._validators.get(key)
+        if validator is not None:
+            self._validators.move_to_end(key)
+            self.hits += 1
+            return validator
+
+        validator = CompiledSchemaValidator(schema, self.engine)
+        self.compilations += 1
+        self._validators[key] = validator
+        while len(self._validators) > self.max_size:
+            self._validators.popitem(last=False)
+        return validator
+
+    def validate(self, data: Any, schema: Dict[str, Any], fingerprint: Optional[str] = None) -> List[SchemaViolation]:
+        """Validate ``data`` and return the list of violations."""
+        if not schema:
+            return []
+        return self.get(schema, fingerprint).errors(data)
+
+    def clear(self) -> None:
+        self._validators.clear()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "validators": len(self._validators),
+            "hits": self.hits,
+            "compilations": self.compilations,
+            "fastjsonschema_available": FASTJSONSCHEMA_AVAILABLE
+        }
+
+
+# Global validator cache
+schema_validators = SchemaValidatorCache()
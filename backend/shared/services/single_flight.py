@@ -0,0 +1,143 @@
+"""Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one upstream call instead
+of issuing duplicate requests. Streaming calls are fanned out so that every
+subscriber receives the full chunk sequence.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SingleFlightStats:
+    """Single-flight statistics"""
+    upstream_calls: int = 0
+    shared_calls: int = 0
+    in_flight: int = 0
+
+
+class _Flight:
+    """A single in-flight upstream call and its waiters."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """A single in-flight upstream stream buffered for all subscribers."""
+
+    def __init__(self):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one upstream call."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run ``fn`` once for all concurrent callers with the same key.
+
+        The upstream call runs in its own task so that cancelling one caller
+        does not cancel it for the others; it is only cancelled once every
+        waiter has gone away.
+
+        Returns:
+            Tuple of (result, shared) where ``shared`` is True for callers
+            that joined an existing flight
+        """
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t, k=key, f=flight: self._forget(k, f))
+            self.stats.upstream_calls += 1
+        else:
+            self.stats.shared_calls += 1
+
+        self.stats.in_flight = len(self._flights)
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+            return result, shared
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Share one upstream stream between concurrent subscribers with the same key.
+
+        Chunks are buffered for the lifetime of the upstream stream so that
+        subscribers joining late still receive the chunks already produced.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.ensure_future(self._pump(key, flight, factory))
+            self.stats.upstream_calls += 1
+        else:
+            self.stats.shared_calls += 1
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: index < len(flight.chunks) or flight.done)
+                    pending = flight.chunks[index:]
+                    finished = flight.done
+                for chunk in pending:
+                    yield chunk
+                index += len(pending)
+                if finished and index >= len(flight.chunks):
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and flight.task and not flight.task.done():
+                flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _StreamFlight, factory: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for chunk in factory():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        self.stats.in_flight = len(self._flights)
+        # Mark the exception as retrieved if nobody was left to await it
+        if not flight.task.cancelled() and flight.task.exception() is not None and flight.waiters == 0:
+            logger.debug(f"Single-flight call {key[:12]} failed with no waiters: {flight.task.exception()}")
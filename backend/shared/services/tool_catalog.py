@@ -0,0 +1,175 @@
+"""In-process tool catalog.
+
+Agent executions resolve tools by id or name on every iteration. The catalog
+loads compact descriptors for all tools once, indexes them by id, name and
+MCP server + tool name, and is invalidated whenever tools are created,
+updated, deleted or re-synced from an MCP server. A TTL bounds staleness
+for changes made by other processes. Descriptors carry a fingerprint of
+their input schema so the compiled validator is looked up without
+re-serializing the schema.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+
+from ..config.settings import get_settings
+from ..database import get_database_session
+from ..models.tool import Tool, ToolStatus, ToolType
+from .schema_validator import SchemaViolation, schema_fingerprint, schema_validators
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ToolDescriptor:
+    """Compact, immutable view of a tool used for routing and lookup."""
+    id: str
+    name: str
+    description: Optional[str]
+    tool_type: ToolType
+    status: ToolStatus
+    input_schema: Dict[str, Any] = field(default_factory=dict, hash=False, compare=False)
+    category: Optional[str] = None
+    timeout_seconds: int = 30
+    mcp_server_id: Optional[str] = None
+    mcp_tool_name: Optional[str] = None
+    schema_fingerprint: Optional[str] = field(default=None, compare=False)
+
+    def validate_inputs(self, inputs: Dict[str, Any]) -> List[SchemaViolation]:
+        """Validate inputs with the cached, compiled validator for this schema."""
+        return schema_validators.validate(inputs, self.input_schema, self.schema_fingerprint)
+
+    def to_info(self) -> Dict[str, Any]:
+        """Tool info dictionary as consumed by the tool router."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "input_schema": self.input_schema,
+            "tool_type": self.tool_type
+        }
+
+
+class ToolCatalog:
+    """Tool descriptors indexed by id, name and MCP server + tool name."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else get_settings().tools.catalog_ttl_seconds
+        self._by_id: Dict[str, ToolDescriptor] = {}
+        self._by_name: Dict[str, ToolDescriptor] = {}
+        self._by_mcp: Dict[Tuple[str, str], ToolDescriptor] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    @staticmethod
+    def _describe(row: Any) -> ToolDescriptor:
+        metadata = row.tool_config_metadata or {}
+        mcp_server_id = getattr(row, "mcp_server_id", None) or metadata.get("mcp_server_id")
+        return ToolDescriptor(
+            id=str(row.id),
+            name=row.name,
+            description=row.description,
+            tool_type=row.tool_type,
+            status=row.status,
+            input_schema=row.input_schema or {},
+            schema_fingerprint=schema_fingerprint(row.input_schema) if row.input_schema else None,
+            category=row.category,
+            timeout_seconds=row.timeout_seconds or 30,
+            mcp_server_id=str(mcp_server_id) if mcp_server_id else None,
+            mcp_tool_name=getattr(row, "mcp_tool_name", None) or metadata.get("mcp_tool_name")
+        )
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return self.ttl_seconds <= 0 or time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def ensure_loaded(self) -> None:
+        """Load the catalog if it is empty, invalidated or expired."""
+        if self._is_fresh():
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._is_fresh():
+                await self._load()
+
+    async def _load(self) -> None:
+        generation = self._generation
+        async with get_database_session() as session:
+            result = await session.execute(
+                select(
+                    Tool.id, Tool.name, Tool.description, Tool.tool_type, Tool.status,
+                    Tool.input_schema, Tool.category, Tool.timeout_seconds,
+                    Tool.tool_config_metadata, Tool.mcp_server_id, Tool.mcp_tool_name
+                ).where(Tool.is_deleted.is_not(True)).order_by(Tool.created_at.desc())
+            )
+            descriptors = [self._describe(row) for row in result.all()]
+
+        self._index(descriptors)
+        # An invalidation that raced with the load leaves the snapshot stale
+        self._loaded_at = time.monotonic() if generation == self._generation else None
+        logger.debug(f"Tool catalog loaded with {len(descriptors)} tool(s)")
+
+    def _index(self, descriptors: Iterable[ToolDescriptor]) -> None:
+        # Names are not unique; descriptors come newest first and the first one wins
+        by_id, by_name, by_mcp = {}, {}, {}
+        for descriptor in descriptors:
+            by_id[descriptor.id] = descriptor
+            by_name.setdefault(descriptor.name, descriptor)
+            if descriptor.mcp_server_id and descriptor.mcp_tool_name:
+                by_mcp.setdefault((descriptor.mcp_server_id, descriptor.mcp_tool_name), descriptor)
+        self._by_id, self._by_name, self._by_mcp = by_id, by_name, by_mcp
+
+    def invalidate(self) -> None:
+        """Mark the catalog stale; the next lookup reloads it."""
+        self._generation += 1
+        self._loaded_at = None
+
+    async def get(self, identifier: str) -> Optional[ToolDescriptor]:
+        """Resolve a tool by id (UUID string) or by name."""
+        await self.ensure_loaded()
+        try:
+            return self._by_id.get(str(UUID(str(identifier)))) or self._by_name.get(identifier)
+        except (ValueError, TypeError):
+            return self._by_name.get(identifier)
+
+    async def get_by_name(self, name: str) -> Optional[ToolDescriptor]:
+        """Resolve a tool by name."""
+        await self.ensure_loaded()
+        return self._by_name.get(name)
+
+    async def get_mcp_tool(self, server_id: Any, tool_name: str) -> Optional[ToolDescriptor]:
+        """Resolve an MCP tool by server id and the server's own tool name."""
+        await self.ensure_loaded()
+        return self._by_mcp.get((str(server_id), tool_name))
+
+    async def resolve(self, identifiers: Iterable[str]) -> List[ToolDescriptor]:
+        """Resolve several identifiers, skipping unknown ones and duplicates."""
+        await self.ensure_loaded()
+        resolved: Dict[str, ToolDescriptor] = {}
+        for identifier in identifiers:
+            descriptor = await self.get(identifier)
+            if descriptor:
+                resolved.setdefault(descriptor.id, descriptor)
+        return list(resolved.values())
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get catalog statistics."""
+        return {
+            "tools": len(self._by_id),
+            "mcp_tools": len(self._by_mcp),
+            "loaded": self._loaded_at is not None,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+# Global tool catalog instance
+tool_catalog = ToolCatalog()
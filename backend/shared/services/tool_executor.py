@@ -8,6 +8,7 @@ This service handles the execution of tools during agent runs, including:
 """
 
 
+import asyncio
 import json
 import logging
 import re
@@ -16,9 +17,13 @@ from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..database import get_database_session
 from ..models.tool import Tool, ToolType, ToolStatus
 from ..models.agent import AgentConfig
 from ..services.tool_registry import ToolRegistryService
+from ..services.tool_catalog import tool_catalog
+from ..services.tool_output_store import render_output
+from ..config.settings import get_settings
 from ..services.mcp_gateway import MCPGatewayService
 from ..services.rag_service import RAGService
 from ..services.memory_manager import get_memory_manager
@@ -101,41 +106,27 @@ class ToolExecutorService:
                     tool_executions
                 )
             
-            if not tool_decision.get("needs_tool"):
+            tool_calls = self._normalize_tool_calls(tool_decision)
+            if not tool_calls:
                 logger.info("No tool needed, proceeding with direct response")
                 break
             
-            tool_name = tool_decision.get("tool_name")
-            tool_params = tool_decision.get("parameters", {})
+            logger.info(f"Executing {len(tool_calls)} tool call(s): {[c['tool_name'] for c in tool_calls]}")
             
-            logger.info(f"Executing tool: {tool_name} with params: {tool_params}")
-            
-            # Execute the tool
-            result = await self._execute_tool_by_name(
-                tool_name,
-                tool_params,
-                credentials.get("user_id") or agent_id, # Fallback if user_id missing, but we need REAL user_id for RAG owner. 
-                # This is a problem. analyze_and_execute_tools signature doesn't have user_id explicitly except in credentials?
-                # The caller should provide user_id. 
-                # In main.py or ChainOrchestrator, we usually have user context.
-                # credentials usually holds {"user_id": ...}
-                # Let's check call signature.
-                agent_id=agent_id
+            # Independent calls from one decision run concurrently; results keep plan order
+            results = await self._execute_tool_batch(
+                tool_calls,
+                (credentials or {}).get("user_id") or agent_id,
+                agent_id=agent_id,
+                max_concurrency=(agent_config.max_parallel_tools if agent_config else None)
             )
             
-            tool_executions.append({
-                "tool": tool_name,
-                "parameters": tool_params,
-                "result": result
-            })
-            
-            # Append result to input for next iteration (chaining)
-            # This allows the LLM to see the result and decide if more tools are needed
-            # For simplicity in this loop, we just collect results
-            # A more complex ReAct loop would update context here
-            
-            # If we have a successful result, check if we need another tool?
-            # The LLM router should decide in the next iteration.
+            for call, result in zip(tool_calls, results):
+                tool_executions.append({
+                    "tool": call["tool_name"],
+                    "parameters": call["parameters"],
+                    "result": result
+                })
             
         return tool_executions, total_usage
     
@@ -155,11 +146,12 @@ class ToolExecutorService:
             # Construct context from previous executions
             context_str = ""
             if previous_executions:
+                per_result = max(500, get_settings().tools.context_max_chars // len(previous_executions))
                 context_str = "PREVIOUS TOOL EXECUTIONS:\n"
                 for i, exec_data in enumerate(previous_executions, 1):
                     context_str += f"{i}. Tool: {exec_data['tool']}\n"
                     context_str += f"   Input: {json.dumps(exec_data['parameters'])}\n"
-                    context_str += f"   Output: {json.dumps(exec_data['result'].get('output'))}\n"
+                    context_str += f"   Output: {render_output(exec_data['result'].get('output'), per_result)}\n"
             
             # Prepare tools description
             tools_desc = json.dumps([{
@@ -182,13 +174,13 @@ STRICT CONSTRAINTS:
 1. OUTPUT ONLY VALID JSON.
 2. DO NOT include any explanations, code, or markdown blocks.
 3. If no tool is needed, return {{"needs_tool": false, "tool_name": null, "parameters": {{}} }}.
-4. If a tool IS needed, return {{"needs_tool": true, "tool_name": "exact_name", "parameters": {{...}} }}.
+4. If a tool IS needed, return {{"needs_tool": true, "tool_calls": [{{"tool_name": "exact_name", "parameters": {{...}} }}] }}.
+5. If several INDEPENDENT calls are needed (none uses another's output), list them all in "tool_calls"; they run in parallel.
 
 RESPONSE FORMAT:
 {{
   "needs_tool": boolean,
-  "tool_name": "string or null",
-  "parameters": {{ "key": "value" }}
+  "tool_calls": [{{ "tool_name": "string", "parameters": {{ "key": "value" }} }}]
 }}
 """
             
@@ -236,30 +228,80 @@ RESPONSE FORMAT:
             logger.error(f"LLM tool routing failed: {e}")
             return {"needs_tool": False}, None
 
-    async def _get_tools_info(self, tool_identifiers: List[str]) -> List[Dict[str, Any]]:
-        """Get tool information for the given identifiers."""
-        tools_info = []
+    def _normalize_tool_calls(self, decision: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Turn a routing decision into a list of distinct tool calls.
         
-        for identifier in tool_identifiers:
-            try:
-                # Try as UUID first
-                tool_id = UUID(identifier)
-                tool = await self.tool_registry.get_tool(tool_id)
-            except (ValueError, TypeError):
-                # Otherwise search by name
-                tools = await self.tool_registry.list_tools(limit=100)
-                tool = next((t for t in tools if t.name == identifier), None)
+        Accepts both the batch form (``tool_calls``) and the single-call
+        form (``tool_name``/``parameters``). Duplicate calls are dropped and
+        the batch is capped at ``max_calls_per_batch``.
+        """
+        if not decision or not decision.get("needs_tool"):
+            return []
+        
+        raw_calls = decision.get("tool_calls")
+        if not isinstance(raw_calls, list) or not raw_calls:
+            raw_calls = [{"tool_name": decision.get("tool_name"), "parameters": decision.get("parameters")}]
+        
+        calls = []
+        seen = set()
+        for raw in raw_calls:
+            if not isinstance(raw, dict) or not raw.get("tool_name"):
+                continue
+            parameters = raw.get("parameters") if isinstance(raw.get("parameters"), dict) else {}
+            key = (raw["tool_name"], json.dumps(parameters, sort_keys=True, default=str))
+            if key in seen:
+                continue
+            seen.add(key)
+            calls.append({"tool_name": raw["tool_name"], "parameters": parameters})
+        
+        max_calls = get_settings().tools.max_calls_per_batch
+        if len(calls) > max_calls:
+            logger.warning(f"Tool batch of {len(calls)} calls truncated to {max_calls}")
+            calls = calls[:max_calls]
+        return calls
+    
+    async def _execute_tool_batch(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        user_id: str,
+        agent_id: Optional[str] = None,
+        max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Execute independent tool calls concurrently.
+        
+        Args:
+            tool_calls: Calls as ``{"tool_name", "parameters"}`` dicts
+            user_id: ID of the user on whose behalf tools run
+            agent_id: ID of the agent executing tools
+            max_concurrency: Per-agent cap on concurrent calls
             
-            if tool:
-                tools_info.append({
-                    "id": str(tool.id),
-                    "name": tool.name,
-                    "description": tool.description,
-                    "input_schema": tool.input_schema,
-                    "tool_type": tool.tool_type
-                })
+        Returns:
+            One result per call, in the same order as ``tool_calls``
+        """
+        tool_settings = get_settings().tools
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or tool_settings.max_parallel_calls))
         
-        return tools_info
+        async def run(call: Dict[str, Any]) -> Dict[str, Any]:
+            descriptor = await tool_catalog.get_by_name(call["tool_name"])
+            timeout = (descriptor.timeout_seconds if descriptor else 0) or tool_settings.call_timeout_seconds
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        self._execute_tool_by_name(call["tool_name"], call["parameters"], user_id, agent_id=agent_id),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Tool {call['tool_name']} timed out after {timeout}s")
+                    return {"status": "error", "error": f"Tool timed out after {timeout}s"}
+        
+        if len(tool_calls) == 1:
+            return [await run(tool_calls[0])]
+        return list(await asyncio.gather(*[run(call) for call in tool_calls]))
+    
+    async def _get_tools_info(self, tool_identifiers: List[str]) -> List[Dict[str, Any]]:
+        """Get tool information for the given identifiers."""
+        tools = await tool_catalog.resolve(tool_identifiers)
+        return [tool.to_info() for tool in tools]
     
     async def _decide_tool_use(
         self,
@@ -372,8 +414,7 @@ RESPONSE FORMAT:
         """Execute a tool by name."""
         try:
             # Find tool by name
-            tools = await self.tool_registry.list_tools(limit=100)
-            tool = next((t for t in tools if t.name == tool_name), None)
+            tool = await tool_catalog.get_by_name(tool_name)
             
             if not tool:
                 # Check for system tools like knowledge_base that might not be in registry if manually added
@@ -385,12 +426,22 @@ RESPONSE FORMAT:
                     "error": f"Tool {tool_name} not found"
                 }
             
+            # Reject malformed calls before touching the database or sandbox
+            violations = tool.validate_inputs(parameters)
+            if violations:
+                return {
+                    "status": "error",
+                    "error": "Invalid parameters: " + "; ".join(f"{v.path}: {v.message}" for v in violations),
+                    "validation_errors": [v.to_dict() for v in violations]
+                }
+            
             # Execute the tool
             result = await self.tool_registry.execute_tool(
                 user_id=user_id,
                 tool_id=tool.id,
                 inputs=parameters,
-                context={"source": "agent_execution"}
+                context={"source": "agent_execution"},
+                validated=True
             )
             
             # Result is a dict, not a Pydantic model
@@ -417,7 +468,6 @@ RESPONSE FORMAT:
                 return {"status": "error", "error": "Query is required"}
                 
             memory_manager = await get_memory_manager()
-            rag_service = RAGService(self.session, memory_manager)
             
             # Parse user_id to UUID
             try:
@@ -437,7 +487,11 @@ RESPONSE FORMAT:
                 except ValueError:
                     pass
 
-            results = await rag_service.query(query, owner_id, limit, agent_id=parsed_agent_id)
+            # Own session: concurrent calls or a timeout cancelling the query
+            # must not touch the agent's session
+            async with get_database_session() as session:
+                rag_service = RAGService(session, memory_manager)
+                results = await rag_service.query(query, owner_id, limit, agent_id=parsed_agent_id)
             
             return {
                 "status": "success",
@@ -453,19 +507,27 @@ RESPONSE FORMAT:
     
     def format_tool_results_for_context(
         self,
-        tool_executions: List[Dict[str, Any]]
+        tool_executions: List[Dict[str, Any]],
+        max_chars: Optional[int] = None
     ) -> str:
-        """Format tool execution results for inclusion in agent context."""
+        """Format tool execution results for inclusion in agent context.
+        
+        Each result gets an equal share of the ``max_chars`` budget; longer
+        outputs are truncated and stored blobs are shown by their preview.
+        """
         if not tool_executions:
             return ""
         
+        budget = max_chars or get_settings().tools.context_max_chars
+        per_result = max(500, budget // len(tool_executions))
+        
         formatted = "\n\nTool Execution Results:\n"
         for i, execution in enumerate(tool_executions, 1):
             formatted += f"\n{i}. Tool: {execution['tool']}\n"
             formatted += f"   Parameters: {json.dumps(execution['parameters'], indent=2)}\n"
             
             if execution['result'].get('status') == 'success':
-                formatted += f"   Result: {json.dumps(execution['result'].get('output', {}), indent=2)}\n"
+                formatted += f"   Result: {render_output(execution['result'].get('output', {}), per_result)}\n"
             else:
                 formatted += f"   Error: {execution['result'].get('error', 'Unknown error')}\n"
         
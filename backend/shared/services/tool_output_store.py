@@ -0,0 +1,324 @@
+"""Blob storage for large tool outputs.
+
+Tool outputs above a size threshold are streamed to a blob store instead of
+being carried through memory, prompts and execution JSONB. Callers keep a
+small reference with a preview::
+
+    {"blob_ref": {"id": ..., "size_bytes": ..., "content_type": ..., "sha256": ...},
+     "preview": "...first characters...", "truncated": true}
+
+The store is a local directory (a stand-in for object storage); blobs are
+addressed by random ids and expire after a retention period. The user a
+blob was produced for is recorded next to it, and only that user (or an
+administrator) may read it back.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterable, Dict, Iterable, Optional, Union
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+BLOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+EXTENSIONS = {"application/json": ".json", "text/plain": ".txt"}
+OWNER_SUFFIX = ".owner"
+WRITE_BUFFER_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    """Reference to a stored blob."""
+    id: str
+    size_bytes: int
+    content_type: str
+    sha256: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "size_bytes": self.size_bytes,
+            "content_type": self.content_type,
+            "sha256": self.sha256
+        }
+
+
+class _BlobWriter:
+    """Incrementally writes one blob to a temporary file."""
+
+    def __init__(self, store: "ToolOutputStore", content_type: str):
+        self.store = store
+        self.content_type = content_type
+        self.blob_id = uuid.uuid4().hex
+        self.path = store.path_for_new(self.blob_id, content_type)
+        self.tmp_path = self.path.with_suffix(self.path.suffix + ".part")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.handle = open(self.tmp_path, "wb")
+
+    def write(self, chunk: Union[str, bytes]) -> None:
+        data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        self.handle.write(data)
+        self.digest.update(data)
+        self.size += len(data)
+
+    def commit(self) -> BlobRef:
+        self.handle.close()
+        os.replace(self.tmp_path, self.path)
+        return BlobRef(self.blob_id, self.size, self.content_type, self.digest.hexdigest())
+
+    def abort(self) -> None:
+        self.handle.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class ToolOutputStore:
+    """Spills large tool outputs to blobs and renders bounded previews."""
+
+    def __init__(
+        self,
+        root_dir: Optional[str] = None,
+        spill_threshold_bytes: Optional[int] = None,
+        preview_chars: Optional[int] = None,
+        retention_hours: Optional[float] = None
+    ):
+        tool_settings = get_settings().tools
+        self.root = Path(root_dir or tool_settings.output_store_dir)
+        self.spill_threshold_bytes = spill_threshold_bytes or tool_settings.output_spill_threshold_bytes
+        self.preview_chars = preview_chars or tool_settings.output_preview_chars
+        self.retention_seconds = (retention_hours or tool_settings.output_retention_hours) * 3600
+        self._last_purge = 0.0
+        self.spilled = 0
+
+    @property
+    def blob_dir(self) -> Path:
+        path = self.root / "blobs"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    @property
+    def incoming_dir(self) -> Path:
+        """Directory where sandbox workers write spilled results."""
+        path = self.root / "incoming"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def path_for_new(self, blob_id: str, content_type: str) -> Path:
+        return self.blob_dir / f"{blob_id}{EXTENSIONS.get(content_type, '.bin')}"
+
+    def path_for(self, blob_id: str) -> Optional[Path]:
+        """Path of an existing blob, or None for unknown or malformed ids."""
+        if not BLOB_ID_PATTERN.match(blob_id or ""):
+            return None
+        for extension in (*EXTENSIONS.values(), ".bin"):
+            path = self.blob_dir / f"{blob_id}{extension}"
+            if path.exists():
+                return path
+        return None
+
+    @staticmethod
+    def is_reference(value: Any) -> bool:
+        return isinstance(value, dict) and isinstance(value.get("blob_ref"), dict)
+
+    def reference(self, ref: BlobRef, preview: str, owner: Optional[str] = None) -> Dict[str, Any]:
+        if owner:
+            (self.blob_dir / f"{ref.id}{OWNER_SUFFIX}").write_text(owner)
+        self.spilled += 1
+        return {"blob_ref": ref.to_dict(), "preview": preview, "truncated": True}
+
+    def owner_of(self, blob_id: str) -> Optional[str]:
+        """The user a blob was stored for, or None if unknown."""
+        if not BLOB_ID_PATTERN.match(blob_id or ""):
+            return None
+        try:
+            return (self.blob_dir / f"{blob_id}{OWNER_SUFFIX}").read_text().strip() or None
+        except OSError:
+            return None
+
+    def _preview(self, path: Path) -> str:
+        # Reading a few bytes per character is enough for UTF-8 text
+        with open(path, "rb") as handle:
+            head = handle.read(self.preview_chars * 4)
+        return head.decode("utf-8", errors="ignore")[:self.preview_chars]
+
+    def _spill_sync(self, output: Any, owner: Optional[str]) -> Optional[Dict[str, Any]]:
+        if isinstance(output, str):
+            if len(output) * 4 <= self.spill_threshold_bytes and len(output.encode("utf-8")) <= self.spill_threshold_bytes:
+                return None
+            writer = _BlobWriter(self, "text/plain")
+            try:
+                writer.write(output)
+                ref = writer.commit()
+            except BaseException:
+                writer.abort()
+                raise
+            return self.reference(ref, output[:self.preview_chars], owner)
+
+        # Encode incrementally; nothing is written unless the threshold is crossed
+        buffered, size, writer = [], 0, None
+        try:
+            for chunk in json.JSONEncoder(default=str).iterencode(output):
+                if writer is None:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                    if size <= self.spill_threshold_bytes:
+                        continue
+                    writer = _BlobWriter(self, "application/json")
+                    writer.write("".join(buffered))
+                    buffered = []
+                else:
+                    buffered.append(chunk)
+                    size += len(chunk)
+                    if size >= WRITE_BUFFER_BYTES:
+                        writer.write("".join(buffered))
+                        buffered, size = [], 0
+            if writer is None:
+                return None
+            if buffered:
+                writer.write("".join(buffered))
+            ref = writer.commit()
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        return self.reference(ref, self._preview(self.path_for(ref.id)), owner)
+
+    async def spill_if_large(self, output: Any, owner: Optional[str] = None) -> Any:
+        """Return ``output`` unchanged, or a blob reference if it is too large.
+
+        ``owner`` is the id of the user allowed to read the blob back.
+        """
+        if output is None or self.is_reference(output) or isinstance(output, (int, float, bool)):
+            return output
+        reference = await asyncio.to_thread(self._spill_sync, output, owner)
+        if reference is None:
+            return output
+        self._maybe_purge()
+        logger.debug(f"Spilled tool output of {reference['blob_ref']['size_bytes']} bytes to blob {reference['blob_ref']['id']}")
+        return reference
+
+    async def put_stream(
+        self,
+        chunks: Union[AsyncIterable[Union[str, bytes]], Iterable[Union[str, bytes]]],
+        content_type: str = "text/plain",
+        owner: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Stream chunks into a new blob and return its reference."""
+        writer = await asyncio.to_thread(_BlobWriter, self, content_type)
+        try:
+            if hasattr(chunks, "__aiter__"):
+                async for chunk in chunks:
+                    writer.write(chunk)
+            else:
+                for chunk in chunks:
+                    writer.write(chunk)
+            ref = await asyncio.to_thread(writer.commit)
+        except BaseException:
+            writer.abort()
+            raise
+        self._maybe_purge()
+        preview = await asyncio.to_thread(self._preview, self.path_for(ref.id))
+        return await asyncio.to_thread(self.reference, ref, preview, owner)
+
+    def _adopt_sync(self, path: str, content_type: str, owner: Optional[str]) -> Dict[str, Any]:
+        source = Path(path).resolve()
+        # Only files written into the incoming directory may be adopted
+        if source.parent != self.incoming_dir.resolve() or not source.is_file():
+            raise ValueError(f"Refusing to adopt spilled output outside the store: {path}")
+        blob_id = uuid.uuid4().hex
+        target = self.path_for_new(blob_id, content_type)
+        digest, size = hashlib.sha256(), 0
+        with open(source, "rb") as handle:
+            for block in iter(lambda: handle.read(WRITE_BUFFER_BYTES), b""):
+                digest.update(block)
+                size += len(block)
+        os.replace(source, target)
+        return self.reference(BlobRef(blob_id, size, content_type, digest.hexdigest()), self._preview(target), owner)
+
+    async def adopt(
+        self,
+        path: str,
+        content_type: str = "application/json",
+        owner: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Move a file spilled by a sandbox worker into the store."""
+        reference = await asyncio.to_thread(self._adopt_sync, path, content_type, owner)
+        self._maybe_purge()
+        return reference
+
+    async def read(self, blob_id: str, offset: int = 0, limit: Optional[int] = None) -> Optional[bytes]:
+        """Read (part of) a blob; returns None if it does not exist."""
+        path = self.path_for(blob_id)
+        if path is None:
+            return None
+
+        def _read() -> bytes:
+            with open(path, "rb") as handle:
+                handle.seek(offset)
+                return handle.read() if limit is None else handle.read(limit)
+
+        return await asyncio.to_thread(_read)
+
+    def content_type_of(self, blob_id: str) -> str:
+        path = self.path_for(blob_id)
+        for content_type, extension in EXTENSIONS.items():
+            if path is not None and path.suffix == extension:
+                return content_type
+        return "application/octet-stream"
+
+    def _maybe_purge(self) -> None:
+        if time.time() - self._last_purge > 3600:
+            self._last_purge = time.time()
+            asyncio.ensure_future(asyncio.to_thread(self.purge_expired))
+
+    def purge_expired(self) -> int:
+        """Delete blobs (and abandoned spills) older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        removed = 0
+        for directory in (self.blob_dir, self.incoming_dir):
+            for path in directory.iterdir():
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        removed += 1
+                except OSError:
+                    continue
+        if removed:
+            logger.info(f"Purged {removed} expired tool output blob(s)")
+        return removed
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        return {
+            "spilled": self.spilled,
+            "spill_threshold_bytes": self.spill_threshold_bytes,
+            "root": str(self.root)
+        }
+
+
+def render_output(output: Any, max_chars: int) -> str:
+    """Render a tool output for an LLM prompt within ``max_chars``."""
+    if ToolOutputStore.is_reference(output):
+        ref = output["blob_ref"]
+        preview = output.get("preview", "")[:max_chars]
+        return (
+            f"{preview}\n   [Output truncated: {ref['size_bytes']} bytes stored as blob {ref['id']}; "
+            f"showing the first {len(preview)} characters]"
+        )
+    rendered = output if isinstance(output, str) else json.dumps(output, indent=2, default=str)
+    if len(rendered) <= max_chars:
+        return rendered
+    return f"{rendered[:max_chars]}\n   [Output truncated: showing {max_chars} of {len(rendered)} characters]"
+
+
+# Global tool output store
+tool_output_store = ToolOutputStore()
@@ -5,11 +5,7 @@ This service manages custom tools and their lifecycle including validation,
 registration, and execution.
 """
 
-import asyncio
-import json
 import logging
-import subprocess
-import tempfile
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
@@ -24,6 +20,11 @@ from ..models.tool import Tool, ToolType, ToolStatus, ToolRequest, ToolResponse
 from ..models.audit import AuditLog, AuditEventType
 from ..services.base import BaseService
 from ..services.validation import ValidationService
+from ..services.tool_catalog import tool_catalog
+from ..services.sandbox_pool import sandbox_pool, SandboxError, SandboxTimeoutError, SpilledOutput
+from ..services.tool_output_store import tool_output_store
+from ..services.tool_result_cache import tool_result_cache
+from ..services.tool_usage_stats import tool_usage_recorder
 # from ..services.rbac import RBACService # RBAC Disabled for single-tenant simplified
 from ..logging.config import get_logger
 
@@ -85,6 +86,7 @@ class ToolRegistryService(BaseService):
             session.add(tool)
             await session.commit()
             await session.refresh(tool)
+            tool_catalog.invalidate()
             
             logger.info(
                 "Tool created successfully",
@@ -183,6 +185,7 @@ class ToolRegistryService(BaseService):
             
             await session.commit()
             await session.refresh(tool)
+            tool_catalog.invalidate()
             
             return ToolResponse.model_validate(tool)
     
@@ -201,6 +204,7 @@ class ToolRegistryService(BaseService):
             
             await session.delete(tool)
             await session.commit()
+            tool_catalog.invalidate()
             
             return True
     
@@ -229,6 +233,7 @@ class ToolRegistryService(BaseService):
                 tool.status = ToolStatus.ERROR
             
             await session.commit()
+            tool_catalog.invalidate()
             
             return {
                 "tool_id": str(tool_id),
@@ -243,68 +248,106 @@ class ToolRegistryService(BaseService):
         tool_id: UUID,
         inputs: Dict[str, Any],
         context: Optional[Dict[str, Any]] = None,
-        timeout_override: Optional[int] = None
+        timeout_override: Optional[int] = None,
+        validated: bool = False
     ) -> Dict[str, Any]:
-        """Execute a tool with given inputs."""
+        """Execute a tool with given inputs.
+
+        ``validated`` skips the input schema check for callers that already
+        ran it against the catalog descriptor.
+        """
         
+        # The session is only needed to load the tool; none is held while it runs
         async with get_database_session() as session:
             result = await session.execute(select(Tool).where(Tool.id == tool_id))
             tool = result.scalar_one_or_none()
-            
-            if not tool:
-                raise ValueError(f"Tool with ID {tool_id} not found")
-            
-            # Allow executing drafts for testing?
-            # if tool.status != ToolStatus.ACTIVE:
-            #     raise ToolExecutionError(f"Tool is not active (status: {tool.status})")
-            
-            execution_id = str(uuid4())
-            start_time = time.time()
-            
-            try:
-                if tool.input_schema:
-                    self.validation_service.validate_json_schema(inputs, tool.input_schema)
-                
-                if tool.tool_type == ToolType.CUSTOM:
-                    outputs = await self._execute_custom_tool(tool, inputs, context, timeout_override)
-                elif tool.tool_type == ToolType.MCP_SERVER:
-                    outputs = await self._execute_mcp_tool(tool, inputs, context, timeout_override)
-                else:
-                    raise ToolExecutionError(f"Unsupported tool type: {tool.tool_type}")
-                
-                execution_time = int((time.time() - start_time) * 1000)
-                
-                tool.usage_count += 1
-                tool.last_used_at = datetime.utcnow()
-                
-                if tool.average_execution_time:
-                    tool.average_execution_time = int((tool.average_execution_time + execution_time) / 2)
-                else:
-                    tool.average_execution_time = execution_time
-                
-                await session.commit()
+        
+        if not tool:
+            raise ValueError(f"Tool with ID {tool_id} not found")
+        
+        # Allow executing drafts for testing?
+        # if tool.status != ToolStatus.ACTIVE:
+        #     raise ToolExecutionError(f"Tool is not active (status: {tool.status})")
+        
+        execution_id = str(uuid4())
+        start_time = time.time()
+        
+        try:
+            if tool.input_schema and not validated:
+                validation_errors = self.validation_service.json_schema_errors(inputs, tool.input_schema)
+                if validation_errors:
+                    raise ToolValidationError(validation_errors)
+            
+            cache_hit, outputs = await tool_result_cache.get(tool, inputs, context)
+            if cache_hit:
+                tool_usage_recorder.record(tool.id, cache_hit=True)
                 
                 return {
                     "tool_id": str(tool_id),
                     "execution_id": execution_id,
                     "status": "success",
                     "outputs": outputs,
-                    "execution_time": execution_time,
-                    "started_at": datetime.fromtimestamp(start_time).isoformat(),
-                    "completed_at": datetime.utcnow().isoformat()
-                }
-                
-            except Exception as e:
-                execution_time = int((time.time() - start_time) * 1000)
-                return {
-                    "tool_id": str(tool_id),
-                    "execution_id": execution_id,
-                    "status": "error",
-                    "error": str(e),
-                    "execution_time": execution_time,
+                    "execution_time": int((time.time() - start_time) * 1000),
+                    "cache_hit": True,
                     "started_at": datetime.fromtimestamp(start_time).isoformat(),
                     "completed_at": datetime.utcnow().isoformat()
                 }
+            
+            if tool.tool_type == ToolType.CUSTOM:
+                outputs = await self._execute_custom_tool(tool, inputs, context, timeout_override)
+            elif tool.tool_type == ToolType.MCP_SERVER:
+                outputs = await self._execute_mcp_tool(tool, inputs, context, timeout_override)
+            else:
+                raise ToolExecutionError(f"Unsupported tool type: {tool.tool_type}")
+            
+            # Large outputs are kept as blobs readable by the caller; only a reference and preview travel on
+            owner = str(user_id) if user_id else None
+            if isinstance(outputs, SpilledOutput):
+                outputs = await tool_output_store.adopt(outputs.path, owner=owner)
+            else:
+                outputs = await tool_output_store.spill_if_large(outputs, owner=owner)
+            
+            execution_time = int((time.time() - start_time) * 1000)
+            
+            # Usage counters are flushed in batches, off the request path
+            tool_usage_recorder.record(tool.id, execution_time)
+            await tool_result_cache.set(tool, inputs, outputs, context)
+            
+            return {
+                "tool_id": str(tool_id),
+                "execution_id": execution_id,
+                "status": "success",
+                "outputs": outputs,
+                "execution_time": execution_time,
+                "cache_hit": False if tool_result_cache.is_cacheable(tool) else None,
+                "started_at": datetime.fromtimestamp(start_time).isoformat(),
+                "completed_at": datetime.utcnow().isoformat()
+            }
+            
+        except ToolValidationError as e:
+            return {
+                "tool_id": str(tool_id),
+                "execution_id": execution_id,
+                "status": "error",
+                "error": "Input validation failed: " + "; ".join(
+                    f"{error['path']}: {error['message']}" for error in e.args[0]
+                ),
+                "validation_errors": e.args[0],
+                "execution_time": int((time.time() - start_time) * 1000),
+                "started_at": datetime.fromtimestamp(start_time).isoformat(),
+                "completed_at": datetime.utcnow().isoformat()
+            }
+        except Exception as e:
+            execution_time = int((time.time() - start_time) * 1000)
+            return {
+                "tool_id": str(tool_id),
+                "execution_id": execution_id,
+                "status": "error",
+                "error": str(e),
+                "execution_time": execution_time,
+                "started_at": datetime.fromtimestamp(start_time).isoformat(),
+                "completed_at": datetime.utcnow().isoformat()
+            }
     
     async def get_tool_templates(self) -> List[Dict[str, Any]]:
         """Get available tool templates for development."""
@@ -318,7 +361,9 @@ class ToolRegistryService(BaseService):
                     "type": "object",
                     "properties": {"location": {"type": "string"}},
                     "required": ["location"]
-                }
+                },
+                "cacheable": True,
+                "cache_ttl_seconds": 600
             },
             {
                 "name": "wikipedia_template",
@@ -329,7 +374,9 @@ class ToolRegistryService(BaseService):
                     "type": "object",
                     "properties": {"query": {"type": "string"}},
                     "required": ["query"]
-                }
+                },
+                "cacheable": True,
+                "cache_ttl_seconds": 3600
             }
         ]
     
@@ -381,62 +428,19 @@ class ToolRegistryService(BaseService):
         return ValidationResult(is_valid=len(errors) == 0, errors=errors)
 
     async def _execute_custom_tool(self, tool, inputs, context, timeout_override):
-        # Simply mocked execution as unsafe subprocess execution needs more care in refactor
-        # But keeping structure:
         if not tool.code: return {"error": "No code"}
-        # For simplicity in this environment, we might skip actual execution or keep it minimal
-        # The original used subprocess, which is fine if environment allows python.
-        
-        # Creating temp file...
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(tool.code)
-            temp_file = f.name
-        
-        execution_script = f'''
-import json
-import sys
-import importlib.util
-from datetime import datetime
-
-# Mock context
-sys.path.insert(0, '.')
-
-try:
-    spec = importlib.util.spec_from_file_location("tool_module", r"{temp_file}")
-    tool_module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(tool_module)
-    
-    inputs = {json.dumps(inputs)}
-    context = {json.dumps(context or {})}
-    
-    result = tool_module.execute(inputs, context)
-    print(json.dumps({{"status": "success", "result": result}}))
-except Exception as e:
-    print(json.dumps({{"status": "error", "error": str(e)}}))
-'''
-        # We need to run this command.
-        # Check if python is available in container. It is.
-        proc = await asyncio.create_subprocess_exec(
-            'python', '-c', execution_script,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await proc.communicate()
-        
-        import os
-        try: os.unlink(temp_file)
-        except: pass
-
-        if proc.returncode != 0:
-            raise ToolExecutionError(f"Execution failed: {stderr.decode()}")
         
+        timeout = timeout_override or tool.timeout_seconds or 30
         try:
-            res = json.loads(stdout.decode())
-            if res['status'] == 'error':
-                 raise ToolExecutionError(res['error'])
-            return res['result']
-        except json.JSONDecodeError:
-             raise ToolExecutionError(f"Invalid output: {stdout.decode()}")
+            return await sandbox_pool.execute(
+                tool.code, inputs, context, timeout=timeout,
+                spill_dir=str(tool_output_store.incoming_dir),
+                spill_threshold_bytes=tool_output_store.spill_threshold_bytes
+            )
+        except SandboxTimeoutError as e:
+            raise ToolExecutionError(str(e))
+        except SandboxError as e:
+            raise ToolExecutionError(f"Execution failed: {e}")
 
     async def _execute_mcp_tool(self, tool, inputs, context, timeout):
         return {"status": "not_implemented"}
@@ -0,0 +1,136 @@
+"""Tool result caching.
+
+Results of tools that opt in via ``Tool.cacheable`` are stored in an
+``AppCache`` (in-process L1, Redis L2) keyed by tool id, tool version and
+code hash, and the canonical JSON form of the inputs and the execution
+context (which tool code receives as its second argument). Changing a tool's
+code or version therefore never serves stale results.
+
+Outputs are stored as JSON text and decoded on every hit, so callers get
+their own copy and mutating it cannot alter the cached result.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from ..config.settings import get_settings
+from .cache import AppCache, CacheConfig, CacheStrategy
+from .tool_output_store import ToolOutputStore
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACE = "tool_results"
+
+
+@dataclass
+class ToolCacheStats:
+    """Tool result cache statistics"""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def canonical_inputs(inputs: Dict[str, Any]) -> str:
+    """Serialize inputs so that equivalent dicts produce identical keys."""
+    return json.dumps(inputs or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """Caches outputs of cacheable tools."""
+
+    def __init__(self, app_cache: Optional[AppCache] = None):
+        tool_settings = get_settings().tools
+        self.enabled = tool_settings.result_cache_enabled
+        self.default_ttl = tool_settings.result_cache_default_ttl_seconds
+        self._cache = app_cache
+        self.stats = ToolCacheStats()
+
+    @property
+    def cache(self) -> AppCache:
+        if self._cache is None:
+            settings = get_settings()
+            config = CacheConfig(
+                max_memory_mb=settings.tools.result_cache_max_memory_mb,
+                default_ttl_seconds=self.default_ttl,
+                strategy=CacheStrategy.LRU,
+                enable_l2=settings.tools.result_cache_l2
+            )
+            self._cache = AppCache(redis.from_url(settings.redis.url, decode_responses=True), config)
+        return self._cache
+
+    def is_cacheable(self, tool: Any) -> bool:
+        return self.enabled and bool(getattr(tool, "cacheable", False))
+
+    def _key(self, tool: Any, inputs: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> str:
+        code_digest = hashlib.sha256((tool.code or "").encode("utf-8")).hexdigest()[:16]
+        call = f"{canonical_inputs(inputs)}\n{canonical_inputs(context)}"
+        call_digest = hashlib.sha256(call.encode("utf-8")).hexdigest()
+        return f"{tool.id}:{tool.version}:{code_digest}:{call_digest}"
+
+    async def get(
+        self, tool: Any, inputs: Dict[str, Any], context: Optional[Dict[str, Any]] = None
+    ) -> Tuple[bool, Any]:
+        """Look up a cached result.
+
+        Returns:
+            Tuple of (hit, outputs)
+        """
+        if not self.is_cacheable(tool):
+            return False, None
+        entry = await self.cache.get(self._key(tool, inputs, context), namespace=CACHE_NAMESPACE)
+        if isinstance(entry, dict) and isinstance(entry.get("outputs_json"), str):
+            self.stats.hits += 1
+            return True, json.loads(entry["outputs_json"])
+        self.stats.misses += 1
+        return False, None
+
+    async def set(
+        self, tool: Any, inputs: Dict[str, Any], outputs: Any, context: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Store a successful result for a cacheable tool."""
+        if not self.is_cacheable(tool):
+            return False
+        # Tools report failures in-band as {"error": ...}; never cache those
+        if isinstance(outputs, dict) and outputs.get("error"):
+            return False
+        # Spilled outputs are blobs readable only by their owner and purged after the
+        # retention period, so a cached reference could outlive its blob or leak to others
+        if ToolOutputStore.is_reference(outputs):
+            return False
+        try:
+            outputs_json = json.dumps(outputs)
+        except (TypeError, ValueError):
+            return False
+        ttl = tool.cache_ttl_seconds or self.default_ttl
+        stored = await self.cache.set(
+            self._key(tool, inputs, context),
+            {"outputs_json": outputs_json},
+            ttl=ttl,
+            namespace=CACHE_NAMESPACE
+        )
+        if stored:
+            self.stats.stores += 1
+        return stored
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "stores": self.stats.stores,
+            "hit_rate": round(self.stats.hit_rate, 4)
+        }
+
+
+# Global tool result cache
+tool_result_cache = ToolResultCache()
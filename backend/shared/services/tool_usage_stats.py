@@ -0,0 +1,289 @@
+"""Write-behind tool usage statistics.
+
+Tool executions record their usage in memory; a background task flushes the
+aggregated counters to the ``tools`` table periodically with one batched
+``UPDATE ... FROM (VALUES ...)`` statement, so the execution hot path never
+takes a row lock or commits. The persisted average is an exact running mean
+weighted by ``execution_count``. Latency percentiles are tracked per process
+with a mergeable log-bucket sketch (relative-error quantiles, in the style of
+DDSketch) and exposed through ``get_statistics``.
+"""
+
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from ..config.settings import get_settings
+from ..database import get_database_session
+
+logger = logging.getLogger(__name__)
+
+
+class LatencySketch:
+    """Streaming quantile sketch with bounded relative error.
+
+    Values are counted in logarithmically sized buckets; any quantile is
+    answered within ``relative_accuracy`` of the true value using a few
+    hundred integers of memory regardless of how many values were added.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            self._collapse_lowest()
+
+    def _collapse_lowest(self) -> None:
+        # Fold the two lowest buckets together; only low quantiles lose accuracy
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other: "LatencySketch") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        while len(self.buckets) > self.max_buckets:
+            self._collapse_lowest()
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile ``q`` (0..1)."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+@dataclass
+class PendingUsage:
+    """Usage recorded for one tool since the last flush."""
+    calls: int = 0
+    executions: int = 0
+    total_ms: int = 0
+    last_used_at: Optional[datetime] = None
+
+    def merge(self, other: "PendingUsage") -> None:
+        self.calls += other.calls
+        self.executions += other.executions
+        self.total_ms += other.total_ms
+        if other.last_used_at and (self.last_used_at is None or other.last_used_at > self.last_used_at):
+            self.last_used_at = other.last_used_at
+
+
+@dataclass
+class ToolUsageStats:
+    """Lifetime statistics of one tool in this process."""
+    calls: int = 0
+    cache_hits: int = 0
+    latency: LatencySketch = field(default_factory=LatencySketch)
+
+
+class ToolUsageRecorder:
+    """Aggregates tool usage in memory and flushes it in batches."""
+
+    def __init__(self, flush_interval: Optional[float] = None, max_pending: Optional[int] = None):
+        tool_settings = get_settings().tools
+        self.flush_interval = flush_interval if flush_interval is not None else tool_settings.usage_flush_interval_seconds
+        self.max_pending = max_pending or tool_settings.usage_flush_max_pending
+        self._pending: Dict[str, PendingUsage] = {}
+        self._stats: Dict[str, ToolUsageStats] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._running = False
+        self._closed = False
+        self.flushes = 0
+        self.flush_failures = 0
+
+    def record(self, tool_id: Any, execution_time_ms: Optional[int] = None, cache_hit: bool = False) -> None:
+        """Record one successful tool use.
+
+        Args:
+            tool_id: Tool identifier
+            execution_time_ms: Execution time; omitted for cache hits so they
+                do not skew the persisted average
+            cache_hit: Whether the result was served from the result cache
+        """
+        key = str(tool_id)
+        pending = self._pending.setdefault(key, PendingUsage())
+        pending.calls += 1
+        pending.last_used_at = datetime.now(timezone.utc)
+
+        stats = self._stats.setdefault(key, ToolUsageStats())
+        stats.calls += 1
+        if cache_hit:
+            stats.cache_hits += 1
+        elif execution_time_ms is not None:
+            pending.executions += 1
+            pending.total_ms += int(execution_time_ms)
+            stats.latency.add(execution_time_ms)
+
+        # Processes that never call start() (workers, scripts) flush too
+        if not self._closed:
+            self._start_flusher()
+        if len(self._pending) >= self.max_pending and self._running:
+            asyncio.ensure_future(self.flush())
+
+    async def start(self) -> None:
+        """Start the periodic flush task."""
+        self._closed = False
+        self._start_flusher()
+
+    def _start_flusher(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Recorded outside an event loop; flushed once one starts the task
+        task = self._flush_task
+        if self._running and task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._running = True
+        self._flush_task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._running:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write pending usage to the database; returns the number of tools updated."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            try:
+                await self._write(batch)
+                self.flushes += 1
+                return len(batch)
+            except Exception as e:
+                self.flush_failures += 1
+                logger.warning(f"Failed to flush usage for {len(batch)} tool(s), will retry: {e}")
+                # Keep the counts for the next flush
+                for key, usage in batch.items():
+                    self._pending.setdefault(key, PendingUsage()).merge(usage)
+                return 0
+
+    @staticmethod
+    def _build_update(batch: Dict[str, PendingUsage]) -> tuple:
+        rows: List[str] = []
+        params: Dict[str, Any] = {}
+        for n, (tool_id, usage) in enumerate(batch.items()):
+            rows.append(
+                f"(CAST(:id_{n} AS uuid), CAST(:calls_{n} AS integer), CAST(:executions_{n} AS integer), "
+                f"CAST(:total_{n} AS bigint), CAST(:last_used_{n} AS timestamptz))"
+            )
+            params.update({
+                f"id_{n}": tool_id,
+                f"calls_{n}": usage.calls,
+                f"executions_{n}": usage.executions,
+                f"total_{n}": usage.total_ms,
+                f"last_used_{n}": usage.last_used_at
+            })
+        # SET expressions see the row's previous values, so the running mean
+        # is weighted by the old execution_count
+        statement = f"""
+            UPDATE tools AS t SET
+                usage_count = COALESCE(t.usage_count, 0) + v.calls,
+                last_used_at = GREATEST(t.last_used_at, v.last_used),
+                average_execution_time = CASE
+                    WHEN v.executions = 0 THEN t.average_execution_time
+                    ELSE ROUND(
+                        (COALESCE(t.average_execution_time, 0)::numeric * t.execution_count + v.total_ms)
+                        / (t.execution_count + v.executions)
+                    )
+                END,
+                execution_count = t.execution_count + v.executions
+            FROM (VALUES {", ".join(rows)}) AS v(id, calls, executions, total_ms, last_used)
+            WHERE t.id = v.id
+        """
+        return text(statement), params
+
+    async def _write(self, batch: Dict[str, PendingUsage]) -> None:
+        statement, params = self._build_update(batch)
+        async with get_database_session() as session:
+            await session.execute(statement, params)
+            await session.commit()
+
+    async def aclose(self) -> None:
+        """Stop the flush task and write any remaining usage."""
+        self._closed = True
+        self._running = False
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    def get_tool_statistics(self, tool_id: Any) -> Optional[Dict[str, Any]]:
+        """Latency and call statistics for one tool in this process."""
+        stats = self._stats.get(str(tool_id))
+        if stats is None:
+            return None
+        latency = stats.latency
+        return {
+            "calls": stats.calls,
+            "cache_hits": stats.cache_hits,
+            "executions": latency.count,
+            "mean_ms": round(latency.mean, 2) if latency.mean is not None else None,
+            "p50_ms": latency.quantile(0.5),
+            "p95_ms": latency.quantile(0.95),
+            "p99_ms": latency.quantile(0.99),
+            "max_ms": latency.max
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get recorder statistics."""
+        return {
+            "pending_tools": len(self._pending),
+            "tracked_tools": len(self._stats),
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures
+        }
+
+
+# Global tool usage recorder
+tool_usage_recorder = ToolUsageRecorder()
@@ -12,6 +12,7 @@ from shared.models.rbac import Role, Permission
 from shared.models.agent import Agent, AgentConfig
 from shared.models.workflow import Workflow, WorkflowExecution
 from shared.models.audit import AuditLog
+from .schema_validator import schema_validators
 
 T = TypeVar('T', bound=BaseModel)
 
@@ -83,17 +84,18 @@ class ValidationService:
     @staticmethod
     def validate_json_schema(data: Any, schema: Dict[str, Any]) -> bool:
         """Validate data against a JSON schema."""
-        try:
-            import jsonschema
-            try:
-                jsonschema.validate(data, schema)
-                return True
-            except (jsonschema.ValidationError, jsonschema.SchemaError):
-                return False
-        except ImportError:
-            # If jsonschema is not installed, log warning and return True (allow)
-            # or return False (strict). For now, strict but safe.
-            return False
+        return not ValidationService.json_schema_errors(data, schema)
+    
+    @staticmethod
+    def json_schema_errors(
+        data: Any, schema: Dict[str, Any], fingerprint: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Validate data against a JSON schema and return structured errors.
+
+        Passing the schema's ``fingerprint`` skips re-serializing it to find the
+        compiled validator.
+        """
+        return [violation.to_dict() for violation in schema_validators.validate(data, schema, fingerprint)]
     
     @staticmethod
     def sanitize_input(data: Any) -> Any:
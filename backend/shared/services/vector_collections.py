@@ -0,0 +1,94 @@
+"""Chroma collections compared by cosine distance.
+
+Embedding providers differ in whether they return unit vectors: Ollama's
+``/api/embed`` normalizes, its older ``/api/embeddings`` does not, and
+sentence-transformers depends on the model. Collections used to be created
+with Chroma's default L2 distance, where a vector's length changes the
+ranking, so vectors written by one endpoint could not be compared with
+queries embedded by another. Cosine distance ignores length, so stored and
+query vectors stay comparable whichever endpoint produced them, and
+``1 - distance`` is the cosine similarity the memory threshold expects.
+
+Chroma cannot change the distance of an existing collection, so L2
+collections are copied into a cosine collection under the same name. The
+stored vectors are reused as they are; nothing is re-embedded.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DISTANCE_KEY = "hnsw:space"
+DISTANCE = "cosine"
+MIGRATION_SUFFIX = "__cosine_migration"
+COPY_BATCH_SIZE = 1000
+
+
+def cosine_metadata(metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Collection metadata selecting cosine distance."""
+    return {**(metadata or {}), DISTANCE_KEY: DISTANCE}
+
+
+def is_cosine(collection: Any) -> bool:
+    return (collection.metadata or {}).get(DISTANCE_KEY) == DISTANCE
+
+
+def get_or_create_collection(client: Any, name: str, metadata: Optional[Dict[str, Any]] = None) -> Any:
+    """Get a collection, creating it with cosine distance if it does not exist."""
+    return client.get_or_create_collection(name=name, metadata=cosine_metadata(metadata))
+
+
+def migrate_to_cosine(client: Any, collection: Any) -> Any:
+    """Copy an L2 collection into a cosine collection of the same name.
+
+    The copy is built under a temporary name and only replaces the original
+    once complete; an interrupted copy is discarded and redone next time.
+    """
+    if is_cosine(collection):
+        return collection
+    name = collection.name
+    staging_name = f"{name}{MIGRATION_SUFFIX}"
+    try:
+        client.delete_collection(staging_name)
+    except Exception:
+        pass  # No leftover from an interrupted migration
+
+    staging = client.create_collection(name=staging_name, metadata=cosine_metadata(collection.metadata))
+    copied = 0
+    while True:
+        page = collection.get(
+            limit=COPY_BATCH_SIZE, offset=copied, include=["embeddings", "documents", "metadatas"]
+        )
+        if not page["ids"]:
+            break
+        staging.add(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"]
+        )
+        copied += len(page["ids"])
+
+    client.delete_collection(name)
+    staging.modify(name=name)
+    logger.info(f"Migrated vector collection {name} ({copied} record(s)) to cosine distance")
+    return client.get_collection(name)
+
+
+def migrate_collections(client: Any) -> List[str]:
+    """Move every L2 collection to cosine distance; returns the migrated names."""
+    collections = {collection.name: collection for collection in client.list_collections()}
+    migrated = []
+    for name, collection in collections.items():
+        if name.endswith(MIGRATION_SUFFIX):
+            # Left by an interrupted migration; completed if the original is gone
+            original = name[:-len(MIGRATION_SUFFIX)]
+            if original not in collections:
+                collection.modify(name=original)
+                migrated.append(original)
+            continue
+        if not is_cosine(collection):
+            migrate_to_cosine(client, collection)
+            migrated.append(name)
+    return migrated
@@ -0,0 +1,135 @@
+# Unit Tests for the Batched Audit Log Writer
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from starlette.requests import Request
+
+from shared.middleware.audit import AuditMiddleware
+from shared.middleware.pipeline import RequestContext
+from shared.models.audit import AuditEventType, AuditLog, AuditOutcome, AuditSeverity
+from shared.services.audit import AuditService
+from shared.services.audit_writer import AuditWriter
+
+
+def make_entry(n=0, severity=AuditSeverity.MEDIUM):
+    return AuditService.build_entry(
+        event_type=AuditEventType.DATA_ACCESSED,
+        action=f"get_api_v1_items_{n}",
+        message=f"GET /api/v1/items/{n} - 200 (0.010s)",
+        severity=severity,
+        details={"duration_seconds": 0.01, "n": n}
+    )
+
+
+def make_writer(**overrides):
+    options = dict(queue_max_size=10, batch_size=4, flush_interval=0.05, overflow_policy="block", enqueue_timeout=0.01)
+    options.update(overrides)
+    writer = AuditWriter(**options)
+    writer._write = AsyncMock()
+    return writer
+
+
+class TestAuditWriter:
+    """Test batching, overflow policies and the checksum chain"""
+
+    @pytest.mark.asyncio
+    async def test_events_written_in_batches(self):
+        """Queued events are inserted in batches of at most batch_size"""
+        writer = make_writer()
+        for n in range(10):
+            await writer.submit(make_entry(n))
+        await writer.aclose()
+
+        sizes = [len(call.args[0]) for call in writer._write.await_args_list]
+        assert sum(sizes) == 10
+        assert max(sizes) <= 4
+        assert writer.get_statistics()["written"] == 10
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_flushed_after_interval(self):
+        """A lone event is written once the flush interval passes"""
+        writer = make_writer()
+        await writer.submit(make_entry())
+        await asyncio.sleep(0.2)
+
+        assert writer._write.await_count == 1
+        await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_overflow_policies(self):
+        """Full queues drop events or sample low-severity ones"""
+        drop = make_writer(queue_max_size=2, overflow_policy="drop")
+        results = [await drop.submit(make_entry(n)) for n in range(4)]
+        assert results == [True, True, False, False]
+        assert drop.stats.dropped == 2
+
+        sample = make_writer(queue_max_size=10, overflow_policy="sample")
+        sample.sample_rate = 0.0
+        for n in range(8):
+            await sample.submit(make_entry(n))
+        assert not await sample.submit(make_entry(severity=AuditSeverity.LOW))
+        assert await sample.submit(make_entry(severity=AuditSeverity.HIGH))
+        assert sample.stats.sampled_out == 1
+
+        for writer in (drop, sample):
+            await writer.aclose()
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_retried_once(self):
+        """A failed batch is retried with the next one, then dropped"""
+        writer = make_writer()
+        writer._write.side_effect = [ConnectionError("db down"), None]
+
+        await writer._flush_batch([make_entry(1)])
+        await writer._flush_batch([make_entry(2)])
+
+        assert len(writer._write.await_args_list[1].args[0]) == 2
+        assert writer.stats.written == 2 and writer.stats.dropped == 0
+
+    @pytest.mark.asyncio
+    async def test_rejected_row_dropped_alone(self):
+        """A row the database rejects does not take the rest of the batch with it"""
+        writer = make_writer()
+        bad = make_entry(99)
+
+        async def write(entries):
+            if any(entry is bad for entry in entries):
+                raise ValueError("value too long for type character varying(50)")
+
+        writer._write.side_effect = write
+        await writer._flush_batch([make_entry(n) for n in range(3)] + [bad] + [make_entry(n) for n in range(4, 7)])
+
+        assert writer.stats.written == 6 and writer.stats.dropped == 1
+        assert writer._retry == []
+
+    def test_oversized_request_values_clamped(self):
+        """A forged X-Forwarded-For and a long path fit their columns"""
+        request = Request({
+            "type": "http", "method": "GET", "path": "/api/v1/" + "a" * 300, "query_string": b"",
+            "headers": [(b"x-forwarded-for", b"9" * 5000 + b", 10.0.0.1")], "client": ("10.0.0.2", 1234)
+        })
+        context = RequestContext.from_request(request)
+        middleware = AuditMiddleware()
+
+        entry = middleware._build_audit_entry(
+            request=request, status_code=200, correlation_id=context.correlation_id, duration=0.01,
+            request_info=middleware._extract_request_info(request, context), response_info={},
+            outcome=AuditOutcome.SUCCESS, error_info=None
+        )
+
+        assert entry["source_ip"] == "9" * 50
+        assert len(entry["action"]) == 100
+
+    def test_checksum_chain(self):
+        """Each checksum covers the record and links to its predecessor"""
+        writer = make_writer()
+        entries = [make_entry(n) for n in range(3)]
+        last = writer._chain(entries, "seed")
+
+        records = [AuditLog(**entry) for entry in entries]
+        assert [r.previous_checksum for r in records] == ["seed", entries[0]["checksum"], entries[1]["checksum"]]
+        assert last == entries[2]["checksum"]
+        assert all(r.verify_integrity() for r in records)
+
+        records[1].message = "tampered"
+        assert not records[1].verify_integrity()
@@ -0,0 +1,148 @@
+# Unit Tests for Rolling Chat Session Summaries
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from shared.config.settings import ChatSettings
+from shared.models.chat import ChatMessage, ChatSession
+from shared.services.chat_summary import ChatSummaryService
+
+
+@pytest.fixture(autouse=True)
+def chat_settings():
+    """Small windows: summarize after 4 foldable messages, keep 2 recent"""
+    settings = SimpleNamespace(chat=ChatSettings(summary_trigger_messages=4, summary_recent_messages=2))
+    with patch("shared.services.chat_summary.get_settings", return_value=settings):
+        yield settings.chat
+
+
+async def make_session(db, message_count, summarized=0, summary=None):
+    chat_session = ChatSession(
+        user_id=uuid.uuid4(), chain_id=uuid.uuid4(), summary=summary, summarized_message_count=summarized
+    )
+    db.add(chat_session)
+    await db.flush()
+    started = datetime(2024, 1, 1)
+    for index in range(message_count):
+        db.add(ChatMessage(
+            session_id=chat_session.id,
+            role="user" if index % 2 == 0 else "assistant",
+            content=f"message {index}",
+            created_at=started + timedelta(seconds=index)
+        ))
+    await db.commit()
+    return chat_session
+
+
+def llm_returning(text):
+    return SimpleNamespace(generate_response=AsyncMock(return_value=SimpleNamespace(content=text)))
+
+
+class TestSummaryTrigger:
+    """Test when a summary update is due"""
+
+    def test_trigger_threshold(self):
+        """An update is due once trigger messages sit beyond the recent window"""
+        service = ChatSummaryService(None)
+        chat_session = ChatSession(summarized_message_count=0)
+
+        assert not service.needs_summary(chat_session, 5)
+        assert service.needs_summary(chat_session, 6)
+
+    def test_threshold_counts_from_summarized_offset(self):
+        """Messages already folded into the summary do not count"""
+        service = ChatSummaryService(None)
+        chat_session = ChatSession(summarized_message_count=4)
+
+        assert not service.needs_summary(chat_session, 9)
+        assert service.needs_summary(chat_session, 10)
+
+
+class TestSummaryFolding:
+    """Test folding older messages into the summary"""
+
+    @pytest.mark.asyncio
+    async def test_folds_messages_outside_recent_window(self, async_session):
+        """Only messages older than the recent window are sent and counted"""
+        chat_session = await make_session(async_session, 7, summarized=0, summary=None)
+        llm = llm_returning("  They said hello.  ")
+
+        written = []
+        commit = async_session.commit
+
+        async def recording_commit():
+            written.extend(
+                obj.summary_updated_at for obj in async_session.dirty if isinstance(obj, ChatSession)
+            )
+            await commit()
+
+        with patch.object(async_session, "commit", recording_commit):
+            assert await ChatSummaryService(async_session).update_summary(chat_session.id, llm)
+
+        # Timezone-aware, matching the DateTime(timezone=True) column
+        assert len(written) == 1 and written[0].tzinfo is not None
+        await async_session.refresh(chat_session)
+        assert chat_session.summary == "They said hello."
+        assert chat_session.summarized_message_count == 5
+        prompt = llm.generate_response.await_args.args[0][1]["content"]
+        assert "message 0" in prompt and "message 4" in prompt and "message 5" not in prompt
+
+    @pytest.mark.asyncio
+    async def test_extends_existing_summary_with_new_messages(self, async_session):
+        """An update sends the previous summary plus only the newly folded messages"""
+        chat_session = await make_session(async_session, 12, summarized=5, summary="Earlier summary")
+        llm = llm_returning("Updated summary")
+
+        assert await ChatSummaryService(async_session).update_summary(chat_session.id, llm)
+
+        await async_session.refresh(chat_session)
+        assert chat_session.summarized_message_count == 10
+        prompt = llm.generate_response.await_args.args[0][1]["content"]
+        assert "Earlier summary" in prompt
+        assert "message 4" not in prompt and "message 5" in prompt and "message 10" not in prompt
+
+    @pytest.mark.asyncio
+    async def test_below_threshold_does_nothing(self, async_session):
+        """No LLM call is made until enough messages accumulate"""
+        chat_session = await make_session(async_session, 5)
+        llm = llm_returning("unused")
+
+        assert not await ChatSummaryService(async_session).update_summary(chat_session.id, llm)
+        llm.generate_response.assert_not_called()
+
+
+class TestLoadHistory:
+    """Test reading the unsummarized tail of a conversation"""
+
+    @pytest.mark.asyncio
+    async def test_reads_after_summarized_offset(self, async_session):
+        """History starts right after the summarized messages, in order"""
+        chat_session = await make_session(async_session, 8, summarized=5)
+
+        messages, total = await ChatSummaryService(async_session).load_history(chat_session)
+
+        assert total == 8
+        assert [m.content for m in messages] == ["message 5", "message 6", "message 7"]
+
+    @pytest.mark.asyncio
+    async def test_lagging_summary_loses_nothing(self, async_session):
+        """Messages beyond the usual window are kept while the summary lags"""
+        chat_session = await make_session(async_session, 20, summarized=2)
+
+        messages, _ = await ChatSummaryService(async_session).load_history(chat_session)
+
+        assert [m.content for m in messages] == [f"message {i}" for i in range(2, 20)]
+
+    @pytest.mark.asyncio
+    async def test_excluded_message_left_out(self, async_session):
+        """The message being answered is not part of its own history"""
+        chat_session = await make_session(async_session, 3)
+        messages, _ = await ChatSummaryService(async_session).load_history(chat_session)
+        latest = messages[-1]
+
+        messages, total = await ChatSummaryService(async_session).load_history(chat_session, latest.id)
+
+        assert total == 2
+        assert [m.content for m in messages] == ["message 0", "message 1"]
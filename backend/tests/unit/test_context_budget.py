@@ -0,0 +1,89 @@
+# Unit Tests for Context Budgeting
+import pytest
+from unittest.mock import patch
+
+from shared.services.context_budget import (
+    ContextBudgeter,
+    TokenCounter,
+    get_context_window,
+    MESSAGE_OVERHEAD_TOKENS
+)
+
+
+class TestTokenCounter:
+    """Test token counting"""
+
+    def test_approximate_count_for_non_openai_provider(self):
+        """Non-OpenAI providers use a characters-per-token approximation"""
+        counter = TokenCounter("llama3.2:latest", "ollama")
+        assert not counter.is_exact
+        assert counter.count("a" * 400) == 100
+        assert counter.count("") == 0
+
+    def test_cached_token_count_is_reused(self):
+        """A stored token_count on a message skips re-tokenizing"""
+        counter = TokenCounter("llama3.2:latest", "ollama")
+        message = {"role": "user", "content": "x" * 4000, "token_count": 7}
+        assert counter.count_message(message) == 7 + MESSAGE_OVERHEAD_TOKENS
+
+    def test_unavailable_encoding_falls_back_to_approximation(self):
+        """A failed download of the fallback encoding does not raise"""
+        with patch("shared.services.context_budget.tiktoken") as tiktoken_module:
+            tiktoken_module.encoding_for_model.side_effect = KeyError("unknown-model")
+            tiktoken_module.get_encoding.side_effect = OSError("network unreachable")
+            counter = TokenCounter("unknown-model")
+
+        assert not counter.is_exact
+        assert counter.count("a" * 400) > 0
+
+    def test_truncate(self):
+        """Truncation respects the token limit"""
+        counter = TokenCounter("llama3.2:latest", "ollama")
+        truncated = counter.truncate("b" * 1000, 10)
+        assert counter.count(truncated) <= 10
+
+
+class TestContextBudgeter:
+    """Test budget allocation"""
+
+    def test_context_window_lookup(self):
+        """Longest matching prefix wins"""
+        assert get_context_window("gpt-4o-mini") == 128000
+        assert get_context_window("gpt-4") == 8192
+        assert get_context_window("unknown-model") == 8192
+
+    def test_history_drops_oldest_turns(self):
+        """History is trimmed from the oldest end to fit the budget"""
+        budgeter = ContextBudgeter("llama3.2", "ollama", max_tokens=100, context_window=1000)
+        history = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "w" * 400}
+            for i in range(20)
+        ]
+        result = budgeter.fit("You are helpful.", "hello", history=history)
+
+        assert 0 < len(result.history) < len(history)
+        assert result.omitted_history == len(history) - len(result.history)
+        assert result.history[-1] is history[-1]
+        assert result.tokens_used["history"] <= 1000 - 100
+
+    def test_unused_rag_share_goes_to_history(self):
+        """History can use the RAG/memory share when they are empty"""
+        budgeter = ContextBudgeter("llama3.2", "ollama", max_tokens=100, context_window=1000)
+        history = [{"role": "user", "content": "w" * 400} for _ in range(20)]
+
+        without_rag = budgeter.fit("sys", "hi", history=history)
+        with_rag = budgeter.fit("sys", "hi", history=history, rag_entries=["r" * 4000])
+
+        assert len(without_rag.history) > len(with_rag.history)
+        assert len(with_rag.rag_entries) == 1
+
+    def test_everything_fits(self):
+        """Small inputs pass through untouched"""
+        budgeter = ContextBudgeter("gpt-4o", "openai", max_tokens=500)
+        history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+        result = budgeter.fit("sys", "question", history=history, rag_entries=["a"], memory_entries=["m"])
+
+        assert result.history == history
+        assert result.rag_entries == ["a"]
+        assert result.memory_entries == ["m"]
+        assert result.omitted_history == 0
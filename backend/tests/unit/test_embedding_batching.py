@@ -0,0 +1,102 @@
+# Unit Tests for Embedding Micro-Batching
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from shared.services.embeddings.batching import MicroBatcher
+from shared.services.embeddings.ollama_provider import OllamaEmbeddingProvider
+
+
+class TestMicroBatcher:
+    """Test dynamic micro-batching"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_batched(self):
+        """Requests arriving together are dispatched as one batch"""
+        batches = []
+
+        async def embed(texts):
+            batches.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        batcher = MicroBatcher(embed, max_batch_size=10, max_wait_ms=5)
+        results = await asyncio.gather(*[batcher.submit("x" * i) for i in range(1, 6)])
+
+        assert results == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert len(batches) == 1
+        assert batcher.stats.batches == 1
+        assert batcher.stats.average_batch_size == 5
+
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self):
+        """Full batches are dispatched without waiting"""
+        batches = []
+
+        async def embed(texts):
+            batches.append(len(texts))
+            return [[0.0] for _ in texts]
+
+        batcher = MicroBatcher(embed, max_batch_size=4, max_wait_ms=1000)
+        await asyncio.wait_for(asyncio.gather(*[batcher.submit(str(i)) for i in range(8)]), timeout=1)
+
+        assert batches == [4, 4]
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_request(self):
+        """A failing batch fails each of its requests"""
+        async def embed(texts):
+            raise ConnectionError("provider down")
+
+        batcher = MicroBatcher(embed, max_batch_size=8, max_wait_ms=1)
+        results = await asyncio.gather(*[batcher.submit("a"), batcher.submit("b")], return_exceptions=True)
+
+        assert all(isinstance(r, ConnectionError) for r in results)
+
+
+class TestOllamaEmbeddingEndpoints:
+    """Test that single and batched Ollama embeddings share one endpoint"""
+
+    def _provider(self, *responses):
+        provider = OllamaEmbeddingProvider(base_url="http://ollama.test:11434", model="embed")
+        provider._model_checked = True
+        provider.client = Mock()
+        request = httpx.Request("POST", "http://ollama.test:11434")
+        for response in responses:
+            response.request = request
+        provider.client.post = AsyncMock(side_effect=list(responses))
+        return provider
+
+    @pytest.mark.asyncio
+    async def test_single_text_uses_batch_endpoint(self):
+        """A single embedding comes from /api/embed like batched ones"""
+        provider = self._provider(httpx.Response(200, json={"embeddings": [[0.6, 0.8]]}))
+
+        assert await provider.generate_embedding("hello") == [0.6, 0.8]
+        assert provider.client.post.await_args.args[0] == "/api/embed"
+
+    @pytest.mark.asyncio
+    async def test_legacy_fallback_is_normalized(self):
+        """Vectors from the old endpoint are scaled to unit length like /api/embed's"""
+        provider = self._provider(
+            httpx.Response(404, text="404 page not found"),
+            httpx.Response(200, json={"embedding": [3.0, 4.0]}),
+            httpx.Response(200, json={"embedding": [0.0, 2.0]})
+        )
+
+        assert await provider.generate_embedding("a") == [0.6, 0.8]
+        assert await provider.generate_embedding("b") == [0.0, 1.0]
+        assert [call.args[0] for call in provider.client.post.await_args_list] == [
+            "/api/embed", "/api/embeddings", "/api/embeddings"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_missing_model_keeps_batch_endpoint(self):
+        """A model error from /api/embed is raised without disabling batching"""
+        provider = self._provider(
+            httpx.Response(404, json={"error": 'model "embed" not found, try pulling it first'})
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await provider.generate_embeddings(["a"])
+        assert provider._batch_supported and not provider._model_checked
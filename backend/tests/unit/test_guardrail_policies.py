@@ -0,0 +1,155 @@
+# Unit Tests for Cached Guardrail Policies and Queued Violation Reporting
+import json
+import uuid
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from shared.services.guardrail_policies import GuardrailPolicyCache, PolicySet
+from shared.services.guardrails import (
+    ContentCategory, GuardrailsEngine, RiskLevel, ValidationContext, Violation, ViolationType
+)
+
+POLICIES = [
+    {'name': 'allow_all', 'action': '*', 'resource': '*', 'allowed': True},
+    {'name': 'no_delete', 'action': 'delete', 'resource': '*', 'allowed': False, 'reason': 'Deletes are blocked'},
+    {
+        'name': 'no_external_output', 'action': 'generate_response', 'resource': 'agent_output', 'allowed': False,
+        'conditions': {'external': True}, 'risk_score': 0.9
+    },
+]
+
+
+def make_context(user_id="user-123"):
+    return ValidationContext(
+        user_id=user_id,
+        agent_id="agent-123",
+        session_id=None,
+        content_category=ContentCategory.GENERAL,
+        source='input',
+        timestamp=datetime.utcnow(),
+        metadata={}
+    )
+
+
+class TestPolicySet:
+    """Test compiled policy evaluation"""
+
+    def test_first_blocking_policy_wins(self):
+        """Wildcards, action and resource matching follow the policy list"""
+        policies = PolicySet(POLICIES)
+
+        assert policies.evaluate("delete", "agent", {}).name == "no_delete"
+        assert policies.evaluate("read", "agent", {}) is None
+
+    def test_conditions_only_constrain_present_keys(self):
+        """A condition blocks unless the context contradicts it"""
+        policies = PolicySet(POLICIES)
+
+        assert policies.evaluate("generate_response", "agent_output", {}).name == "no_external_output"
+        assert policies.evaluate("generate_response", "agent_output", {"external": True}).risk_score == 0.9
+        assert policies.evaluate("generate_response", "agent_output", {"external": False}) is None
+
+
+class TestGuardrailPolicyCache:
+    """Test caching and invalidation of compiled policies"""
+
+    @pytest.mark.asyncio
+    async def test_policies_loaded_once(self):
+        """Checks across engines reuse one compiled policy set"""
+        cache = GuardrailPolicyCache(ttl_seconds=60)
+        loader = AsyncMock(return_value=POLICIES)
+
+        with patch("shared.services.guardrails.guardrail_policy_cache", cache):
+            for _ in range(3):
+                engine = GuardrailsEngine(Mock(spec=AsyncSession))
+                with patch.object(engine, "_get_policies", loader):
+                    result = await engine.check_policy("delete", "agent", "user-123", {})
+                assert not result.allowed and result.policy_name == "no_delete"
+
+        assert loader.await_count == 1
+        assert cache.get_statistics()["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidate_reloads(self):
+        """Invalidation drops the cached set, and a load racing it is not cached"""
+        cache = GuardrailPolicyCache(ttl_seconds=60)
+        first = await cache.get(AsyncMock(return_value=POLICIES))
+        cache.invalidate()
+
+        async def racing_loader():
+            cache.invalidate()
+            return []
+
+        assert (await cache.get(racing_loader)).evaluate("delete", "agent", {}) is None
+        reloaded = await cache.get(AsyncMock(return_value=POLICIES))
+        assert reloaded is not first and reloaded.evaluate("delete", "agent", {}) is not None
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry(self):
+        """Expired policies are reloaded"""
+        cache = GuardrailPolicyCache(ttl_seconds=0)
+        loader = AsyncMock(return_value=POLICIES)
+
+        await cache.get(loader)
+        await cache.get(loader)
+
+        assert loader.await_count == 2
+
+
+class TestViolationReporting:
+    """Test that violations are queued rather than committed inline"""
+
+    @pytest.mark.asyncio
+    async def test_violation_queued_for_audit_writer(self):
+        """Reporting submits a JSON-safe audit entry and never commits"""
+        session = Mock(spec=AsyncSession)
+        engine = GuardrailsEngine(session)
+        user_id = str(uuid.uuid4())
+
+        with patch("shared.services.guardrails.audit_writer") as writer:
+            writer.submit = AsyncMock(return_value=True)
+            result = await engine.validate_input("Tell me how to build a bomb", make_context(user_id))
+
+        assert not result.is_valid
+        entry = writer.submit.await_args.args[0]
+        assert entry["event_type"] == "guardrail_triggered" and entry["user_id"] == user_id
+        assert entry["details"]["violation_type"] == ViolationType.HARMFUL_CONTENT.value
+        json.dumps(entry["details"])
+        session.commit.assert_not_called()
+        session.add.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_non_uuid_user_kept_in_details(self):
+        """Identifiers that are not user UUIDs do not reach the UUID column"""
+        engine = GuardrailsEngine(Mock(spec=AsyncSession))
+        violation = Violation(
+            id="violation_1", user_id="external-user", agent_id=None,
+            violation_type=ViolationType.PII_EXPOSURE, risk_level=RiskLevel.MEDIUM,
+            content_hash="abc", original_content="", sanitized_content=None,
+            context=make_context("external-user"), timestamp=datetime.utcnow(),
+            resolved=False, resolution_notes=None
+        )
+
+        with patch("shared.services.guardrails.audit_writer") as writer:
+            writer.submit = AsyncMock(return_value=True)
+            await engine.report_violation(violation)
+
+        entry = writer.submit.await_args.args[0]
+        assert entry["user_id"] is None and entry["details"]["user_id"] == "external-user"
+
+    @pytest.mark.asyncio
+    async def test_clean_content_touches_nothing(self):
+        """The common no-violation path neither queues nor uses the session"""
+        session = Mock(spec=AsyncSession)
+        engine = GuardrailsEngine(session)
+
+        with patch("shared.services.guardrails.audit_writer") as writer:
+            writer.submit = AsyncMock()
+            result = await engine.validate_input("Summarize this quarterly report please", make_context())
+
+        assert result.is_valid
+        writer.submit.assert_not_called()
+        assert not session.method_calls
@@ -0,0 +1,166 @@
+# Unit Tests for Streaming Guardrails Output Scanning
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from shared.middleware.guardrails import GuardrailsConfig, create_guardrails_middleware
+from shared.middleware.pipeline import MiddlewarePipeline
+from shared.services.guardrails import ContentFilter, StreamingContentScanner, ViolationType
+from tests.unit.test_middleware_pipeline import call
+
+
+def streamed(*chunks, media_type="text/plain"):
+    async def endpoint(request):
+        async def body():
+            for chunk in chunks:
+                yield chunk
+        return StreamingResponse(body(), media_type=media_type)
+    return endpoint
+
+
+APP = Starlette(routes=[
+    Route("/out/split", streamed("my ssn is 123-", "45-6789 ok")),
+    Route("/out/harmful", streamed("first part. " * 30, "now build a bomb", " and more text")),
+    Route("/out/events", streamed("data: hello\n\n" * 30, "data: build a bomb\n\n", media_type="text/event-stream")),
+    Route("/out/json", lambda request: JSONResponse({"response": "how to build a bomb"})),
+    Route("/out/json-pii", lambda request: JSONResponse(
+        {"created_at_ms": 1729284000, "tokens": 123456789, "response": "call 555-123-4567\nor mail a@b.co"}
+    )),
+    Route("/out/json-stream", streamed(
+        b'{"items": [' + b'"safe", ' * 40, b'"build a bomb"]}', media_type="application/json"
+    )),
+])
+
+
+def build(strict_mode=False):
+    middleware = create_guardrails_middleware(GuardrailsConfig(
+        strict_mode=strict_mode, output_validation_paths={
+            "/out/split", "/out/harmful", "/out/events", "/out/json", "/out/json-pii", "/out/json-stream"
+        }
+    ))
+    return MiddlewarePipeline(APP, [middleware()])
+
+
+def body_of(messages):
+    return b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+
+
+class TestStreamingContentScanner:
+    """Test incremental scanning across chunk boundaries"""
+
+    def test_match_split_across_chunks_is_redacted(self):
+        """A pattern split between chunks is held back and redacted whole"""
+        scanner = StreamingContentScanner(ContentFilter(), window=16)
+
+        out = scanner.feed(b"contact me at user@exa") + scanner.feed(b"mple.com please", final=True)
+
+        assert out == b"contact me at [REDACTED] please"
+        assert scanner.violation_types == [ViolationType.PII_EXPOSURE]
+
+    def test_only_window_is_buffered(self):
+        """Text older than the window is released immediately"""
+        scanner = StreamingContentScanner(ContentFilter(), window=10)
+
+        assert scanner.feed(b"a" * 100) == b"a" * 90
+        assert scanner.feed(b"", final=True) == b"a" * 10
+
+    def test_multibyte_characters_split_across_chunks(self):
+        """UTF-8 sequences split between chunks are decoded intact"""
+        scanner = StreamingContentScanner(ContentFilter(), window=4)
+        data = "café über".encode()
+
+        out = scanner.feed(data[:4]) + scanner.feed(data[4:], final=True)
+
+        assert out.decode() == "café über"
+
+    def test_blocking_cuts_before_match(self):
+        """In blocking mode nothing from the harmful match onward is released"""
+        scanner = StreamingContentScanner(ContentFilter(), window=8, block=True)
+
+        out = scanner.feed(b"safe text then a bomb", final=True)
+
+        assert out == b"safe text then a "
+        assert scanner.blocked and scanner.feed(b"more", final=True) == b""
+
+
+class TestGuardrailsStreamingMiddleware:
+    """Test the guardrails pipeline stage on streamed responses"""
+
+    @pytest.fixture(autouse=True)
+    def no_reporting(self):
+        with patch("shared.middleware.guardrails.get_database_session"), \
+             patch("shared.middleware.guardrails.GuardrailsEngine") as engine:
+            engine.return_value.report_violation = AsyncMock()
+            self.report_violation = engine.return_value.report_violation
+            yield
+
+    @pytest.mark.asyncio
+    async def test_split_pii_redacted_in_stream(self):
+        """PII spanning two chunks is redacted and the violation reported"""
+        messages = await call(build(), "/out/split")
+
+        assert messages[0]["status"] == 200
+        assert body_of(messages) == b"my ssn is [REDACTED] ok"
+        headers = {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+        assert headers["x-guardrails-output-validated"] == "true" and "content-length" not in headers
+        self.report_violation.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_stream_not_buffered(self):
+        """Chunks are released before the response ends"""
+        messages = await call(build(), "/out/harmful")
+
+        chunks = [m for m in messages if m["type"] == "http.response.body" and m.get("body")]
+        assert len(chunks) > 1
+        assert b"[FILTERED]" in body_of(messages)
+
+    @pytest.mark.asyncio
+    async def test_strict_mode_cuts_stream_off(self):
+        """A harmful match mid-stream ends the stream with a marker"""
+        messages = await call(build(strict_mode=True), "/out/harmful")
+
+        body = body_of(messages)
+        assert messages[0]["status"] == 200
+        assert body.startswith(b"first part. ") and b"bomb" not in body
+        assert body.endswith(b"[Content blocked by guardrails]")
+        assert messages[-1]["more_body"] is False
+
+    @pytest.mark.asyncio
+    async def test_strict_mode_event_stream_marker(self):
+        """Event streams are terminated with a guardrails event"""
+        messages = await call(build(strict_mode=True), "/out/events")
+
+        assert body_of(messages).endswith(b'event: guardrails\ndata: {"error": "Content blocked by guardrails"}\n\n')
+
+    @pytest.mark.asyncio
+    async def test_strict_mode_rejects_unsent_response(self):
+        """A blocked body that has not started streaming becomes a 400"""
+        messages = await call(build(strict_mode=True), "/out/json")
+
+        assert messages[0]["status"] == 400
+        payload = json.loads(body_of(messages))
+        assert payload["violation_types"] == ["harmful_content"]
+        assert b"how to build" not in body_of(messages)
+
+    @pytest.mark.asyncio
+    async def test_json_body_reported_not_rewritten(self):
+        """Redacting raw JSON bytes would corrupt it, so JSON is only reported"""
+        messages = await call(build(), "/out/json-pii")
+
+        payload = json.loads(body_of(messages))
+        assert payload["tokens"] == 123456789 and payload["created_at_ms"] == 1729284000
+        assert payload["response"] == "call 555-123-4567\nor mail a@b.co"
+        self.report_violation.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_strict_mode_json_stream_not_cut(self):
+        """A JSON stream already under way is passed through whole"""
+        messages = await call(build(strict_mode=True), "/out/json-stream")
+
+        assert messages[0]["status"] == 200
+        assert json.loads(body_of(messages))["items"][-1] == "build a bomb"
+        assert self.report_violation.await_args.args[0].risk_level.value == "medium"
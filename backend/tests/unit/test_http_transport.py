@@ -0,0 +1,88 @@
+# Unit Tests for Shared HTTP Transport and Provider Cache Eviction
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from shared.services.http_transport import HTTPTransportRegistry, normalize_base_url
+from shared.services.llm_providers.base import LLMProviderType
+from shared.services.llm_providers.provider_factory import LLMProviderFactory, aclose_all_factories
+
+
+class TestHTTPTransportRegistry:
+    """Test pooled client sharing"""
+
+    def test_normalize_base_url(self):
+        """Equivalent URL spellings normalize to the same key"""
+        assert normalize_base_url("HTTP://Ollama:11434/") == "http://ollama:11434"
+        assert normalize_base_url("https://api.openai.com:443") == "https://api.openai.com"
+
+    @pytest.mark.asyncio
+    async def test_same_host_shares_client(self):
+        """Clients are shared per upstream and recreated after close"""
+        registry = HTTPTransportRegistry()
+        first = registry.get_client("http://ollama:11434")
+        assert registry.get_client("http://ollama:11434/") is first
+        assert registry.get_client("http://other:11434") is not first
+
+        await registry.aclose()
+        assert first.is_closed
+        assert registry.get_stats()["clients"] == 0
+        assert registry.get_client("http://ollama:11434") is not first
+        await registry.aclose()
+
+
+class TestProviderCacheEviction:
+    """Test LRU eviction of cached provider instances"""
+
+    def _factory(self, size: int) -> LLMProviderFactory:
+        credential_manager = MagicMock()
+        credential_manager.validate_and_update_credentials = AsyncMock()
+        factory = LLMProviderFactory(credential_manager)
+        factory.max_cached_providers = size
+        return factory
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_provider_is_closed(self):
+        """Providers beyond capacity are evicted and closed"""
+        factory = self._factory(size=2)
+
+        first = await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "a"})
+        first.aclose = AsyncMock()
+        await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "b"})
+        await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "c"})
+
+        assert factory.get_cache_statistics()["cached_providers"] == 2
+        first.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_reuses_provider(self):
+        """Identical credentials reuse the cached instance"""
+        factory = self._factory(size=4)
+
+        first = await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "a"})
+        second = await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "a"})
+
+        assert first is second
+        await factory.aclose_all()
+        assert factory.get_cache_statistics()["cached_providers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_evicted_provider_keeps_client_for_inflight_requests(self):
+        """Eviction does not pull the client out from under a running request"""
+        factory = self._factory(size=1)
+
+        first = await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "a"})
+        first._client = client = object()
+        await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "b"})
+
+        assert first._client is client
+
+    @pytest.mark.asyncio
+    async def test_shutdown_closes_every_factory(self):
+        """Application shutdown empties the caches of all live factories"""
+        factories = [self._factory(size=2) for _ in range(2)]
+        for factory in factories:
+            await factory.create_provider(LLMProviderType.MOCK, credentials={"key": "a"})
+
+        await aclose_all_factories()
+
+        assert all(f.get_cache_statistics()["cached_providers"] == 0 for f in factories)
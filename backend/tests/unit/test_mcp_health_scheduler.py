@@ -0,0 +1,105 @@
+# Unit Tests for the Centralized MCP Health Scheduler
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+from shared.services.mcp_health_scheduler import MCPHealthScheduler
+
+
+def make_scheduler(**overrides):
+    options = dict(tick_seconds=3600, max_concurrency=2, jitter=0.0,
+                   reconnect_initial_backoff=1.0, reconnect_max_backoff=8.0)
+    options.update(overrides)
+    scheduler = MCPHealthScheduler(**options)
+    scheduler._write = AsyncMock()
+    return scheduler
+
+
+def make_due(scheduler):
+    for state in scheduler._servers.values():
+        state.next_due = 0
+
+
+class TestMCPHealthScheduler:
+    """Test batched, bounded health checks with reconnect backoff"""
+
+    @pytest.mark.asyncio
+    async def test_one_write_per_tick_with_bounded_concurrency(self):
+        """All due servers are checked concurrently up to the limit and persisted once"""
+        scheduler = make_scheduler()
+        running = peak = 0
+
+        async def probe(server):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        for _ in range(5):
+            scheduler.register(SimpleNamespace(id=uuid4()), probe, AsyncMock(return_value=True))
+        make_due(scheduler)
+
+        outcomes = await scheduler.tick()
+        await scheduler.aclose()
+
+        assert len(outcomes) == 5 and all(o.healthy for o in outcomes)
+        assert peak == 2
+        assert scheduler._write.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_reconnect_with_exponential_backoff(self):
+        """Unhealthy servers are reconnected (not probed) with growing delays"""
+        scheduler = make_scheduler()
+        probe = AsyncMock(side_effect=ConnectionError("down"))
+        reconnect = AsyncMock(side_effect=ConnectionError("still down"))
+        scheduler.register(SimpleNamespace(id=uuid4()), probe, reconnect)
+        state = next(iter(scheduler._servers.values()))
+
+        delays = []
+        for _ in range(6):
+            state.next_due = 0
+            await scheduler.tick()
+            delays.append(round(state.next_due - time.monotonic()))
+        await scheduler.aclose()
+
+        assert probe.await_count == 1
+        assert reconnect.await_count == 5
+        assert delays == [1, 2, 4, 8, 8, 8]
+
+    @pytest.mark.asyncio
+    async def test_busy_server_is_not_checked_twice(self):
+        """Overlapping ticks never run two checks for one server"""
+        scheduler = make_scheduler()
+        release = asyncio.Event()
+        reconnect = AsyncMock(return_value=True)
+
+        async def probe(server):
+            await release.wait()
+
+        scheduler.register(SimpleNamespace(id=uuid4()), probe, reconnect)
+        make_due(scheduler)
+        first = asyncio.ensure_future(scheduler.tick())
+        await asyncio.sleep(0)
+
+        assert await scheduler.tick() == []
+        release.set()
+        assert len(await first) == 1
+        await scheduler.aclose()
+
+    def test_batched_update_statement(self):
+        """Outcomes are written with one UPDATE ... FROM (VALUES ...)"""
+        from datetime import datetime, timezone
+        from shared.services.mcp_health_scheduler import HealthOutcome
+
+        now = datetime.now(timezone.utc)
+        statement, params = MCPHealthScheduler._build_update([
+            HealthOutcome(str(uuid4()), True, None, now),
+            HealthOutcome(str(uuid4()), False, "timeout", now)
+        ])
+
+        assert str(statement).count("UPDATE mcp_servers") == 1
+        assert params["error_1"] == "timeout"
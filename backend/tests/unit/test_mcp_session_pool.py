@@ -0,0 +1,188 @@
+# Unit Tests for Persistent, Multiplexed MCP Sessions
+import asyncio
+import json
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+from shared.services import mcp_session_pool as pool_module
+from shared.services.mcp_session_pool import (
+    JSONRPCWebSocket,
+    MCPRequestError,
+    MCPSessionError,
+    PersistentMCPSession,
+)
+
+
+class FakeWebSocket:
+    """WebSocket double that answers requests in reverse order"""
+
+    def __init__(self, batch: int):
+        self.batch = batch
+        self.sent = []
+        self.incoming: asyncio.Queue = asyncio.Queue()
+
+    async def send(self, raw):
+        self.sent.append(json.loads(raw))
+        if len(self.sent) == self.batch:
+            for message in reversed(self.sent):
+                if message["method"] == "fail":
+                    reply = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -1, "message": "nope"}}
+                else:
+                    reply = {"jsonrpc": "2.0", "id": message["id"], "result": message["params"]}
+                await self.incoming.put(json.dumps(reply))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raw = await self.incoming.get()
+        if raw is None:
+            raise StopAsyncIteration
+        return raw
+
+    async def close(self):
+        await self.incoming.put(None)
+
+
+class TestJSONRPCWebSocket:
+    """Test request-id multiplexing over a raw WebSocket"""
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_responses_match_requests(self):
+        """Concurrent requests receive their own responses"""
+        connection = JSONRPCWebSocket(FakeWebSocket(batch=3))
+        results = await asyncio.gather(*[
+            connection.request("tools/call", {"n": n}, timeout=1) for n in range(3)
+        ])
+        await connection.close()
+
+        assert results == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+    @pytest.mark.asyncio
+    async def test_error_response_raises(self):
+        """JSON-RPC errors are raised to the matching caller only"""
+        connection = JSONRPCWebSocket(FakeWebSocket(batch=2))
+        ok, failed = await asyncio.gather(
+            connection.request("tools/call", {"n": 1}, timeout=1),
+            connection.request("fail", {}, timeout=1),
+            return_exceptions=True
+        )
+        await connection.close()
+
+        assert ok == {"n": 1}
+        assert isinstance(failed, MCPRequestError)
+
+    @pytest.mark.asyncio
+    async def test_connection_loss_fails_pending_requests(self):
+        """Pending requests fail when the server closes the connection"""
+        websocket = FakeWebSocket(batch=99)
+        connection = JSONRPCWebSocket(websocket)
+        pending = asyncio.ensure_future(connection.request("tools/call", {}, timeout=1))
+        await asyncio.sleep(0)
+        await websocket.incoming.put(None)
+
+        with pytest.raises(MCPSessionError):
+            await pending
+
+
+class FakeClientSession:
+    """ClientSession double counting handshakes"""
+
+    initializations = 0
+
+    def __init__(self, read_stream, write_stream):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def initialize(self):
+        FakeClientSession.initializations += 1
+
+    async def call_tool(self, name, arguments=None):
+        await asyncio.sleep(0.01)
+        return {"name": name, "arguments": arguments}
+
+
+@asynccontextmanager
+async def fake_sse_client(url, headers=None, timeout=5.0):
+    yield (None, None)
+
+
+class TestPersistentMCPSession:
+    """Test session reuse across calls"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_handshake(self):
+        """Many concurrent calls use a single initialized session"""
+        FakeClientSession.initializations = 0
+        with patch.object(pool_module, "sse_client", fake_sse_client), \
+             patch.object(pool_module, "ClientSession", FakeClientSession):
+            session = PersistentMCPSession("http://mcp.local/sse", max_in_flight=4)
+            results = await asyncio.gather(*[
+                session.request(lambda s, n=n: s.call_tool("echo", {"n": n}), timeout=1)
+                for n in range(10)
+            ])
+            await session.aclose()
+
+        assert [r["arguments"]["n"] for r in results] == list(range(10))
+        assert FakeClientSession.initializations == 1
+
+    @pytest.mark.asyncio
+    async def test_silently_dead_session_reconnects_after_timeout(self):
+        """A timeout on a session that no longer answers pings forces a reconnect"""
+
+        class StalledSession(FakeClientSession):
+            generation = 0
+
+            async def initialize(self):
+                await super().initialize()
+                StalledSession.generation += 1
+                self.dead = StalledSession.generation == 1
+
+            async def call_tool(self, name, arguments=None):
+                if self.dead:
+                    await asyncio.sleep(10)
+                return await super().call_tool(name, arguments)
+
+            async def send_ping(self):
+                if self.dead:
+                    await asyncio.sleep(10)
+
+        FakeClientSession.initializations = 0
+        with patch.object(pool_module, "sse_client", fake_sse_client), \
+             patch.object(pool_module, "ClientSession", StalledSession):
+            session = PersistentMCPSession("http://mcp.local/sse", connect_timeout=0.05, initial_backoff=0.01)
+            with pytest.raises(asyncio.TimeoutError):
+                await session.request(lambda s: s.call_tool("echo"), timeout=0.05)
+            result = await session.request(lambda s: s.call_tool("echo", {"n": 1}), timeout=1)
+            await session.aclose()
+
+        assert result["arguments"] == {"n": 1}
+        assert FakeClientSession.initializations == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_request_on_live_session_keeps_it(self):
+        """A timeout on a session that still answers pings does not reconnect"""
+
+        class SlowSession(FakeClientSession):
+            async def call_tool(self, name, arguments=None):
+                await asyncio.sleep(10)
+
+            async def send_ping(self):
+                return None
+
+        FakeClientSession.initializations = 0
+        with patch.object(pool_module, "sse_client", fake_sse_client), \
+             patch.object(pool_module, "ClientSession", SlowSession):
+            session = PersistentMCPSession("http://mcp.local/sse", connect_timeout=0.05)
+            with pytest.raises(asyncio.TimeoutError):
+                await session.request(lambda s: s.call_tool("echo"), timeout=0.05)
+            assert session.connected
+            await session.aclose()
+
+        assert FakeClientSession.initializations == 1
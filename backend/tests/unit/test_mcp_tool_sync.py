@@ -0,0 +1,68 @@
+# Unit Tests for Set-Based MCP Tool Discovery Sync
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from shared.services.mcp_gateway import MCPGatewayService
+
+
+def compile_sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.fixture
+def server():
+    return SimpleNamespace(id=uuid4(), name="docs")
+
+
+class TestMCPToolSync:
+    """Test the discovery upsert and soft-deletion statements"""
+
+    def test_single_upsert_for_all_tools(self, server):
+        """All discovered tools are written by one INSERT ... ON CONFLICT"""
+        discovered = [{"name": f"tool_{n}", "input_schema": {"type": "object"}} for n in range(200)]
+        discovered.append({"name": "tool_0", "description": "redefined"})
+
+        upsert, _ = MCPGatewayService._build_tool_sync_statements(server, discovered)
+        sql = compile_sql(upsert)
+
+        assert sql.count("INSERT INTO tools") == 1
+        assert "ON CONFLICT ON CONSTRAINT uq_tools_mcp_server_tool DO UPDATE" in sql
+        assert "IS DISTINCT FROM excluded.input_schema" in sql
+        assert len(upsert.compile(dialect=postgresql.dialect()).params) > 200
+
+    def test_vanished_tools_soft_deleted(self, server):
+        """Tools missing from discovery are flagged deleted, not removed"""
+        _, deactivate = MCPGatewayService._build_tool_sync_statements(server, [{"name": "search"}])
+        sql = compile_sql(deactivate)
+
+        assert sql.startswith("UPDATE tools SET")
+        assert "is_deleted" in sql and "NOT IN" in sql
+
+    def test_empty_discovery_soft_deletes_everything(self, server):
+        """An empty tool list removes all of the server's tools"""
+        upsert, deactivate = MCPGatewayService._build_tool_sync_statements(server, [])
+
+        assert upsert is None
+        assert "NOT IN" not in compile_sql(deactivate)
+
+    @pytest.mark.asyncio
+    async def test_sync_counts_and_invalidates_catalog(self, server):
+        """Sync reports created/updated/removed rows and invalidates the catalog"""
+        session = MagicMock()
+        session.flush = AsyncMock()
+        session.commit = AsyncMock()
+        upsert_result = MagicMock()
+        upsert_result.all.return_value = [SimpleNamespace(inserted=True), SimpleNamespace(inserted=False)]
+        session.execute = AsyncMock(side_effect=[upsert_result, MagicMock(rowcount=3)])
+
+        service = MCPGatewayService.__new__(MCPGatewayService)
+        with patch("shared.services.mcp_gateway.tool_catalog") as catalog:
+            counts = await service._sync_discovered_tools(session, server, [{"name": "a"}, {"name": "b"}])
+
+        assert counts == {"created": 1, "updated": 1, "removed": 3}
+        assert session.execute.await_count == 2
+        catalog.invalidate.assert_called_once()
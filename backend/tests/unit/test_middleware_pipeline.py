@@ -0,0 +1,151 @@
+# Unit Tests for the Pure ASGI Middleware Pipeline
+import json
+import pytest
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from shared.middleware.pipeline import MiddlewarePipeline, PipelineStage, RequestContext
+from shared.middleware.security import SecurityHeadersMiddleware
+
+
+class RecordingStage(PipelineStage):
+    """Records the hooks it sees; optionally rejects requests"""
+
+    def __init__(self, name, events, reject=False, body=False):
+        super().__init__()
+        self.name, self.events, self.reject, self.body = name, events, reject, body
+
+    def wants_body(self, request, context):
+        return self.body
+
+    async def on_request(self, request, context) -> Optional[Response]:
+        self.events.append((self.name, "request", context.correlation_id))
+        if self.reject:
+            return JSONResponse({"detail": "rejected"}, status_code=429)
+        return None
+
+    def on_response_start(self, context, headers):
+        headers[f"X-{self.name}"] = "1"
+
+    async def on_complete(self, context: RequestContext):
+        self.events.append((self.name, "complete", context.status_code, context.error, context.request_body))
+
+
+async def echo(request: Request):
+    return JSONResponse({"received": await request.json(), "correlation_id": request.state.correlation_id})
+
+
+async def stream(request: Request):
+    async def chunks():
+        for n in range(3):
+            yield f"chunk {n}\n"
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+async def fail(request: Request):
+    raise RuntimeError("boom")
+
+
+APP = Starlette(routes=[
+    Route("/echo", echo, methods=["POST"]),
+    Route("/stream", stream),
+    Route("/fail", fail),
+    Route("/ok", lambda request: PlainTextResponse("ok"))
+])
+
+
+async def call(app, path, method="GET", body=b"", headers=None):
+    """Drive an ASGI app directly and collect the sent messages"""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if body:
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": raw_headers, "client": ("203.0.113.5", 1234), "server": ("test", 80),
+        "scheme": "http", "http_version": "1.1", "root_path": "", "app": app
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = []
+
+    async def receive():
+        return requests.pop(0) if requests else {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def response_headers(messages):
+    return {k.decode().lower(): v.decode() for k, v in messages[0]["headers"]}
+
+
+class TestMiddlewarePipeline:
+    """Test hook order, short-circuiting, body replay and streaming"""
+
+    @pytest.mark.asyncio
+    async def test_stages_share_one_context(self):
+        """All stages see one correlation id and the final status"""
+        events = []
+        app = MiddlewarePipeline(APP, [RecordingStage("a", events), RecordingStage("b", events)])
+
+        messages = await call(app, "/ok")
+
+        assert response_headers(messages)["x-a"] == "1" and response_headers(messages)["x-b"] == "1"
+        assert [e[:2] for e in events] == [("a", "request"), ("b", "request"), ("b", "complete"), ("a", "complete")]
+        assert events[0][2] == events[1][2]
+        assert events[2][2] == 200
+
+    @pytest.mark.asyncio
+    async def test_short_circuit_skips_inner_stages(self):
+        """A rejecting stage stops the chain; outer stages still see the response"""
+        events = []
+        app = MiddlewarePipeline(APP, [
+            RecordingStage("outer", events), RecordingStage("gate", events, reject=True), RecordingStage("inner", events)
+        ])
+
+        messages = await call(app, "/ok")
+
+        assert messages[0]["status"] == 429
+        assert "x-outer" in response_headers(messages) and "x-inner" not in response_headers(messages)
+        assert [e[:2] for e in events] == [("outer", "request"), ("gate", "request"), ("outer", "complete")]
+
+    @pytest.mark.asyncio
+    async def test_body_buffered_once_and_replayed(self):
+        """A stage can read the JSON body and the endpoint still receives it"""
+        events = []
+        app = MiddlewarePipeline(APP, [RecordingStage("audit", events, body=True)])
+        body = json.dumps({"name": "agent"}).encode()
+
+        messages = await call(app, "/echo", method="POST", body=body, headers={"content-type": "application/json"})
+
+        payload = json.loads(b"".join(m.get("body", b"") for m in messages[1:]))
+        assert payload["received"] == {"name": "agent"}
+        assert events[-1][4] == body
+
+    @pytest.mark.asyncio
+    async def test_streaming_response_is_not_buffered(self):
+        """Streaming bodies pass through chunk by chunk with headers added"""
+        app = MiddlewarePipeline(APP, [SecurityHeadersMiddleware()])
+
+        messages = await call(app, "/stream")
+
+        body_messages = [m for m in messages if m["type"] == "http.response.body" and m.get("body")]
+        assert len(body_messages) == 3
+        assert response_headers(messages)["x-frame-options"] == "DENY"
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_on_complete(self):
+        """Stages are told about application errors, which propagate"""
+        events = []
+        app = MiddlewarePipeline(APP, [RecordingStage("log", events)])
+
+        with pytest.raises(RuntimeError):
+            await call(app, "/fail")
+
+        assert isinstance(events[-1][3], RuntimeError)
@@ -0,0 +1,125 @@
+# Unit Tests for Parallel Tool Execution
+import asyncio
+import time
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from shared.services.tool_executor import ToolExecutorService
+
+
+@pytest.fixture
+def executor():
+    service = ToolExecutorService(session=None)
+    with patch("shared.services.tool_executor.tool_catalog.get_by_name", AsyncMock(return_value=None)):
+        yield service
+
+
+class TestParallelToolExecution:
+    """Test batched tool calls within one iteration"""
+
+    def test_normalize_batch_and_single_forms(self, executor):
+        """Both decision formats produce distinct tool calls"""
+        single = {"needs_tool": True, "tool_name": "weather", "parameters": {"city": "Oslo"}}
+        batch = {"needs_tool": True, "tool_calls": [
+            {"tool_name": "weather", "parameters": {"city": "Oslo"}},
+            {"tool_name": "weather", "parameters": {"city": "Oslo"}},
+            {"tool_name": "weather", "parameters": {"city": "Lima"}},
+            {"parameters": {}},
+        ]}
+
+        assert executor._normalize_tool_calls(single) == [{"tool_name": "weather", "parameters": {"city": "Oslo"}}]
+        assert [c["parameters"]["city"] for c in executor._normalize_tool_calls(batch)] == ["Oslo", "Lima"]
+        assert executor._normalize_tool_calls({"needs_tool": False}) == []
+
+    @pytest.mark.asyncio
+    async def test_batch_runs_concurrently_in_plan_order(self, executor):
+        """Independent calls overlap and results keep the planned order"""
+        async def fake_execute(tool_name, parameters, user_id, agent_id=None):
+            await asyncio.sleep(0.1 if parameters["n"] == 0 else 0.02)
+            return {"status": "success", "output": parameters["n"]}
+
+        executor._execute_tool_by_name = fake_execute
+        calls = [{"tool_name": "echo", "parameters": {"n": n}} for n in range(3)]
+
+        start = time.monotonic()
+        results = await executor._execute_tool_batch(calls, "user", max_concurrency=3)
+
+        assert [r["output"] for r in results] == [0, 1, 2]
+        assert time.monotonic() - start < 0.25
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap_is_respected(self, executor):
+        """No more than max_concurrency calls run at once"""
+        running = 0
+        peak = 0
+
+        async def fake_execute(tool_name, parameters, user_id, agent_id=None):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"status": "success"}
+
+        executor._execute_tool_by_name = fake_execute
+        calls = [{"tool_name": "echo", "parameters": {"n": n}} for n in range(6)]
+        await executor._execute_tool_batch(calls, "user", max_concurrency=2)
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_tool_times_out_without_blocking_others(self, executor):
+        """A timed-out call yields an error result while the others succeed"""
+        async def fake_execute(tool_name, parameters, user_id, agent_id=None):
+            await asyncio.sleep(5 if tool_name == "slow" else 0)
+            return {"status": "success"}
+
+        executor._execute_tool_by_name = fake_execute
+        with patch("shared.services.tool_executor.get_settings") as settings:
+            settings.return_value.tools.call_timeout_seconds = 0.05
+            settings.return_value.tools.max_parallel_calls = 4
+            results = await executor._execute_tool_batch(
+                [{"tool_name": "slow", "parameters": {}}, {"tool_name": "fast", "parameters": {}}],
+                "user"
+            )
+
+        assert results[0]["status"] == "error"
+        assert results[1]["status"] == "success"
+
+    @pytest.mark.asyncio
+    async def test_knowledge_base_timeout_leaves_agent_session_alone(self, executor):
+        """RAG queries run on their own session, which is closed when a timeout cancels them"""
+        executor.session = MagicMock(name="agent_session")
+        rag_session = MagicMock(name="rag_session")
+        sessions = []
+
+        @asynccontextmanager
+        async def database_session():
+            sessions.append("open")
+            try:
+                yield rag_session
+            finally:
+                sessions.append("closed")
+
+        class SlowRAGService:
+            def __init__(self, session, memory_manager):
+                assert session is rag_session
+
+            async def query(self, *args, **kwargs):
+                await asyncio.sleep(5)
+
+        with patch("shared.services.tool_executor.get_database_session", database_session), \
+                patch("shared.services.tool_executor.get_memory_manager", AsyncMock()), \
+                patch("shared.services.tool_executor.RAGService", SlowRAGService), \
+                patch("shared.services.tool_executor.get_settings") as settings:
+            settings.return_value.tools.call_timeout_seconds = 0.05
+            settings.return_value.tools.max_parallel_calls = 4
+            results = await executor._execute_tool_batch(
+                [{"tool_name": "knowledge_base", "parameters": {"query": "q"}}],
+                "00000000-0000-0000-0000-000000000001"
+            )
+
+        assert results[0]["status"] == "error"
+        assert sessions == ["open", "closed"]
+        assert not executor.session.method_calls
@@ -0,0 +1,70 @@
+# Unit Tests for the Bounded Password Hasher
+import asyncio
+import threading
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from shared.models.user import User
+from shared.services.auth import AuthService
+from shared.services.password_hasher import PasswordHasher, PasswordHasherBusyError
+
+# Cheap argon2 parameters keep the tests fast
+FAST = dict(time_cost=1, memory_cost=8, parallelism=1)
+
+
+class TestPasswordHasher:
+    """Test off-loop hashing, the concurrency limit and rehashing"""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_pool_thread(self):
+        """Hashing and verification do not run on the event loop thread"""
+        hasher = PasswordHasher(workers=2, max_waiting=4, **FAST)
+        loop_thread = threading.get_ident()
+
+        def hash_in_thread(password):
+            assert threading.get_ident() != loop_thread
+            return hasher.hash(password)
+
+        hashed = await hasher.run(hash_in_thread, "s3cret")
+        assert await hasher.run(hasher.verify, "s3cret", hashed)
+        assert not await hasher.run(hasher.verify, "wrong", hashed)
+        hasher.close()
+
+    @pytest.mark.asyncio
+    async def test_excess_operations_rejected(self):
+        """Operations beyond workers plus waiting slots are rejected"""
+        hasher = PasswordHasher(workers=1, max_waiting=1, **FAST)
+        release = threading.Event()
+
+        running = asyncio.ensure_future(hasher.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.ensure_future(hasher.run(lambda: "done"))
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher.run(lambda: "rejected")
+
+        release.set()
+        assert await running is True and await waiting == "done"
+        assert hasher.get_statistics()["rejected"] == 1
+        hasher.close()
+
+    @pytest.mark.asyncio
+    async def test_login_rehashes_outdated_hash(self):
+        """A hash made with older parameters is replaced on successful login"""
+        old = PasswordHasher(workers=1, **FAST)
+        current = PasswordHasher(workers=1, time_cost=2, memory_cost=16, parallelism=1)
+        user = User(email="rehash@example.com", username="rehash", password_hash=old.hash("s3cret"), is_active=True)
+        session = MagicMock()
+        session.commit = AsyncMock()
+        service = AuthService(session)
+        service.get_user_by_email = AsyncMock(return_value=user)
+
+        with patch("shared.services.auth.password_hasher", current):
+            assert await service.authenticate_user(user.email, "s3cret") is user
+
+        assert current.context.identify(user.password_hash) == "argon2"
+        assert "t=2" in user.password_hash and current.verify("s3cret", user.password_hash)
+        assert not current.needs_update(user.password_hash)
+        for hasher in (old, current):
+            hasher.close()
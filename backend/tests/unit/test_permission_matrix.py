@@ -0,0 +1,94 @@
+# Unit Tests for Compiled Permission Matrices
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from shared.services.permission_matrix import PermissionMatrixCache, compile_permission_matrix
+from shared.services.permission_service import PermissionService
+
+
+def make_role(level, *permissions):
+    return SimpleNamespace(
+        id=uuid4(),
+        permission_level=level,
+        permissions=[
+            SimpleNamespace(name=name, resource=name.split(".")[0], action=name.split(".")[1])
+            for name in permissions
+        ]
+    )
+
+
+def make_session(roles, agent_grants=(), workflow_grants=()):
+    """Session answering the role query and one query per resource type"""
+    role_result = MagicMock()
+    role_result.scalars.return_value.all.return_value = [SimpleNamespace(role=role) for role in roles]
+    agent_result, workflow_result = MagicMock(), MagicMock()
+    agent_result.all.return_value = list(agent_grants)
+    workflow_result.all.return_value = list(workflow_grants)
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=[role_result, agent_result, workflow_result])
+    return session
+
+
+def make_user():
+    return SimpleNamespace(id=uuid4(), is_superuser=False, is_system_admin=False)
+
+
+class TestPermissionMatrix:
+    """Test compiled checks, caching and invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_global_permissions_respect_role_level(self):
+        """A permission only counts for actions its role's level allows"""
+        viewer = make_role(1, "agent.view", "agent.delete")
+        matrix = await compile_permission_matrix(make_session([viewer]), uuid4())
+
+        assert matrix.allows("agent", "view")
+        assert not matrix.allows("agent", "delete")
+        assert not matrix.allows("workflow", "view")
+
+    @pytest.mark.asyncio
+    async def test_resource_grants_use_highest_access(self):
+        """Resource checks need the global permission and a sufficient grant"""
+        agent_id, other_id = uuid4(), uuid4()
+        role = make_role(3, "agent.execute", "agent.modify")
+        session = make_session([role], agent_grants=[(agent_id, "view"), (agent_id, "modify"), (other_id, "view")])
+        matrix = await compile_permission_matrix(session, uuid4())
+
+        assert matrix.allows_resource("agent", "modify", agent_id)
+        assert not matrix.allows_resource("agent", "execute", other_id)
+        assert not matrix.allows_resource("agent", "view", agent_id)  # no global agent.view
+        assert sorted(matrix.resource_ids("agent")) == sorted([agent_id, other_id])
+
+    @pytest.mark.asyncio
+    async def test_checks_served_from_cache_until_invalidated(self):
+        """Checks compile once; resource grant changes recompile"""
+        cache = PermissionMatrixCache(ttl_seconds=30, max_entries=10)
+        user = make_user()
+        role = make_role(2, "agent.view")
+        service = PermissionService(make_session([role]))
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("shared.services.permission_service.permission_matrix_cache", cache)
+            for _ in range(5):
+                assert await service.has_permission(user, "agent", "view")
+            assert service.session.execute.await_count == 3
+
+            cache.on_invalidation("api_key", "h")
+            assert cache.get_statistics()["users"] == 1
+            cache.on_invalidation("permissions", "")
+            assert cache.get_statistics()["users"] == 0
+
+    @pytest.mark.asyncio
+    async def test_accessible_resources_from_matrix(self):
+        """Granted resource ids come from the compiled matrix"""
+        cache = PermissionMatrixCache(ttl_seconds=30, max_entries=10)
+        agent_id = uuid4()
+        service = PermissionService(make_session([make_role(1, "agent.view")], agent_grants=[(agent_id, "view")]))
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr("shared.services.permission_service.permission_matrix_cache", cache)
+            resource_ids = await service.get_user_accessible_resources(make_user(), "agent")
+
+        assert resource_ids == [agent_id]
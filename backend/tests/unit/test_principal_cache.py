@@ -0,0 +1,126 @@
+# Unit Tests for Cached Principal Resolution
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+from shared.models.api_key import APIKey
+from shared.models.user import User
+from shared.services.api_key import APIKeyService
+from shared.services.principal_cache import PrincipalCache
+
+
+def make_session():
+    session = MagicMock()
+    session.merge = AsyncMock(side_effect=lambda obj, load=True: obj)
+    session.commit = AsyncMock()
+    return session
+
+
+def make_user():
+    return User(id=uuid4(), email="cached@example.com", username="cached", password_hash="x", is_active=True)
+
+
+def make_cache(**overrides):
+    options = dict(ttl_seconds=30, max_entries=2, flush_interval=60, channel="")
+    options.update(overrides)
+    return PrincipalCache(**options)
+
+
+class TestPrincipalCache:
+    """Test caching, invalidation and coalesced API key usage"""
+
+    @pytest.mark.asyncio
+    async def test_user_loaded_once_and_merged_per_request(self):
+        """Repeated lookups hit the cache and merge without loading"""
+        cache = make_cache()
+        user = make_user()
+        cache._load_user = AsyncMock(return_value=user)
+        session = make_session()
+
+        for _ in range(3):
+            assert await cache.get_user(session, user.id) is user
+
+        cache._load_user.assert_awaited_once()
+        assert session.merge.await_count == 3
+        assert all(call.kwargs == {"load": False} for call in session.merge.await_args_list)
+        assert cache.get_statistics()["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidation_and_ttl(self):
+        """Invalidated or expired users are loaded again"""
+        cache = make_cache()
+        user = make_user()
+        cache._load_user = AsyncMock(return_value=user)
+        session = make_session()
+
+        await cache.get_user(session, user.id)
+        await cache.invalidate_user(user.id)
+        await cache.get_user(session, user.id)
+        assert cache._load_user.await_count == 2
+
+        with patch("shared.services.principal_cache.time.monotonic", return_value=10 ** 9):
+            await cache.get_user(session, user.id)
+        assert cache._load_user.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_load_racing_invalidation_not_cached(self):
+        """A snapshot loaded before an invalidation is not stored"""
+        cache = make_cache()
+        user = make_user()
+
+        async def load(user_id):
+            await cache.invalidate_user(user_id)
+            return user
+
+        cache._load_user = load
+        await cache.get_user(make_session(), user.id)
+
+        assert cache.get_statistics()["users"] == 0
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_messages(self):
+        """Messages from other workers drop users, keys or everything"""
+        cache = make_cache()
+        cache._users["u1"] = (10 ** 12, make_user())
+        cache._api_keys["h1"] = (10 ** 12, APIKey())
+        cache._api_keys["h2"] = (10 ** 12, APIKey())
+
+        cache._invalidate_local("user:u1")
+        cache._invalidate_local("api_key:h1")
+        assert list(cache._users) == [] and list(cache._api_keys) == ["h2"]
+
+        cache._invalidate_local("all")
+        assert not cache._api_keys
+
+    @pytest.mark.asyncio
+    async def test_validate_api_key_coalesces_last_used(self):
+        """API key validation neither queries nor commits when cached"""
+        cache = make_cache()
+        record = APIKey(id=uuid4(), key_hash=APIKeyService.hash_api_key("secret"), is_active=True, expires_at=None)
+        cache._load_api_key = AsyncMock(return_value=record)
+        session = make_session()
+
+        with patch("shared.services.api_key.principal_cache", cache):
+            service = APIKeyService(session)
+            for _ in range(5):
+                assert await service.validate_api_key("secret") is record
+
+        cache._load_api_key.assert_awaited_once()
+        session.commit.assert_not_awaited()
+        assert list(cache._pending_use) == [str(record.id)]
+
+        statement, params = cache._build_update(cache._pending_use)
+        assert "UPDATE api_keys" in str(statement) and params["id_0"] == str(record.id)
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_pending_usage(self):
+        """Usage is retried with the next flush if the write fails"""
+        cache = make_cache()
+        cache.record_api_key_use(uuid4())
+
+        with patch("shared.services.principal_cache.get_database_session", side_effect=ConnectionError("db down")):
+            assert await cache.flush() == 0
+
+        assert len(cache._pending_use) == 1 and cache.flush_failures == 1
+        await cache.aclose()
@@ -0,0 +1,170 @@
+# Unit Tests for Queued Structured Logging
+import json
+import logging
+import threading
+import uuid
+import pytest
+
+from shared.logging.log_queue import LogQueue
+from shared.logging.structured_logging import (
+    CorrelationFilter, CustomJSONFormatter, RequestContext, SamplingFilter
+)
+
+
+class RecordingHandler(logging.Handler):
+    """Collects formatted records and the thread that wrote them"""
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.current_thread())
+
+
+@pytest.fixture
+def queued_logger():
+    """A private logger whose handler sits behind a log queue"""
+    logger = logging.getLogger(f"test.queued.{uuid.uuid4().hex}")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = RecordingHandler()
+    logger.addHandler(handler)
+    yield logger, handler
+    for attached in list(logger.handlers):
+        logger.removeHandler(attached)
+
+
+class TestLogQueue:
+    """Test writing records through the queue listener"""
+
+    def test_records_written_by_listener_thread(self, queued_logger):
+        """Handlers run on the listener thread, respecting their level"""
+        logger, handler = queued_logger
+        handler.setLevel(logging.INFO)
+        log_queue = LogQueue()
+        log_queue.attach(logger)
+        log_queue.start()
+
+        logger.debug("hidden %s", "detail")
+        logger.info("agent %s finished", "agent-1")
+        log_queue.stop()
+
+        assert [record.getMessage() for record in handler.records] == ["agent agent-1 finished"]
+        assert threading.current_thread() not in handler.threads
+        assert log_queue.get_statistics()["enqueued"] == 2
+
+    def test_message_merged_at_call_time(self, queued_logger):
+        """Mutable arguments are rendered before the call returns"""
+        logger, handler = queued_logger
+        log_queue = LogQueue()
+        log_queue.attach(logger)
+
+        payload = {"status": "running"}
+        logger.info("state %s", payload)
+        payload["status"] = "done"
+        log_queue.start()
+        log_queue.stop()
+
+        assert handler.records[0].getMessage() == "state {'status': 'running'}"
+
+    def test_full_queue_drops_and_counts(self, queued_logger):
+        """Logging never blocks on a full queue"""
+        logger, handler = queued_logger
+        log_queue = LogQueue(max_size=2)
+        log_queue.attach(logger)
+
+        for index in range(5):
+            logger.info("record %d", index)
+        stats = log_queue.get_statistics()
+        log_queue.start()
+        log_queue.stop()
+
+        assert stats["dropped"] == 3 and stats["enqueued"] == 2
+        assert len(handler.records) == 2
+
+    def test_truncation(self, queued_logger):
+        """Long messages and extra string fields are cut"""
+        logger, handler = queued_logger
+        log_queue = LogQueue(max_message_chars=10, max_field_chars=5)
+        log_queue.attach(logger)
+        log_queue.start()
+
+        logger.info("x" * 50, extra={"payload": "y" * 50, "count": 12345678})
+        log_queue.stop()
+
+        record = handler.records[0]
+        assert record.getMessage() == "x" * 10 + "... [truncated 40 chars]"
+        assert record.payload == "y" * 5 + "... [truncated 45 chars]"
+        assert record.count == 12345678
+
+    def test_correlation_captured_before_queueing(self, queued_logger):
+        """Context variables are read on the logging side, not the listener"""
+        logger, handler = queued_logger
+        log_queue = LogQueue()
+        log_queue.attach(logger, [CorrelationFilter()])
+        log_queue.start()
+
+        with RequestContext(correlation_id="req-123", user_id="user-1"):
+            logger.info("handled")
+        log_queue.stop()
+
+        assert handler.records[0].correlation_id == "req-123"
+        assert handler.records[0].user_id == "user-1"
+
+
+class TestSamplingFilter:
+    """Test per-module sampling of high-volume records"""
+
+    def _record(self, name, level):
+        return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+    def test_sampling_by_prefix(self):
+        """The longest matching prefix applies and WARNING and above are kept"""
+        sampler = SamplingFilter({"shared.services": 1.0, "shared.services.chain_orchestrator": 0.0})
+
+        assert sampler.filter(self._record("shared.services.agent_executor", logging.INFO))
+        assert not sampler.filter(self._record("shared.services.chain_orchestrator", logging.INFO))
+        assert not sampler.filter(self._record("shared.services.chain_orchestrator.nodes", logging.DEBUG))
+        assert sampler.filter(self._record("shared.services.chain_orchestrator", logging.WARNING))
+        assert sampler.filter(self._record("shared.services_extra", logging.INFO))
+        assert sampler.sampled_out == 2
+
+
+class TestJSONFormatter:
+    """Test JSON output of the structured formatter"""
+
+    def test_output_is_valid_json(self):
+        """Non-serializable extras are stringified"""
+        formatter = CustomJSONFormatter('%(timestamp)s %(level)s %(logger)s %(message)s')
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "done ✓", None, None)
+        record.execution_id = uuid.UUID(int=1)
+
+        output = json.loads(formatter.format(record))
+
+        assert output["message"] == "done ✓"
+        assert output["level"] == "INFO"
+        assert output["execution_id"] == str(uuid.UUID(int=1))
+
+
+class TestLogQueueShutdown:
+    """Test logging after the queue is stopped"""
+
+    def test_stop_restores_handlers(self, queued_logger):
+        """Records logged after stop are written directly, with producer filters kept"""
+        logger, handler = queued_logger
+        log_queue = LogQueue()
+        log_queue.attach(logger, [CorrelationFilter()])
+        log_queue.start()
+        logger.info("queued")
+        log_queue.stop()
+
+        with RequestContext(correlation_id="req-after"):
+            logger.info("after shutdown")
+
+        assert logger.handlers == [handler]
+        assert [record.getMessage() for record in handler.records] == ["queued", "after shutdown"]
+        assert handler.records[-1].correlation_id == "req-after"
+        assert threading.current_thread() in handler.threads
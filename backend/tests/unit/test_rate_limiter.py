@@ -0,0 +1,91 @@
+# Unit Tests for the Sliding-Window Rate Limiter
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from shared.services.rate_limiter import InMemoryRateLimiter, RateLimitRule, RedisRateLimiter
+
+RULES = [RateLimitRule("burst", 10, 3), RateLimitRule("minute", 60, 5)]
+
+
+class TestInMemoryRateLimiter:
+    """Test limits, window sliding and key eviction"""
+
+    def test_blocks_over_limit_and_reports_rule(self):
+        """The tightest rule blocks, with a retry hint"""
+        limiter = InMemoryRateLimiter(RULES, max_keys=100)
+
+        decisions = [limiter.hit_sync(["ip:a"], now=1000.0 + n * 0.1) for n in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        assert decisions[3].rule == "burst" and decisions[3].retry_after >= 1
+
+    def test_previous_window_is_weighted(self):
+        """Counts from the previous window decay as the current window advances"""
+        limiter = InMemoryRateLimiter([RateLimitRule("minute", 60, 10)], max_keys=100)
+        for n in range(10):
+            limiter.hit_sync(["ip:a"], now=1020.0 + n)
+
+        # Early in the next window nearly all previous requests still count
+        assert not limiter.hit_sync(["ip:a"], now=1081.0).allowed
+        # Halfway through, half of them do
+        assert limiter.hit_sync(["ip:a"], now=1110.0).remaining == 4
+
+    def test_blocked_requests_are_not_counted_and_keys_are_independent(self):
+        """Rejected requests do not extend the block; other clients are unaffected"""
+        limiter = InMemoryRateLimiter(RULES, max_keys=100)
+        for n in range(10):
+            limiter.hit_sync(["ip:a"], now=1000.0)
+
+        assert limiter.hit_sync(["ip:b"], now=1000.0).allowed
+        assert limiter.hit_sync(["ip:a"], now=1019.5).allowed
+
+    def test_any_key_over_limit_blocks(self):
+        """A request limited per user and per API key is blocked by either"""
+        limiter = InMemoryRateLimiter(RULES, max_keys=100)
+        for _ in range(3):
+            limiter.hit_sync(["user:1", "api_key:k"], now=1000.0)
+
+        assert not limiter.hit_sync(["user:2", "api_key:k"], now=1000.0).allowed
+        assert limiter.hit_sync(["user:2"], now=1000.0).allowed
+
+    def test_idle_and_excess_keys_are_evicted(self):
+        """Memory stays bounded under scanning traffic"""
+        limiter = InMemoryRateLimiter(RULES, max_keys=50)
+        for n in range(200):
+            limiter.hit_sync([f"ip:{n}"], now=1000.0)
+        assert limiter.get_statistics()["keys"] == 50
+
+        limiter.hit_sync(["ip:late"], now=1000.0 + 121)
+        assert limiter.get_statistics()["keys"] == 1
+
+
+class TestRedisRateLimiter:
+    """Test the Redis backend wiring and its fallback"""
+
+    @pytest.mark.asyncio
+    async def test_script_result_is_decoded(self):
+        """Keys are prefixed and one script call decides the request"""
+        client = MagicMock()
+        script = AsyncMock(return_value=[0, 3, 0, 2500, 1])
+        client.register_script.return_value = script
+        limiter = RedisRateLimiter(RULES, client=client)
+
+        decision = await limiter.hit(["ip:a"], now=1000.0)
+
+        assert not decision.allowed
+        assert decision.rule == "burst" and decision.retry_after == 3
+        assert script.await_args.kwargs["keys"] == ["ratelimit:ip:a"]
+        assert script.await_args.kwargs["args"] == [1000000, 120000, 10000, 3, 60000, 5]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_limits(self):
+        """Redis errors switch to in-process limiting instead of failing requests"""
+        client = MagicMock()
+        client.register_script.return_value = AsyncMock(side_effect=ConnectionError("down"))
+        limiter = RedisRateLimiter(RULES, client=client)
+
+        decisions = [await limiter.hit(["ip:a"], now=1000.0) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert limiter.fallbacks == 4
@@ -0,0 +1,119 @@
+# Unit Tests for the Sandbox Worker Pool
+import asyncio
+import pytest
+
+from shared.services.sandbox_pool import SandboxPool, SandboxError, SandboxTimeoutError
+
+ECHO_TOOL = "def execute(inputs, context=None):\n    import os\n    return {'value': inputs['value'] * 2, 'pid': os.getpid()}\n"
+
+
+def make_pool(**kwargs) -> SandboxPool:
+    options = dict(size=1, max_calls_per_worker=0, memory_limit_mb=0, cpu_seconds_per_call=0, warm_modules=[])
+    options.update(kwargs)
+    return SandboxPool(**options)
+
+
+class TestSandboxPool:
+    """Test pooled custom tool execution"""
+
+    @pytest.mark.asyncio
+    async def test_worker_is_reused_between_calls(self):
+        """Consecutive calls are served by the same pre-warmed worker"""
+        pool = make_pool()
+        try:
+            await pool.start()
+            first = await pool.execute(ECHO_TOOL, {"value": 2}, timeout=10)
+            second = await pool.execute(ECHO_TOOL, {"value": 5}, timeout=10)
+        finally:
+            await pool.close()
+
+        assert first["value"] == 4
+        assert second["value"] == 10
+        assert first["pid"] == second["pid"]
+        assert pool.stats.workers_started == 1
+
+    @pytest.mark.asyncio
+    async def test_worker_recycled_after_max_calls(self):
+        """Workers are replaced once they have served their call budget"""
+        pool = make_pool(max_calls_per_worker=1)
+        try:
+            first = await pool.execute(ECHO_TOOL, {"value": 1}, timeout=10)
+            second = await pool.execute(ECHO_TOOL, {"value": 1}, timeout=10)
+        finally:
+            await pool.close()
+
+        assert first["pid"] != second["pid"]
+
+    @pytest.mark.asyncio
+    async def test_tool_error_keeps_worker(self):
+        """Exceptions raised by the tool are reported without killing the worker"""
+        pool = make_pool()
+        code = "def execute(inputs, context=None):\n    raise ValueError('bad input')\n"
+        try:
+            with pytest.raises(SandboxError, match="bad input"):
+                await pool.execute(code, {}, timeout=10)
+            assert (await pool.execute(ECHO_TOOL, {"value": 1}, timeout=10))["value"] == 2
+        finally:
+            await pool.close()
+
+        assert pool.stats.workers_started == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_and_replaces_worker(self):
+        """A call exceeding its timeout is aborted and the worker replaced"""
+        pool = make_pool()
+        code = "def execute(inputs, context=None):\n    import time\n    time.sleep(30)\n"
+        try:
+            with pytest.raises(SandboxTimeoutError):
+                await pool.execute(code, {}, timeout=0.5)
+            result = await pool.execute(ECHO_TOOL, {"value": 3}, timeout=10)
+        finally:
+            await pool.close()
+
+        assert result["value"] == 6
+        assert pool.stats.timeouts == 1
+
+    @pytest.mark.asyncio
+    async def test_tool_prints_do_not_corrupt_protocol(self):
+        """Output printed by tool code goes to stderr, not the frame channel"""
+        pool = make_pool()
+        code = "def execute(inputs, context=None):\n    print('noise')\n    return 'ok'\n"
+        try:
+            assert await pool.execute(code, {}, timeout=10) == "ok"
+        finally:
+            await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_worker_started_during_close_is_stopped(self):
+        """A worker that finishes starting after close is terminated, not queued"""
+        pool = make_pool()
+        spawned = []
+        spawn = pool._spawn
+
+        async def recording_spawn():
+            worker = await spawn()
+            spawned.append(worker)
+            return worker
+
+        pool._spawn = recording_spawn
+        starting = asyncio.ensure_future(pool.start())
+        await asyncio.sleep(0)
+        await pool.close()
+        await starting
+
+        await asyncio.wait_for(spawned[0].process.wait(), timeout=5)
+        assert not spawned[0].alive
+        assert pool.get_statistics()["workers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_workers_not_shared_between_calls_by_default(self):
+        """Without opting in to reuse, every call runs in its own process"""
+        pool = SandboxPool(size=1, memory_limit_mb=0, cpu_seconds_per_call=0, warm_modules=[])
+        try:
+            first = await pool.execute(ECHO_TOOL, {"value": 1}, timeout=10)
+            second = await pool.execute(ECHO_TOOL, {"value": 1}, timeout=10)
+        finally:
+            await pool.close()
+
+        assert pool.max_calls_per_worker == 1
+        assert first["pid"] != second["pid"]
@@ -0,0 +1,69 @@
+# Unit Tests for Compiled JSON-Schema Validators
+import pytest
+from unittest.mock import patch
+
+from shared.services.schema_validator import SchemaValidatorCache, schema_fingerprint
+from shared.services.validation import ValidationService
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "city": {"type": "string"},
+        "days": {"type": "integer", "minimum": 1}
+    },
+    "required": ["city"]
+}
+
+
+class TestSchemaValidatorCache:
+    """Test validator compilation caching and structured errors"""
+
+    def test_validator_compiled_once_per_schema(self):
+        """Equivalent schemas share one compiled validator"""
+        cache = SchemaValidatorCache(max_size=8, engine="jsonschema")
+        reordered = {"required": ["city"], "properties": SCHEMA["properties"], "type": "object"}
+
+        assert cache.validate({"city": "Oslo"}, SCHEMA) == []
+        assert cache.validate({"city": "Lima", "days": 2}, reordered) == []
+        assert cache.compilations == 1
+        assert schema_fingerprint(SCHEMA) == schema_fingerprint(reordered)
+
+    def test_structured_errors(self):
+        """All violations are reported with their paths"""
+        cache = SchemaValidatorCache(max_size=8, engine="jsonschema")
+
+        errors = cache.validate({"days": 0}, SCHEMA)
+
+        assert {(e.path, e.validator) for e in errors} == {("$", "required"), ("days", "minimum")}
+
+    def test_invalid_schema_reported(self):
+        """A broken schema yields a schema error instead of raising"""
+        cache = SchemaValidatorCache(max_size=8, engine="jsonschema")
+
+        errors = cache.validate({}, {"type": "not-a-type"})
+
+        assert errors and errors[0].validator == "schema"
+
+    def test_lru_bound(self):
+        """The cache evicts least recently used validators"""
+        cache = SchemaValidatorCache(max_size=2, engine="jsonschema")
+        for n in range(3):
+            cache.get({"type": "object", "maxProperties": n})
+
+        assert cache.get_statistics()["validators"] == 2
+
+    def test_validation_service_compatibility(self):
+        """ValidationService keeps its boolean API"""
+        assert ValidationService.validate_json_schema({"city": "Oslo"}, SCHEMA) is True
+        assert ValidationService.validate_json_schema({"city": 3}, SCHEMA) is False
+        assert ValidationService.json_schema_errors({"city": 3}, SCHEMA)[0]["path"] == "city"
+
+    def test_fingerprint_passed_through(self):
+        """A known fingerprint skips re-serializing the schema"""
+        fingerprint = schema_fingerprint(SCHEMA)
+
+        with patch("shared.services.schema_validator.schema_fingerprint") as fingerprint_schema:
+            errors = ValidationService.json_schema_errors({"city": 3}, SCHEMA, fingerprint)
+
+        fingerprint_schema.assert_not_called()
+        assert errors[0]["path"] == "city"
@@ -0,0 +1,84 @@
+# Unit Tests for Single-Flight Request Coalescing
+import asyncio
+import pytest
+
+from shared.services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical calls"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_upstream(self):
+        """Concurrent callers with the same key trigger one upstream call"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        results = await asyncio.gather(*[flight.do("key", upstream) for _ in range(5)])
+
+        assert calls == 1
+        assert [r for r, _ in results] == ["answer"] * 5
+        assert sum(1 for _, shared in results if shared) == 4
+        assert flight.stats.upstream_calls == 1
+        assert flight.stats.shared_calls == 4
+        assert flight.stats.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_callers(self):
+        """An upstream failure is raised to every waiter"""
+        flight = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[flight.do("key", upstream) for _ in range(3)],
+            return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Cancelling one waiter leaves the shared call running"""
+        flight = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.05)
+            return 42
+
+        first = asyncio.create_task(flight.do("key", upstream))
+        second = asyncio.create_task(flight.do("key", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        result, shared = await second
+        assert result == 42
+        assert shared
+
+    @pytest.mark.asyncio
+    async def test_stream_fan_out(self):
+        """Every subscriber receives the full chunk sequence"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            for chunk in ["a", "b", "c"]:
+                await asyncio.sleep(0.005)
+                yield chunk
+
+        async def consume():
+            return [chunk async for chunk in flight.stream("key", upstream)]
+
+        results = await asyncio.gather(consume(), consume(), consume())
+
+        assert calls == 1
+        assert results == [["a", "b", "c"]] * 3
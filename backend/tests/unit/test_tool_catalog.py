@@ -0,0 +1,95 @@
+# Unit Tests for the In-Process Tool Catalog
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from uuid import uuid4
+
+from shared.models.tool import ToolStatus, ToolType
+from shared.services.tool_catalog import ToolCatalog
+
+
+def make_row(name, mcp_server_id=None, mcp_tool_name=None):
+    metadata = {}
+    if mcp_server_id:
+        metadata = {"mcp_server_id": mcp_server_id, "mcp_tool_name": mcp_tool_name}
+    return SimpleNamespace(
+        id=uuid4(), name=name, description=f"{name} tool", tool_type=ToolType.CUSTOM,
+        status=ToolStatus.ACTIVE, input_schema={"type": "object"}, category=None,
+        timeout_seconds=30, tool_config_metadata=metadata
+    )
+
+
+class TestToolCatalog:
+    """Test indexed tool lookup and invalidation"""
+
+    def _catalog(self, rows):
+        catalog = ToolCatalog(ttl_seconds=0)
+        loads = []
+
+        async def fake_load():
+            loads.append(1)
+            catalog._index([catalog._describe(row) for row in rows])
+            catalog._loaded_at = 0.0
+
+        catalog._load = fake_load
+        return catalog, loads
+
+    @pytest.mark.asyncio
+    async def test_lookup_by_id_name_and_mcp_key(self):
+        """Tools resolve by id, by name and by MCP server + tool name"""
+        server_id = str(uuid4())
+        calculator = make_row("calculator")
+        search = make_row("docs_search", mcp_server_id=server_id, mcp_tool_name="search")
+        catalog, loads = self._catalog([calculator, search])
+
+        assert (await catalog.get(str(calculator.id))).name == "calculator"
+        assert (await catalog.get("calculator")).id == str(calculator.id)
+        assert (await catalog.get_mcp_tool(server_id, "search")).name == "docs_search"
+        assert await catalog.get("missing") is None
+        assert len(loads) == 1
+
+    @pytest.mark.asyncio
+    async def test_resolve_skips_unknown_and_duplicates(self):
+        """Resolving identifiers returns each known tool once"""
+        calculator = make_row("calculator")
+        catalog, _ = self._catalog([calculator])
+
+        tools = await catalog.resolve(["calculator", str(calculator.id), "unknown"])
+
+        assert [t.name for t in tools] == ["calculator"]
+        assert tools[0].to_info()["input_schema"] == {"type": "object"}
+
+    @pytest.mark.asyncio
+    async def test_duplicate_name_resolves_to_newest(self):
+        """With duplicate names the first (newest) loaded tool is used"""
+        newest, older = make_row("calculator"), make_row("calculator")
+        catalog, _ = self._catalog([newest, older])
+
+        assert (await catalog.get("calculator")).id == str(newest.id)
+        assert (await catalog.get(str(older.id))).id == str(older.id)
+
+    @pytest.mark.asyncio
+    async def test_invalidate_triggers_reload(self):
+        """Invalidation makes the next lookup reload the catalog"""
+        catalog, loads = self._catalog([make_row("calculator")])
+
+        await catalog.get("calculator")
+        catalog.invalidate()
+        await catalog.get("calculator")
+
+        assert len(loads) == 2
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry_triggers_reload(self):
+        """An expired snapshot is reloaded"""
+        catalog, loads = self._catalog([make_row("calculator")])
+        catalog.ttl_seconds = 60
+
+        with patch("shared.services.tool_catalog.time.monotonic", return_value=30.0):
+            await catalog.get("calculator")
+            await catalog.get("calculator")
+        assert len(loads) == 1
+
+        with patch("shared.services.tool_catalog.time.monotonic", return_value=100.0):
+            await catalog.get("calculator")
+        assert len(loads) == 2
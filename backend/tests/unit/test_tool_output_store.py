@@ -0,0 +1,128 @@
+# Unit Tests for Large Tool Output Storage
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+from shared.api.tool_registry import get_tool_output
+from shared.services.sandbox_pool import SandboxPool, SpilledOutput
+from shared.services.tool_output_store import ToolOutputStore, render_output
+
+BIG_TOOL = "def execute(inputs, context=None):\n    return {'rows': ['x' * 100] * inputs['n']}\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ToolOutputStore(root_dir=str(tmp_path), spill_threshold_bytes=1024, preview_chars=50, retention_hours=1)
+
+
+class TestToolOutputStore:
+    """Test spilling, reading and rendering of large outputs"""
+
+    @pytest.mark.asyncio
+    async def test_small_outputs_pass_through(self, store):
+        """Outputs under the threshold are returned unchanged"""
+        output = {"answer": 42}
+
+        assert await store.spill_if_large(output) is output
+        assert await store.spill_if_large("short text") == "short text"
+
+    @pytest.mark.asyncio
+    async def test_large_output_spilled_to_blob(self, store):
+        """Large outputs become a reference whose blob holds the full JSON"""
+        output = {"rows": [{"id": n, "text": "lorem ipsum"} for n in range(200)]}
+
+        reference = await store.spill_if_large(output)
+        blob_id = reference["blob_ref"]["id"]
+
+        assert store.is_reference(reference)
+        assert len(reference["preview"]) == 50
+        assert json.loads(await store.read(blob_id)) == output
+        assert reference["blob_ref"]["size_bytes"] == len(json.dumps(output).encode("utf-8"))
+
+    @pytest.mark.asyncio
+    async def test_stream_text_blob(self, store):
+        """Chunks are streamed into one text blob"""
+        reference = await store.put_stream(("line %d\n" % n for n in range(500)))
+
+        content = await store.read(reference["blob_ref"]["id"], offset=0, limit=14)
+
+        assert content == b"line 0\nline 1\n"
+        assert store.content_type_of(reference["blob_ref"]["id"]) == "text/plain"
+
+    @pytest.mark.asyncio
+    async def test_adopt_only_from_incoming_dir(self, store, tmp_path):
+        """Spilled worker files are adopted; arbitrary paths are refused"""
+        outside = tmp_path / "secret.json"
+        outside.write_text("{}")
+        with pytest.raises(ValueError):
+            await store.adopt(str(outside))
+
+        spilled = store.incoming_dir / "result.json"
+        spilled.write_text(json.dumps({"ok": True}))
+        reference = await store.adopt(str(spilled))
+
+        assert not spilled.exists()
+        assert json.loads(await store.read(reference["blob_ref"]["id"])) == {"ok": True}
+
+    @pytest.mark.asyncio
+    async def test_unknown_or_malformed_ids(self, store):
+        """Reads never escape the blob directory"""
+        assert await store.read("../../etc/passwd") is None
+        assert await store.read("0" * 32) is None
+
+    @pytest.mark.asyncio
+    async def test_owner_recorded_for_every_spill_path(self, store):
+        """Spilled, streamed and adopted blobs remember who they belong to"""
+        spilled = await store.spill_if_large("z" * 5000, owner="user-1")
+        streamed = await store.put_stream(["a" * 2000], owner="user-2")
+        (store.incoming_dir / "result.json").write_text("{}")
+        adopted = await store.adopt(str(store.incoming_dir / "result.json"), owner="user-3")
+        anonymous = await store.spill_if_large("z" * 5000)
+
+        assert store.owner_of(spilled["blob_ref"]["id"]) == "user-1"
+        assert store.owner_of(streamed["blob_ref"]["id"]) == "user-2"
+        assert store.owner_of(adopted["blob_ref"]["id"]) == "user-3"
+        assert store.owner_of(anonymous["blob_ref"]["id"]) is None
+
+    @pytest.mark.asyncio
+    async def test_only_owner_or_admin_reads_blob(self, store):
+        """Other users get the same 404 as for a missing blob"""
+        blob_id = (await store.spill_if_large("z" * 5000, owner="user-1"))["blob_ref"]["id"]
+        owner = SimpleNamespace(id="user-1", is_system_admin=False)
+        other = SimpleNamespace(id="user-2", is_system_admin=False)
+        admin = SimpleNamespace(id="admin", is_system_admin=True)
+
+        with patch("shared.api.tool_registry.tool_output_store", store):
+            assert (await get_tool_output(blob_id, 0, 4, owner)).body == b"zzzz"
+            assert (await get_tool_output(blob_id, 0, 4, admin)).body == b"zzzz"
+            with pytest.raises(HTTPException) as denied:
+                await get_tool_output(blob_id, 0, 4, other)
+
+        assert denied.value.status_code == 404
+
+    def test_render_output_respects_budget(self):
+        """Prompt rendering truncates inline output and shows blob previews"""
+        reference = {"blob_ref": {"id": "a" * 32, "size_bytes": 10 ** 6}, "preview": "p" * 300, "truncated": True}
+
+        assert len(render_output({"text": "y" * 5000}, 600)) < 700
+        assert "stored as blob" in render_output(reference, 100)
+        assert render_output({"a": 1}, 100) == json.dumps({"a": 1}, indent=2)
+
+    @pytest.mark.asyncio
+    async def test_sandbox_worker_spills_large_results(self, store):
+        """Workers write large results to the store instead of the pipe"""
+        pool = SandboxPool(size=1, max_calls_per_worker=0, memory_limit_mb=0, cpu_seconds_per_call=0, warm_modules=[])
+        options = dict(timeout=10, spill_dir=str(store.incoming_dir), spill_threshold_bytes=1024)
+        try:
+            small = await pool.execute(BIG_TOOL, {"n": 2}, **options)
+            large = await pool.execute(BIG_TOOL, {"n": 100}, **options)
+        finally:
+            await pool.close()
+
+        assert small == {"rows": ["x" * 100] * 2}
+        assert isinstance(large, SpilledOutput)
+        reference = await store.adopt(large.path)
+        assert len(json.loads(await store.read(reference["blob_ref"]["id"]))["rows"]) == 100
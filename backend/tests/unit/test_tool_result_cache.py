@@ -0,0 +1,94 @@
+# Unit Tests for Tool Result Caching
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+from shared.services.cache import AppCache, CacheConfig
+from shared.services.tool_result_cache import ToolResultCache, canonical_inputs
+
+
+def make_tool(cacheable=True, ttl=None, code="def execute(inputs): return inputs", version="1.0.0"):
+    return SimpleNamespace(id=uuid4(), version=version, code=code, cacheable=cacheable, cache_ttl_seconds=ttl)
+
+
+@pytest.fixture
+def result_cache():
+    return ToolResultCache(AppCache(None, CacheConfig(enable_l2=False, default_ttl_seconds=60)))
+
+
+class TestToolResultCache:
+    """Test per-tool result caching"""
+
+    def test_inputs_are_canonicalized(self):
+        """Key order does not change the canonical form"""
+        assert canonical_inputs({"b": 1, "a": {"y": 2, "x": 1}}) == canonical_inputs({"a": {"x": 1, "y": 2}, "b": 1})
+
+    @pytest.mark.asyncio
+    async def test_hit_after_store(self, result_cache):
+        """Equivalent inputs hit the cache and different inputs miss"""
+        tool = make_tool()
+        assert await result_cache.get(tool, {"a": 1, "b": 2}) == (False, None)
+
+        assert await result_cache.set(tool, {"a": 1, "b": 2}, {"sum": 3})
+        assert await result_cache.get(tool, {"b": 2, "a": 1}) == (True, {"sum": 3})
+        assert (await result_cache.get(tool, {"a": 1, "b": 3}))[0] is False
+        assert result_cache.get_statistics()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_non_cacheable_tools_and_errors_are_not_stored(self, result_cache):
+        """Opted-out tools and in-band errors are never cached"""
+        assert not await result_cache.set(make_tool(cacheable=False), {}, {"ok": True})
+        assert not await result_cache.set(make_tool(), {}, {"error": "upstream down"})
+
+    @pytest.mark.asyncio
+    async def test_spilled_outputs_are_not_stored(self, result_cache):
+        """Blob references are owned by one user and expire, so they are not shared"""
+        reference = {"blob_ref": {"id": "a" * 32, "size_bytes": 10 ** 6}, "preview": "...", "truncated": True}
+
+        assert not await result_cache.set(make_tool(), {}, reference)
+
+    @pytest.mark.asyncio
+    async def test_code_change_invalidates(self, result_cache):
+        """A new code revision does not see results of the old one"""
+        tool = make_tool()
+        await result_cache.set(tool, {"q": "x"}, {"v": 1})
+        tool.code = "def execute(inputs): return {}"
+
+        assert (await result_cache.get(tool, {"q": "x"}))[0] is False
+
+    @pytest.mark.asyncio
+    async def test_per_tool_ttl_expiry(self, result_cache):
+        """Entries expire after the tool's own TTL"""
+        tool = make_tool(ttl=10)
+        await result_cache.set(tool, {"q": "x"}, {"v": 1})
+        expires_at = result_cache.cache._l1_expires_at
+        key = next(iter(expires_at))
+
+        assert expires_at[key] - datetime.utcnow() <= timedelta(seconds=10)
+        assert (await result_cache.get(tool, {"q": "x"}))[0] is True
+
+        expires_at[key] = datetime.utcnow() - timedelta(seconds=1)
+        assert (await result_cache.get(tool, {"q": "x"}))[0] is False
+
+    @pytest.mark.asyncio
+    async def test_hits_return_independent_copies(self, result_cache):
+        """Mutating a returned result does not change the cached one"""
+        tool = make_tool()
+        outputs = {"items": [1, 2]}
+        await result_cache.set(tool, {"q": "x"}, outputs)
+        outputs["items"].append(3)
+
+        _, first = await result_cache.get(tool, {"q": "x"})
+        first["items"].append(4)
+
+        assert (await result_cache.get(tool, {"q": "x"}))[1] == {"items": [1, 2]}
+
+    @pytest.mark.asyncio
+    async def test_context_is_part_of_key(self, result_cache):
+        """Tool code receives the context, so results are cached per context"""
+        tool = make_tool()
+        await result_cache.set(tool, {"q": "x"}, {"v": 1}, {"source": "agent_execution"})
+
+        assert (await result_cache.get(tool, {"q": "x"}, {"source": "agent_execution"}))[0] is True
+        assert (await result_cache.get(tool, {"q": "x"}, {"source": "api"}))[0] is False
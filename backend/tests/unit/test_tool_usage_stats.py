@@ -0,0 +1,101 @@
+# Unit Tests for Write-Behind Tool Usage Statistics
+import asyncio
+import random
+import pytest
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+from shared.services.tool_usage_stats import LatencySketch, ToolUsageRecorder
+
+
+class TestLatencySketch:
+    """Test streaming latency quantiles"""
+
+    def test_quantiles_within_relative_error(self):
+        """Quantiles stay within the configured relative accuracy"""
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(4, 1) for _ in range(5000))
+        sketch = LatencySketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(sketch.quantile(q) - exact) / exact < 0.02
+
+    def test_merge(self):
+        """Merged sketches answer like one sketch over all values"""
+        left, right, combined = LatencySketch(), LatencySketch(), LatencySketch()
+        for value in range(1, 101):
+            (left if value % 2 else right).add(value)
+            combined.add(value)
+        left.merge(right)
+
+        assert left.count == 100
+        assert left.quantile(0.9) == combined.quantile(0.9)
+
+
+class TestToolUsageRecorder:
+    """Test in-memory aggregation and batched flushing"""
+
+    @pytest.mark.asyncio
+    async def test_usage_aggregated_into_one_batch(self):
+        """Many calls produce one write with per-tool totals"""
+        recorder = ToolUsageRecorder(flush_interval=60, max_pending=100)
+        recorder._write = AsyncMock()
+        tool_a, tool_b = uuid4(), uuid4()
+        recorder.record(tool_a, 100)
+        recorder.record(tool_a, 300)
+        recorder.record(tool_a, cache_hit=True)
+        recorder.record(tool_b, 50)
+
+        assert await recorder.flush() == 2
+        batch = recorder._write.call_args.args[0]
+        assert (batch[str(tool_a)].calls, batch[str(tool_a)].executions, batch[str(tool_a)].total_ms) == (3, 2, 400)
+        assert recorder.get_tool_statistics(tool_a)["cache_hits"] == 1
+        assert await recorder.flush() == 0
+        await recorder.aclose()
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_counts(self):
+        """Usage is retained and merged when a flush fails"""
+        recorder = ToolUsageRecorder(flush_interval=60, max_pending=100)
+        recorder._write = AsyncMock(side_effect=RuntimeError("database unavailable"))
+        tool_id = uuid4()
+        recorder.record(tool_id, 10)
+        await recorder.flush()
+        recorder.record(tool_id, 20)
+
+        recorder._write = AsyncMock()
+        await recorder.flush()
+
+        usage = recorder._write.call_args.args[0][str(tool_id)]
+        assert (usage.calls, usage.total_ms) == (2, 30)
+        assert recorder.flush_failures == 1
+        await recorder.aclose()
+
+    @pytest.mark.asyncio
+    async def test_first_record_starts_flusher(self):
+        """Usage is flushed without an explicit start(), until the recorder is closed"""
+        recorder = ToolUsageRecorder(flush_interval=0.01, max_pending=100)
+        recorder._write = AsyncMock()
+        recorder.record(uuid4(), 10)
+
+        await asyncio.sleep(0.1)
+        assert recorder._write.await_count == 1
+
+        await recorder.aclose()
+        recorder.record(uuid4(), 10)
+        assert recorder._flush_task.done()
+
+    def test_single_batched_update_statement(self):
+        """The flush is one UPDATE ... FROM (VALUES ...) statement"""
+        recorder = ToolUsageRecorder(flush_interval=60, max_pending=100)
+        for _ in range(3):
+            recorder.record(uuid4(), 5)
+
+        statement, params = recorder._build_update(recorder._pending)
+
+        assert str(statement).count("UPDATE tools") == 1
+        assert "FROM (VALUES" in str(statement)
+        assert {params[f"calls_{n}"] for n in range(3)} == {1}
@@ -0,0 +1,61 @@
+# Unit Tests for Cosine Vector Collections
+import uuid
+import chromadb
+import pytest
+
+from shared.services.vector_collections import (
+    MIGRATION_SUFFIX, get_or_create_collection, is_cosine, migrate_collections
+)
+
+
+@pytest.fixture
+def client():
+    return chromadb.EphemeralClient()
+
+
+def unique_name(prefix="tenant"):
+    return f"{prefix}_{uuid.uuid4().hex[:12]}"
+
+
+class TestVectorCollections:
+    """Test cosine collection creation and migration of L2 collections"""
+
+    def test_new_collections_use_cosine(self, client):
+        """Created collections keep their metadata and use cosine distance"""
+        collection = get_or_create_collection(client, unique_name("rag_kb"), {"owner_id": "o-1"})
+
+        assert is_cosine(collection)
+        assert collection.metadata["owner_id"] == "o-1"
+
+    def test_l2_collection_migrated_in_place(self, client):
+        """Stored vectors are copied unchanged and unnormalized ones rank like unit ones"""
+        name = unique_name()
+        legacy = client.create_collection(name=name, metadata={"agent_id": "a-1"})
+        # An unnormalized legacy vector close in direction to the query, and a
+        # short vector pointing elsewhere that L2 distance would rank first
+        legacy.add(
+            ids=["near", "far"],
+            embeddings=[[30.0, 1.0], [0.0, 0.5]],
+            documents=["near", "far"],
+            metadatas=[{"k": 1}, {"k": 2}]
+        )
+
+        assert name in migrate_collections(client)
+
+        collection = client.get_collection(name)
+        assert is_cosine(collection) and collection.metadata["agent_id"] == "a-1"
+        assert collection.count() == 2
+        assert collection.get(ids=["near"], include=["embeddings"])["embeddings"][0].tolist() == pytest.approx([30.0, 1.0])
+        result = collection.query(query_embeddings=[[1.0, 0.0]], n_results=2)
+        assert result["ids"][0] == ["near", "far"]
+        assert name not in migrate_collections(client)
+
+    def test_interrupted_migration_completed(self, client):
+        """A finished copy whose original was already deleted takes its name"""
+        name = unique_name()
+        staging = client.create_collection(name=name + MIGRATION_SUFFIX, metadata={"hnsw:space": "cosine"})
+        staging.add(ids=["m1"], embeddings=[[1.0, 0.0]], documents=["kept"])
+
+        migrate_collections(client)
+
+        assert client.get_collection(name).get(ids=["m1"])["documents"] == ["kept"]